@@ -7,7 +7,7 @@
 @File: base_schema.py
 @Desc: 通用分页响应模型 - items: List[T]
 """
-from typing import Generic, TypeVar, List, Optional
+from typing import Generic, TypeVar, List, Optional, Dict
 
 from pydantic import BaseModel
 
@@ -24,3 +24,13 @@ class ResponseModel(BaseModel):
     """通用响应模型"""
     message: str = "success"
     data: Optional[dict | list] = None
+
+
+class MetricsHistorySchema(BaseModel):
+    """监控指标历史响应模型"""
+    name: str
+    resolution: int  # 数据精度（秒），0表示原始采样
+    start: float
+    end: float
+    timestamps: List[float]
+    series: Dict[str, List[Optional[float]]]
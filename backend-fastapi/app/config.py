@@ -8,7 +8,7 @@
 @Desc: 应用配置 - # 环境标识
 """
 import os
-from typing import Literal, Optional
+from typing import Dict, Literal, Optional
 
 from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -50,6 +50,59 @@ class Settings(BaseSettings):
     CACHE_DEFAULT_EXPIRE: int = 300  # 默认缓存过期时间（秒）
     CACHE_PREFIX: str = "fastapi:"  # 缓存key前缀
     
+    # 服务器监控配置
+    SERVER_MONITOR_SAMPLE_INTERVAL: float = 2.0  # 后台采样间隔（秒）
+    SERVER_MONITOR_HISTORY_SIZE: int = 300  # 采样环形缓冲区保留的样本数
+    
+    # 监控历史配置
+    MONITOR_HISTORY_ENABLED: bool = True  # 是否记录Redis/数据库监控历史
+    MONITOR_HISTORY_INTERVAL: int = 10  # Redis/数据库监控历史采集间隔（秒）
+    MONITOR_HISTORY_DIR: Optional[str] = None  # 历史数据mmap持久化目录，为空时仅保存在内存（多worker共用目录时只有获得目录锁的一个进程持久化）
+    
+    # WebSocket配置
+    WS_PER_MESSAGE_DEFLATE: bool = True  # 协商permessage-deflate压缩（客户端支持时生效）
+    WS_SEND_QUEUE_SIZE: int = 100  # 每个连接的发送队列长度
+    WS_SLOW_CONSUMER_POLICY: str = "drop_oldest"  # 发送队列满时的处理方式：drop_oldest丢弃最早的消息，evict断开慢连接
+    WS_BACKPLANE_ENABLED: bool = True  # 通过Redis发布订阅跨进程投递WebSocket消息（支持多worker部署）
+    WS_COALESCE_WINDOW: float = 0.05  # 消息合并窗口（秒），窗口内的消息合并为一次发布
+    WS_PRESENCE_TTL: int = 60  # 各进程在线用户集合的过期时间（秒），每1/3周期续期
+    
+    # 消息中心配置
+    MESSAGE_INSERT_CHUNK_SIZE: int = 1000  # 批量创建消息时每条INSERT写入的行数
+    MESSAGE_BULK_THRESHOLD: int = 1000  # 接收人超过该数量时转为后台投递任务
+    
+    # 数据源配置
+    DATA_SOURCE_BATCH_CONCURRENCY: int = 8  # 批量执行时同时执行的数据源数量
+    DATA_SOURCE_BATCH_ITEM_TIMEOUT: float = 15.0  # 批量执行时单个数据源的超时时间（秒）
+    DATA_SOURCE_CACHE_STALE_TTL: int = 300  # 缓存过期后继续返回旧值并在后台刷新的时长（秒）
+    DATA_SOURCE_CACHE_CODEC: str = "auto"  # 缓存压缩算法：auto/zstd/lz4/zlib/none，auto按zstd、lz4、zlib顺序选择已安装的
+    DATA_SOURCE_CACHE_COMPRESS_MIN_SIZE: int = 4096  # 序列化后超过该字节数才压缩
+    DATA_SOURCE_AGGREGATE_MAX_ROWS: int = 100000  # 设置了降采样点数时，降采样前最多读取的行数
+
+    # HTTP客户端配置（API数据源、OAuth等外部请求共用的连接池）
+    HTTP_CLIENT_TIMEOUT: float = 10.0  # 默认超时时间（秒）
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 100  # 连接池最大连接数
+    HTTP_CLIENT_MAX_KEEPALIVE: int = 20  # 最大空闲长连接数
+    HTTP_CLIENT_KEEPALIVE_EXPIRY: float = 30.0  # 空闲长连接保留时间（秒）
+    HTTP_CLIENT_MAX_CONNECTIONS_PER_HOST: int = 20  # 单个主机同时进行的最大请求数
+    HTTP_CLIENT_HTTP2: bool = False  # 是否启用HTTP/2（需要安装h2）
+    HTTP_CLIENT_RETRIES: int = 2  # GET等幂等请求在连接错误或502/503/504时的重试次数
+
+    # 定时任务配置
+    ENABLE_SCHEDULER: bool = True  # 是否在本进程启动定时任务调度器
+    SCHEDULER_DISTRIBUTED: bool = True  # 通过Redis协调多worker，每个触发时间只执行一次，并同步任务变更
+    SCHEDULER_LOCAL_FALLBACK: bool = False  # 协调用的Redis不可用时仍在本worker执行（多worker部署时会重复执行），默认跳过执行
+    SCHEDULER_RUN_LOCK_TTL: int = 3600  # 执行锁保留时间（秒），需大于各worker触发同一时间的最大时间差
+    SCHEDULER_THREAD_POOL_SIZE: int = 4  # thread执行器的线程数（同步任务在事件循环执行器下也使用该线程池）
+    SCHEDULER_PROCESS_POOL_SIZE: int = 2  # process执行器同时运行的最大进程数（每次执行启动独立进程，超时时终止）
+    SCHEDULER_GROUP_MAX_CONCURRENCY: int = 4  # 每个任务分组在本进程内同时执行的任务数
+    SCHEDULER_GROUP_CONCURRENCY: Dict[str, int] = {}  # 按分组覆盖同时执行的任务数，如 {"report": 1}
+    SCHEDULER_RETRY_BACKOFF: float = 2.0  # 重试退避基数（秒），第n次重试前等待 [0, 基数*2^n] 内的随机时长
+    SCHEDULER_RETRY_MAX_BACKOFF: float = 300.0  # 重试退避上限（秒）
+    SCHEDULER_LOG_FLUSH_INTERVAL: float = 1.0  # 执行日志和执行计数的批量写入间隔（秒）
+    SCHEDULER_LOG_BATCH_SIZE: int = 500  # 缓冲达到该条数时立即写入
+    SCHEDULER_DURATION_WINDOW: int = 3600  # 执行耗时分位数的统计窗口（秒）
+    
     # JWT配置
     JWT_SECRET_KEY: str = "your-secret-key-change-in-production"  # JWT密钥，生产环境必须修改
     JWT_ALGORITHM: str = "HS256"  # JWT算法
@@ -0,0 +1,349 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Data Source Aggregate - 数据源聚合与降采样
+按数据源的 aggregate_config 对结果分组聚合、按时间分桶、降采样
+
+SQL 数据源将分组聚合编译为包裹原 SQL 的外层查询，在数据库中执行，排序子句始终位于最外层查询；
+API/静态数据源在获取数据后用 Python 计算，两者结果字段一致。
+
+配置示例：
+    {
+        "time_field": "created_at",     # 时间字段（可选），结果按其升序
+        "time_bucket": "hour",          # 时间分桶：minute/hour/day/week/month/year，不设置时按原值分组
+        "group_by": ["region"],         # 分组字段（可选）
+        "metrics": [                    # 聚合指标，分组但未设置时默认 count(*)
+            {"func": "sum", "field": "amount", "alias": "total"},
+            {"func": "count"}
+        ],
+        "max_points": 500,              # 每个分组最多保留的点数，超过时按 LTTB 降采样
+        "value_field": "total"          # 降采样依据的字段，默认第一个指标
+    }
+"""
+import re
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from core.data_source.transform import column, lttb_indices, numeric
+
+TIME_BUCKETS = ('minute', 'hour', 'day', 'week', 'month', 'year')
+FUNCTIONS = ('count', 'sum', 'avg', 'min', 'max')
+
+# 字段名只允许字母、数字、下划线（含中文），编译 SQL 时再按数据库规则加引号
+_IDENTIFIER = re.compile(r'^[^\W\d]\w*$')
+
+# 各数据库的时间分桶表达式，{col} 为已加引号的字段
+_SQL_BUCKETS = {
+    'postgresql': {
+        bucket: f"date_trunc('{bucket}', {{col}})" for bucket in TIME_BUCKETS
+    },
+    'mysql': {
+        'minute': "DATE_FORMAT({col}, '%Y-%m-%d %H:%i:00')",
+        'hour': "DATE_FORMAT({col}, '%Y-%m-%d %H:00:00')",
+        'day': "DATE({col})",
+        'week': "DATE_SUB(DATE({col}), INTERVAL WEEKDAY({col}) DAY)",
+        'month': "DATE_FORMAT({col}, '%Y-%m-01')",
+        'year': "DATE_FORMAT({col}, '%Y-01-01')",
+    },
+    'sqlite': {
+        'minute': "strftime('%Y-%m-%d %H:%M:00', {col})",
+        'hour': "strftime('%Y-%m-%d %H:00:00', {col})",
+        'day': "date({col})",
+        'week': "date({col}, 'weekday 0', '-6 days')",
+        'month': "strftime('%Y-%m-01', {col})",
+        'year': "strftime('%Y-01-01', {col})",
+    },
+}
+
+
+def _check_identifier(name: Any, label: str) -> str:
+    if not isinstance(name, str) or not _IDENTIFIER.match(name):
+        raise ValueError(f"聚合配置 {label} 不是合法的字段名: {name}")
+    return name
+
+
+def normalize_config(config: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    校验并补全聚合配置
+
+    Returns:
+        补全后的配置，未配置任何聚合或降采样时返回 None
+    """
+    if not config:
+        return None
+    if not isinstance(config, dict):
+        raise ValueError("聚合配置必须是对象")
+
+    time_field = config.get('time_field') or None
+    if time_field:
+        _check_identifier(time_field, 'time_field')
+    time_bucket = config.get('time_bucket') or None
+    if time_bucket:
+        if time_bucket not in TIME_BUCKETS:
+            raise ValueError(f"不支持的时间分桶: {time_bucket}，可选: {'/'.join(TIME_BUCKETS)}")
+        if not time_field:
+            raise ValueError("设置 time_bucket 时必须设置 time_field")
+
+    group_by = config.get('group_by') or []
+    if isinstance(group_by, str):
+        group_by = [group_by]
+    group_by = [_check_identifier(field, 'group_by') for field in group_by]
+
+    metrics = []
+    for metric in config.get('metrics') or []:
+        if not isinstance(metric, dict):
+            raise ValueError("聚合指标必须是对象")
+        func = (metric.get('func') or '').lower()
+        if func not in FUNCTIONS:
+            raise ValueError(f"不支持的聚合函数: {metric.get('func')}，可选: {'/'.join(FUNCTIONS)}")
+        field = metric.get('field') or None
+        if field:
+            _check_identifier(field, 'metrics.field')
+        elif func != 'count':
+            raise ValueError(f"聚合函数 {func} 必须指定 field")
+        alias = metric.get('alias') or (f"{func}_{field}" if field else 'count')
+        metrics.append({'func': func, 'field': field, 'alias': _check_identifier(alias, 'metrics.alias')})
+
+    grouped = bool(time_field or group_by)
+    if grouped and not metrics:
+        metrics = [{'func': 'count', 'field': None, 'alias': 'count'}]
+
+    names = ([time_field] if time_field else []) + group_by + [m['alias'] for m in metrics]
+    if len(names) != len(set(names)):
+        raise ValueError("聚合配置中的分组字段与指标别名不能重复")
+
+    max_points = config.get('max_points') or 0
+    if not isinstance(max_points, int) or max_points < 0 or 0 < max_points < 3:
+        raise ValueError("max_points 必须是不小于 3 的整数")
+    value_field = config.get('value_field') or (metrics[0]['alias'] if metrics else None)
+    if max_points and not value_field:
+        raise ValueError("设置 max_points 时必须设置 value_field 或 metrics")
+    if value_field:
+        _check_identifier(value_field, 'value_field')
+
+    if not grouped and not metrics and not max_points:
+        return None
+    return {
+        'time_field': time_field,
+        'time_bucket': time_bucket,
+        'group_by': group_by,
+        'metrics': metrics,
+        'max_points': max_points,
+        'value_field': value_field,
+    }
+
+
+def is_aggregated(config: Optional[Dict[str, Any]]) -> bool:
+    """是否需要分组聚合（否则只做降采样）"""
+    return bool(config and (config['time_field'] or config['group_by'] or config['metrics']))
+
+
+# ==================== SQL ====================
+
+def order_by_sql(config: Optional[Dict[str, Any]], dialect) -> Optional[str]:
+    """
+    聚合结果的排序子句，按输出的时间字段、分组字段排序
+
+    子查询中的 ORDER BY 不保证外层查询的顺序，再次包裹聚合查询时需将其加在最外层
+    """
+    if not is_aggregated(config):
+        return None
+    fields = ([config['time_field']] if config['time_field'] else []) + config['group_by']
+    if not fields:
+        return None
+    quote = dialect.identifier_preparer.quote
+    return f"ORDER BY {', '.join(quote(field) for field in fields)}"
+
+
+def compile_sql(sql: str, config: Dict[str, Any], dialect) -> str:
+    """
+    将聚合编译为包裹原 SQL 的外层查询
+
+    Args:
+        sql: 已校验、去掉末尾分号的原 SQL
+        config: normalize_config 返回的配置
+        dialect: SQLAlchemy 方言，用于字段加引号和选择时间分桶表达式
+    """
+    if not is_aggregated(config):
+        return sql
+
+    quote = dialect.identifier_preparer.quote
+    columns = []
+    keys = []
+
+    if config['time_field']:
+        expr = quote(config['time_field'])
+        if config['time_bucket']:
+            buckets = _SQL_BUCKETS.get(dialect.name)
+            if buckets is None:
+                raise ValueError(f"数据库 {dialect.name} 不支持时间分桶")
+            expr = buckets[config['time_bucket']].format(col=expr)
+        columns.append(f"{expr} AS {quote(config['time_field'])}")
+        keys.append(expr)
+
+    for field in config['group_by']:
+        columns.append(quote(field))
+        keys.append(quote(field))
+
+    for metric in config['metrics']:
+        argument = quote(metric['field']) if metric['field'] else '*'
+        columns.append(f"{metric['func'].upper()}({argument}) AS {quote(metric['alias'])}")
+
+    compiled = f"SELECT {', '.join(columns)} FROM ({sql}) AS _ds_agg"
+    if keys:
+        compiled += f" GROUP BY {', '.join(keys)} {order_by_sql(config, dialect)}"
+    return compiled
+
+
+# ==================== Python ====================
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # 大于 1e11 视为毫秒时间戳
+        return datetime.fromtimestamp(value / 1000 if value > 1e11 else value)
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return None
+
+
+def truncate_time(value: Any, bucket: str) -> Optional[datetime]:
+    """将时间截断到分桶起点，无法解析时返回 None"""
+    moment = _parse_time(value)
+    if moment is None:
+        return None
+    if bucket == 'minute':
+        return moment.replace(second=0, microsecond=0)
+    if bucket == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    moment = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == 'week':
+        return moment - timedelta(days=moment.weekday())
+    if bucket == 'month':
+        return moment.replace(day=1)
+    if bucket == 'year':
+        return moment.replace(month=1, day=1)
+    return moment
+
+
+def _number(value: Any) -> Any:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _compute(func: str, values: Optional[List[Any]], indices: List[int]) -> Any:
+    if values is None:
+        return len(indices)
+    present = [values[i] for i in indices if values[i] is not None]
+    if func == 'count':
+        return len(present)
+    if not present:
+        return None
+    if func in ('sum', 'avg'):
+        total = sum(map(_number, present))
+        return total / len(present) if func == 'avg' else total
+    try:
+        return min(present) if func == 'min' else max(present)
+    except TypeError:
+        numbers = list(map(_number, present))
+        return min(numbers) if func == 'min' else max(numbers)
+
+
+def _sort_key(key: tuple) -> tuple:
+    # None 排在最后
+    return tuple((value is None, value) for value in key)
+
+
+def aggregate_rows(rows: Any, config: Dict[str, Any]) -> Any:
+    """在 Python 中分组聚合（API/静态数据源），结果字段与 compile_sql 一致"""
+    if not is_aggregated(config) or not isinstance(rows, list) or not rows:
+        return rows
+    rows = [row for row in rows if isinstance(row, dict)]
+
+    key_fields = []
+    key_columns = []
+    if config['time_field']:
+        values = column(rows, config['time_field'])
+        if config['time_bucket']:
+            values = [truncate_time(value, config['time_bucket']) for value in values]
+        key_fields.append(config['time_field'])
+        key_columns.append(values)
+    for field in config['group_by']:
+        key_fields.append(field)
+        key_columns.append(column(rows, field))
+
+    groups: Dict[tuple, List[int]] = {}
+    for i, key in enumerate(zip(*key_columns) if key_columns else [()] * len(rows)):
+        indices = groups.get(key)
+        if indices is None:
+            groups[key] = [i]
+        else:
+            indices.append(i)
+
+    keys = list(groups)
+    try:
+        keys.sort(key=_sort_key)
+    except TypeError:
+        # 分组值类型不一致时保持出现顺序
+        pass
+
+    metric_columns = [
+        column(rows, metric['field']) if metric['field'] else None
+        for metric in config['metrics']
+    ]
+    result = []
+    for key in keys:
+        indices = groups[key]
+        item = dict(zip(key_fields, key))
+        for metric, values in zip(config['metrics'], metric_columns):
+            item[metric['alias']] = _compute(metric['func'], values, indices)
+        result.append(item)
+    return result
+
+
+def downsample(rows: Any, config: Optional[Dict[str, Any]]) -> Any:
+    """
+    按 max_points 对每个分组（group_by）分别做 LTTB 降采样
+
+    行需已按时间（或横轴）排序，降采样依据 value_field 的值；
+    各分组的结果拼接后重新按 time_field 排序
+    """
+    if not config or not config['max_points'] or not isinstance(rows, list):
+        return rows
+    max_points = config['max_points']
+    if len(rows) <= max_points:
+        return rows
+
+    partitions: Dict[tuple, List[Dict]] = {}
+    for row in rows:
+        key = tuple(row.get(field) for field in config['group_by']) if isinstance(row, dict) else ()
+        partitions.setdefault(key, []).append(row)
+
+    result = []
+    for part in partitions.values():
+        if len(part) <= max_points:
+            result.extend(part)
+            continue
+        indices = lttb_indices(numeric(column(part, config['value_field'], 0)), max_points)
+        result.extend(part[i] for i in indices)
+
+    if len(partitions) > 1 and config['time_field']:
+        times = column(result, config['time_field'])
+        try:
+            # 稳定排序，同一时间点保持分组顺序
+            order = sorted(range(len(result)), key=lambda i: _sort_key((times[i],)))
+        except TypeError:
+            # 时间值类型不一致时保持分组顺序
+            return result
+        result = [result[i] for i in order]
+    return result
@@ -8,9 +8,10 @@ import logging
 from typing import List, Any, Dict
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_db, AsyncSessionLocal
 from app.config import settings
 from app.base_schema import PaginatedResponse, ResponseModel
 from core.data_source.model import DataSource
@@ -21,9 +22,12 @@ from core.data_source.schema import (
     DataSourceSimpleOut,
     DataSourcePreviewRequest,
     DataSourceExecuteRequest,
+    DataSourceBatchRequest,
     DataSourceTestRequest,
     DataSourceCopyRequest,
 )
+from core.data_source.cache import data_source_cache
+from core.data_source.registry import data_source_registry
 from core.data_source.service import DataSourceService
 
 logger = logging.getLogger(__name__)
@@ -63,6 +67,7 @@ async def create_data_source(
 
     source = await DataSourceService.create(db, data.model_dump())
     await db.commit()
+    await data_source_registry.invalidate()
     logger.info(f"数据源已创建: {source.code}")
     return source
 
@@ -91,12 +96,14 @@ async def test_data_source(
             'api_data_path': body.api_data_path,
             'sql_content': body.sql_content,
             'db_connection': body.db_connection,
+            'sql_timeout': body.sql_timeout,
             'static_data': body.static_data,
             'params_def': body.params_def,
             'result_type': body.result_type,
             'tree_config': body.tree_config,
             'field_mapping': body.field_mapping,
             'chart_config': body.chart_config,
+            'aggregate_config': body.aggregate_config,
         }
 
         data = await DataSourceService.execute_temp(db, config, body.params)
@@ -126,6 +133,12 @@ async def check_code_available(
     return {'available': not exists}
 
 
+@router.get("/cache-stats", summary="获取数据源缓存统计")
+async def get_data_source_cache_stats():
+    """获取当前进程的数据源缓存命中、合并、后台刷新次数"""
+    return data_source_cache.get_stats()
+
+
 # ============ 执行接口 ============
 
 @router.get("/execute/{code}", summary="执行数据源（GET）")
@@ -169,6 +182,72 @@ async def execute_data_source_post(
         raise HTTPException(status_code=500, detail=f"执行失败: {str(e)}")
 
 
+@router.post("/execute-batch", summary="批量执行数据源")
+async def execute_data_source_batch(
+    body: DataSourceBatchRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    批量执行数据源（用于页面一次加载多个组件的数据）
+
+    相同编码和参数的调用只执行一次，各调用并发执行，单个失败不影响其他调用，
+    results 与 items 顺序一致
+    """
+    results = await DataSourceService.execute_batch(
+        db, [item.model_dump() for item in body.items], body.timeout
+    )
+    return {'results': results}
+
+
+@router.get("/export/{code}", summary="导出数据源数据")
+async def export_data_source(
+    request: Request,
+    code: str,
+    format: str = Query(default="ndjson", description="导出格式: ndjson/csv"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    流式导出数据源的全部数据（不受返回行数限制）
+
+    除 format 外的查询参数作为数据源参数
+    """
+    if format not in DataSourceService.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"不支持的导出格式: {format}")
+    source = await DataSourceService.get_by_code(db, code)
+    if not source or not source.status:
+        raise HTTPException(status_code=404, detail=f"数据源不存在或已禁用: {code}")
+    params = {k: v for k, v in request.query_params.items() if k != 'format'}
+
+    # 导出期间占用独立会话，先取第一批数据，SQL错误可以直接返回400
+    session = AsyncSessionLocal()
+    chunks = DataSourceService.export_source(session, source, params, format)
+    try:
+        first = await anext(chunks, '')
+    except ValueError as e:
+        await session.close()
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        await session.close()
+        logger.error(f"数据源导出失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"导出失败: {str(e)}")
+
+    async def stream():
+        try:
+            yield first
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+            await session.close()
+
+    media_type = 'text/csv; charset=utf-8' if format == 'csv' else 'application/x-ndjson'
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename="{code}.{format}"'},
+    )
+
+
 # ============ 动态路径接口（必须放在静态路径之后） ============
 
 @router.get("/{source_id}", response_model=DataSourceResponse, summary="获取数据源详情")
@@ -199,6 +278,7 @@ async def update_data_source(
     if not source:
         raise HTTPException(status_code=404, detail="数据源不存在")
     await db.commit()
+    await data_source_registry.invalidate()
     logger.info(f"数据源已更新: {source.code}")
     return source
 
@@ -213,6 +293,7 @@ async def delete_data_source(
     if not success:
         raise HTTPException(status_code=404, detail="数据源不存在")
     await db.commit()
+    await data_source_registry.invalidate()
     return ResponseModel(message="删除成功")
 
 
@@ -261,6 +342,7 @@ async def copy_data_source(
     if not source:
         raise HTTPException(status_code=404, detail="数据源不存在")
     await db.commit()
+    await data_source_registry.invalidate()
     logger.info(f"数据源已复制: {body.new_code}")
     return source
 
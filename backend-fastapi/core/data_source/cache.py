@@ -0,0 +1,400 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Data Source Cache - 数据源结果缓存
+缓存启用了 cache_enabled 的数据源的执行结果（异步版本）
+
+- 合并请求：同一进程内相同编码和参数的并发未命中只执行一次；
+  跨进程通过 Redis 锁保证同一时间只有一个进程在加载，其他进程等待其写入
+- 过期后继续返回旧值（最多 DATA_SOURCE_CACHE_STALE_TTL 秒），同时在后台刷新
+- 值使用 orjson（未安装时使用 json）序列化，超过 DATA_SOURCE_CACHE_COMPRESS_MIN_SIZE 字节时压缩，
+  压缩算法可通过 register_codec 扩展
+- 每个数据源在集合中记录自己的缓存键，清除时不需要扫描整个 Redis
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import struct
+import time
+import uuid
+import zlib
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from core.data_source.model import DataSource
+from utils.redis import RedisClient
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+Loader = Callable[[AsyncSession], Awaitable[Any]]
+
+# 令牌一致时才删除加载锁：KEYS[1]=锁，ARGV[1]=令牌
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+# ==================== 编解码 ====================
+
+class Codec:
+    """压缩编解码器，codec_id 写入缓存值头部，用于读取时选择解压方式"""
+
+    codec_id = 0
+    name = 'none'
+
+    def compress(self, data: bytes) -> bytes:
+        return data
+
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+
+class ZlibCodec(Codec):
+    codec_id = 1
+    name = 'zlib'
+
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data, 3)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data)
+
+
+class ZstdCodec(Codec):
+    codec_id = 2
+    name = 'zstd'
+
+    def __init__(self):
+        import zstandard
+        self._compressor = zstandard.ZstdCompressor(level=3)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompressor.decompress(data)
+
+
+class Lz4Codec(Codec):
+    codec_id = 3
+    name = 'lz4'
+
+    def __init__(self):
+        import lz4.frame
+        self._lz4 = lz4.frame
+
+    def compress(self, data: bytes) -> bytes:
+        return self._lz4.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._lz4.decompress(data)
+
+
+CODECS: Dict[int, Codec] = {}
+
+
+def register_codec(codec: Codec):
+    """注册压缩编解码器"""
+    CODECS[codec.codec_id] = codec
+
+
+register_codec(Codec())
+register_codec(ZlibCodec())
+for _codec_class in (ZstdCodec, Lz4Codec):
+    try:
+        register_codec(_codec_class())
+    except ImportError:
+        pass
+
+
+def get_codec(name: str) -> Codec:
+    """
+    按名称获取编解码器
+
+    auto 依次选择 zstd、lz4、zlib 中已安装的第一个
+    """
+    by_name = {codec.name: codec for codec in CODECS.values()}
+    if name == 'auto':
+        for candidate in ('zstd', 'lz4', 'zlib'):
+            if candidate in by_name:
+                return by_name[candidate]
+    if name not in by_name:
+        logger.warning(f"数据源缓存压缩算法 {name} 不可用，使用 zlib")
+        return by_name['zlib']
+    return by_name[name]
+
+
+def _dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, ensure_ascii=False, default=str).encode()
+
+
+def _loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# ==================== 缓存 ====================
+
+class DataSourceCache:
+    """数据源结果缓存"""
+
+    PREFIX = f"{settings.CACHE_PREFIX}datasource:cache:"
+
+    # 缓存值头部：格式版本、编解码器ID、新鲜截止时间戳
+    HEADER = struct.Struct('>BBd')
+    FORMAT_VERSION = 1
+
+    # 加载锁过期时间（秒），防止加载进程异常退出后一直持有
+    LOCK_TTL = 60
+    # 其他进程正在加载时最长等待时间（秒），超时后自己加载
+    LOCK_WAIT = 5.0
+    LOCK_POLL_INTERVAL = 0.05
+
+    # 预热时剩余新鲜时间低于缓存时间的该比例则刷新
+    WARM_MARGIN = 0.2
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._codec: Optional[Codec] = None
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'coalesced': 0, 'refreshes': 0, 'errors': 0}
+
+    @property
+    def codec(self) -> Codec:
+        if self._codec is None:
+            self._codec = get_codec(settings.DATA_SOURCE_CACHE_CODEC)
+        return self._codec
+
+    # ---------- 键 ----------
+
+    def _key(self, code: str, params: Dict[str, Any]) -> str:
+        params_str = json.dumps(params, sort_keys=True, default=str)
+        params_hash = hashlib.md5(params_str.encode()).hexdigest()[:16]
+        return f"{self.PREFIX}{code}:{params_hash}"
+
+    def _index_key(self, code: str) -> str:
+        return f"{self.PREFIX}{code}:keys"
+
+    # ---------- 编解码 ----------
+
+    def _encode(self, value: Any, fresh_until: float) -> bytes:
+        data = _dumps(value)
+        codec = CODECS[0]
+        if len(data) >= settings.DATA_SOURCE_CACHE_COMPRESS_MIN_SIZE:
+            codec = self.codec
+            data = codec.compress(data)
+        return self.HEADER.pack(self.FORMAT_VERSION, codec.codec_id, fresh_until) + data
+
+    def _decode(self, raw: bytes) -> Optional[Tuple[Any, float]]:
+        """解码缓存值，返回 (值, 新鲜截止时间)，无法识别时返回 None"""
+        if len(raw) < self.HEADER.size:
+            return None
+        version, codec_id, fresh_until = self.HEADER.unpack_from(raw)
+        codec = CODECS.get(codec_id)
+        if version != self.FORMAT_VERSION or codec is None:
+            return None
+        return _loads(codec.decompress(raw[self.HEADER.size:])), fresh_until
+
+    # ---------- 读写 ----------
+
+    async def _read(self, key: str) -> Optional[Tuple[Any, float]]:
+        try:
+            client = await RedisClient.get_binary_client()
+            raw = await client.get(key)
+            return self._decode(raw) if raw else None
+        except Exception as e:
+            logger.warning(f"获取缓存失败: {str(e)}")
+            return None
+
+    async def _write(self, source: DataSource, key: str, value: Any):
+        ttl = source.cache_ttl + settings.DATA_SOURCE_CACHE_STALE_TTL
+        try:
+            payload = self._encode(value, time.time() + source.cache_ttl)
+            client = await RedisClient.get_binary_client()
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.set(key, payload, ex=ttl)
+                pipe.sadd(self._index_key(source.code), key)
+                pipe.expire(self._index_key(source.code), ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"设置缓存失败: {str(e)}")
+
+    async def _acquire(self, key: str) -> Optional[str]:
+        """获取加载锁，返回锁令牌；Redis 不可用时视为获取成功"""
+        token = uuid.uuid4().hex
+        try:
+            client = await RedisClient.get_binary_client()
+            if await client.set(f"{key}:lock", token, nx=True, ex=self.LOCK_TTL):
+                return token
+            return None
+        except Exception as e:
+            logger.warning(f"获取缓存加载锁失败: {str(e)}")
+            return token
+
+    async def _release(self, key: str, token: str):
+        """释放加载锁；加载超过 LOCK_TTL 时锁可能已被其他进程获取，令牌不一致时不删除"""
+        try:
+            client = await RedisClient.get_binary_client()
+            await client.eval(_RELEASE_LOCK_SCRIPT, 1, f"{key}:lock", token)
+        except Exception as e:
+            logger.warning(f"释放缓存加载锁失败: {str(e)}")
+
+    # ---------- 加载 ----------
+
+    async def get_or_load(self, db: AsyncSession, source: DataSource, params: Dict[str, Any], loader: Loader) -> Any:
+        """
+        读取缓存，未命中时加载并写入
+
+        Args:
+            db: 数据库会话，未命中时传给 loader
+            source: 数据源（后台刷新会在请求结束后使用，需为不依赖会话的对象）
+            params: 合并默认值后的参数
+            loader: 加载函数，接收数据库会话，返回执行结果
+        """
+        key = self._key(source.code, params)
+        entry = await self._read(key)
+        if entry is not None:
+            value, fresh_until = entry
+            if time.time() < fresh_until:
+                self.stats['hits'] += 1
+            else:
+                self.stats['stale_hits'] += 1
+                self._refresh_in_background(key, source, loader)
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats['coalesced'] += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # 发起加载的请求被取消，由当前请求重新加载
+                if inflight.cancelled():
+                    return await self.get_or_load(db, source, params, loader)
+                raise
+
+        self.stats['misses'] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._fill(db, key, source, loader)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _fill(self, db: AsyncSession, key: str, source: DataSource, loader: Loader) -> Any:
+        token = await self._acquire(key)
+        if token is None:
+            # 其他进程正在加载，等待其写入
+            deadline = time.monotonic() + self.LOCK_WAIT
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.LOCK_POLL_INTERVAL)
+                entry = await self._read(key)
+                if entry is not None:
+                    self.stats['coalesced'] += 1
+                    return entry[0]
+        try:
+            value = await loader(db)
+            await self._write(source, key, value)
+            return value
+        finally:
+            if token is not None:
+                await self._release(key, token)
+
+    def _refresh_in_background(self, key: str, source: DataSource, loader: Loader):
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        task = asyncio.create_task(self._refresh(key, source, loader))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, key: str, source: DataSource, loader: Loader) -> bool:
+        """使用独立会话重新加载并写入，其他进程正在刷新时跳过"""
+        try:
+            token = await self._acquire(key)
+            if token is None:
+                return False
+            try:
+                async with AsyncSessionLocal() as db:
+                    value = await loader(db)
+                await self._write(source, key, value)
+                self.stats['refreshes'] += 1
+                return True
+            finally:
+                await self._release(key, token)
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.warning(f"数据源 {source.code} 缓存刷新失败: {str(e)}")
+            return False
+        finally:
+            self._refreshing.discard(key)
+
+    async def warm(self, source: DataSource, params: Dict[str, Any], loader: Loader) -> bool:
+        """
+        预热缓存：缓存不存在或即将过期时重新加载
+
+        Returns:
+            是否刷新了缓存
+        """
+        key = self._key(source.code, params)
+        entry = await self._read(key)
+        if entry is not None and entry[1] - time.time() > source.cache_ttl * self.WARM_MARGIN:
+            return False
+        if key in self._refreshing:
+            return False
+        self._refreshing.add(key)
+        return await self._refresh(key, source, loader)
+
+    async def clear(self, code: str) -> int:
+        """清除数据源的全部缓存，返回清除的缓存数量"""
+        index_key = self._index_key(code)
+        try:
+            client = await RedisClient.get_binary_client()
+            keys = await client.smembers(index_key)
+            await client.delete(index_key, *keys)
+            if keys:
+                logger.info(f"已清除数据源 {code} 的 {len(keys)} 个缓存")
+            return len(keys)
+        except Exception as e:
+            logger.warning(f"清除缓存失败: {str(e)}")
+            return 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'codec': self.codec.name,
+            'serializer': 'orjson' if orjson is not None else 'json',
+            'inflight': len(self._inflight),
+            'refreshing': len(self._refreshing),
+        }
+
+
+# 全局数据源结果缓存
+data_source_cache = DataSourceCache()
@@ -41,6 +41,7 @@ class DataSource(BaseModel):
     # ===== SQL 配置 =====
     sql_content = Column(Text, default='', comment="SQL语句，使用 :param 作为参数占位符")
     db_connection = Column(String(50), default='default', comment="数据库连接名称")
+    sql_timeout = Column(Integer, default=30, comment="SQL执行超时时间（秒），0表示不限制")
 
     # ===== 静态数据 =====
     static_data = Column(JSON, default=list, comment="静态数据（JSON 数组）")
@@ -53,6 +54,7 @@ class DataSource(BaseModel):
     tree_config = Column(JSON, default=dict, comment="树形转换配置")
     field_mapping = Column(JSON, default=dict, comment="字段映射配置")
     chart_config = Column(JSON, default=dict, comment="图表配置")
+    aggregate_config = Column(JSON, default=dict, comment="聚合配置：分组、聚合指标、时间分桶、降采样点数")
 
     # ===== 缓存配置 =====
     cache_enabled = Column(Boolean, default=False, comment="是否启用缓存")
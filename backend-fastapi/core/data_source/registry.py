@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Data Source Registry - 数据源定义进程内缓存
+按编码缓存数据源定义，避免每次执行都查询数据源表（异步版本）
+
+失效方式：Redis 中保存全局版本号，数据源创建/修改/删除/复制后递增；
+读取时比较缓存时的版本号，不一致则整体丢弃。多 worker 部署时各进程通过版本号感知变化。
+Redis 不可用时退化为直接查询数据库。
+"""
+import logging
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from core.data_source.model import DataSource
+from utils.redis import RedisClient
+
+logger = logging.getLogger(__name__)
+
+
+class DataSourceRegistry:
+    """数据源定义缓存"""
+
+    VERSION_KEY = f"{settings.CACHE_PREFIX}datasource:version"
+
+    # 缓存项最长保留时间（秒），兜底防止版本号丢失（如Redis重启）后长期使用旧定义
+    MAX_AGE = 300
+
+    def __init__(self):
+        # {code: (DataSource快照, 加载时间)}
+        self._items: Dict[str, Tuple[DataSource, float]] = {}
+        self._version: Optional[str] = None
+
+    @staticmethod
+    def snapshot(source: DataSource) -> DataSource:
+        """复制为不属于任何会话的对象，可在多个请求/协程间共享（只读）"""
+        return DataSource(**{
+            column.key: getattr(source, column.key)
+            for column in DataSource.__table__.columns
+        })
+
+    async def _current_version(self) -> Optional[str]:
+        """读取全局版本号，Redis 不可用时返回 None"""
+        try:
+            client = await RedisClient.get_client()
+            return await client.get(self.VERSION_KEY) or '0'
+        except Exception as e:
+            logger.warning(f"读取数据源版本失败: {str(e)}")
+            return None
+
+    async def get_many(self, db: AsyncSession, codes: Iterable[str]) -> Dict[str, DataSource]:
+        """
+        按编码批量获取数据源定义（未删除的，包含已禁用的）
+
+        Returns:
+            {code: DataSource}，不存在的编码不在结果中
+        """
+        codes = list(dict.fromkeys(codes))
+        version = await self._current_version()
+        if version is None or version != self._version:
+            self._items.clear()
+            self._version = version
+
+        now = time.monotonic()
+        found: Dict[str, DataSource] = {}
+        missing = []
+        for code in codes:
+            item = self._items.get(code)
+            if item is not None and now - item[1] < self.MAX_AGE:
+                found[code] = item[0]
+            else:
+                missing.append(code)
+
+        if missing:
+            result = await db.execute(select(DataSource).where(
+                DataSource.code.in_(missing),
+                DataSource.is_deleted == False,
+            ))
+            for source in result.scalars().all():
+                snapshot = self.snapshot(source)
+                found[source.code] = snapshot
+                # Redis 不可用时不缓存
+                if version is not None:
+                    self._items[source.code] = (snapshot, now)
+        return found
+
+    async def get(self, db: AsyncSession, code: str) -> Optional[DataSource]:
+        """按编码获取数据源定义"""
+        return (await self.get_many(db, [code])).get(code)
+
+    async def invalidate(self):
+        """数据源变更后递增版本号，使所有进程的缓存失效"""
+        self._items.clear()
+        self._version = None
+        try:
+            client = await RedisClient.get_client()
+            await client.incr(self.VERSION_KEY)
+        except Exception as e:
+            logger.warning(f"更新数据源版本失败: {str(e)}")
+
+
+# 全局数据源定义缓存
+data_source_registry = DataSourceRegistry()
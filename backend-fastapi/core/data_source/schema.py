@@ -6,7 +6,9 @@ Data Source Schema - 数据源数据验证模式
 from datetime import datetime
 from typing import Optional, List, Any, Dict
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+from core.data_source.aggregate import normalize_config
 
 
 class DataSourceBase(BaseModel):
@@ -28,6 +30,7 @@ class DataSourceBase(BaseModel):
     # SQL 配置
     sql_content: str = Field(default='', description="SQL语句")
     db_connection: str = Field(default='default', description="数据库连接")
+    sql_timeout: int = Field(default=30, ge=0, description="SQL执行超时时间（秒），0表示不限制")
     
     # 静态数据
     static_data: List[Any] = Field(default_factory=list, description="静态数据")
@@ -40,11 +43,19 @@ class DataSourceBase(BaseModel):
     tree_config: Dict[str, Any] = Field(default_factory=dict, description="树形配置")
     field_mapping: Dict[str, str] = Field(default_factory=dict, description="字段映射")
     chart_config: Dict[str, Any] = Field(default_factory=dict, description="图表配置")
+    aggregate_config: Dict[str, Any] = Field(default_factory=dict, description="聚合配置")
     
     # 缓存配置
     cache_enabled: bool = Field(default=False, description="是否启用缓存")
     cache_ttl: int = Field(default=300, description="缓存时间")
 
+    @field_validator("aggregate_config")
+    @classmethod
+    def validate_aggregate_config(cls, v):
+        """验证聚合配置"""
+        normalize_config(v)
+        return v
+
 
 class DataSourceCreate(DataSourceBase):
     """数据源创建Schema"""
@@ -67,6 +78,7 @@ class DataSourceUpdate(BaseModel):
     
     sql_content: Optional[str] = None
     db_connection: Optional[str] = None
+    sql_timeout: Optional[int] = Field(default=None, ge=0)
     
     static_data: Optional[List[Any]] = None
     params: Optional[List[Dict[str, Any]]] = None
@@ -75,10 +87,18 @@ class DataSourceUpdate(BaseModel):
     tree_config: Optional[Dict[str, Any]] = None
     field_mapping: Optional[Dict[str, str]] = None
     chart_config: Optional[Dict[str, Any]] = None
+    aggregate_config: Optional[Dict[str, Any]] = None
     
     cache_enabled: Optional[bool] = None
     cache_ttl: Optional[int] = None
 
+    @field_validator("aggregate_config")
+    @classmethod
+    def validate_aggregate_config(cls, v):
+        """验证聚合配置"""
+        normalize_config(v)
+        return v
+
 
 class DataSourceResponse(DataSourceBase):
     """数据源响应Schema"""
@@ -114,6 +134,18 @@ class DataSourceExecuteRequest(BaseModel):
     params: Dict[str, Any] = Field(default_factory=dict)
 
 
+class DataSourceBatchItem(BaseModel):
+    """批量执行中的单个调用"""
+    code: str = Field(..., description="数据源编码")
+    params: Dict[str, Any] = Field(default_factory=dict)
+
+
+class DataSourceBatchRequest(BaseModel):
+    """数据源批量执行请求"""
+    items: List[DataSourceBatchItem] = Field(..., min_length=1, max_length=100, description="调用列表")
+    timeout: Optional[float] = Field(default=None, gt=0, le=60, description="单个调用的超时时间（秒）")
+
+
 class DataSourceTestRequest(BaseModel):
     """数据源测试请求（临时配置）"""
     source_type: str
@@ -127,6 +159,7 @@ class DataSourceTestRequest(BaseModel):
     # SQL 配置
     sql_content: str = ""
     db_connection: str = "default"
+    sql_timeout: int = Field(default=30, ge=0)
     # 静态数据
     static_data: List[Any] = Field(default_factory=list)
     # 参数
@@ -137,6 +170,14 @@ class DataSourceTestRequest(BaseModel):
     tree_config: Dict[str, Any] = Field(default_factory=dict)
     field_mapping: Dict[str, str] = Field(default_factory=dict)
     chart_config: Dict[str, Any] = Field(default_factory=dict)
+    aggregate_config: Dict[str, Any] = Field(default_factory=dict)
+
+    @field_validator("aggregate_config")
+    @classmethod
+    def validate_aggregate_config(cls, v):
+        """验证聚合配置"""
+        normalize_config(v)
+        return v
 
 
 class DataSourceCopyRequest(BaseModel):
@@ -4,17 +4,25 @@
 Data Source Service - 数据源服务
 提供数据源执行、缓存、转换等核心功能（异步版本）
 """
-import hashlib
+import asyncio
+import csv
+import io
+import json
 import logging
 import re
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 import httpx
-from sqlalchemy import select, func
+from sqlalchemy import select, func, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from utils.redis import RedisClient
+from app.config import settings
+from app.database import AsyncSessionLocal
+from utils.http_client import http_clients
 from core.data_source.model import DataSource
+from core.data_source import aggregate, transform
+from core.data_source.cache import data_source_cache
+from core.data_source.registry import data_source_registry
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +40,13 @@ class DataSourceService:
     MAX_ROWS_EXECUTE = 1000  # 正常执行最多返回 1000 条
     MAX_ROWS_TEST = 100  # 测试最多返回 100 条
 
+    # SQL 默认超时时间（秒）
+    DEFAULT_SQL_TIMEOUT = 30
+
+    # 导出
+    EXPORT_FORMATS = ('ndjson', 'csv')
+    EXPORT_BATCH_SIZE = 500  # 每次从游标读取的行数
+
     # ==================== CRUD 方法 ====================
 
     @classmethod
@@ -179,12 +194,14 @@ class DataSourceService:
             api_data_path=source.api_data_path,
             sql_content=source.sql_content,
             db_connection=source.db_connection,
+            sql_timeout=source.sql_timeout,
             static_data=source.static_data,
             params=source.params,
             result_type=source.result_type,
             tree_config=source.tree_config,
             field_mapping=source.field_mapping,
             chart_config=source.chart_config,
+            aggregate_config=source.aggregate_config,
             cache_enabled=source.cache_enabled,
             cache_ttl=source.cache_ttl,
         )
@@ -197,12 +214,64 @@ class DataSourceService:
 
     @classmethod
     async def execute(cls, db: AsyncSession, code: str, params: Dict[str, Any] = None) -> Any:
-        """根据编码执行数据源"""
-        source = await cls.get_by_code(db, code)
+        """根据编码执行数据源（定义从进程内缓存读取）"""
+        source = await data_source_registry.get(db, code)
         if not source or not source.status:
             raise ValueError(f"数据源不存在或已禁用: {code}")
         return await cls.execute_source(db, source, params)
 
+    @classmethod
+    async def execute_batch(
+            cls,
+            db: AsyncSession,
+            items: List[Dict[str, Any]],
+            timeout: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        批量执行数据源
+
+        相同编码和参数的调用只执行一次；各调用在信号量限制下并发执行，SQL 数据源各自使用独立会话，
+        单个调用失败或超时不影响其他调用。
+
+        Args:
+            items: [{code, params}]
+            timeout: 单个调用的超时时间（秒）
+
+        Returns:
+            与 items 顺序一致的结果 [{code, success, data, error}]
+        """
+        timeout = timeout or settings.DATA_SOURCE_BATCH_ITEM_TIMEOUT
+        sources = await data_source_registry.get_many(db, [item['code'] for item in items])
+        semaphore = asyncio.Semaphore(settings.DATA_SOURCE_BATCH_CONCURRENCY)
+
+        async def run(code: str, params: Dict[str, Any]) -> Dict[str, Any]:
+            source = sources.get(code)
+            if not source or not source.status:
+                return {'code': code, 'success': False, 'data': None, 'error': f"数据源不存在或已禁用: {code}"}
+            async with semaphore:
+                try:
+                    if source.source_type == 'sql':
+                        async with AsyncSessionLocal() as session:
+                            data = await asyncio.wait_for(cls.execute_source(session, source, params), timeout)
+                    else:
+                        data = await asyncio.wait_for(cls.execute_source(db, source, params), timeout)
+                    return {'code': code, 'success': True, 'data': data, 'error': None}
+                except asyncio.TimeoutError:
+                    error = f"执行超时（{timeout} 秒）"
+                except ValueError as e:
+                    error = str(e)
+                except Exception as e:
+                    logger.error(f"数据源 {code} 执行失败: {str(e)}")
+                    error = f"执行失败: {str(e)}"
+                return {'code': code, 'success': False, 'data': None, 'error': error}
+
+        # 去重：相同编码和参数只执行一次
+        keys = [(item['code'], json.dumps(item.get('params') or {}, sort_keys=True, default=str)) for item in items]
+        unique = list(dict.fromkeys(keys))
+        results = await asyncio.gather(*(run(code, json.loads(params)) for code, params in unique))
+        by_key = dict(zip(unique, results))
+        return [by_key[key] for key in keys]
+
     @classmethod
     async def execute_by_id(cls, db: AsyncSession, source_id: str, params: Dict[str, Any] = None) -> Any:
         """根据ID执行数据源"""
@@ -219,22 +288,30 @@ class DataSourceService:
         # 合并默认参数
         final_params = cls._merge_params(source.params or [], params)
 
-        # 检查缓存
-        if source.cache_enabled:
-            cache_key = cls._get_cache_key(source.code, final_params)
-            cached = await cls._get_cache(cache_key)
-            if cached is not None:
-                logger.debug(f"数据源 {source.code} 命中缓存")
-                return cached
+        if source.cache_enabled and source.cache_ttl > 0:
+            # 后台刷新在请求结束后执行，使用不依赖会话的副本
+            source = data_source_registry.snapshot(source)
+            return await data_source_cache.get_or_load(
+                db, source, final_params, lambda session: cls._load_source(session, source, final_params)
+            )
+        return await cls._load_source(db, source, final_params)
+
+    @classmethod
+    async def _load_source(cls, db: AsyncSession, source: DataSource, final_params: Dict[str, Any]) -> Any:
+        """执行数据源并转换结果（不经过缓存）"""
+        aggregate_config = aggregate.normalize_config(source.aggregate_config)
 
         # 根据类型执行
         if source.source_type == 'sql':
-            result = await cls._execute_sql(db, source, final_params)
+            result = await cls._execute_sql(db, source, final_params, aggregate_config)
         elif source.source_type == 'api':
             result = await cls._execute_api(source, final_params)
         else:
             result = source.static_data or []
 
+        # 聚合与降采样（SQL 数据源的聚合已在数据库中完成）
+        result = cls._apply_aggregate(result, source.source_type, aggregate_config)
+
         # 字段映射
         if source.field_mapping:
             result = cls._apply_field_mapping(result, source.field_mapping)
@@ -247,12 +324,6 @@ class DataSourceService:
             logger.warning(f"数据源 {source.code} 返回数据超过限制，截取前 {cls.MAX_ROWS_EXECUTE} 条")
             result = result[:cls.MAX_ROWS_EXECUTE]
 
-        # 写入缓存
-        if source.cache_enabled and source.cache_ttl > 0:
-            cache_key = cls._get_cache_key(source.code, final_params)
-            await cls._set_cache(cache_key, result, source.cache_ttl)
-            logger.debug(f"数据源 {source.code} 结果已缓存 {source.cache_ttl}s")
-
         return result
 
     @classmethod
@@ -265,15 +336,19 @@ class DataSourceService:
         final_params = cls._merge_params(params_def, params)
 
         source_type = config.get('source_type', 'static')
+        aggregate_config = aggregate.normalize_config(config.get('aggregate_config'))
 
         # 根据类型执行
         if source_type == 'sql':
-            result = await cls._execute_sql_temp(db, config, final_params)
+            result = await cls._execute_sql_temp(db, config, final_params, aggregate_config)
         elif source_type == 'api':
             result = await cls._execute_api_temp(config, final_params)
         else:
             result = config.get('static_data', [])
 
+        # 聚合与降采样
+        result = cls._apply_aggregate(result, source_type, aggregate_config)
+
         # 字段映射
         field_mapping = config.get('field_mapping', {})
         if field_mapping:
@@ -291,23 +366,70 @@ class DataSourceService:
     # ==================== SQL 执行 ====================
 
     @classmethod
-    async def _execute_sql(cls, db: AsyncSession, source: DataSource, params: Dict[str, Any]) -> List[Dict]:
+    async def _execute_sql(
+            cls,
+            db: AsyncSession,
+            source: DataSource,
+            params: Dict[str, Any],
+            aggregate_config: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict]:
         """执行 SQL 查询"""
-        sql = (source.sql_content or '').strip()
-        return await cls._execute_sql_internal(db, sql, params)
+        sql = cls._compile_aggregate(db, (source.sql_content or '').strip(), aggregate_config)
+        return await cls._execute_sql_internal(
+            db, sql, params,
+            max_rows=cls._get_max_rows(cls.MAX_ROWS_EXECUTE, aggregate_config),
+            timeout=cls._get_sql_timeout(source.sql_timeout),
+            order_by=aggregate.order_by_sql(aggregate_config, db.get_bind().dialect),
+        )
 
     @classmethod
-    async def _execute_sql_temp(cls, db: AsyncSession, config: Dict[str, Any], params: Dict[str, Any]) -> List[Dict]:
+    async def _execute_sql_temp(
+            cls,
+            db: AsyncSession,
+            config: Dict[str, Any],
+            params: Dict[str, Any],
+            aggregate_config: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict]:
         """执行临时 SQL 查询"""
-        sql = config.get('sql_content', '').strip()
-        return await cls._execute_sql_internal(db, sql, params)
+        sql = cls._compile_aggregate(db, config.get('sql_content', '').strip(), aggregate_config)
+        return await cls._execute_sql_internal(
+            db, sql, params,
+            max_rows=cls._get_max_rows(cls.MAX_ROWS_TEST, aggregate_config),
+            timeout=cls._get_sql_timeout(config.get('sql_timeout')),
+            order_by=aggregate.order_by_sql(aggregate_config, db.get_bind().dialect),
+        )
 
     @classmethod
-    async def _execute_sql_internal(cls, db: AsyncSession, sql: str, params: Dict[str, Any]) -> List[Dict]:
-        """内部 SQL 执行方法"""
-        if not sql:
-            return []
+    def _compile_aggregate(cls, db: AsyncSession, sql: str, aggregate_config: Optional[Dict[str, Any]]) -> str:
+        """将聚合配置编译进 SQL（在数据库中分组聚合）"""
+        if not sql or not aggregate.is_aggregated(aggregate_config):
+            return sql
+        return aggregate.compile_sql(cls._validate_sql(sql), aggregate_config, db.get_bind().dialect)
+
+    @classmethod
+    def _get_max_rows(cls, max_rows: int, aggregate_config: Optional[Dict[str, Any]]) -> int:
+        """读取的最大行数，设置了降采样时放宽限制，由降采样控制返回的点数"""
+        if aggregate_config and aggregate_config['max_points']:
+            return max(max_rows, settings.DATA_SOURCE_AGGREGATE_MAX_ROWS)
+        return max_rows
+
+    @classmethod
+    def _apply_aggregate(cls, data: Any, source_type: str, aggregate_config: Optional[Dict[str, Any]]) -> Any:
+        """API/静态数据源在 Python 中分组聚合，之后按 max_points 降采样"""
+        if not aggregate_config:
+            return data
+        if source_type != 'sql':
+            data = aggregate.aggregate_rows(data, aggregate_config)
+        return aggregate.downsample(data, aggregate_config)
+
+    @classmethod
+    def _get_sql_timeout(cls, timeout: Optional[int]) -> int:
+        """SQL 超时时间（秒），未配置时使用默认值，0 表示不限制"""
+        return cls.DEFAULT_SQL_TIMEOUT if timeout is None else timeout
 
+    @classmethod
+    def _validate_sql(cls, sql: str) -> str:
+        """安全检查并去掉末尾分号，返回可作为子查询的 SQL"""
         # 安全检查：只允许 SELECT
         sql_upper = sql.upper().strip()
         if not sql_upper.startswith('SELECT') and not sql_upper.startswith('WITH'):
@@ -319,17 +441,176 @@ class DataSourceService:
             if re.search(pattern, sql_upper):
                 raise ValueError(f'SQL 中不允许使用 {keyword}')
 
-        # 将 :param 格式转换为 SQLAlchemy 格式
-        from sqlalchemy import text
+        return sql.strip().rstrip(';').strip()
+
+    @classmethod
+    async def _set_statement_timeout(cls, db: AsyncSession, timeout: int) -> Optional[str]:
+        """
+        设置语句超时，由数据库在超时后终止查询
+
+        - PostgreSQL: SET LOCAL statement_timeout（只在当前事务内有效）
+        - MySQL: SET SESSION max_execution_time（只对 SELECT 生效）；MariaDB: max_statement_time
+
+        Returns:
+            恢复默认值的 SQL，需在查询结束后（回滚前）执行；其他数据库返回 None，由调用方在客户端限制
+        """
+        if not timeout:
+            return None
+        dialect = db.get_bind().dialect
+        if dialect.name == 'postgresql':
+            await db.execute(text(f"SET LOCAL statement_timeout = {int(timeout * 1000)}"))
+            return "SET LOCAL statement_timeout TO DEFAULT"
+        if dialect.name == 'mysql':
+            if getattr(dialect, 'is_mariadb', False):
+                await db.execute(text(f"SET SESSION max_statement_time = {float(timeout)}"))
+                return "SET SESSION max_statement_time = DEFAULT"
+            await db.execute(text(f"SET SESSION max_execution_time = {int(timeout * 1000)}"))
+            return "SET SESSION max_execution_time = DEFAULT"
+        return None
+
+    @staticmethod
+    async def _reset_statement_timeout(db: AsyncSession, reset_sql: Optional[str]):
+        """恢复语句超时（MySQL 的会话变量会随连接回到连接池，必须恢复）"""
+        if not reset_sql:
+            return
         try:
-            result = await db.execute(text(sql), params)
-            rows = result.fetchall()
-            columns = result.keys()
-            return [dict(zip(columns, row)) for row in rows]
+            await db.execute(text(reset_sql))
         except Exception as e:
+            logger.warning(f"恢复语句超时失败: {str(e)}")
+
+    @classmethod
+    async def _execute_sql_internal(
+            cls,
+            db: AsyncSession,
+            sql: str,
+            params: Dict[str, Any],
+            max_rows: Optional[int] = None,
+            timeout: int = 0,
+            order_by: Optional[str] = None,
+    ) -> List[Dict]:
+        """
+        内部 SQL 执行方法
+
+        Args:
+            max_rows: 最多返回的行数，多取的一行用于判断是否截断。PostgreSQL 在数据库中以外层
+                LIMIT max_rows+1 限制；其他数据库不改写 SQL（MySQL 会忽略子查询中的 ORDER BY，
+                且子查询不允许重复列名），通过服务端游标只读取前 max_rows+1 行
+                （session.execute 会预先缓冲全部结果，不能用于限制读取的行数）
+            timeout: 超时时间（秒），0 表示不限制
+            order_by: SQL 自带的排序子句（按输出字段），以 LIMIT 包裹时重复在外层，保证截取和返回的顺序
+        """
+        if not sql:
+            return []
+
+        sql = cls._validate_sql(sql)
+        query_params = dict(params)
+        wrap_limit = bool(max_rows) and db.get_bind().dialect.name == 'postgresql'
+        if wrap_limit:
+            sql = f"SELECT * FROM ({sql}) AS _ds_limited"
+            if order_by:
+                sql += f" {order_by}"
+            sql += " LIMIT :_ds_limit"
+            query_params['_ds_limit'] = max_rows + 1
+
+        async def fetch():
+            if max_rows and not wrap_limit:
+                result = await db.stream(text(sql), query_params)
+                try:
+                    return list(result.keys()), await result.fetchmany(max_rows + 1)
+                finally:
+                    await result.close()
+            result = await db.execute(text(sql), query_params)
+            return list(result.keys()), result.fetchall()
+
+        reset_sql = None
+        try:
+            reset_sql = await cls._set_statement_timeout(db, timeout)
+            if timeout and not reset_sql:
+                columns, rows = await asyncio.wait_for(fetch(), timeout)
+            else:
+                columns, rows = await fetch()
+            await cls._reset_statement_timeout(db, reset_sql)
+        except asyncio.TimeoutError:
+            # 客户端超时时查询仍在数据库中执行，连接状态未知，作废连接而不是放回连接池
+            await db.invalidate()
+            logger.error(f"SQL 执行超时: {timeout}s")
+            raise ValueError(f"SQL 执行超时（{timeout} 秒）")
+        except Exception as e:
+            await cls._reset_statement_timeout(db, reset_sql)
+            await db.rollback()
             logger.error(f"SQL 执行失败: {str(e)}")
             raise ValueError(f"SQL 执行失败: {str(e)}")
 
+        if max_rows and len(rows) > max_rows:
+            logger.warning(f"SQL 返回数据超过限制，截取前 {max_rows} 条")
+            rows = rows[:max_rows]
+        return [dict(zip(columns, row)) for row in rows]
+
+    # ==================== 导出 ====================
+
+    @classmethod
+    async def export_source(
+            cls,
+            db: AsyncSession,
+            source: DataSource,
+            params: Dict[str, Any] = None,
+            fmt: str = 'ndjson',
+    ) -> AsyncIterator[str]:
+        """
+        导出数据源的全部数据（不受返回行数限制），按行流式输出
+
+        SQL 数据源使用服务端游标分批读取，内存占用只与批大小有关；
+        API/静态数据源数据已在内存中，直接逐行输出。只应用字段映射，不做结果转换。
+
+        Args:
+            db: 仅供本次导出使用的会话（流式输出期间一直占用）
+            source: 数据源
+            params: 参数
+            fmt: ndjson 或 csv
+        """
+        if fmt not in cls.EXPORT_FORMATS:
+            raise ValueError(f"不支持的导出格式: {fmt}")
+        final_params = cls._merge_params(source.params or [], params or {})
+        field_mapping = source.field_mapping or {}
+        writer = _CsvWriter() if fmt == 'csv' else None
+
+        def encode(rows: List[Dict]) -> str:
+            if field_mapping:
+                rows = cls._apply_field_mapping(rows, field_mapping)
+            if writer is not None:
+                return writer.write(rows)
+            return ''.join(json.dumps(row, default=str, ensure_ascii=False) + '\n' for row in rows)
+
+        if source.source_type != 'sql':
+            if source.source_type == 'api':
+                data = await cls._execute_api(source, final_params)
+            else:
+                data = source.static_data or []
+            rows = data if isinstance(data, list) else [data]
+            for i in range(0, len(rows), cls.EXPORT_BATCH_SIZE):
+                yield encode([row if isinstance(row, dict) else {'value': row}
+                              for row in rows[i:i + cls.EXPORT_BATCH_SIZE]])
+            return
+
+        sql = cls._validate_sql((source.sql_content or '').strip())
+        timeout = cls._get_sql_timeout(source.sql_timeout)
+        reset_sql = None
+        try:
+            reset_sql = await cls._set_statement_timeout(db, timeout)
+            result = await db.stream(text(sql), final_params)
+            columns = list(result.keys())
+            async for partition in result.partitions(cls.EXPORT_BATCH_SIZE):
+                yield encode([dict(zip(columns, row)) for row in partition])
+        except Exception as e:
+            await cls._reset_statement_timeout(db, reset_sql)
+            reset_sql = None
+            await db.rollback()
+            logger.error(f"数据源 {source.code} 导出失败: {str(e)}")
+            raise ValueError(f"导出失败: {str(e)}")
+        finally:
+            # 客户端中途断开时也要恢复
+            await cls._reset_statement_timeout(db, reset_sql)
+
     # ==================== API 执行 ====================
 
     @classmethod
@@ -386,7 +667,7 @@ class DataSourceService:
             final_headers[k] = v
 
         try:
-            async with httpx.AsyncClient(timeout=timeout) as client:
+            async with http_clients.session(timeout=timeout) as client:
                 if method.upper() == 'GET':
                     resp = await client.get(url, params=params, headers=final_headers)
                 else:
@@ -474,57 +755,12 @@ class DataSourceService:
     @classmethod
     def _transform_to_chart_axis(cls, data: List[Dict], config: Dict[str, Any]) -> Dict[str, Any]:
         """转换为轴向图表数据格式"""
-        if not data:
-            return {"xAxisData": [], "seriesData": []}
-
-        x_field = config.get('x_field', '')
-        series_fields = config.get('series_fields', [])
-        series_names = config.get('series_names', [])
-
-        if not x_field or not series_fields:
-            if data and isinstance(data[0], dict):
-                keys = list(data[0].keys())
-                if not x_field and keys:
-                    x_field = keys[0]
-                if not series_fields and len(keys) > 1:
-                    series_fields = keys[1:]
-
-        x_axis_data = [item.get(x_field, '') for item in data]
-
-        series_data = []
-        for i, field in enumerate(series_fields):
-            name = series_names[i] if i < len(series_names) else field
-            values = [item.get(field, 0) for item in data]
-            series_data.append({"name": name, "data": values})
-
-        return {"xAxisData": x_axis_data, "seriesData": series_data}
+        return transform.to_chart_axis(data, config)
 
     @classmethod
     def _transform_to_chart_pie(cls, data: List[Dict], config: Dict[str, Any]) -> Dict[str, Any]:
         """转换为饼图数据格式"""
-        if not data:
-            return {"seriesData": []}
-
-        name_field = config.get('name_field', '')
-        value_field = config.get('value_field', '')
-
-        if not name_field or not value_field:
-            if data and isinstance(data[0], dict):
-                keys = list(data[0].keys())
-                if len(keys) >= 2:
-                    if not name_field:
-                        name_field = keys[0]
-                    if not value_field:
-                        value_field = keys[1]
-
-        series_data = []
-        for item in data:
-            series_data.append({
-                "name": item.get(name_field, ''),
-                "value": item.get(value_field, 0)
-            })
-
-        return {"seriesData": series_data}
+        return transform.to_chart_pie(data, config)
 
     @classmethod
     def _transform_to_chart_gauge(cls, data: List[Dict], config: Dict[str, Any]) -> Dict[str, Any]:
@@ -547,79 +783,17 @@ class DataSourceService:
     @classmethod
     def _transform_to_chart_radar(cls, data: List[Dict], config: Dict[str, Any]) -> Dict[str, Any]:
         """转换为雷达图数据格式"""
-        if not data:
-            return {"indicator": [], "seriesData": []}
-
-        indicator_field = config.get('indicator_field', 'name')
-        max_field = config.get('max_field', 'max')
-        value_fields = config.get('value_fields', [])
-        series_names = config.get('series_names', [])
-
-        if not value_fields and data:
-            keys = list(data[0].keys())
-            value_fields = [k for k in keys if k not in [indicator_field, max_field]]
-
-        indicator = []
-        for item in data:
-            indicator.append({
-                "name": item.get(indicator_field, ''),
-                "max": item.get(max_field, 100)
-            })
-
-        series_data = []
-        for i, field in enumerate(value_fields):
-            name = series_names[i] if i < len(series_names) else field
-            values = [item.get(field, 0) for item in data]
-            series_data.append({"name": name, "value": values})
-
-        return {"indicator": indicator, "seriesData": series_data}
+        return transform.to_chart_radar(data, config)
 
     @classmethod
     def _transform_to_chart_scatter(cls, data: List[Dict], config: Dict[str, Any]) -> Dict[str, Any]:
         """转换为散点图数据格式"""
-        if not data:
-            return {"seriesData": []}
-
-        x_field = config.get('x_field', 'x')
-        y_field = config.get('y_field', 'y')
-        size_field = config.get('size_field', '')
-        name_field = config.get('name_field', '')
-
-        series_data = []
-        for item in data:
-            point = [item.get(x_field, 0), item.get(y_field, 0)]
-            if size_field:
-                point.append(item.get(size_field, 0))
-            if name_field:
-                point.append(item.get(name_field, ''))
-            series_data.append(point)
-
-        return {"seriesData": series_data}
+        return transform.to_chart_scatter(data, config)
 
     @classmethod
     def _transform_to_chart_heatmap(cls, data: List[Dict], config: Dict[str, Any]) -> Dict[str, Any]:
         """转换为热力图数据格式"""
-        if not data:
-            return {"xAxisData": [], "yAxisData": [], "seriesData": []}
-
-        x_field = config.get('x_field', 'x')
-        y_field = config.get('y_field', 'y')
-        value_field = config.get('value_field', 'value')
-
-        x_values = list(dict.fromkeys(item.get(x_field, '') for item in data))
-        y_values = list(dict.fromkeys(item.get(y_field, '') for item in data))
-
-        x_index = {v: i for i, v in enumerate(x_values)}
-        y_index = {v: i for i, v in enumerate(y_values)}
-
-        series_data = []
-        for item in data:
-            x = item.get(x_field, '')
-            y = item.get(y_field, '')
-            value = item.get(value_field, 0)
-            series_data.append([x_index.get(x, 0), y_index.get(y, 0), value])
-
-        return {"xAxisData": x_values, "yAxisData": y_values, "seriesData": series_data}
+        return transform.to_chart_heatmap(data, config)
 
     @classmethod
     def _list_to_tree(
@@ -670,25 +844,7 @@ class DataSourceService:
     @classmethod
     def _apply_field_mapping(cls, data: List[Dict], mapping: Dict[str, str]) -> List[Dict]:
         """应用字段映射"""
-        if not data or not mapping:
-            return data
-
-        result = []
-        for item in data:
-            if not isinstance(item, dict):
-                result.append(item)
-                continue
-
-            new_item = {}
-            for old_key, new_key in mapping.items():
-                if old_key in item:
-                    new_item[new_key] = item[old_key]
-            for key, value in item.items():
-                if key not in mapping:
-                    new_item[key] = value
-            result.append(new_item)
-
-        return result
+        return transform.rename_fields(data, mapping)
 
     @classmethod
     def _merge_params(cls, param_defs: List[Dict], input_params: Dict[str, Any]) -> Dict[str, Any]:
@@ -786,47 +942,50 @@ class DataSourceService:
     # ==================== 缓存方法 ====================
 
     @classmethod
-    def _get_cache_key(cls, code: str, params: Dict[str, Any]) -> str:
-        """生成缓存键"""
-        params_str = str(sorted(params.items()))
-        params_hash = hashlib.md5(params_str.encode()).hexdigest()[:8]
-        return f"datasource:{code}:{params_hash}"
-
-    @classmethod
-    async def _get_cache(cls, key: str) -> Any:
-        """获取缓存"""
-        try:
-            import json
-            client = await RedisClient.get_client()
-            value = await client.get(key)
-            if value:
-                return json.loads(value)
-            return None
-        except Exception as e:
-            logger.warning(f"获取缓存失败: {str(e)}")
-            return None
+    async def clear_cache(cls, code: str) -> None:
+        """清除数据源缓存"""
+        await data_source_cache.clear(code)
 
     @classmethod
-    async def _set_cache(cls, key: str, value: Any, ttl: int) -> None:
-        """设置缓存"""
-        try:
-            import json
-            client = await RedisClient.get_client()
-            await client.set(key, json.dumps(value, default=str), ex=ttl)
-        except Exception as e:
-            logger.warning(f"设置缓存失败: {str(e)}")
+    async def warm_up_cache(cls, db: AsyncSession) -> int:
+        """
+        预热缓存：对启用缓存的数据源按默认参数执行，缓存不存在或即将过期时刷新
 
-    @classmethod
-    async def clear_cache(cls, code: str) -> None:
-        """清除数据源缓存"""
-        pattern = f"datasource:{code}:*"
-        try:
-            client = await RedisClient.get_client()
-            keys = []
-            async for key in client.scan_iter(match=pattern):
-                keys.append(key)
-            if keys:
-                await client.delete(*keys)
-                logger.info(f"已清除数据源 {code} 的 {len(keys)} 个缓存")
-        except Exception as e:
-            logger.warning(f"清除缓存失败: {str(e)}")
+        Returns:
+            刷新的数据源数量
+        """
+        result = await db.execute(select(DataSource).where(
+            DataSource.cache_enabled == True,
+            DataSource.cache_ttl > 0,
+            DataSource.status == True,
+            DataSource.is_deleted == False,
+        ))
+        count = 0
+        for source in result.scalars().all():
+            source = data_source_registry.snapshot(source)
+            final_params = cls._merge_params(source.params or [], {})
+            if await data_source_cache.warm(
+                source, final_params, lambda session, s=source, p=final_params: cls._load_source(session, s, p)
+            ):
+                count += 1
+        return count
+
+
+class _CsvWriter:
+    """逐批输出 CSV，表头取第一批第一行的字段"""
+
+    def __init__(self):
+        self.columns: Optional[List[str]] = None
+
+    def write(self, rows: List[Dict]) -> str:
+        buffer = io.StringIO()
+        if self.columns is None:
+            if not rows:
+                return ''
+            self.columns = list(rows[0].keys())
+            # UTF-8 BOM，便于 Excel 识别中文
+            buffer.write('\ufeff')
+            csv.writer(buffer).writerow(self.columns)
+        writer = csv.DictWriter(buffer, fieldnames=self.columns, extrasaction='ignore')
+        writer.writerows(rows)
+        return buffer.getvalue()
@@ -0,0 +1,358 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Data Source Transform - 数据源图表结果转换
+将行数据（字典列表）转换为各类图表格式
+
+按需要的字段一次抽取为列，之后的转换都在列上进行；安装了 NumPy 且行数较多时，
+数值计算（饼图 Top N 排序、降采样）使用 NumPy，未安装时使用纯 Python 实现，结果一致。
+
+图表配置中的可选项：
+- chart-axis: max_points 最大点数，超过时降采样；downsample 降采样方式 lttb（默认）/avg
+- chart-pie: top_n 只保留值最大的 N 项，其余合并为 other_name（默认“其他”）
+- chart-heatmap: aggregate 相同坐标的合并方式 sum/avg/max/min/count，不设置时每行一个点
+"""
+import gc
+import heapq
+from contextlib import contextmanager
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 行数达到该值时才使用 NumPy（数据量小时转换数组的开销大于收益）
+NUMPY_MIN_ROWS = 10000
+
+# 行数达到该值时，构建结果期间暂停循环垃圾回收
+GC_PAUSE_MIN_ROWS = 10000
+
+AGGREGATES = ('sum', 'avg', 'max', 'min', 'count')
+
+
+# ==================== 列操作 ====================
+
+@contextmanager
+def gc_paused(rows: Sequence[Any]):
+    """
+    构建大量小列表/字典时暂停循环垃圾回收
+
+    这些对象不含循环引用，但数量大时会反复触发分代回收，耗时可占构建过程的大部分
+    """
+    if len(rows) < GC_PAUSE_MIN_ROWS or not gc.isenabled():
+        yield
+        return
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
+
+
+def column(rows: List[Dict], field: str, default: Any = None) -> List[Any]:
+    """抽取一列，所有行都有该字段时使用 itemgetter 快速路径"""
+    try:
+        return list(map(itemgetter(field), rows))
+    except KeyError:
+        return [row.get(field, default) for row in rows]
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def numeric(values: Sequence[Any]) -> Any:
+    """转换为数值列（非数值按 0 处理），数据量大且安装了 NumPy 时返回 ndarray"""
+    if np is not None and len(values) >= NUMPY_MIN_ROWS:
+        try:
+            return np.nan_to_num(np.asarray(values, dtype=float), nan=0.0)
+        except (TypeError, ValueError):
+            return np.fromiter(map(_to_float, values), dtype=float, count=len(values))
+    return list(map(_to_float, values))
+
+
+def factorize(values: Sequence[Any]):
+    """
+    编码为索引，返回 (去重后的值（按首次出现顺序）, 每个值的索引)
+    """
+    index: Dict[Any, int] = dict.fromkeys(values)
+    for i, value in enumerate(index):
+        index[value] = i
+    return list(index), list(map(index.__getitem__, values))
+
+
+def rename_fields(rows: List[Dict], mapping: Dict[str, str]) -> List[Dict]:
+    """
+    字段重命名：映射的字段排在前面，其余字段保持原顺序
+
+    字段集合相同的行共用一次计算出的输出字段顺序
+    """
+    if not rows or not mapping:
+        return rows
+
+    result = []
+    plan_keys = None
+    out_keys: List[str] = []
+    getter = None
+    with gc_paused(rows):
+        for row in rows:
+            if not isinstance(row, dict):
+                result.append(row)
+                continue
+            keys = row.keys()
+            if plan_keys is None or keys != plan_keys:
+                plan_keys = keys
+                in_keys = [k for k in mapping if k in row] + [k for k in row if k not in mapping]
+                out_keys = [mapping.get(k, k) for k in in_keys]
+                getter = itemgetter(*in_keys) if in_keys else None
+            if getter is None:
+                result.append({})
+            elif len(out_keys) == 1:
+                result.append({out_keys[0]: getter(row)})
+            else:
+                result.append(dict(zip(out_keys, getter(row))))
+    return result
+
+
+# ==================== 降采样 ====================
+
+def _bucket_bounds(n: int, buckets: int) -> List[int]:
+    """将 n 个点均分为 buckets 个桶，返回各桶起始位置（含结尾 n）"""
+    return [n * i // buckets for i in range(buckets)] + [n]
+
+
+def lttb_indices(values: Sequence[float], threshold: int) -> List[int]:
+    """
+    Largest-Triangle-Three-Buckets 降采样，返回保留点的索引
+
+    横坐标按等间距处理，首尾两点始终保留
+    """
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    every = (n - 2) / (threshold - 2)
+    use_numpy = np is not None and hasattr(values, 'dtype')
+    indices = [0]
+    a = 0
+    for i in range(threshold - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        range_start = int(i * every) + 1
+        range_end = int((i + 1) * every) + 1
+        avg_x = (avg_start + avg_end - 1) / 2
+        ay = values[a]
+        if use_numpy:
+            avg_y = values[avg_start:avg_end].mean()
+            xs = np.arange(range_start, range_end)
+            areas = np.abs((a - avg_x) * (values[range_start:range_end] - ay) - (a - xs) * (avg_y - ay))
+            a = range_start + int(areas.argmax())
+        else:
+            avg_y = sum(values[avg_start:avg_end]) / (avg_end - avg_start)
+            max_area = -1.0
+            next_a = range_start
+            for j in range(range_start, range_end):
+                area = abs((a - avg_x) * (values[j] - ay) - (a - j) * (avg_y - ay))
+                if area > max_area:
+                    max_area = area
+                    next_a = j
+            a = next_a
+        indices.append(a)
+    indices.append(n - 1)
+    return indices
+
+
+def bucket_means(values: Sequence[float], buckets: int) -> List[float]:
+    """按等宽分桶求平均"""
+    n = len(values)
+    bounds = _bucket_bounds(n, buckets)
+    if np is not None and hasattr(values, 'dtype'):
+        starts = np.asarray(bounds[:-1])
+        sums = np.add.reduceat(values, starts)
+        return (sums / np.diff(bounds)).tolist()
+    return [sum(values[s:e]) / (e - s) for s, e in zip(bounds, bounds[1:])]
+
+
+# ==================== 图表转换 ====================
+
+def _default_fields(rows: List[Dict]) -> List[str]:
+    if rows and isinstance(rows[0], dict):
+        return list(rows[0].keys())
+    return []
+
+
+def to_chart_axis(rows: List[Dict], config: Dict[str, Any]) -> Dict[str, Any]:
+    """轴向图表（折线、柱状）：{xAxisData, seriesData: [{name, data}]}"""
+    if not rows:
+        return {"xAxisData": [], "seriesData": []}
+
+    x_field = config.get('x_field', '')
+    series_fields = config.get('series_fields', [])
+    series_names = config.get('series_names', [])
+
+    if not x_field or not series_fields:
+        keys = _default_fields(rows)
+        if not x_field and keys:
+            x_field = keys[0]
+        if not series_fields and len(keys) > 1:
+            series_fields = keys[1:]
+
+    x_axis_data = column(rows, x_field, '')
+    series_values = [column(rows, field, 0) for field in series_fields]
+
+    max_points = config.get('max_points') or 0
+    if 2 < max_points < len(rows) and series_values:
+        if config.get('downsample', 'lttb') == 'avg':
+            bounds = _bucket_bounds(len(rows), max_points)
+            x_axis_data = [x_axis_data[i] for i in bounds[:-1]]
+            series_values = [bucket_means(numeric(values), max_points) for values in series_values]
+        else:
+            # 以第一个系列选点，所有系列保留相同的横坐标
+            indices = lttb_indices(numeric(series_values[0]), max_points)
+            x_axis_data = [x_axis_data[i] for i in indices]
+            series_values = [[values[i] for i in indices] for values in series_values]
+
+    series_data = []
+    for i, field in enumerate(series_fields):
+        name = series_names[i] if i < len(series_names) else field
+        series_data.append({"name": name, "data": series_values[i]})
+
+    return {"xAxisData": x_axis_data, "seriesData": series_data}
+
+
+def to_chart_pie(rows: List[Dict], config: Dict[str, Any]) -> Dict[str, Any]:
+    """饼图：{seriesData: [{name, value}]}"""
+    if not rows:
+        return {"seriesData": []}
+
+    name_field = config.get('name_field', '')
+    value_field = config.get('value_field', '')
+
+    if not name_field or not value_field:
+        keys = _default_fields(rows)
+        if len(keys) >= 2:
+            if not name_field:
+                name_field = keys[0]
+            if not value_field:
+                value_field = keys[1]
+
+    names = column(rows, name_field, '')
+    values = column(rows, value_field, 0)
+
+    top_n = config.get('top_n') or 0
+    if 0 < top_n < len(rows):
+        numbers = numeric(values)
+        if hasattr(numbers, 'dtype'):
+            # 稳定排序保证相同值按原顺序
+            order = np.argsort(-numbers, kind='stable')
+            top = order[:top_n].tolist()
+            other = float(numbers[order[top_n:]].sum())
+        else:
+            top = heapq.nlargest(top_n, range(len(numbers)), key=numbers.__getitem__)
+            other = float(sum(numbers) - sum(numbers[i] for i in top))
+        series_data = [{"name": names[i], "value": values[i]} for i in top]
+        series_data.append({
+            "name": config.get('other_name', '其他'),
+            "value": int(other) if other.is_integer() else other,
+        })
+        return {"seriesData": series_data}
+
+    with gc_paused(rows):
+        series_data = [{"name": name, "value": value} for name, value in zip(names, values)]
+    return {"seriesData": series_data}
+
+
+def to_chart_radar(rows: List[Dict], config: Dict[str, Any]) -> Dict[str, Any]:
+    """雷达图：{indicator: [{name, max}], seriesData: [{name, value}]}"""
+    if not rows:
+        return {"indicator": [], "seriesData": []}
+
+    indicator_field = config.get('indicator_field', 'name')
+    max_field = config.get('max_field', 'max')
+    value_fields = config.get('value_fields', [])
+    series_names = config.get('series_names', [])
+
+    if not value_fields:
+        value_fields = [k for k in _default_fields(rows) if k not in [indicator_field, max_field]]
+
+    with gc_paused(rows):
+        indicator = [
+            {"name": name, "max": max_value}
+            for name, max_value in zip(column(rows, indicator_field, ''), column(rows, max_field, 100))
+        ]
+
+    series_data = []
+    for i, field in enumerate(value_fields):
+        name = series_names[i] if i < len(series_names) else field
+        series_data.append({"name": name, "value": column(rows, field, 0)})
+
+    return {"indicator": indicator, "seriesData": series_data}
+
+
+def to_chart_scatter(rows: List[Dict], config: Dict[str, Any]) -> Dict[str, Any]:
+    """散点图：{seriesData: [[x, y, size?, name?]]}"""
+    if not rows:
+        return {"seriesData": []}
+
+    columns = [column(rows, config.get('x_field', 'x'), 0), column(rows, config.get('y_field', 'y'), 0)]
+    if config.get('size_field', ''):
+        columns.append(column(rows, config['size_field'], 0))
+    if config.get('name_field', ''):
+        columns.append(column(rows, config['name_field'], ''))
+
+    with gc_paused(rows):
+        series_data = list(map(list, zip(*columns)))
+    return {"seriesData": series_data}
+
+
+def _aggregate_cells(x_codes: List[int], y_codes: List[int], values: List[Any], method: str) -> List[List[Any]]:
+    """按 (x, y) 合并相同坐标的值，返回 [[x, y, value]]（按首次出现顺序）"""
+    cells: Dict[tuple, List[float]] = {}
+    if method == 'count':
+        for cell in zip(x_codes, y_codes):
+            acc = cells.get(cell)
+            if acc is None:
+                cells[cell] = [1]
+            else:
+                acc[0] += 1
+        return [[x, y, acc[0]] for (x, y), acc in cells.items()]
+
+    numbers = values if isinstance(values, list) else values.tolist()
+    for cell, value in zip(zip(x_codes, y_codes), numbers):
+        acc = cells.get(cell)
+        if acc is None:
+            cells[cell] = [value, 1]
+        elif method == 'max':
+            acc[0] = max(acc[0], value)
+        elif method == 'min':
+            acc[0] = min(acc[0], value)
+        else:
+            acc[0] += value
+            acc[1] += 1
+    if method == 'avg':
+        return [[x, y, acc[0] / acc[1]] for (x, y), acc in cells.items()]
+    return [[x, y, acc[0]] for (x, y), acc in cells.items()]
+
+
+def to_chart_heatmap(rows: List[Dict], config: Dict[str, Any]) -> Dict[str, Any]:
+    """热力图：{xAxisData, yAxisData, seriesData: [[xIndex, yIndex, value]]}"""
+    if not rows:
+        return {"xAxisData": [], "yAxisData": [], "seriesData": []}
+
+    x_values, x_codes = factorize(column(rows, config.get('x_field', 'x'), ''))
+    y_values, y_codes = factorize(column(rows, config.get('y_field', 'y'), ''))
+    values = column(rows, config.get('value_field', 'value'), 0)
+
+    aggregate: Optional[str] = config.get('aggregate')
+    with gc_paused(rows):
+        if aggregate in AGGREGATES:
+            series_data = _aggregate_cells(x_codes, y_codes, numeric(values), aggregate)
+        else:
+            series_data = list(map(list, zip(x_codes, y_codes, values)))
+
+    return {"xAxisData": x_values, "yAxisData": y_values, "seriesData": series_data}
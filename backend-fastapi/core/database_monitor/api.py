@@ -11,11 +11,13 @@
 数据库监控API
 """
 import logging
-from typing import List
+import time
+from typing import List, Optional
 from urllib.parse import urlparse
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 
+from app.base_schema import MetricsHistorySchema
 from app.config import settings
 import asyncpg
 
@@ -26,11 +28,19 @@ from core.database_monitor.schema import (
     DatabaseConnectionTestSchema,
     DatabaseConfigSchema
 )
+from utils.collector_registry import collector_registry
+from utils.metrics_history import metrics_history
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/database_monitor", tags=["数据库监控"])
 
+# 记录历史的指标
+HISTORY_METRICS = [
+    'connections_used', 'connection_usage_percent', 'active_connections',
+    'database_size_mb', 'cache_hit_ratio',
+]
+
 
 async def get_all_databases_from_server(db_config: dict, db_type: str) -> List[str]:
     """从数据库服务器获取所有数据库列表（异步）"""
@@ -180,6 +190,23 @@ async def get_database_configs() -> List[dict]:
     return configs
 
 
+async def get_pooled_collector(db_config: dict) -> AsyncDatabaseCollector:
+    """获取数据库的常驻采集器（由采集器注册表复用连接）"""
+    key = (
+        f"db:{db_config['database']}:{db_config['db_type']}:"
+        f"{db_config['user']}@{db_config['host']}:{db_config['port']}"
+    )
+    return await collector_registry.get(key, lambda: AsyncDatabaseCollector(
+        db_type=db_config['db_type'],
+        host=db_config['host'],
+        port=db_config['port'],
+        user=db_config['user'],
+        password=db_config['password'],
+        database=db_config['database'],
+        persistent=True
+    ))
+
+
 @router.get("/configs", response_model=List[DatabaseConfigSchema], summary="获取数据库配置列表")
 async def get_database_monitor_configs():
     """获取数据库监控配置列表"""
@@ -205,15 +232,7 @@ async def get_database_overview(db_name: str):
     if not db_config:
         raise HTTPException(status_code=404, detail=f"Database {db_name} not found")
 
-    collector = AsyncDatabaseCollector(
-        db_type=db_config['db_type'],
-        host=db_config['host'],
-        port=db_config['port'],
-        user=db_config['user'],
-        password=db_config['password'],
-        database=db_config['database']
-    )
-
+    collector = await get_pooled_collector(db_config)
     data = await collector.get_all_info(db_name, db_config['name'])
     return DatabaseOverviewSchema(**data)
 
@@ -227,15 +246,7 @@ async def get_database_realtime_stats(db_name: str):
     if not db_config:
         raise HTTPException(status_code=404, detail=f"Database {db_name} not found")
 
-    collector = AsyncDatabaseCollector(
-        db_type=db_config['db_type'],
-        host=db_config['host'],
-        port=db_config['port'],
-        user=db_config['user'],
-        password=db_config['password'],
-        database=db_config['database']
-    )
-
+    collector = await get_pooled_collector(db_config)
     data = await collector.get_realtime_stats(db_name)
     return DatabaseRealtimeStatsSchema(**data)
 
@@ -260,3 +271,34 @@ async def test_database_connection(db_name: str):
 
     result = await collector.test_connection()
     return DatabaseConnectionTestSchema(**result)
+
+
+async def record_database_history():
+    """采集项目数据库（DATABASE_URL）实时统计并写入指标历史（采集失败时不写入，避免记录为0）"""
+    db_info = parse_database_url(settings.DATABASE_URL or '')
+    if not db_info or not db_info['database']:
+        return
+
+    db_name = db_info['database']
+    collector = await get_pooled_collector(db_info)
+    store = metrics_history.get_store(f"db:{db_name}", HISTORY_METRICS, settings.MONITOR_HISTORY_INTERVAL)
+    stats = await collector.get_realtime_stats(db_name)
+    if stats.get('error'):
+        raise RuntimeError(stats['error'])
+    store.record(stats)
+
+
+@router.get("/{db_name}/history", response_model=MetricsHistorySchema, summary="获取数据库监控历史")
+async def get_database_history(
+        db_name: str,
+        minutes: int = Query(60, ge=1, le=7 * 24 * 60, description="查询最近多少分钟"),
+        start: Optional[float] = Query(None, description="开始时间戳，优先于minutes"),
+        end: Optional[float] = Query(None, description="结束时间戳"),
+        metrics: Optional[str] = Query(None, description="指标名称，多个用逗号分隔")
+):
+    """获取数据库监控历史（仅记录项目配置的数据库），1小时内为原始采样，24小时内为1分钟均值，更长为5分钟均值"""
+    store = metrics_history.get(f"db:{db_name}")
+    if store is None:
+        raise HTTPException(status_code=404, detail=f"Database {db_name} has no history")
+    start = start or time.time() - minutes * 60
+    return store.query(start, end, metrics.split(',') if metrics else None)
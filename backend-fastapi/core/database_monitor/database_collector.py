@@ -10,6 +10,7 @@
 """
 数据库信息收集器（异步版本）
 """
+import asyncio
 import logging
 import time
 from datetime import datetime, timedelta, timezone
@@ -53,19 +54,68 @@ def serialize_data(data: Any) -> Any:
 class AsyncDatabaseCollector:
     """异步数据库信息收集器"""
 
+    # 实时统计单条SQL：连接数、最大连接数、数据库大小、缓存命中所需计数一次取回
+    POSTGRESQL_REALTIME_SQL = """
+        SELECT a.total_connections,
+               a.active_connections,
+               a.idle_connections,
+               current_setting('max_connections')::int AS max_connections,
+               pg_database_size($1) AS size_bytes,
+               d.blocks_read,
+               d.blocks_hit
+        FROM (
+            SELECT COUNT(*) AS total_connections,
+                   COUNT(*) FILTER (WHERE state = 'active') AS active_connections,
+                   COUNT(*) FILTER (WHERE state = 'idle') AS idle_connections
+            FROM pg_stat_activity
+        ) a, (
+            SELECT SUM(blks_read) AS blocks_read,
+                   SUM(blks_hit) AS blocks_hit
+            FROM pg_stat_database
+            WHERE datname = $1
+        ) d
+    """
+
+    # MySQL实时统计所需的全局状态变量
+    MYSQL_REALTIME_STATUS = (
+        'Threads_connected', 'Threads_running',
+        'Innodb_buffer_pool_reads', 'Innodb_buffer_pool_read_requests',
+    )
+
     def __init__(self, db_type: str, host: str, port: int,
-                 user: str, password: str, database: str, **kwargs):
+                 user: str, password: str, database: str,
+                 persistent: bool = False, **kwargs):
+        """
+        Args:
+            persistent: 常驻模式，连接在多次采集间复用，disconnect不关闭连接，需调用close释放
+        """
         self.db_type = db_type.upper()
         self.host = host
         self.port = port
         self.user = user
         self.password = password
         self.database = database
+        self.persistent = persistent
         self.kwargs = kwargs
         self.connection = None
+        # 同一连接不能并发执行查询，采集入口串行化
+        self._lock = asyncio.Lock()
+
+    def _is_connected(self) -> bool:
+        """连接是否可用"""
+        if not self.connection:
+            return False
+        if self.db_type == 'POSTGRESQL':
+            return not self.connection.is_closed()
+        return not self.connection.closed
 
     async def connect(self) -> bool:
         """连接数据库"""
+        if self.persistent:
+            if self._is_connected():
+                return True
+            # 常驻连接已断开，先释放再重连
+            await self._close_connection()
         try:
             if self.db_type == 'POSTGRESQL':
                 return await self._connect_postgresql()
@@ -103,20 +153,52 @@ class AsyncDatabaseCollector:
             password=self.password,
             db=self.database,
             charset='utf8mb4',
-            connect_timeout=5
+            connect_timeout=5,
+            # 常驻连接不开启事务，避免统计信息停留在事务快照
+            autocommit=True
         )
         return True
 
     async def disconnect(self):
-        """断开连接"""
+        """断开连接（常驻模式下保留连接）"""
+        if self.persistent:
+            return
+        await self._close_connection()
+
+    async def close(self):
+        """关闭连接（常驻模式下释放连接）"""
+        async with self._lock:
+            await self._close_connection()
+
+    async def _close_connection(self):
         if self.connection:
             try:
-                await self.connection.close()
+                if self.db_type == 'MYSQL':
+                    # aiomysql的close为同步方法
+                    self.connection.close()
+                else:
+                    await self.connection.close()
             except Exception as e:
                 logger.error(f"Error disconnecting from database: {e}")
             finally:
                 self.connection = None
 
+    async def health_check(self) -> bool:
+        """检查连接是否可用，不可用时关闭连接，下次采集时重连"""
+        async with self._lock:
+            try:
+                if not await self.connect():
+                    return False
+                if self.db_type == 'POSTGRESQL':
+                    await self.connection.fetchval("SELECT 1")
+                else:
+                    await self.connection.ping(reconnect=False)
+                return True
+            except Exception as e:
+                logger.warning(f"Database health check failed {self.host}:{self.port}/{self.database}: {e}")
+                await self._close_connection()
+                return False
+
     async def test_connection(self) -> Dict[str, Any]:
         """测试数据库连接"""
         start_time = time.time()
@@ -263,44 +345,46 @@ class AsyncDatabaseCollector:
 
     async def _get_postgresql_connections(self) -> Dict[str, Any]:
         """获取PostgreSQL连接信息"""
-        total_connections = await self.connection.fetchval(
-            "SELECT COUNT(*) FROM pg_stat_activity"
-        )
-        
-        max_connections = await self.connection.fetchval("SHOW max_connections")
-        max_connections = int(max_connections)
-        
-        active_connections = await self.connection.fetchval(
-            "SELECT COUNT(*) FROM pg_stat_activity WHERE state = 'active'"
-        )
-        
-        idle_connections = await self.connection.fetchval(
-            "SELECT COUNT(*) FROM pg_stat_activity WHERE state = 'idle'"
-        )
+        row = await self.connection.fetchrow("""
+            SELECT COUNT(*) AS total_connections,
+                   COUNT(*) FILTER (WHERE state = 'active') AS active_connections,
+                   COUNT(*) FILTER (WHERE state = 'idle') AS idle_connections,
+                   current_setting('max_connections')::int AS max_connections
+            FROM pg_stat_activity
+        """)
+        total_connections = row['total_connections']
+        max_connections = row['max_connections']
 
         return {
             'total_connections': total_connections,
             'max_connections': max_connections,
-            'active_connections': active_connections,
-            'idle_connections': idle_connections,
+            'active_connections': row['active_connections'],
+            'idle_connections': row['idle_connections'],
             'connection_usage_percent': round((total_connections / max_connections) * 100, 2) if max_connections > 0 else 0.0
         }
 
+    async def _get_mysql_status(self, cursor, names) -> Dict[str, int]:
+        """一次查询获取多个MySQL全局状态变量"""
+        placeholders = ', '.join(['%s'] * len(names))
+        await cursor.execute(f"SHOW GLOBAL STATUS WHERE Variable_name IN ({placeholders})", tuple(names))
+        status = {name: 0 for name in names}
+        for name, value in await cursor.fetchall():
+            try:
+                status[name] = int(value)
+            except (TypeError, ValueError):
+                pass
+        return status
+
     async def _get_mysql_connections(self) -> Dict[str, Any]:
         """获取MySQL连接信息"""
         async with self.connection.cursor() as cursor:
-            await cursor.execute("SHOW STATUS LIKE 'Threads_connected'")
-            result = await cursor.fetchone()
-            total_connections = int(result[1])
-
-            await cursor.execute("SHOW VARIABLES LIKE 'max_connections'")
+            status = await self._get_mysql_status(cursor, ('Threads_connected', 'Threads_running'))
+            await cursor.execute("SELECT @@max_connections")
             result = await cursor.fetchone()
-            max_connections = int(result[1])
-
-            await cursor.execute("SHOW STATUS LIKE 'Threads_running'")
-            result = await cursor.fetchone()
-            active_connections = int(result[1])
+            max_connections = int(result[0])
 
+        total_connections = status['Threads_connected']
+        active_connections = status['Threads_running']
         idle_connections = total_connections - active_connections
 
         return {
@@ -416,33 +500,22 @@ class AsyncDatabaseCollector:
 
     async def _get_mysql_performance(self) -> Dict[str, Any]:
         """获取MySQL性能统计"""
-        stats = {}
-        status_queries = [
-            ('queries', 'Queries'),
-            ('connections', 'Connections'),
-            ('slow_queries', 'Slow_queries'),
-            ('bytes_received', 'Bytes_received'),
-            ('bytes_sent', 'Bytes_sent'),
-            ('innodb_buffer_pool_reads', 'Innodb_buffer_pool_reads'),
-            ('innodb_buffer_pool_read_requests', 'Innodb_buffer_pool_read_requests')
-        ]
-
         async with self.connection.cursor() as cursor:
-            for stat_name, mysql_var in status_queries:
-                await cursor.execute(f"SHOW GLOBAL STATUS LIKE '{mysql_var}'")
-                result = await cursor.fetchone()
-                stats[stat_name] = int(result[1]) if result else 0
+            stats = await self._get_mysql_status(cursor, (
+                'Queries', 'Connections', 'Slow_queries', 'Bytes_received', 'Bytes_sent',
+                'Innodb_buffer_pool_reads', 'Innodb_buffer_pool_read_requests'
+            ))
 
-        read_requests = stats['innodb_buffer_pool_read_requests']
-        reads = stats['innodb_buffer_pool_reads']
+        read_requests = stats['Innodb_buffer_pool_read_requests']
+        reads = stats['Innodb_buffer_pool_reads']
         cache_hit_ratio = ((read_requests - reads) / read_requests * 100) if read_requests > 0 else 0
 
         return {
-            'total_queries': stats['queries'],
-            'total_connections': stats['connections'],
-            'slow_queries': stats['slow_queries'],
-            'bytes_received': stats['bytes_received'],
-            'bytes_sent': stats['bytes_sent'],
+            'total_queries': stats['Queries'],
+            'total_connections': stats['Connections'],
+            'slow_queries': stats['Slow_queries'],
+            'bytes_received': stats['Bytes_received'],
+            'bytes_sent': stats['Bytes_sent'],
             'cache_hit_ratio': round(cache_hit_ratio, 2)
         }
 
@@ -519,6 +592,10 @@ class AsyncDatabaseCollector:
 
     async def get_all_info(self, connection_id: str, connection_name: str) -> Dict[str, Any]:
         """获取所有数据库监控信息"""
+        async with self._lock:
+            return await self._get_all_info(connection_id, connection_name)
+
+    async def _get_all_info(self, connection_id: str, connection_name: str) -> Dict[str, Any]:
         timestamp = datetime.now().isoformat()
 
         try:
@@ -563,46 +640,90 @@ class AsyncDatabaseCollector:
         finally:
             await self.disconnect()
 
+    async def _get_postgresql_realtime(self) -> Dict[str, Any]:
+        """单条SQL获取PostgreSQL实时统计"""
+        row = await self.connection.fetchrow(self.POSTGRESQL_REALTIME_SQL, self.database)
+        return {
+            'total_connections': row['total_connections'],
+            'active_connections': row['active_connections'],
+            'max_connections': row['max_connections'],
+            'size_bytes': row['size_bytes'] or 0,
+            'blocks_read': row['blocks_read'] or 0,
+            'blocks_hit': row['blocks_hit'] or 0,
+        }
+
+    async def _get_mysql_realtime(self) -> Dict[str, Any]:
+        """获取MySQL实时统计（SHOW GLOBAL STATUS 与 SELECT 各一次）"""
+        async with self.connection.cursor() as cursor:
+            status = await self._get_mysql_status(cursor, self.MYSQL_REALTIME_STATUS)
+            await cursor.execute("""
+                SELECT @@max_connections,
+                       (SELECT SUM(data_length + index_length)
+                        FROM information_schema.tables
+                        WHERE table_schema = %s)
+            """, (self.database,))
+            max_connections, size_bytes = await cursor.fetchone()
+
+        read_requests = status['Innodb_buffer_pool_read_requests']
+        reads = status['Innodb_buffer_pool_reads']
+        return {
+            'total_connections': status['Threads_connected'],
+            'active_connections': status['Threads_running'],
+            'max_connections': int(max_connections),
+            'size_bytes': int(size_bytes or 0),
+            # 统一为命中/未命中计数
+            'blocks_read': reads,
+            'blocks_hit': max(read_requests - reads, 0),
+        }
+
     async def get_realtime_stats(self, connection_id: str) -> Dict[str, Any]:
-        """获取实时统计信息"""
+        """获取实时统计信息，每次采集只执行一次（MySQL两次）查询"""
+        async with self._lock:
+            return await self._get_realtime_stats(connection_id)
+
+    async def _get_realtime_stats(self, connection_id: str) -> Dict[str, Any]:
         timestamp = datetime.now().isoformat()
+        empty = {
+            'connection_id': connection_id,
+            'connections_used': 0,
+            'connection_usage_percent': 0.0,
+            'database_size_mb': 0.0,
+            'cache_hit_ratio': 0.0,
+            'active_connections': 0,
+            'timestamp': timestamp
+        }
 
         try:
             if not await self.connect():
-                return {
-                    'connection_id': connection_id,
-                    'connections_used': 0,
-                    'connection_usage_percent': 0.0,
-                    'database_size_mb': 0.0,
-                    'cache_hit_ratio': 0.0,
-                    'active_connections': 0,
-                    'timestamp': timestamp
-                }
+                return {**empty, 'error': '连接数据库失败'}
+
+            if self.db_type == 'POSTGRESQL':
+                stats = await self._get_postgresql_realtime()
+            elif self.db_type == 'MYSQL':
+                stats = await self._get_mysql_realtime()
+            else:
+                return {**empty, 'error': f'不支持的数据库类型: {self.db_type}'}
 
-            connection_info = await self.get_connection_info()
-            database_size = await self.get_database_size()
-            performance_stats = await self.get_performance_stats()
+            total_connections = stats['total_connections']
+            max_connections = stats['max_connections']
+            total_reads = stats['blocks_read'] + stats['blocks_hit']
+            cache_hit_ratio = (stats['blocks_hit'] / total_reads * 100) if total_reads > 0 else 0
 
             data = {
                 'connection_id': connection_id,
-                'connections_used': connection_info.get('total_connections', 0),
-                'connection_usage_percent': connection_info.get('connection_usage_percent', 0.0),
-                'database_size_mb': database_size.get('database_size_mb', 0.0),
-                'cache_hit_ratio': performance_stats.get('cache_hit_ratio', 0.0),
-                'active_connections': connection_info.get('active_connections', 0),
+                'connections_used': total_connections,
+                'connection_usage_percent': round((total_connections / max_connections) * 100, 2) if max_connections > 0 else 0.0,
+                'database_size_mb': round(stats['size_bytes'] / 1024 / 1024, 2),
+                'cache_hit_ratio': round(cache_hit_ratio, 2),
+                'active_connections': stats['active_connections'],
                 'timestamp': timestamp
             }
             return serialize_data(data)
         except Exception as e:
             logger.error(f"Error getting database realtime stats: {e}")
-            return {
-                'connection_id': connection_id,
-                'connections_used': 0,
-                'connection_usage_percent': 0.0,
-                'database_size_mb': 0.0,
-                'cache_hit_ratio': 0.0,
-                'active_connections': 0,
-                'timestamp': timestamp
-            }
+            if self.persistent:
+                # 常驻连接可能已损坏，关闭后下次采集重连
+                await self._close_connection()
+            return {**empty, 'error': str(e)}
         finally:
             await self.disconnect()
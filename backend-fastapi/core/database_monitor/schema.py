@@ -118,6 +118,7 @@ class DatabaseRealtimeStatsSchema(BaseModel):
     database_size_mb: float
     cache_hit_ratio: float
     active_connections: int
+    error: Optional[str] = None
     timestamp: str
 
 
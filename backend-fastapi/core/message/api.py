@@ -22,6 +22,7 @@ from core.message.schema import (
     MessageListOut,
     UnreadCountOut,
     MarkReadInput,
+    MessageDeliveryJobOut,
     AnnouncementCreate,
     AnnouncementUpdate,
     AnnouncementOut,
@@ -29,6 +30,8 @@ from core.message.schema import (
     UserAnnouncementOut,
     ReadStatsOut,
 )
+from core.message.counter import UnreadCounter
+from core.message.delivery import delivery_manager
 from core.message.service import MessageService, AnnouncementService
 
 router = APIRouter(prefix="/message", tags=["消息中心"])
@@ -69,10 +72,9 @@ async def get_unread_count(
 ):
     """获取未读消息数量"""
     user_id = request.state.user_id
-    total = await MessageService.get_unread_count(db, user_id)
-    by_type = await MessageService.get_unread_count_by_type(db, user_id)
+    by_type = await UnreadCounter.get_message_counts(db, user_id)
 
-    return UnreadCountOut(total=total, by_type=by_type)
+    return UnreadCountOut(total=sum(by_type.values()), by_type=by_type)
 
 
 @router.post("/read-all", response_model=ResponseModel, summary="全部已读")
@@ -101,6 +103,31 @@ async def clear_read_messages(
     return ResponseModel(message=f"已删除 {count} 条已读消息")
 
 
+@router.get("/delivery-jobs", response_model=List[MessageDeliveryJobOut], summary="消息投递任务列表")
+async def list_delivery_jobs():
+    """获取站内消息批量投递任务列表"""
+    return await delivery_manager.list()
+
+
+@router.get("/delivery-jobs/{job_id}", response_model=MessageDeliveryJobOut, summary="消息投递任务进度")
+async def get_delivery_job(job_id: str):
+    """获取站内消息批量投递任务进度"""
+    try:
+        return await delivery_manager.get(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post("/delivery-jobs/{job_id}/cancel", response_model=ResponseModel, summary="取消消息投递任务")
+async def cancel_delivery_job(job_id: str):
+    """取消站内消息批量投递任务（已写入的消息保留）"""
+    try:
+        success = await delivery_manager.cancel(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return ResponseModel(message="任务已取消" if success else "任务未在运行")
+
+
 @router.get("/{message_id}", response_model=MessageOut, summary="消息详情")
 async def get_message(
         request: Request,
@@ -316,7 +343,7 @@ async def get_user_unread_count(
         if payload.get('role_id'):
             user_role_ids = [payload.get('role_id')]
 
-    count = await AnnouncementService.get_unread_count(
+    count = await UnreadCounter.get_announcement_count(
         db, user_id, user_dept_ids, user_role_ids
     )
     return {"count": count}
@@ -0,0 +1,356 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author: 臧成龙
+@Contact: 939589097@qq.com
+@Time: 2025-12-31
+@File: counter.py
+@Desc: 未读数量计数器 - Redis Hash增量维护每个用户的未读消息/公告数量，变化时通过WebSocket推送
+"""
+"""
+未读数量计数器
+- 每个用户一个Hash：{prefix}message:unread:{user_id}
+  - 各消息类型一个字段，创建/已读/全部已读/删除时增量更新
+  - _ready: 字段已从数据库加载，缺失时读取会按数据库重建
+  - _announcement / _announcement_epoch: 未读公告数及其计算时的公告版本
+  - _announcement_until: 计算时最近一条未过期公告的过期时间戳，到期后计数失效
+- 公告按全员/部门/角色发布，不逐个用户累加：发布、修改、删除时递增全局公告版本，
+  用户的未读公告数在版本变化或有公告到期后首次读取时重新计算
+- 计数有变化时向在线用户推送 unread_count 消息，前端无需轮询
+- 校准任务（scheduler.tasks.unread_counter_reconcile_task）按数据库重建计数
+- Redis不可用时读取直接查询数据库，写入失败只记录日志
+"""
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from core.message.model import Message
+from core.websocket.consumers.base import manager
+from utils.redis import RedisClient
+
+logger = logging.getLogger(__name__)
+
+# 原子地重写用户的计数Hash：KEYS[1]=Hash，ARGV[1]=过期秒数，其余为字段、值
+_REWRITE_SCRIPT = """
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+class UnreadCounter:
+    """未读数量计数器"""
+
+    KEY_PREFIX = f"{settings.CACHE_PREFIX}message:unread:"
+    # 有计数的用户集合，供校准任务遍历
+    USERS_KEY = f"{settings.CACHE_PREFIX}message:unread_users"
+    # 全局公告版本
+    ANNOUNCEMENT_EPOCH_KEY = f"{settings.CACHE_PREFIX}message:announcement_epoch"
+
+    READY_FIELD = "_ready"
+    ANNOUNCEMENT_FIELD = "_announcement"
+    ANNOUNCEMENT_EPOCH_FIELD = "_announcement_epoch"
+    ANNOUNCEMENT_UNTIL_FIELD = "_announcement_until"
+    ANNOUNCEMENT_FIELDS = (ANNOUNCEMENT_FIELD, ANNOUNCEMENT_EPOCH_FIELD, ANNOUNCEMENT_UNTIL_FIELD)
+
+    # 计数过期时间（秒），长期不活跃的用户下次读取时重建
+    TTL = 7 * 24 * 3600
+    # 校准任务每批处理的用户数
+    RECONCILE_BATCH_SIZE = 500
+    # 消息类型为空时计入的字段
+    DEFAULT_TYPE = "system"
+
+    @staticmethod
+    def key(user_id: str) -> str:
+        return f"{UnreadCounter.KEY_PREFIX}{user_id}"
+
+    @staticmethod
+    def field(msg_type: Optional[str]) -> str:
+        """消息类型对应的计数字段，增量、清零和重建都经过这里，类型为空的消息计入 system"""
+        return msg_type or UnreadCounter.DEFAULT_TYPE
+
+    @staticmethod
+    def _parse_by_type(data: Dict[str, str]) -> Dict[str, int]:
+        """取出消息类型字段（去掉内部字段和非正数）"""
+        by_type = {}
+        for field, value in data.items():
+            if field.startswith("_"):
+                continue
+            count = int(value)
+            if count > 0:
+                by_type[field] = count
+        return by_type
+
+    @staticmethod
+    def _kept_fields(data: Dict[str, str]) -> Dict[str, str]:
+        """重写消息计数时保留的公告字段"""
+        return {
+            field: value for field, value in data.items()
+            if field in UnreadCounter.ANNOUNCEMENT_FIELDS
+        }
+
+    @staticmethod
+    def _announcement_count(values: List[Optional[str]], epoch: str) -> Optional[int]:
+        """
+        取出缓存的未读公告数
+
+        Args:
+            values: ANNOUNCEMENT_FIELDS 对应的值
+            epoch: 当前公告版本
+
+        Returns:
+            未读公告数，缓存无效（版本变化或有公告已到期）时返回 None
+        """
+        count, user_epoch, until = values
+        if count is None or user_epoch != epoch or int(count) < 0:
+            return None
+        if until and float(until) <= time.time():
+            return None
+        return int(count)
+
+    @staticmethod
+    def _rewrite(pipe, user_id: str, by_type: Dict[str, int], kept: Optional[Dict[str, str]] = None):
+        """在管道中重写用户的消息计数（删除和写入在一个脚本中执行，期间不会插入其他增量）"""
+        mapping = {UnreadCounter.READY_FIELD: 1, **by_type, **(kept or {})}
+        args = [item for pair in mapping.items() for item in pair]
+        pipe.eval(_REWRITE_SCRIPT, 1, UnreadCounter.key(user_id), UnreadCounter.TTL, *args)
+        pipe.sadd(UnreadCounter.USERS_KEY, user_id)
+
+    # ---------- 读取 ----------
+
+    @staticmethod
+    async def _load_by_type(db: AsyncSession, user_ids: List[str]) -> Dict[str, Dict[str, int]]:
+        """从数据库统计用户各类型的未读消息数"""
+        stmt = select(Message.recipient_id, Message.msg_type, func.count(Message.id)).where(
+            Message.recipient_id.in_(user_ids),
+            Message.status == "unread",
+            Message.is_deleted == False,
+        ).group_by(Message.recipient_id, Message.msg_type)
+        result = await db.execute(stmt)
+
+        counts: Dict[str, Dict[str, int]] = {user_id: {} for user_id in user_ids}
+        for recipient_id, msg_type, count in result.all():
+            field = UnreadCounter.field(msg_type)
+            counts[recipient_id][field] = counts[recipient_id].get(field, 0) + count
+        return counts
+
+    @staticmethod
+    async def get_message_counts(db: AsyncSession, user_id: str) -> Dict[str, int]:
+        """
+        获取用户各类型的未读消息数
+
+        Returns:
+            {msg_type: count}
+        """
+        try:
+            client = await RedisClient.get_client()
+            data = await client.hgetall(UnreadCounter.key(user_id))
+            if data.get(UnreadCounter.READY_FIELD):
+                return UnreadCounter._parse_by_type(data)
+
+            by_type = (await UnreadCounter._load_by_type(db, [user_id]))[user_id]
+            pipe = client.pipeline(transaction=True)
+            UnreadCounter._rewrite(pipe, user_id, by_type, UnreadCounter._kept_fields(data))
+            await pipe.execute()
+            return by_type
+        except Exception as e:
+            logger.warning(f"读取未读消息计数失败，改为查询数据库: {e}")
+            return (await UnreadCounter._load_by_type(db, [user_id]))[user_id]
+
+    @staticmethod
+    async def get_announcement_count(
+            db: AsyncSession,
+            user_id: str,
+            user_dept_ids: List[str] = None,
+            user_role_ids: List[str] = None,
+    ) -> int:
+        """获取用户的未读公告数，公告版本变化后重新计算"""
+        from core.message.service import AnnouncementService
+
+        try:
+            client = await RedisClient.get_client()
+            pipe = client.pipeline(transaction=False)
+            pipe.hmget(UnreadCounter.key(user_id), *UnreadCounter.ANNOUNCEMENT_FIELDS)
+            pipe.get(UnreadCounter.ANNOUNCEMENT_EPOCH_KEY)
+            values, epoch = await pipe.execute()
+            epoch = epoch or "0"
+            count = UnreadCounter._announcement_count(values, epoch)
+            if count is not None:
+                return count
+        except Exception as e:
+            logger.warning(f"读取未读公告计数失败，改为查询数据库: {e}")
+            return await AnnouncementService.get_unread_count(db, user_id, user_dept_ids, user_role_ids)
+
+        # 以查询前读取的版本写入，查询期间有新发布时下次读取会再次计算；
+        # 到期时间取查询前的最近过期时间，查询期间到期的公告同样会在下次读取时重新计算
+        until = await AnnouncementService.get_next_expire_time(db)
+        count = await AnnouncementService.get_unread_count(db, user_id, user_dept_ids, user_role_ids)
+        try:
+            key = UnreadCounter.key(user_id)
+            pipe = client.pipeline(transaction=True)
+            pipe.hset(key, mapping={
+                UnreadCounter.ANNOUNCEMENT_FIELD: count,
+                UnreadCounter.ANNOUNCEMENT_EPOCH_FIELD: epoch,
+                UnreadCounter.ANNOUNCEMENT_UNTIL_FIELD: until.timestamp() if until else "",
+            })
+            pipe.expire(key, UnreadCounter.TTL)
+            pipe.sadd(UnreadCounter.USERS_KEY, user_id)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"写入未读公告计数失败: {e}")
+        return count
+
+    # ---------- 更新 ----------
+
+    @staticmethod
+    async def incr(changes: Dict[str, Dict[str, int]]):
+        """
+        增量更新未读消息数
+
+        Args:
+            changes: {user_id: {msg_type: 增量}}
+        """
+        if not changes:
+            return
+        try:
+            client = await RedisClient.get_client()
+            pipe = client.pipeline(transaction=False)
+            for user_id, by_type in changes.items():
+                key = UnreadCounter.key(user_id)
+                for msg_type, amount in by_type.items():
+                    pipe.hincrby(key, UnreadCounter.field(msg_type), amount)
+                pipe.expire(key, UnreadCounter.TTL)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"更新未读消息计数失败: {e}")
+
+    @staticmethod
+    async def clear(user_id: str, msg_type: Optional[str] = None):
+        """全部已读：清零指定类型或全部类型"""
+        try:
+            client = await RedisClient.get_client()
+            if msg_type:
+                await client.hdel(UnreadCounter.key(user_id), UnreadCounter.field(msg_type))
+                return
+            data = await client.hgetall(UnreadCounter.key(user_id))
+            pipe = client.pipeline(transaction=True)
+            UnreadCounter._rewrite(pipe, user_id, {}, UnreadCounter._kept_fields(data))
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"清零未读消息计数失败: {e}")
+
+    @staticmethod
+    async def decr_announcement(user_id: str):
+        """用户阅读了一条公告"""
+        try:
+            client = await RedisClient.get_client()
+            await client.hincrby(UnreadCounter.key(user_id), UnreadCounter.ANNOUNCEMENT_FIELD, -1)
+        except Exception as e:
+            logger.warning(f"更新未读公告计数失败: {e}")
+
+    @staticmethod
+    async def bump_announcement_epoch():
+        """公告发布/修改/删除后使所有用户的未读公告数失效"""
+        try:
+            client = await RedisClient.get_client()
+            await client.incr(UnreadCounter.ANNOUNCEMENT_EPOCH_KEY)
+        except Exception as e:
+            logger.warning(f"更新公告版本失败: {e}")
+
+    # ---------- 推送 ----------
+
+    @staticmethod
+    async def push(db: AsyncSession, user_ids: Iterable[str], online: Optional[Set[str]] = None):
+        """
+        向在线用户推送最新的未读数量
+
+        未读公告数仅在计数有效（公告版本未变化且没有公告到期）时附带，否则前端收到 announcement 消息后自行刷新
+
+        Args:
+            db: 数据库会话
+            user_ids: 用户ID列表
+            online: 调用方已查询的在线用户，传入时不再重复查询
+        """
+        try:
+            if online is None:
+                online = await manager.get_online_users(user_ids)
+            if not online:
+                return
+
+            client = await RedisClient.get_client()
+            epoch = await client.get(UnreadCounter.ANNOUNCEMENT_EPOCH_KEY) or "0"
+            for user_id in online:
+                by_type = await UnreadCounter.get_message_counts(db, user_id)
+                data: Dict[str, Any] = {'total': sum(by_type.values()), 'by_type': by_type}
+
+                values = await client.hmget(UnreadCounter.key(user_id), *UnreadCounter.ANNOUNCEMENT_FIELDS)
+                count = UnreadCounter._announcement_count(values, epoch)
+                if count is not None:
+                    data['announcement'] = count
+
+                await manager.send_to_user(user_id, {
+                    'type': 'unread_count',
+                    'message': '未读数量',
+                    'data': data,
+                    'timestamp': datetime.now().isoformat()
+                }, coalesce_key='unread_count')
+        except Exception as e:
+            logger.warning(f"推送未读数量失败: {e}")
+
+    # ---------- 校准 ----------
+
+    @staticmethod
+    async def reconcile(db: AsyncSession) -> int:
+        """
+        按数据库重建所有已缓存用户的未读消息数，并使未读公告数失效
+
+        Returns:
+            重建的用户数
+        """
+        client = await RedisClient.get_client()
+        rebuilt = 0
+        batch: List[str] = []
+
+        async def flush(user_ids: List[str]) -> int:
+            pipe = client.pipeline(transaction=False)
+            for user_id in user_ids:
+                pipe.exists(UnreadCounter.key(user_id))
+            exists = await pipe.execute()
+
+            expired = [user_id for user_id, flag in zip(user_ids, exists) if not flag]
+            alive = [user_id for user_id, flag in zip(user_ids, exists) if flag]
+            pipe = client.pipeline(transaction=False)
+            if expired:
+                pipe.srem(UnreadCounter.USERS_KEY, *expired)
+            if alive:
+                counts = await UnreadCounter._load_by_type(db, alive)
+                for user_id in alive:
+                    UnreadCounter._rewrite(pipe, user_id, counts[user_id])
+            await pipe.execute()
+            return len(alive)
+
+        async for user_id in client.sscan_iter(UnreadCounter.USERS_KEY, count=UnreadCounter.RECONCILE_BATCH_SIZE):
+            batch.append(user_id)
+            if len(batch) >= UnreadCounter.RECONCILE_BATCH_SIZE:
+                rebuilt += await flush(batch)
+                batch = []
+        if batch:
+            rebuilt += await flush(batch)
+
+        await client.incr(UnreadCounter.ANNOUNCEMENT_EPOCH_KEY)
+        return rebuilt
+
+
+def count_changes(messages: Iterable[Message], amount: int = 1) -> Dict[str, Dict[str, int]]:
+    """按接收人、类型汇总消息数，用于 UnreadCounter.incr"""
+    changes: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for message in messages:
+        changes[message.recipient_id][UnreadCounter.field(message.msg_type)] += amount
+    return changes
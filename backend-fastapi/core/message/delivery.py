@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author: 臧成龙
+@Contact: 939589097@qq.com
+@Time: 2025-12-31
+@File: delivery.py
+@Desc: 站内消息批量投递任务 - 大量接收人时在后台分批写入并推送进度
+"""
+"""
+站内消息批量投递任务
+- 接收人按 MESSAGE_INSERT_CHUNK_SIZE 分批，每批一条多行INSERT（不创建ORM对象）并单独提交，
+  事务与内存占用只与批大小有关
+- 每批提交后更新未读计数、推送提醒，并通过WebSocket向发起人推送进度
+- 取消时已提交的批次保留，进度中的 delivered 为实际写入数
+- 任务状态保存在Redis中，任意worker都能查询和取消；取消请求写入取消标记，由执行任务的worker在推送进度时检查
+- 公告不经过此处：公告按接收范围在读取时过滤，已读记录只在阅读时写入，不为每个用户生成消息
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from core.message.service import MessageService
+from core.websocket.consumers.base import manager
+from utils.redis import RedisClient
+
+logger = logging.getLogger(__name__)
+
+JOB_KEY_PREFIX = f"{settings.CACHE_PREFIX}message_delivery:job:"
+JOB_INDEX_KEY = f"{settings.CACHE_PREFIX}message_delivery:jobs"
+
+# 任务状态保留时间（秒）
+JOB_STATE_TTL = 86400
+
+# 运行标记过期时间（秒），运行中推送进度时续期；worker异常退出后到期，任务视为失败
+JOB_RUNNING_TTL = 300
+
+
+class MessageDeliveryJob:
+    """站内消息批量投递任务"""
+
+    job_type = 'message_delivery'
+
+    # 通过WebSocket推送进度的最小间隔（秒）
+    PROGRESS_INTERVAL = 1.0
+
+    def __init__(
+            self,
+            recipient_ids: List[str],
+            fields: Dict[str, Any],
+            user_id: Optional[str] = None,
+            chunk_size: Optional[int] = None,
+    ):
+        """
+        Args:
+            recipient_ids: 接收人ID列表
+            fields: 消息字段 title/content/msg_type/link_type/link_id/sender_id
+            user_id: 发起人ID，用于推送进度
+            chunk_size: 每批写入的行数
+        """
+        self.job_id = uuid.uuid4().hex
+        self.recipient_ids = recipient_ids
+        self.fields = fields
+        self.user_id = user_id
+        self.chunk_size = chunk_size or settings.MESSAGE_INSERT_CHUNK_SIZE
+        self.status = 'pending'  # pending, running, completed, failed, cancelled
+        self.progress: Dict[str, Any] = {'total': len(recipient_ids), 'delivered': 0, 'percent': 0}
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_notify = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return self.status in ('pending', 'running')
+
+    def start(self):
+        """在事件循环中启动任务"""
+        self._task = asyncio.create_task(self._run())
+
+    def cancel(self) -> bool:
+        """取消本进程内运行的任务（已写入的批次不回滚）"""
+        if not self.is_running or not self._task:
+            return False
+        self._task.cancel()
+        return True
+
+    async def _run(self):
+        self.status = 'running'
+        self.started_at = datetime.now()
+        try:
+            await self.save()
+            async with AsyncSessionLocal() as db:
+                await self.execute(db)
+            self.status = 'completed'
+        except asyncio.CancelledError:
+            self.status = 'cancelled'
+        except Exception as e:
+            logger.error(f"Message delivery job {self.job_id} failed: {e}")
+            self.status = 'failed'
+            self.error = str(e)
+        finally:
+            self.finished_at = datetime.now()
+            await self.notify_progress(force=True)
+
+    async def execute(self, db):
+        total = len(self.recipient_ids)
+        for i in range(0, total, self.chunk_size):
+            self.progress['delivered'] += await MessageService.insert_messages(
+                db, self.recipient_ids[i:i + self.chunk_size], **self.fields
+            )
+            self.progress['percent'] = self.progress['delivered'] * 100 // total if total else 100
+            await self.notify_progress()
+        self.progress['percent'] = 100
+
+    async def save(self):
+        """保存任务状态到Redis，运行中同时续期运行标记"""
+        try:
+            client = await RedisClient.get_client()
+            pipe = client.pipeline(transaction=False)
+            pipe.set(f"{JOB_KEY_PREFIX}{self.job_id}", json.dumps(self.to_dict(), default=str), ex=JOB_STATE_TTL)
+            if self.is_running:
+                pipe.set(f"{JOB_KEY_PREFIX}{self.job_id}:running", 1, ex=JOB_RUNNING_TTL)
+            else:
+                pipe.delete(f"{JOB_KEY_PREFIX}{self.job_id}:running", f"{JOB_KEY_PREFIX}{self.job_id}:cancel")
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"保存投递任务状态失败 {self.job_id}: {e}")
+
+    async def _cancel_requested(self) -> bool:
+        """其他worker是否请求取消本任务"""
+        try:
+            client = await RedisClient.get_client()
+            return bool(await client.exists(f"{JOB_KEY_PREFIX}{self.job_id}:cancel"))
+        except Exception as e:
+            logger.warning(f"检查投递任务取消标记失败 {self.job_id}: {e}")
+            return False
+
+    async def notify_progress(self, force: bool = False):
+        """
+        保存任务状态，并通过WebSocket向发起人推送投递进度
+
+        Args:
+            force: 忽略推送间隔
+        """
+        now = time.monotonic()
+        if not force and now - self._last_notify < self.PROGRESS_INTERVAL:
+            return
+        self._last_notify = now
+
+        if self.is_running and await self._cancel_requested():
+            raise asyncio.CancelledError()
+        await self.save()
+
+        if not self.user_id:
+            return
+        await manager.send_to_user(str(self.user_id), {
+            'type': 'message_delivery_progress',
+            'message': self.status,
+            'data': {
+                'job_id': self.job_id,
+                'status': self.status,
+                'progress': self.progress,
+                'error': self.error,
+            },
+            'timestamp': datetime.now().isoformat()
+        }, coalesce_key=f"message_delivery:{self.job_id}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.job_id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'title': self.fields.get('title', ''),
+            'msg_type': self.fields.get('msg_type', 'system'),
+            'progress': self.progress,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class MessageDeliveryManager:
+    """
+    站内消息投递任务管理
+
+    任务在提交的worker中执行，状态保存在Redis中，
+    查询、列表和取消在任意worker上都可用
+    """
+
+    # 最多保留的任务记录数
+    MAX_JOBS = 50
+
+    def __init__(self):
+        # 本进程内运行中的任务
+        self.jobs: Dict[str, MessageDeliveryJob] = {}
+
+    async def submit(self, job: MessageDeliveryJob) -> MessageDeliveryJob:
+        """提交并启动任务"""
+        client = await RedisClient.get_client()
+        pipe = client.pipeline(transaction=False)
+        pipe.set(f"{JOB_KEY_PREFIX}{job.job_id}", json.dumps(job.to_dict(), default=str), ex=JOB_STATE_TTL)
+        pipe.set(f"{JOB_KEY_PREFIX}{job.job_id}:running", 1, ex=JOB_RUNNING_TTL)
+        pipe.zadd(JOB_INDEX_KEY, {job.job_id: job.created_at.timestamp()})
+        # 只保留最近的任务记录，状态键按过期时间自动清理
+        pipe.zremrangebyrank(JOB_INDEX_KEY, 0, -self.MAX_JOBS - 1)
+        await pipe.execute()
+
+        self.jobs[job.job_id] = job
+        job.start()
+        job._task.add_done_callback(lambda _: self.jobs.pop(job.job_id, None))
+        return job
+
+    @staticmethod
+    async def _load(client, job_id: str, data: Optional[str]) -> Optional[Dict[str, Any]]:
+        """解析保存的任务状态，运行标记已过期时视为执行的worker已退出"""
+        if not data:
+            return None
+        state = json.loads(data)
+        if state['status'] in ('pending', 'running') and not await client.exists(f"{JOB_KEY_PREFIX}{job_id}:running"):
+            state['status'] = 'failed'
+            state['error'] = '执行任务的进程已退出'
+        return state
+
+    async def get(self, job_id: str) -> Dict[str, Any]:
+        """获取任务状态，本进程内运行的任务直接返回内存中的最新进度"""
+        job = self.jobs.get(job_id)
+        if job:
+            return job.to_dict()
+        client = await RedisClient.get_client()
+        state = await self._load(client, job_id, await client.get(f"{JOB_KEY_PREFIX}{job_id}"))
+        if not state:
+            raise ValueError(f"投递任务 '{job_id}' 不存在")
+        return state
+
+    async def list(self) -> List[Dict[str, Any]]:
+        """按创建时间倒序获取任务列表"""
+        client = await RedisClient.get_client()
+        job_ids = await client.zrevrange(JOB_INDEX_KEY, 0, -1)
+        if not job_ids:
+            return []
+        values = await client.mget([f"{JOB_KEY_PREFIX}{job_id}" for job_id in job_ids])
+        jobs = []
+        for job_id, data in zip(job_ids, values):
+            if job_id in self.jobs:
+                jobs.append(self.jobs[job_id].to_dict())
+            else:
+                state = await self._load(client, job_id, data)
+                if state:
+                    jobs.append(state)
+        return jobs
+
+    async def cancel(self, job_id: str) -> bool:
+        """
+        取消任务，任务在其他worker上运行时写入取消标记，由该worker在下次推送进度时取消
+
+        Returns:
+            任务是否处于运行中
+        """
+        job = self.jobs.get(job_id)
+        if job:
+            return job.cancel()
+        state = await self.get(job_id)
+        if state['status'] not in ('pending', 'running'):
+            return False
+        client = await RedisClient.get_client()
+        await client.set(f"{JOB_KEY_PREFIX}{job_id}:cancel", 1, ex=JOB_RUNNING_TTL)
+        return True
+
+    async def shutdown(self):
+        """取消本进程内运行中的任务并等待其保存最终状态"""
+        tasks = [job._task for job in list(self.jobs.values()) if job._task and job.cancel()]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+delivery_manager = MessageDeliveryManager()
@@ -11,7 +11,7 @@
 消息中心 Schema
 """
 from datetime import datetime
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Any
 
 from pydantic import BaseModel, Field, ConfigDict
 
@@ -58,6 +58,20 @@ class MarkReadInput(BaseModel):
     msg_type: Optional[str] = Field(None, description="消息类型，不传则标记全部")
 
 
+class MessageDeliveryJobOut(BaseModel):
+    """站内消息投递任务输出"""
+    job_id: str
+    job_type: str
+    status: str  # pending, running, completed, failed, cancelled
+    title: str
+    msg_type: str
+    progress: Dict[str, Any]
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
 # ============ 公告相关 Schema ============
 class AnnouncementCreate(BaseModel):
     """创建公告"""
@@ -13,12 +13,16 @@
 import logging
 import re
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Set, Tuple
 
-from sqlalchemy import select, update, func, and_, or_
+from sqlalchemy import select, update, insert, func, and_, or_, exists
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.base_model import generate_nanoid
+from app.config import settings
+from core.message.counter import UnreadCounter, count_changes
 from core.message.model import Message, Announcement, AnnouncementRead
+from core.websocket.consumers.base import manager
 
 logger = logging.getLogger(__name__)
 
@@ -83,7 +87,11 @@ class MessageService:
         ).group_by(Message.msg_type)
 
         result = await db.execute(stmt)
-        return {row[0]: row[1] for row in result.all()}
+        counts: Dict[str, int] = {}
+        for msg_type, count in result.all():
+            field = UnreadCounter.field(msg_type)
+            counts[field] = counts.get(field, 0) + count
+        return counts
 
     @staticmethod
     async def get_by_id(db: AsyncSession, message_id: str, user_id: str) -> Optional[Message]:
@@ -107,6 +115,8 @@ class MessageService:
             message.status = "read"
             message.read_at = datetime.now()
             await db.commit()
+            await UnreadCounter.incr({user_id: {message.msg_type: -1}})
+            await UnreadCounter.push(db, [user_id])
 
         return True
 
@@ -120,7 +130,11 @@ class MessageService:
         ]
 
         if msg_type:
-            conditions.append(Message.msg_type == msg_type)
+            if msg_type == UnreadCounter.DEFAULT_TYPE:
+                # 类型为空的消息计入 system
+                conditions.append(or_(Message.msg_type == msg_type, Message.msg_type.is_(None)))
+            else:
+                conditions.append(Message.msg_type == msg_type)
 
         stmt = update(Message).where(and_(*conditions)).values(
             status="read",
@@ -130,6 +144,9 @@ class MessageService:
         result = await db.execute(stmt)
         await db.commit()
 
+        if result.rowcount:
+            await UnreadCounter.clear(user_id, msg_type)
+            await UnreadCounter.push(db, [user_id])
         return result.rowcount
 
     @staticmethod
@@ -142,6 +159,9 @@ class MessageService:
         message.is_deleted = True
         await db.commit()
 
+        if message.status == "unread":
+            await UnreadCounter.incr({user_id: {message.msg_type: -1}})
+            await UnreadCounter.push(db, [user_id])
         return True
 
     @staticmethod
@@ -182,6 +202,9 @@ class MessageService:
         db.add(message)
         await db.commit()
         await db.refresh(message)
+
+        await UnreadCounter.incr(count_changes([message]))
+        await UnreadCounter.push(db, [recipient_id])
         return message
 
     @staticmethod
@@ -194,24 +217,83 @@ class MessageService:
             link_type: str = "",
             link_id: str = "",
             sender_id: str = None,
-    ) -> List[Message]:
-        """批量创建消息"""
-        messages = []
-        for recipient_id in recipient_ids:
-            message = Message(
-                recipient_id=recipient_id,
-                title=title,
-                content=content,
-                msg_type=msg_type,
-                link_type=link_type,
-                link_id=link_id,
-                sender_id=sender_id,
+            chunk_size: int = None,
+    ) -> int:
+        """
+        批量创建消息
+
+        按 chunk_size 分批执行多行INSERT（不创建ORM对象），每批单独提交并更新未读计数、推送提醒
+
+        Returns:
+            创建的消息数
+        """
+        chunk_size = chunk_size or settings.MESSAGE_INSERT_CHUNK_SIZE
+        created = 0
+        for i in range(0, len(recipient_ids), chunk_size):
+            created += await MessageService.insert_messages(
+                db, recipient_ids[i:i + chunk_size], title, content,
+                msg_type, link_type, link_id, sender_id,
             )
-            messages.append(message)
-            db.add(message)
+        return created
 
+    @staticmethod
+    async def insert_messages(
+            db: AsyncSession,
+            recipient_ids: List[str],
+            title: str,
+            content: str,
+            msg_type: str = "system",
+            link_type: str = "",
+            link_id: str = "",
+            sender_id: str = None,
+    ) -> int:
+        """
+        以一条多行INSERT写入一批消息并提交，随后更新未读计数并推送
+
+        Returns:
+            写入的消息数
+        """
+        if not recipient_ids:
+            return 0
+
+        now = datetime.now()
+        rows = [
+            {
+                "id": generate_nanoid(),
+                "recipient_id": recipient_id,
+                "title": title,
+                "content": content,
+                "msg_type": msg_type,
+                "status": "unread",
+                "link_type": link_type,
+                "link_id": link_id,
+                "sender_id": sender_id,
+                "sort": 0,
+                "is_deleted": False,
+                "sys_create_datetime": now,
+                "sys_update_datetime": now,
+                "sys_creator_id": sender_id,
+                "sys_modifier_id": sender_id,
+            }
+            for recipient_id in recipient_ids
+        ]
+        await db.execute(insert(Message.__table__).values(rows))
         await db.commit()
-        return messages
+
+        changes = {}
+        for recipient_id in recipient_ids:
+            changes.setdefault(recipient_id, {msg_type: 0})[msg_type] += 1
+        await UnreadCounter.incr(changes)
+
+        # 新消息提醒和未读数量共用一次在线状态查询
+        try:
+            online = await manager.get_online_users(recipient_ids)
+        except Exception as e:
+            logger.warning(f"查询在线用户失败: {e}")
+            return len(rows)
+        await NotifyService.push(recipient_ids, title, msg_type, link_type, link_id, online=online)
+        await UnreadCounter.push(db, recipient_ids, online=online)
+        return len(rows)
 
 
 class AnnouncementService:
@@ -256,6 +338,14 @@ class AnnouncementService:
 
         return items, total
 
+    @staticmethod
+    def _read_by(user_id: str):
+        """公告已被用户阅读（关联子查询，无需先加载用户的全部已读ID）"""
+        return exists().where(
+            AnnouncementRead.announcement_id == Announcement.id,
+            AnnouncementRead.user_id == user_id,
+        )
+
     @staticmethod
     async def get_user_announcements(
             db: AsyncSession,
@@ -308,13 +398,7 @@ class AnnouncementService:
 
         # 只看未读
         if unread_only:
-            read_stmt = select(AnnouncementRead.announcement_id).where(
-                AnnouncementRead.user_id == user_id
-            )
-            read_result = await db.execute(read_stmt)
-            read_ids = [row[0] for row in read_result.all()]
-            if read_ids:
-                conditions.append(Announcement.id.notin_(read_ids))
+            conditions.append(~AnnouncementService._read_by(user_id))
 
         # 获取总数
         count_stmt = select(func.count(Announcement.id)).where(and_(*conditions))
@@ -406,6 +490,8 @@ class AnnouncementService:
         await db.commit()
         await db.refresh(announcement)
 
+        if announcement.status == "published":
+            await UnreadCounter.bump_announcement_epoch()
         return announcement
 
     @staticmethod
@@ -419,6 +505,8 @@ class AnnouncementService:
         announcement.sys_modifier_id = user_id
         await db.commit()
 
+        if announcement.status == "published":
+            await UnreadCounter.bump_announcement_epoch()
         return True
 
     @staticmethod
@@ -442,8 +530,38 @@ class AnnouncementService:
         await db.commit()
         await db.refresh(announcement)
 
+        await UnreadCounter.bump_announcement_epoch()
+        await AnnouncementService.push_published(announcement)
         return announcement
 
+    @staticmethod
+    async def push_published(announcement: Announcement):
+        """通过WebSocket向接收范围内的在线用户推送新公告"""
+        message = {
+            'type': 'announcement',
+            'message': announcement.title,
+            'data': {
+                'id': announcement.id,
+                'title': announcement.title,
+                'target_type': announcement.target_type,
+            },
+            'timestamp': datetime.now().isoformat()
+        }
+        try:
+            target_ids = announcement.target_ids or []
+            if announcement.target_type == "user":
+                for target_id in target_ids:
+                    await manager.send_to_user(str(target_id), message)
+            elif announcement.target_type in ("dept", "role"):
+                for target_id in target_ids:
+                    await manager.broadcast_to_group(
+                        f"notifications_{announcement.target_type}_{target_id}", message
+                    )
+            else:
+                await manager.broadcast_to_group("notifications_all", message)
+        except Exception as e:
+            logger.error(f"推送公告失败: {e}")
+
     @staticmethod
     async def mark_as_read(
             db: AsyncSession,
@@ -479,6 +597,11 @@ class AnnouncementService:
 
             await db.commit()
 
+            if announcement.status == "published" and (
+                    announcement.expire_time is None or announcement.expire_time > datetime.now()):
+                await UnreadCounter.decr_announcement(user_id)
+                await UnreadCounter.push(db, [user_id])
+
         return True
 
     @staticmethod
@@ -529,19 +652,25 @@ class AnnouncementService:
         conditions.append(or_(*target_conditions))
 
         # 排除已读
-        read_stmt = select(AnnouncementRead.announcement_id).where(
-            AnnouncementRead.user_id == user_id
-        )
-        read_result = await db.execute(read_stmt)
-        read_ids = [row[0] for row in read_result.all()]
-        if read_ids:
-            conditions.append(Announcement.id.notin_(read_ids))
+        conditions.append(~AnnouncementService._read_by(user_id))
 
         # 获取数量
         count_stmt = select(func.count(Announcement.id)).where(and_(*conditions))
         result = await db.execute(count_stmt)
         return result.scalar() or 0
 
+    @staticmethod
+    async def get_next_expire_time(db: AsyncSession) -> Optional[datetime]:
+        """已发布公告中最近的未来过期时间，用于确定未读公告数缓存的有效期"""
+        result = await db.execute(
+            select(func.min(Announcement.expire_time)).where(
+                Announcement.status == "published",
+                Announcement.is_deleted == False,
+                Announcement.expire_time > datetime.now(),
+            )
+        )
+        return result.scalar()
+
     @staticmethod
     async def get_read_stats(db: AsyncSession, announcement_id: str) -> Optional[Dict[str, Any]]:
         """获取公告阅读统计"""
@@ -617,8 +746,13 @@ class NotifyService:
             link_type: str = "",
             link_id: str = "",
             sender_id: str = None,
-    ) -> Dict[str, bool]:
-        """发送通知"""
+    ) -> Dict[str, Any]:
+        """
+        发送通知
+
+        接收人超过 MESSAGE_BULK_THRESHOLD 时站内消息转为后台投递任务，
+        结果中的 site_job_id 可用于查询进度
+        """
         if channels is None:
             channels = ["site"]
 
@@ -631,7 +765,25 @@ class NotifyService:
 
         for channel in channels:
             try:
-                if channel == "site":
+                if channel == "site" and len(recipient_ids) > settings.MESSAGE_BULK_THRESHOLD:
+                    from core.message.delivery import MessageDeliveryJob, delivery_manager
+
+                    job = await delivery_manager.submit(MessageDeliveryJob(
+                        recipient_ids=recipient_ids,
+                        fields={
+                            "title": title,
+                            "content": content,
+                            "msg_type": msg_type,
+                            "link_type": link_type,
+                            "link_id": link_id,
+                            "sender_id": sender_id,
+                        },
+                        user_id=sender_id,
+                    ))
+                    results["site"] = True
+                    results["site_job_id"] = job.job_id
+                    logger.info(f"站内消息已转为后台投递: {len(recipient_ids)} 条, 任务 {job.job_id}")
+                elif channel == "site":
                     await MessageService.batch_create_messages(
                         db=db,
                         recipient_ids=recipient_ids,
@@ -652,3 +804,36 @@ class NotifyService:
                 results[channel] = False
 
         return results
+
+    @staticmethod
+    async def push(
+            recipient_ids: List[str],
+            title: str,
+            msg_type: str,
+            link_type: str = "",
+            link_id: str = "",
+            online: Optional[Set[str]] = None,
+    ):
+        """
+        通过WebSocket向在线的接收人推送新消息提醒
+
+        Args:
+            online: 调用方已查询的在线接收人，传入时不再重复查询
+        """
+        message = {
+            'type': 'notification',
+            'message': title,
+            'data': {
+                'msg_type': msg_type,
+                'link_type': link_type,
+                'link_id': link_id,
+            },
+            'timestamp': datetime.now().isoformat()
+        }
+        try:
+            if online is None:
+                online = await manager.get_online_users(recipient_ids)
+            for recipient_id in online:
+                await manager.send_to_user(recipient_id, message)
+        except Exception as e:
+            logger.error(f"推送站内消息提醒失败: {e}")
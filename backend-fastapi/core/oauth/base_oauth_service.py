@@ -22,6 +22,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
 from utils.redis import RedisClient
+from utils.http_client import http_clients
 from core.user.model import User
 from core.login_log.service import LoginLogService
 from utils.security import create_access_token, create_refresh_token
@@ -109,7 +110,7 @@ class BaseOAuthService(ABC):
                 'redirect_uri': config['redirect_uri'],
             }
 
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with http_clients.session(timeout=10.0) as client:
                 response = await client.post(
                     cls.TOKEN_URL,
                     data=data,
@@ -20,6 +20,7 @@ import httpx
 
 from app.config import settings
 from core.oauth.base_oauth_service import BaseOAuthService
+from utils.http_client import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -48,7 +49,7 @@ class GiteeOAuthService(BaseOAuthService):
         """
         try:
             params = {'access_token': access_token}
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with http_clients.session(timeout=10.0) as client:
                 response = await client.get(cls.USER_INFO_URL, params=params)
                 response.raise_for_status()
 
@@ -119,7 +120,7 @@ class GitHubOAuthService(BaseOAuthService):
                 'Authorization': f'Bearer {access_token}',
                 'Accept': 'application/json',
             }
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with http_clients.session(timeout=10.0) as client:
                 response = await client.get(cls.USER_INFO_URL, headers=headers)
                 response.raise_for_status()
 
@@ -190,7 +191,7 @@ class QQOAuthService(BaseOAuthService):
                 'redirect_uri': config['redirect_uri'],
             }
 
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with http_clients.session(timeout=10.0) as client:
                 response = await client.get(cls.TOKEN_URL, params=params)
                 response.raise_for_status()
 
@@ -217,7 +218,7 @@ class QQOAuthService(BaseOAuthService):
     async def get_user_info(cls, access_token: str) -> Optional[Dict]:
         """使用访问令牌获取 QQ 用户信息"""
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with http_clients.session(timeout=10.0) as client:
                 # 1. 获取 openid
                 openid_response = await client.get(
                     cls.OPENID_URL,
@@ -316,7 +317,7 @@ class GoogleOAuthService(BaseOAuthService):
             headers = {
                 'Authorization': f'Bearer {access_token}',
             }
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with http_clients.session(timeout=10.0) as client:
                 response = await client.get(cls.USER_INFO_URL, headers=headers)
                 response.raise_for_status()
 
@@ -400,7 +401,7 @@ class WeChatOAuthService(BaseOAuthService):
                 'grant_type': 'authorization_code',
             }
 
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with http_clients.session(timeout=10.0) as client:
                 response = await client.get(cls.TOKEN_URL, params=params)
                 response.raise_for_status()
 
@@ -433,7 +434,7 @@ class WeChatOAuthService(BaseOAuthService):
                 'lang': 'zh_CN',
             }
 
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with http_clients.session(timeout=10.0) as client:
                 response = await client.get(cls.USER_INFO_URL, params=params)
                 response.raise_for_status()
 
@@ -506,7 +507,7 @@ class MicrosoftOAuthService(BaseOAuthService):
             headers = {
                 'Authorization': f'Bearer {access_token}',
             }
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with http_clients.session(timeout=10.0) as client:
                 response = await client.get(cls.USER_INFO_URL, headers=headers)
                 response.raise_for_status()
 
@@ -585,7 +586,7 @@ class DingTalkOAuthService(BaseOAuthService):
                 'Content-Type': 'application/json',
             }
 
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with http_clients.session(timeout=10.0) as client:
                 response = await client.post(cls.TOKEN_URL, json=data, headers=headers)
                 response.raise_for_status()
 
@@ -614,7 +615,7 @@ class DingTalkOAuthService(BaseOAuthService):
                 'Content-Type': 'application/json',
             }
 
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with http_clients.session(timeout=10.0) as client:
                 response = await client.get(cls.USER_INFO_URL, headers=headers)
                 response.raise_for_status()
 
@@ -693,7 +694,7 @@ class FeishuOAuthService(BaseOAuthService):
                 'app_secret': config['client_secret'],
             }
 
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with http_clients.session(timeout=10.0) as client:
                 response = await client.post(url, json=data)
                 response.raise_for_status()
 
@@ -727,7 +728,7 @@ class FeishuOAuthService(BaseOAuthService):
                 'Authorization': f'Bearer {app_access_token}',
             }
 
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with http_clients.session(timeout=10.0) as client:
                 response = await client.post(cls.TOKEN_URL, json=data, headers=headers)
                 response.raise_for_status()
 
@@ -758,7 +759,7 @@ class FeishuOAuthService(BaseOAuthService):
                 'Content-Type': 'application/json',
             }
 
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with http_clients.session(timeout=10.0) as client:
                 response = await client.get(cls.USER_INFO_URL, headers=headers)
                 response.raise_for_status()
 
@@ -9,7 +9,8 @@ import logging
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
-from fastapi.responses import StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
@@ -22,7 +23,9 @@ from core.page_manager.schema import (
     PageMetaUpdateIn,
     PagePublishIn,
 )
+from core.page_manager.bundle import make_etag, page_bundle_cache
 from core.page_manager.service import PageService, PageServiceException
+from core.data_source.service import DataSourceService
 
 logger = logging.getLogger(__name__)
 
@@ -119,6 +122,44 @@ async def get_page_by_code(
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get("/render/{code}", summary="获取页面渲染包")
+async def get_page_render_bundle(
+        request: Request,
+        code: str,
+        data: bool = Query(False, description="是否包含页面中各数据源的初始数据"),
+        db: AsyncSession = Depends(get_db),
+):
+    """
+    获取已发布页面的渲染包（页面配置及其引用的数据源编码）
+
+    配置在首次访问时序列化并缓存，带 ETag，未变化时返回 304。
+    data=true 时并发执行页面引用的数据源，结果放在 data 中（按数据源编码）
+    """
+    bundle = await page_bundle_cache.get(db, code)
+    if bundle is None:
+        raise HTTPException(status_code=404, detail=f"页面不存在或未发布: {code}")
+
+    body = bundle.body
+    etag = bundle.etag
+    if data and bundle.data_sources:
+        results = await DataSourceService.execute_batch(
+            db, [{'code': source_code, 'params': {}} for source_code in bundle.data_sources]
+        )
+        initial_data = {
+            item['code']: {'success': item['success'], 'data': item['data'], 'error': item['error']}
+            for item in results
+        }
+        # 拼接已序列化的页面配置，不重新序列化
+        data_json = json.dumps(jsonable_encoder(initial_data), ensure_ascii=False, separators=(',', ':'))
+        body = body[:-1] + b',"data":' + data_json.encode() + b'}'
+        etag = make_etag(body)
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @router.get("/{page_id}", response_model=PageMetaOut, summary="页面详情")
 async def get_page(
         page_id: str,
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+页面渲染包缓存（异步版本）
+
+渲染包是已发布页面渲染所需的全部配置，首次访问时序列化一次，按 (code, version) 缓存：
+- Redis 中保存序列化后的 JSON 和 ETag，多个进程共用；进程内按 (code, version) 再缓存一份，命中时不传输正文
+- 发布、取消发布、修改、删除页面后使缓存失效；失效时递增代数，正在构建的旧内容不会写回
+- ETag 为正文的 SHA-256，客户端带 If-None-Match 且未变化时直接返回 304
+"""
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from redis.exceptions import RedisError, WatchError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from core.page_manager.model import PageMeta
+from utils.redis import RedisClient
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PageBundle:
+    """页面渲染包"""
+    code: str
+    version: int
+    etag: str
+    body: bytes
+    # 页面中引用的数据源编码
+    data_sources: List[str]
+
+
+def extract_data_sources(page_config: Dict[str, Any]) -> List[str]:
+    """提取页面配置中各组件引用的数据源编码（去重，保持顺序）"""
+    codes = []
+    for widget in (page_config or {}).get('widgets') or []:
+        data_source = widget.get('dataSource') if isinstance(widget, dict) else None
+        if isinstance(data_source, dict) and data_source.get('type') == 'dataSource' \
+                and data_source.get('dataSourceCode'):
+            codes.append(data_source['dataSourceCode'])
+    return list(dict.fromkeys(codes))
+
+
+def make_etag(body: bytes) -> str:
+    """强 ETag"""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+class PageBundleCache:
+    """页面渲染包缓存"""
+
+    PREFIX = f"{settings.CACHE_PREFIX}page:bundle:"
+
+    # Redis 中缓存的过期时间（秒）
+    TTL = 86400
+    # 进程内最多缓存的页面数
+    MAX_LOCAL = 200
+
+    def __init__(self):
+        self._local: 'OrderedDict[Tuple[str, int], PageBundle]' = OrderedDict()
+
+    def _key(self, code: str) -> str:
+        return f"{self.PREFIX}{code}"
+
+    def _gen_key(self, code: str) -> str:
+        return f"{self.PREFIX}{code}:gen"
+
+    def _remember(self, bundle: PageBundle):
+        key = (bundle.code, bundle.version)
+        self._local[key] = bundle
+        self._local.move_to_end(key)
+        while len(self._local) > self.MAX_LOCAL:
+            self._local.popitem(last=False)
+
+    @staticmethod
+    def build(page: PageMeta) -> PageBundle:
+        """序列化页面渲染包"""
+        page_config = page.page_config or {}
+        data_sources = extract_data_sources(page_config)
+        body = json.dumps({
+            'code': page.code,
+            'name': page.name,
+            'version': page.version,
+            'page_config': page_config,
+            'data_sources': data_sources,
+        }, ensure_ascii=False, separators=(',', ':')).encode()
+        return PageBundle(page.code, page.version, make_etag(body), body, data_sources)
+
+    async def get(self, db: AsyncSession, code: str) -> Optional[PageBundle]:
+        """
+        获取已发布页面的渲染包
+
+        Returns:
+            渲染包，页面不存在或未发布时返回 None
+        """
+        try:
+            client = await RedisClient.get_binary_client()
+            version, etag = await client.hmget(self._key(code), 'version', 'etag')
+            if version is not None:
+                bundle = self._local.get((code, int(version)))
+                if bundle is not None and bundle.etag == etag.decode():
+                    return bundle
+                body, data_sources = await client.hmget(self._key(code), 'body', 'data_sources')
+                if body is not None:
+                    bundle = PageBundle(code, int(version), etag.decode(), body, json.loads(data_sources))
+                    self._remember(bundle)
+                    return bundle
+        except RedisError as e:
+            logger.warning(f"读取页面渲染包缓存失败: {str(e)}")
+            return await self._load(db, code)
+
+        return await self._load_and_store(db, code)
+
+    async def _load(self, db: AsyncSession, code: str) -> Optional[PageBundle]:
+        result = await db.execute(select(PageMeta).where(
+            PageMeta.code == code,
+            PageMeta.status == 'published',
+            PageMeta.is_deleted == False,
+        ))
+        page = result.scalar_one_or_none()
+        return self.build(page) if page else None
+
+    async def _load_and_store(self, db: AsyncSession, code: str) -> Optional[PageBundle]:
+        """从数据库构建并写入缓存，构建期间缓存被失效时不写入"""
+        bundle = None
+        try:
+            client = await RedisClient.get_binary_client()
+            async with client.pipeline(transaction=True) as pipe:
+                await pipe.watch(self._gen_key(code))
+                bundle = await self._load(db, code)
+                if bundle is None:
+                    return None
+                pipe.multi()
+                pipe.hset(self._key(code), mapping={
+                    'version': bundle.version,
+                    'etag': bundle.etag,
+                    'body': bundle.body,
+                    'data_sources': json.dumps(bundle.data_sources),
+                })
+                pipe.expire(self._key(code), self.TTL)
+                await pipe.execute()
+        except WatchError:
+            logger.debug(f"页面 {code} 渲染包构建期间已失效，不写入缓存")
+        except RedisError as e:
+            logger.warning(f"写入页面渲染包缓存失败: {str(e)}")
+            if bundle is None:
+                bundle = await self._load(db, code)
+                if bundle is None:
+                    return None
+        self._remember(bundle)
+        return bundle
+
+    async def invalidate(self, code: str):
+        """页面发布、取消发布、修改、删除后使渲染包失效"""
+        for key in [key for key in self._local if key[0] == code]:
+            del self._local[key]
+        try:
+            client = await RedisClient.get_binary_client()
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.delete(self._key(code))
+                pipe.incr(self._gen_key(code))
+                pipe.expire(self._gen_key(code), self.TTL)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"清除页面渲染包缓存失败: {str(e)}")
+
+
+# 全局页面渲染包缓存
+page_bundle_cache = PageBundleCache()
@@ -9,6 +9,7 @@ from typing import Any, Dict, List
 from sqlalchemy import select, update, func, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.page_manager.bundle import page_bundle_cache
 from core.page_manager.model import PageMeta
 
 logger = logging.getLogger(__name__)
@@ -162,6 +163,7 @@ class PageService:
 
         await db.commit()
         await db.refresh(page)
+        await page_bundle_cache.invalidate(page.code)
 
         logger.info(f"页面更新成功: {page.code}")
         return page
@@ -175,6 +177,7 @@ class PageService:
 
         page.is_deleted = True
         await db.commit()
+        await page_bundle_cache.invalidate(page.code)
 
         logger.info(f"页面删除成功: {page.code}")
         return True
@@ -182,12 +185,20 @@ class PageService:
     @staticmethod
     async def batch_delete(db: AsyncSession, page_ids: List[str]) -> int:
         """批量删除页面"""
+        codes_result = await db.execute(select(PageMeta.code).where(
+            PageMeta.id.in_(page_ids),
+            PageMeta.is_deleted == False
+        ))
+        codes = list(codes_result.scalars().all())
+
         stmt = update(PageMeta).where(
             PageMeta.id.in_(page_ids),
             PageMeta.is_deleted == False
         ).values(is_deleted=True)
         result = await db.execute(stmt)
         await db.commit()
+        for code in codes:
+            await page_bundle_cache.invalidate(code)
 
         count = result.rowcount
         logger.info(f"批量删除页面成功: {count} 个")
@@ -252,6 +263,7 @@ class PageService:
 
         await db.commit()
         await db.refresh(page)
+        await page_bundle_cache.invalidate(page.code)
 
         logger.info(f"页面发布成功: {page.code}, version={page.version}")
         return page
@@ -279,6 +291,7 @@ class PageService:
 
         await db.commit()
         await db.refresh(page)
+        await page_bundle_cache.invalidate(page.code)
 
         logger.info(f"页面取消发布: {page.code}")
         return page
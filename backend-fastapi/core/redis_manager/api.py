@@ -11,11 +11,15 @@
 Redis管理API（异步版本）
 """
 import logging
+from typing import List, Optional
+from urllib.parse import quote
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 
 from core.redis_manager.schema import (
     RedisKeyDetailSchema,
+    RedisKeyMembersResponse,
     RedisKeyCreateSchema,
     RedisKeyUpdateSchema,
     RedisKeySearchSchema,
@@ -25,8 +29,12 @@ from core.redis_manager.schema import (
     RedisKeyExpireSchema,
     RedisBatchDeleteSchema,
     RedisFlushDBSchema,
-    RedisOperationResponse
+    RedisOperationResponse,
+    RedisAnalyzeSchema,
+    RedisBulkDeleteSchema,
+    RedisJobSchema
 )
+from core.redis_manager.jobs import RedisAnalyzeJob, RedisBulkDeleteJob, job_manager
 from core.redis_manager.service import AsyncRedisManagerService
 
 logger = logging.getLogger(__name__)
@@ -55,11 +63,12 @@ async def search_redis_keys(db_index: int, search: RedisKeySearchSchema):
     """搜索Redis键"""
     try:
         service = AsyncRedisManagerService(db_index=db_index)
-        keys, total = await service.search_keys(
+        keys, total, next_cursor = await service.search_keys(
             pattern=search.pattern,
             key_type=search.key_type,
             page=search.page,
-            page_size=search.page_size
+            page_size=search.page_size,
+            cursor=search.cursor
         )
         await service.close()
 
@@ -67,13 +76,72 @@ async def search_redis_keys(db_index: int, search: RedisKeySearchSchema):
             'total': total,
             'keys': keys,
             'page': search.page,
-            'page_size': search.page_size
+            'page_size': search.page_size,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to search redis keys: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/{db_index}/key/members", response_model=RedisKeyMembersResponse, summary="分页获取Redis键元素")
+async def get_redis_key_members(
+        db_index: int,
+        key: str = Query(..., description="键名"),
+        cursor: Optional[str] = Query(None, description="分页游标，为空表示从头开始"),
+        count: int = Query(100, ge=1, le=AsyncRedisManagerService.MAX_DETAIL_ELEMENTS, description="每页数量"),
+        match: Optional[str] = Query(None, description="元素匹配模式，list类型不支持")
+):
+    """分页获取list/hash/set/zset键的元素"""
+    service = AsyncRedisManagerService(db_index=db_index)
+    try:
+        return await service.get_key_members(key, cursor=cursor, count=count, match=match)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to get redis key members: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        await service.close()
+
+
+@router.get("/{db_index}/key/export", summary="流式导出Redis键")
+async def export_redis_key(db_index: int, key: str = Query(..., description="键名")):
+    """以NDJSON格式流式导出单个键的值"""
+    service = AsyncRedisManagerService(db_index=db_index)
+    stream = service.iter_key_export(key)
+    try:
+        # 先取出元信息行，键不存在等错误在开始响应前返回
+        first_line = await stream.__anext__()
+    except ValueError as e:
+        await service.close()
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        await service.close()
+        logger.error(f"Failed to export redis key: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def generate():
+        try:
+            yield first_line
+            async for line in stream:
+                yield line
+        except Exception as e:
+            logger.error(f"Failed to export redis key {key}: {e}")
+        finally:
+            await stream.aclose()
+            await service.close()
+
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(key)}.ndjson"}
+    )
+
+
 @router.get("/{db_index}/keys/{key:path}", response_model=RedisKeyDetailSchema, summary="获取Redis键详情")
 async def get_redis_key_detail(db_index: int, key: str):
     """获取Redis键详情"""
@@ -243,3 +311,68 @@ async def flush_redis_database(db_index: int, data: RedisFlushDBSchema):
     except Exception as e:
         logger.error(f"Failed to flush redis database: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/{db_index}/analyze", response_model=RedisOperationResponse, summary="启动大Key/内存分析")
+async def start_redis_analyze(request: Request, db_index: int, data: RedisAnalyzeSchema):
+    """启动后台大Key/内存分析任务，进度通过WebSocket推送给发起人"""
+    try:
+        user_id = getattr(request.state, 'user_id', None)
+        job = await job_manager.submit(RedisAnalyzeJob(db_index, data.model_dump(), user_id=user_id))
+        return {
+            'success': True,
+            'message': f"Analyze job {job.job_id} started",
+            'data': {'job_id': job.job_id}
+        }
+    except ValueError as e:
+        return {
+            'success': False,
+            'message': str(e)
+        }
+
+
+@router.post("/{db_index}/keys/bulk-delete", response_model=RedisOperationResponse, summary="按模式批量删除Redis键")
+async def start_redis_bulk_delete(request: Request, db_index: int, data: RedisBulkDeleteSchema):
+    """启动后台按模式批量删除任务，进度通过WebSocket推送给发起人"""
+    try:
+        user_id = getattr(request.state, 'user_id', None)
+        job = await job_manager.submit(RedisBulkDeleteJob(db_index, data.model_dump(), user_id=user_id))
+        return {
+            'success': True,
+            'message': f"Bulk delete job {job.job_id} started" + (" (dry run)" if data.dry_run else ""),
+            'data': {'job_id': job.job_id}
+        }
+    except ValueError as e:
+        return {
+            'success': False,
+            'message': str(e)
+        }
+
+
+@router.get("/jobs", response_model=List[RedisJobSchema], summary="获取Redis后台任务列表")
+async def list_redis_jobs(job_type: Optional[str] = Query(None, description="任务类型")):
+    """获取Redis后台任务列表（不含结果）"""
+    return [{**job, 'result': None} for job in await job_manager.list(job_type)]
+
+
+@router.get("/jobs/{job_id}", response_model=RedisJobSchema, summary="获取Redis后台任务进度和结果")
+async def get_redis_job(job_id: str):
+    """获取Redis后台任务进度和结果"""
+    try:
+        return await job_manager.get(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=RedisOperationResponse, summary="取消Redis后台任务")
+async def cancel_redis_job(job_id: str):
+    """取消Redis后台任务"""
+    try:
+        success = await job_manager.cancel(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return {
+        'success': success,
+        'message': f"Job {job_id} cancelled" if success else f"Job {job_id} is not running"
+    }
@@ -0,0 +1,539 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author: 臧成龙
+@Contact: 939589097@qq.com
+@Time: 2025-12-31
+@File: jobs.py
+@Desc: Redis管理后台任务 - 大Key/内存分析、批量删除
+"""
+"""
+Redis管理后台任务
+基于SCAN的长耗时任务，按每秒操作数限速，避免影响线上流量
+"""
+import asyncio
+import heapq
+import json
+import logging
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from core.redis_manager.service import AsyncRedisManagerService
+from core.websocket.consumers.base import manager
+from utils.redis import RedisClient
+
+logger = logging.getLogger(__name__)
+
+JOB_KEY_PREFIX = f"{settings.CACHE_PREFIX}redis_manager:job:"
+JOB_INDEX_KEY = f"{settings.CACHE_PREFIX}redis_manager:jobs"
+
+# 任务状态保留时间（秒）
+JOB_STATE_TTL = 86400
+
+# 运行锁过期时间（秒），运行中推送进度时续期；worker异常退出后到期释放
+JOB_RUNNING_TTL = 300
+
+# 运行锁仍属于该任务时才删除
+_RELEASE_RUNNING_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RateLimiter:
+    """按每秒操作数限速"""
+
+    def __init__(self, max_ops_per_sec: int):
+        self.max_ops_per_sec = max_ops_per_sec
+        self.start_time = time.monotonic()
+        self.ops = 0
+
+    async def acquire(self, ops: int):
+        """
+        记录本次操作数，超出速率时等待
+
+        Args:
+            ops: 本次执行的Redis命令数
+        """
+        self.ops += ops
+        if self.max_ops_per_sec <= 0:
+            return
+        expected = self.ops / self.max_ops_per_sec
+        elapsed = time.monotonic() - self.start_time
+        if expected > elapsed:
+            await asyncio.sleep(expected - elapsed)
+
+
+class RedisJob(ABC):
+    """
+    Redis后台任务基类
+
+    任务状态和进度保存在应用Redis中，任意worker都能查询；
+    取消请求写入取消标记，由执行任务的worker在推送进度时检查
+    """
+
+    job_type = 'base'
+
+    # 通过WebSocket推送进度、保存状态的最小间隔（秒）
+    PROGRESS_INTERVAL = 1.0
+
+    def __init__(self, db_index: int, params: Dict[str, Any], user_id: Optional[str] = None):
+        self.job_id = uuid.uuid4().hex
+        self.db_index = db_index
+        self.params = params
+        self.user_id = user_id
+        self.status = 'pending'  # pending, running, completed, failed, cancelled
+        self.progress: Dict[str, Any] = {}
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_notify = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return self.status in ('pending', 'running')
+
+    @property
+    def running_key(self) -> str:
+        """同一数据库同类型任务的运行锁"""
+        return f"{JOB_KEY_PREFIX}running:{self.job_type}:{self.db_index}"
+
+    def start(self):
+        """在事件循环中启动任务"""
+        self._task = asyncio.create_task(self._run())
+
+    def cancel(self) -> bool:
+        """取消本进程内运行的任务"""
+        if not self.is_running or not self._task:
+            return False
+        self._task.cancel()
+        return True
+
+    async def _run(self):
+        service = AsyncRedisManagerService(db_index=self.db_index)
+        self.status = 'running'
+        self.started_at = datetime.now()
+        try:
+            await self.save()
+            self.result = await self.execute(service)
+            self.status = 'completed'
+        except asyncio.CancelledError:
+            self.status = 'cancelled'
+        except Exception as e:
+            logger.error(f"Redis job {self.job_type} {self.job_id} failed: {e}")
+            self.status = 'failed'
+            self.error = str(e)
+        finally:
+            self.finished_at = datetime.now()
+            await service.close()
+            await self.notify_progress(force=True)
+
+    async def save(self):
+        """保存任务状态到Redis，运行中同时续期运行锁"""
+        try:
+            client = await RedisClient.get_client()
+            pipe = client.pipeline(transaction=False)
+            pipe.set(f"{JOB_KEY_PREFIX}{self.job_id}", json.dumps(self.to_dict(), default=str), ex=JOB_STATE_TTL)
+            if self.is_running:
+                pipe.expire(self.running_key, JOB_RUNNING_TTL)
+            else:
+                pipe.eval(_RELEASE_RUNNING_SCRIPT, 1, self.running_key, self.job_id)
+                pipe.delete(f"{JOB_KEY_PREFIX}{self.job_id}:cancel")
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to save redis job {self.job_id}: {e}")
+
+    async def _cancel_requested(self) -> bool:
+        """其他worker是否请求取消本任务"""
+        try:
+            client = await RedisClient.get_client()
+            return bool(await client.exists(f"{JOB_KEY_PREFIX}{self.job_id}:cancel"))
+        except Exception as e:
+            logger.warning(f"Failed to check cancel flag of redis job {self.job_id}: {e}")
+            return False
+
+    async def notify_progress(self, force: bool = False):
+        """
+        保存任务状态，并通过WebSocket向发起人推送任务进度
+
+        Args:
+            force: 忽略推送间隔
+        """
+        now = time.monotonic()
+        if not force and now - self._last_notify < self.PROGRESS_INTERVAL:
+            return
+        self._last_notify = now
+
+        if self.is_running and await self._cancel_requested():
+            raise asyncio.CancelledError()
+        await self.save()
+
+        if not self.user_id:
+            return
+        await manager.send_to_user(str(self.user_id), {
+            'type': 'redis_job_progress',
+            'message': self.status,
+            'data': {
+                'job_id': self.job_id,
+                'job_type': self.job_type,
+                'db_index': self.db_index,
+                'status': self.status,
+                'progress': self.progress,
+                'error': self.error,
+            },
+            'timestamp': datetime.now().isoformat()
+        }, coalesce_key=f"redis_job:{self.job_id}")
+
+    @abstractmethod
+    async def execute(self, service: AsyncRedisManagerService) -> Dict[str, Any]:
+        """任务主体，由子类实现"""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.job_id,
+            'job_type': self.job_type,
+            'db_index': self.db_index,
+            'status': self.status,
+            'params': self.params,
+            'progress': self.progress,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class RedisAnalyzeJob(RedisJob):
+    """
+    大Key/内存分析任务
+
+    限速SCAN整个库，每批通过pipeline获取 TYPE/TTL/MEMORY USAGE/长度，
+    按前缀聚合内存占用，维护最大的N个键，并统计TTL分布。
+    SCAN可能重复返回同一个键：批内去重，最大的N个键中不会重复出现；
+    跨批次重复（期间发生rehash）的键在汇总中会多计，不为此保存全部已扫描的键
+    """
+
+    job_type = 'analyze'
+
+    # 每个SCAN批次消耗的命令数：SCAN本身 + 每个键的元信息命令
+    OPS_PER_KEY = 5
+
+    # 报告中最多返回的前缀数量
+    MAX_REPORT_PREFIXES = 500
+
+    # 无法按分隔符截取前缀的键归入该分组
+    NO_PREFIX = '(no prefix)'
+
+    # TTL分布区间：(名称, 上限秒数)
+    TTL_BUCKETS = [
+        ('<1h', 3600),
+        ('1h-1d', 86400),
+        ('1d-7d', 7 * 86400),
+        ('7d-30d', 30 * 86400),
+        ('>30d', None),
+    ]
+
+    def _get_prefix(self, key: str) -> str:
+        """按分隔符截取前N段作为前缀"""
+        delimiter = self.params['delimiter']
+        depth = self.params['prefix_depth']
+        parts = key.split(delimiter, depth)
+        if len(parts) <= depth:
+            return self.NO_PREFIX
+        return delimiter.join(parts[:depth]) + delimiter + '*'
+
+    def _get_ttl_bucket(self, ttl: int) -> str:
+        if ttl < 0:
+            return 'persistent'
+        for name, limit in self.TTL_BUCKETS:
+            if limit is None or ttl < limit:
+                return name
+        return self.TTL_BUCKETS[-1][0]
+
+    async def execute(self, service: AsyncRedisManagerService) -> Dict[str, Any]:
+        top_n = self.params['top_n']
+        limiter = RateLimiter(self.params['max_ops_per_sec'])
+        match = self.params['pattern'].encode()
+
+        prefixes: Dict[str, Dict[str, Any]] = {}
+        ttl_distribution = {'persistent': {'count': 0, 'memory': 0}}
+        for name, _ in self.TTL_BUCKETS:
+            ttl_distribution[name] = {'count': 0, 'memory': 0}
+        type_stats: Dict[str, Dict[str, int]] = {}
+        biggest: List[tuple] = []  # 小顶堆 (memory, key)
+        biggest_info: Dict[str, Dict[str, Any]] = {}
+
+        self.progress = {
+            'scanned': 0,
+            'total_keys': await service.client.dbsize(),
+            'total_memory': 0,
+            'percent': 0,
+        }
+
+        cursor = 0
+        while True:
+            cursor, keys = await service.client.scan(
+                cursor,
+                match=match,
+                count=self.params['scan_count']
+            )
+            keys = list(dict.fromkeys(keys))
+            await limiter.acquire(1 + len(keys) * self.OPS_PER_KEY)
+
+            for info in await service.get_keys_info(keys):
+                memory = info['memory_usage'] or 0
+                key_type = info['type']
+
+                prefix = prefixes.setdefault(
+                    self._get_prefix(info['key']),
+                    {'count': 0, 'memory': 0, 'types': {}}
+                )
+                prefix['count'] += 1
+                prefix['memory'] += memory
+                prefix['types'][key_type] = prefix['types'].get(key_type, 0) + 1
+
+                stats = type_stats.setdefault(key_type, {'count': 0, 'memory': 0})
+                stats['count'] += 1
+                stats['memory'] += memory
+
+                bucket = ttl_distribution[self._get_ttl_bucket(info['ttl'])]
+                bucket['count'] += 1
+                bucket['memory'] += memory
+
+                key = info['key']
+                if key not in biggest_info:
+                    if len(biggest) < top_n:
+                        heapq.heappush(biggest, (memory, key))
+                        biggest_info[key] = info
+                    elif memory > biggest[0][0]:
+                        _, removed = heapq.heapreplace(biggest, (memory, key))
+                        del biggest_info[removed]
+                        biggest_info[key] = info
+
+                self.progress['total_memory'] += memory
+
+            self.progress['scanned'] += len(keys)
+            total_keys = self.progress['total_keys']
+            if total_keys:
+                self.progress['percent'] = min(99, self.progress['scanned'] * 100 // total_keys)
+
+            if cursor == 0:
+                break
+            await self.notify_progress()
+
+        self.progress['percent'] = 100
+
+        prefix_list = [
+            {'prefix': name, **stats}
+            for name, stats in prefixes.items()
+        ]
+        prefix_list.sort(key=lambda x: x['memory'], reverse=True)
+
+        return {
+            'scanned_keys': self.progress['scanned'],
+            'total_memory': self.progress['total_memory'],
+            'prefix_count': len(prefix_list),
+            'prefixes': prefix_list[:self.MAX_REPORT_PREFIXES],
+            'biggest_keys': [biggest_info[key] for _, key in sorted(biggest, reverse=True)],
+            'types': type_stats,
+            'ttl_distribution': ttl_distribution,
+        }
+
+
+class RedisBulkDeleteJob(RedisJob):
+    """
+    按模式批量删除任务
+
+    限速SCAN匹配的键（类型过滤使用 SCAN ... TYPE），可按空闲时间过滤，
+    每批键拆分为多个 UNLINK 命令通过pipeline发送，由Redis后台线程释放内存。
+    dry_run 时只统计匹配数量，不删除。
+    """
+
+    job_type = 'bulk_delete'
+
+    async def execute(self, service: AsyncRedisManagerService) -> Dict[str, Any]:
+        limiter = RateLimiter(self.params['max_ops_per_sec'])
+        match = self.params['pattern'].encode()
+        min_idle = self.params.get('min_idle_seconds')
+        chunk_size = self.params['chunk_size']
+        dry_run = self.params['dry_run']
+
+        self.progress = {
+            'scanned': 0,
+            'matched': 0,
+            'deleted': 0,
+            'total_keys': await service.client.dbsize(),
+            'percent': 0,
+        }
+
+        cursor = 0
+        while True:
+            cursor, keys = await service.client.scan(
+                cursor,
+                match=match,
+                count=self.params['scan_count'],
+                _type=self.params.get('key_type') or None
+            )
+            ops = 1
+            scanned = len(keys)
+
+            # 按空闲时间过滤
+            if keys and min_idle:
+                pipe = service.client.pipeline(transaction=False)
+                for key in keys:
+                    pipe.object('idletime', key)
+                idle_times = await pipe.execute(raise_on_error=False)
+                ops += len(keys)
+                keys = [
+                    key for key, idle in zip(keys, idle_times)
+                    if isinstance(idle, int) and idle >= min_idle
+                ]
+
+            self.progress['matched'] += len(keys)
+
+            if keys and not dry_run:
+                pipe = service.client.pipeline(transaction=False)
+                for i in range(0, len(keys), chunk_size):
+                    pipe.unlink(*keys[i:i + chunk_size])
+                    ops += 1
+                results = await pipe.execute(raise_on_error=False)
+                self.progress['deleted'] += sum(r for r in results if isinstance(r, int))
+
+            await limiter.acquire(ops)
+
+            self.progress['scanned'] += scanned
+            total_keys = self.progress['total_keys']
+            if total_keys:
+                self.progress['percent'] = min(99, self.progress['scanned'] * 100 // total_keys)
+
+            if cursor == 0:
+                break
+            await self.notify_progress()
+
+        self.progress['percent'] = 100
+        return {
+            'dry_run': dry_run,
+            'scanned_keys': self.progress['scanned'],
+            'matched_keys': self.progress['matched'],
+            'deleted_keys': self.progress['deleted'],
+        }
+
+
+class RedisJobManager:
+    """
+    Redis后台任务管理
+
+    任务在提交的worker中执行，状态保存在Redis中，
+    查询、列表和取消在任意worker上都可用
+    """
+
+    # 最多保留的任务记录数
+    MAX_JOBS = 50
+
+    def __init__(self):
+        # 本进程内运行中的任务
+        self.jobs: Dict[str, RedisJob] = {}
+
+    async def submit(self, job: RedisJob) -> RedisJob:
+        """
+        提交并启动任务，同一数据库同类型任务只能同时运行一个（跨worker）
+
+        Args:
+            job: 任务
+
+        Returns:
+            任务
+        """
+        client = await RedisClient.get_client()
+        if not await client.set(job.running_key, job.job_id, nx=True, ex=JOB_RUNNING_TTL):
+            running = await client.get(job.running_key)
+            raise ValueError(f"A {job.job_type} job is already running on db{job.db_index}: {running}")
+
+        pipe = client.pipeline(transaction=False)
+        pipe.set(f"{JOB_KEY_PREFIX}{job.job_id}", json.dumps(job.to_dict(), default=str), ex=JOB_STATE_TTL)
+        pipe.zadd(JOB_INDEX_KEY, {job.job_id: job.created_at.timestamp()})
+        # 只保留最近的任务记录，状态键按过期时间自动清理
+        pipe.zremrangebyrank(JOB_INDEX_KEY, 0, -self.MAX_JOBS - 1)
+        await pipe.execute()
+
+        self.jobs[job.job_id] = job
+        job.start()
+        job._task.add_done_callback(lambda _: self.jobs.pop(job.job_id, None))
+        return job
+
+    @staticmethod
+    async def _load(client, job_id: str, data: Optional[str]) -> Optional[Dict[str, Any]]:
+        """解析保存的任务状态，运行锁已不属于该任务时视为执行的worker已退出"""
+        if not data:
+            return None
+        state = json.loads(data)
+        if state['status'] in ('pending', 'running'):
+            running_key = f"{JOB_KEY_PREFIX}running:{state['job_type']}:{state['db_index']}"
+            if await client.get(running_key) != job_id:
+                state['status'] = 'failed'
+                state['error'] = 'Worker exited before the job finished'
+        return state
+
+    async def get(self, job_id: str) -> Dict[str, Any]:
+        """获取任务状态，本进程内运行的任务直接返回内存中的最新进度"""
+        job = self.jobs.get(job_id)
+        if job:
+            return job.to_dict()
+        client = await RedisClient.get_client()
+        state = await self._load(client, job_id, await client.get(f"{JOB_KEY_PREFIX}{job_id}"))
+        if not state:
+            raise ValueError(f"Job '{job_id}' does not exist")
+        return state
+
+    async def list(self, job_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """按创建时间倒序获取任务列表"""
+        client = await RedisClient.get_client()
+        job_ids = await client.zrevrange(JOB_INDEX_KEY, 0, -1)
+        if not job_ids:
+            return []
+        values = await client.mget([f"{JOB_KEY_PREFIX}{job_id}" for job_id in job_ids])
+        jobs = []
+        for job_id, data in zip(job_ids, values):
+            if job_id in self.jobs:
+                job = self.jobs[job_id].to_dict()
+            else:
+                job = await self._load(client, job_id, data)
+            if job and (not job_type or job['job_type'] == job_type):
+                jobs.append(job)
+        return jobs
+
+    async def cancel(self, job_id: str) -> bool:
+        """
+        取消任务，任务在其他worker上运行时写入取消标记，由该worker在下次推送进度时取消
+
+        Returns:
+            任务是否处于运行中
+        """
+        job = self.jobs.get(job_id)
+        if job:
+            return job.cancel()
+        state = await self.get(job_id)
+        if state['status'] not in ('pending', 'running'):
+            return False
+        client = await RedisClient.get_client()
+        await client.set(f"{JOB_KEY_PREFIX}{job_id}:cancel", 1, ex=JOB_RUNNING_TTL)
+        return True
+
+    async def shutdown(self):
+        """取消本进程内运行中的任务并等待其保存最终状态"""
+        tasks = [job._task for job in list(self.jobs.values()) if job._task and job.cancel()]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+job_manager = RedisJobManager()
@@ -24,6 +24,7 @@ class RedisKeySchema(BaseModel):
     size: Optional[int] = None  # 键的大小（字节）
     length: Optional[int] = None  # 集合/列表的元素数量
     encoding: Optional[str] = None  # 编码方式
+    memory_usage: Optional[int] = None  # 占用内存（字节），MEMORY USAGE
 
 
 class RedisKeyDetailSchema(BaseModel):
@@ -33,10 +34,21 @@ class RedisKeyDetailSchema(BaseModel):
     ttl: int
     value: Any  # 根据类型不同，值的格式也不同
     size: Optional[int] = None
+    length: Optional[int] = None  # 集合/列表的元素数量
     encoding: Optional[str] = None
+    truncated: bool = False  # 值是否被截断，截断时需分页获取
     created_at: Optional[datetime] = None
 
 
+class RedisKeyMembersResponse(BaseModel):
+    """Redis键元素分页响应Schema"""
+    key: str
+    type: str
+    length: int  # 元素总数
+    items: List[Any]
+    next_cursor: Optional[str] = None  # 下一页游标，为空表示没有更多数据
+
+
 class RedisKeyCreateSchema(BaseModel):
     """创建Redis键Schema"""
     key: str = Field(..., description="键名")
@@ -82,14 +94,17 @@ class RedisKeySearchSchema(BaseModel):
     key_type: Optional[str] = Field(None, description="键类型过滤")
     page: int = Field(default=1, ge=1, description="页码")
     page_size: int = Field(default=20, ge=1, le=100, description="每页数量")
+    cursor: Optional[str] = Field(None, description="分页游标，取上一页返回的next_cursor，为空时按页码分页")
 
 
 class RedisKeyListResponse(BaseModel):
     """Redis键列表响应Schema"""
-    total: int
+    total: int  # 匹配模式或类型过滤时为估算值
     keys: List[RedisKeySchema]
     page: int
     page_size: int
+    next_cursor: Optional[str] = None  # 下一页游标
+    has_more: bool = False  # 是否还有更多数据
 
 
 class RedisDatabaseSchema(BaseModel):
@@ -129,6 +144,42 @@ class RedisFlushDBSchema(BaseModel):
     confirm: bool = Field(..., description="确认清空")
 
 
+class RedisAnalyzeSchema(BaseModel):
+    """大Key/内存分析Schema"""
+    pattern: str = Field(default="*", description="分析的键模式")
+    delimiter: str = Field(default=":", min_length=1, description="前缀分隔符")
+    prefix_depth: int = Field(default=1, ge=1, le=10, description="前缀层级")
+    top_n: int = Field(default=100, ge=1, le=1000, description="最大键数量")
+    scan_count: int = Field(default=500, ge=10, le=10000, description="每次SCAN的数量")
+    max_ops_per_sec: int = Field(default=5000, ge=0, description="每秒最大命令数，0表示不限速")
+
+
+class RedisBulkDeleteSchema(BaseModel):
+    """按模式批量删除Schema"""
+    pattern: str = Field(..., min_length=1, description="删除的键模式")
+    key_type: Optional[str] = Field(None, description="键类型过滤")
+    min_idle_seconds: Optional[int] = Field(None, ge=1, description="最小空闲时间（秒），OBJECT IDLETIME")
+    dry_run: bool = Field(default=True, description="仅统计匹配数量，不删除")
+    scan_count: int = Field(default=1000, ge=10, le=10000, description="每次SCAN的数量")
+    chunk_size: int = Field(default=100, ge=1, le=1000, description="每个UNLINK命令的键数量")
+    max_ops_per_sec: int = Field(default=5000, ge=0, description="每秒最大命令数，0表示不限速")
+
+
+class RedisJobSchema(BaseModel):
+    """Redis后台任务Schema"""
+    job_id: str
+    job_type: str  # analyze, bulk_delete
+    db_index: int
+    status: str  # pending, running, completed, failed, cancelled
+    params: Dict[str, Any]
+    progress: Dict[str, Any]
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
 class RedisOperationResponse(BaseModel):
     """操作响应Schema"""
     success: bool
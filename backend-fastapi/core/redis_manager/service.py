@@ -10,12 +10,18 @@
 """
 Redis管理服务（异步版本）
 """
+import codecs
+import json
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+import time
+import uuid
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
 
 import redis.asyncio as aioredis
 
 from app.config import settings
+from core.redis_monitor.redis_collector import AsyncRedisInfoCollector
+from utils.redis import RedisClient
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +29,43 @@ logger = logging.getLogger(__name__)
 class AsyncRedisManagerService:
     """异步Redis管理服务"""
 
+    # 数据库概览缓存时间（秒）
+    DATABASES_CACHE_TTL = 2
+
+    # 数据库概览缓存：(过期时间, (数据库列表, 总键数))
+    _databases_cache: Optional[Tuple[float, Tuple[List[Dict[str, Any]], int]]] = None
+
+    # 每次SCAN建议返回的键数量
+    SCAN_COUNT = 1000
+
+    # 分页时SCAN批次剩余键的缓存（应用Redis）及保留时间（秒）
+    SCAN_PENDING_PREFIX = f"{settings.CACHE_PREFIX}redis_manager:scan_pending:"
+    SCAN_PENDING_TTL = 600
+
+    # 各类型获取长度的命令，string类型取字节数
+    LENGTH_COMMANDS = {
+        'string': 'strlen',
+        'list': 'llen',
+        'set': 'scard',
+        'zset': 'zcard',
+        'hash': 'hlen',
+        'stream': 'xlen',
+    }
+
+    # 支持分页读取的类型及其长度命令
+    MEMBER_LENGTH_COMMANDS = {
+        'list': 'llen',
+        'set': 'scard',
+        'zset': 'zcard',
+        'hash': 'hlen',
+    }
+
+    # 详情/分页最多返回的元素数量
+    MAX_DETAIL_ELEMENTS = 1000
+
+    # 详情最多返回的字符串字节数，导出时按此大小分块
+    MAX_STRING_BYTES = 1024 * 1024
+
     def __init__(self, db_index: int = 0):
         """
         初始化Redis连接
@@ -61,180 +104,280 @@ class AsyncRedisManagerService:
                 return f"<binary data: {base64.b64encode(value).decode('ascii')}>"
         return str(value)
 
+    def _decode_chunk(self, decoder: codecs.IncrementalDecoder, chunk: bytes, final: bool) -> str:
+        """
+        分段解码字符串值：分段边界拆开的多字节字符保留在解码器中，与下一段一起解码
+
+        真正的二进制内容按 _safe_decode 的 <binary data> 形式输出本段（含上一段保留的字节）
+        """
+        buffered = decoder.getstate()[0]
+        try:
+            return decoder.decode(chunk, final)
+        except UnicodeDecodeError:
+            decoder.reset()
+            return self._safe_decode(buffered + chunk)
+
     async def get_all_databases(self) -> Tuple[List[Dict[str, Any]], int]:
         """
         获取所有Redis数据库信息
-        
+
+        复用全局Redis连接池执行一次 INFO keyspace，结果短暂缓存
+
         Returns:
             (数据库列表, 总键数)
         """
-        databases = []
-        total_keys = 0
+        cls = AsyncRedisManagerService
+        now = time.monotonic()
+        if cls._databases_cache and cls._databases_cache[0] > now:
+            databases, total_keys = cls._databases_cache[1]
+            return [dict(item) for item in databases], total_keys
+
+        collector = AsyncRedisInfoCollector(client=await RedisClient.get_client())
+        databases, total_keys = await collector.get_keyspace_overview()
+        cls._databases_cache = (now + self.DATABASES_CACHE_TTL, (databases, total_keys))
+        return [dict(item) for item in databases], total_keys
+
+    @staticmethod
+    def _encode_cursor(scan_cursor: int, token: Optional[str] = None, offset: int = 0) -> str:
+        """
+        编码分页游标
 
-        # Redis默认有16个数据库（0-15）
-        for db_idx in range(16):
-            try:
-                temp_client = aioredis.Redis(
-                    host=self.host,
-                    port=self.port,
-                    db=db_idx,
-                    password=self.password,
-                    decode_responses=True
-                )
+        游标格式为 "{SCAN游标}"，或 "{SCAN游标}:{剩余键缓存}:{缓存内偏移}"。
+        同一个SCAN游标再次扫描不保证返回相同的批次（期间发生rehash时批次会变化），
+        因此页在批次中间结束时，批次剩余的键保存在应用Redis中，下一页先从缓存读取
+
+        Args:
+            scan_cursor: 剩余键读完后继续扫描的SCAN游标
+            token: 剩余键缓存标识
+            offset: 缓存内已返回的键数量
 
-                # 获取数据库信息
-                info = await temp_client.info('keyspace')
-                db_key = f'db{db_idx}'
+        Returns:
+            游标字符串
+        """
+        if token is None:
+            return str(scan_cursor)
+        return f"{scan_cursor}:{token}:{offset}"
 
-                if db_key in info:
-                    db_info = info[db_key]
-                    keys_count = db_info.get('keys', 0)
-                    expires_count = db_info.get('expires', 0)
-                    avg_ttl = db_info.get('avg_ttl', 0)
-                else:
-                    keys_count = 0
-                    expires_count = 0
-                    avg_ttl = 0
-
-                databases.append({
-                    'db_index': db_idx,
-                    'keys_count': keys_count,
-                    'expires_count': expires_count,
-                    'avg_ttl': avg_ttl
-                })
-
-                total_keys += keys_count
-                await temp_client.aclose()
-
-            except Exception as e:
-                logger.error(f"Failed to get info for db{db_idx}: {e}")
-                databases.append({
-                    'db_index': db_idx,
-                    'keys_count': 0,
-                    'expires_count': 0,
-                    'avg_ttl': 0
-                })
-
-        return databases, total_keys
+    @staticmethod
+    def _decode_cursor(cursor: Optional[str]) -> Tuple[int, Optional[str], int]:
+        """
+        解码分页游标
+
+        Args:
+            cursor: 游标字符串
+
+        Returns:
+            (SCAN游标, 剩余键缓存标识, 缓存内偏移)
+        """
+        if not cursor:
+            return 0, None, 0
+        parts = cursor.split(':')
+        if len(parts) not in (1, 3):
+            raise ValueError(f"Invalid cursor: {cursor}")
+        try:
+            scan_cursor = int(parts[0])
+            token, offset = (parts[1], int(parts[2])) if len(parts) == 3 else (None, 0)
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        if scan_cursor < 0 or offset < 0 or (token is not None and not token.isalnum()):
+            raise ValueError(f"Invalid cursor: {cursor}")
+        return scan_cursor, token, offset
+
+    async def _save_pending_keys(self, keys: List[bytes]) -> str:
+        """保存SCAN批次中未返回的键，返回缓存标识"""
+        token = uuid.uuid4().hex
+        client = await RedisClient.get_binary_client()
+        pipe = client.pipeline(transaction=False)
+        pipe.rpush(f"{self.SCAN_PENDING_PREFIX}{token}", *keys)
+        pipe.expire(f"{self.SCAN_PENDING_PREFIX}{token}", self.SCAN_PENDING_TTL)
+        await pipe.execute()
+        return token
+
+    async def _load_pending_keys(self, token: str, offset: int, count: int) -> Tuple[List[bytes], int]:
+        """
+        读取缓存的剩余键
+
+        Returns:
+            (键列表, 缓存的键总数)
+        """
+        client = await RedisClient.get_binary_client()
+        pipe = client.pipeline(transaction=False)
+        pipe.lrange(f"{self.SCAN_PENDING_PREFIX}{token}", offset, offset + count - 1)
+        pipe.llen(f"{self.SCAN_PENDING_PREFIX}{token}")
+        keys, length = await pipe.execute()
+        if not length:
+            raise ValueError("Cursor expired, please search again")
+        return keys, length
 
     async def search_keys(
             self,
             pattern: str = "*",
             key_type: Optional[str] = None,
             page: int = 1,
-            page_size: int = 20
-    ) -> Tuple[List[Dict[str, Any]], int]:
+            page_size: int = 20,
+            cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
         """
         搜索Redis键
-        
+
+        基于SCAN游标分页，凑满一页即停止扫描，不再遍历整个键空间；
+        类型过滤通过 SCAN ... TYPE 在服务端完成（需要Redis 6.0+）。
+        页在SCAN批次中间结束时，批次剩余的键缓存在应用Redis中，翻页不会遗漏或重复。
+        未传游标时兼容按页码分页，会逐批跳过前面页的键。
+
         Args:
             pattern: 搜索模式
             key_type: 键类型过滤
-            page: 页码
+            page: 页码（仅在未传游标时用于定位）
             page_size: 每页数量
-            
+            cursor: 上一页返回的游标
+
         Returns:
-            (键列表, 总数)
+            (键列表, 总数, 下一页游标)，匹配模式或类型过滤时总数为估算值，
+            下一页游标为None表示没有更多数据
         """
         try:
-            # 使用SCAN命令遍历所有键
-            all_keys = []
-            cursor = 0
-
-            while True:
-                cursor, keys = await self.client.scan(
-                    cursor,
-                    match=pattern.encode() if isinstance(pattern, str) else pattern,
-                    count=100
+            scan_cursor, token, offset = self._decode_cursor(cursor)
+            match = pattern.encode() if isinstance(pattern, str) else pattern
+            skip = 0 if cursor else (page - 1) * page_size
+            skipped = 0
+            page_keys: List[bytes] = []
+            next_cursor = None
+            scanning = True
+
+            # 先返回上一页所在批次的剩余键
+            if token is not None:
+                page_keys, length = await self._load_pending_keys(token, offset, page_size)
+                offset += len(page_keys)
+                if offset < length:
+                    next_cursor = self._encode_cursor(scan_cursor, token, offset)
+                    scanning = False
+                elif scan_cursor == 0:
+                    scanning = False
+                elif len(page_keys) >= page_size:
+                    next_cursor = self._encode_cursor(scan_cursor)
+                    scanning = False
+
+            while scanning and len(page_keys) < page_size:
+                new_cursor, batch = await self.client.scan(
+                    scan_cursor,
+                    match=match,
+                    count=self.SCAN_COUNT,
+                    _type=key_type or None
                 )
-                all_keys.extend([self._safe_decode(k) for k in keys])
-                if cursor == 0:
+
+                index = 0
+                # 跳过前面页的键（页码分页，同一次请求内的连续扫描）
+                if skipped < skip:
+                    step = min(skip - skipped, len(batch))
+                    skipped += step
+                    index += step
+
+                # 填充当前页
+                take = min(page_size - len(page_keys), len(batch) - index)
+                page_keys.extend(batch[index:index + take])
+                index += take
+
+                if len(page_keys) >= page_size:
+                    if index < len(batch):
+                        # 当前批次还有剩余，缓存后下一页从缓存继续
+                        next_cursor = self._encode_cursor(
+                            new_cursor, await self._save_pending_keys(batch[index:])
+                        )
+                    elif new_cursor != 0:
+                        next_cursor = self._encode_cursor(new_cursor)
+                    break
+
+                if new_cursor == 0:
                     break
+                scan_cursor = new_cursor
 
-            logger.info(f"Scanned {len(all_keys)} keys with pattern '{pattern}'")
-
-            # 按类型过滤
-            if key_type:
-                filtered_keys = []
-                for key in all_keys:
-                    ktype = await self.client.type(key)
-                    ktype_str = self._safe_decode(ktype)
-                    if ktype_str == key_type:
-                        filtered_keys.append(key)
-                logger.info(f"Filtered to {len(filtered_keys)} keys of type '{key_type}'")
-                all_keys = filtered_keys
-
-            total = len(all_keys)
-            logger.info(f"Total keys: {total}, returning page {page} with {page_size} items per page")
-
-            # 分页
-            start = (page - 1) * page_size
-            end = start + page_size
-            page_keys = all_keys[start:end]
-
-            # 获取键的详细信息
-            keys_info = []
-            for key in page_keys:
-                try:
-                    key_info = await self._get_key_info(key)
-                    keys_info.append(key_info)
-                except Exception as e:
-                    logger.error(f"Failed to get info for key {key}: {e}")
-                    keys_info.append({
-                        'key': key,
-                        'type': 'unknown',
-                        'ttl': -1,
-                        'size': None,
-                        'length': None,
-                        'encoding': None
-                    })
-
-            return keys_info, total
+            # 总数：无过滤时直接取DBSIZE，否则返回已知的下限
+            if pattern == '*' and not key_type:
+                total = await self.client.dbsize()
+            else:
+                before = (page - 1) * page_size if cursor else skipped
+                total = before + len(page_keys) + (1 if next_cursor else 0)
+
+            logger.info(
+                f"Scanned page {page} with pattern '{pattern}', type '{key_type}', "
+                f"got {len(page_keys)} keys, next cursor: {next_cursor}"
+            )
+
+            keys_info = await self.get_keys_info(page_keys)
+            return keys_info, total, next_cursor
 
         except Exception as e:
             logger.error(f"Failed to search keys: {e}")
             raise
 
-    async def _get_key_info(self, key: str) -> Dict[str, Any]:
-        """获取键的基本信息"""
-        key_bytes = key.encode() if isinstance(key, str) else key
-        key_type = self._safe_decode(await self.client.type(key_bytes))
-        ttl = await self.client.ttl(key_bytes)
+    @staticmethod
+    def _pipeline_value(value: Any) -> Any:
+        """pipeline结果中的异常视为空值"""
+        return None if isinstance(value, Exception) else value
 
-        info = {
-            'key': key,
-            'type': key_type,
-            'ttl': ttl,
-            'encoding': None
-        }
+    async def get_keys_info(self, keys: List[bytes]) -> List[Dict[str, Any]]:
+        """
+        批量获取键的基本信息
 
-        # 获取编码信息
-        try:
-            if await self.client.exists(key_bytes):
-                encoding = await self.client.object('encoding', key_bytes)
-                info['encoding'] = self._safe_decode(encoding) if encoding else None
-        except Exception:
-            pass
+        两次pipeline往返：第一次获取TYPE/TTL/OBJECT ENCODING/MEMORY USAGE，
+        第二次根据类型获取STRLEN或元素数量
 
-        # 获取大小和长度
-        if key_type == 'string':
-            value = await self.client.get(key_bytes)
-            info['size'] = len(value) if value else 0
-        elif key_type == 'list':
-            info['length'] = await self.client.llen(key_bytes)
-        elif key_type == 'set':
-            info['length'] = await self.client.scard(key_bytes)
-        elif key_type == 'zset':
-            info['length'] = await self.client.zcard(key_bytes)
-        elif key_type == 'hash':
-            info['length'] = await self.client.hlen(key_bytes)
+        Args:
+            keys: 键名列表（原始字节）
+
+        Returns:
+            键信息列表
+        """
+        if not keys:
+            return []
+
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.type(key)
+            pipe.ttl(key)
+            pipe.object('encoding', key)
+            pipe.memory_usage(key)
+        results = await pipe.execute(raise_on_error=False)
+
+        keys_info = []
+        for i, key in enumerate(keys):
+            key_type, ttl, encoding, memory = (self._pipeline_value(v) for v in results[i * 4:i * 4 + 4])
+            keys_info.append({
+                'key': self._safe_decode(key),
+                'type': self._safe_decode(key_type) if key_type else 'unknown',
+                'ttl': ttl if isinstance(ttl, int) else -1,
+                'size': None,
+                'length': None,
+                'encoding': self._safe_decode(encoding) if encoding else None,
+                'memory_usage': memory
+            })
+
+        pipe = self.client.pipeline(transaction=False)
+        targets = []
+        for key, info in zip(keys, keys_info):
+            command = self.LENGTH_COMMANDS.get(info['type'])
+            if command:
+                getattr(pipe, command)(key)
+                targets.append(info)
+        if targets:
+            results = await pipe.execute(raise_on_error=False)
+            for info, value in zip(targets, results):
+                value = self._pipeline_value(value)
+                if info['type'] == 'string':
+                    info['size'] = value
+                else:
+                    info['length'] = value
 
-        return info
+        return keys_info
 
     async def get_key_detail(self, key: str) -> Dict[str, Any]:
         """
         获取键的详细信息
-        
+
+        集合类型最多返回 MAX_DETAIL_ELEMENTS 个元素，字符串最多返回 MAX_STRING_BYTES 字节，
+        超出部分通过 get_key_members 分页获取或导出
+
         Args:
             key: 键名
             
@@ -253,7 +396,8 @@ class AsyncRedisManagerService:
             'key': key,
             'type': key_type,
             'ttl': ttl,
-            'encoding': None
+            'encoding': None,
+            'truncated': False
         }
 
         # 获取编码信息
@@ -265,28 +409,167 @@ class AsyncRedisManagerService:
 
         # 根据类型获取值
         if key_type == 'string':
-            value = await self.client.get(key_bytes)
-            detail['value'] = self._safe_decode(value)
-            detail['size'] = len(value) if value else 0
-        elif key_type == 'list':
-            values = await self.client.lrange(key_bytes, 0, -1)
-            detail['value'] = [self._safe_decode(v) for v in values]
-            detail['length'] = len(values)
-        elif key_type == 'set':
-            members = await self.client.smembers(key_bytes)
-            detail['value'] = [self._safe_decode(m) for m in members]
-            detail['length'] = len(members)
-        elif key_type == 'zset':
-            members = await self.client.zrange(key_bytes, 0, -1, withscores=True)
-            detail['value'] = [{'member': self._safe_decode(m), 'score': s} for m, s in members]
-            detail['length'] = len(members)
-        elif key_type == 'hash':
-            hash_data = await self.client.hgetall(key_bytes)
-            detail['value'] = {self._safe_decode(k): self._safe_decode(v) for k, v in hash_data.items()}
-            detail['length'] = len(hash_data)
+            size = await self.client.strlen(key_bytes)
+            if size > self.MAX_STRING_BYTES:
+                value = await self.client.getrange(key_bytes, 0, self.MAX_STRING_BYTES - 1)
+                detail['truncated'] = True
+                # 截断处可能拆开多字节字符，丢弃末尾不完整的字节
+                detail['value'] = self._decode_chunk(
+                    codecs.getincrementaldecoder('utf-8')(), value, final=False
+                )
+            else:
+                value = await self.client.get(key_bytes)
+                detail['value'] = self._safe_decode(value)
+            detail['size'] = size
+        elif key_type in ('list', 'set', 'zset', 'hash'):
+            members = await self.get_key_members(key, count=self.MAX_DETAIL_ELEMENTS)
+            items = members['items']
+            if key_type == 'list':
+                detail['value'] = [item['value'] for item in items]
+            elif key_type == 'hash':
+                detail['value'] = {item['field']: item['value'] for item in items}
+            else:
+                detail['value'] = items
+            detail['length'] = members['length']
+            detail['truncated'] = members['next_cursor'] is not None
 
         return detail
 
+    async def get_key_members(
+            self,
+            key: str,
+            cursor: Optional[str] = None,
+            count: int = 100,
+            match: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        分页获取集合类型键的元素
+
+        list 使用 LRANGE 窗口，游标即起始下标；hash/set/zset 使用 HSCAN/SSCAN/ZSCAN 游标。
+        SCAN 类命令的 count 只是建议值，小编码（listpack/intset）的键会一次返回全部元素。
+
+        Args:
+            key: 键名
+            cursor: 上一页返回的游标，为空表示从头开始
+            count: 每页元素数量，不超过 MAX_DETAIL_ELEMENTS
+            match: 元素匹配模式（list不支持）
+
+        Returns:
+            {key, type, length, items, next_cursor}，next_cursor为None表示没有更多数据
+        """
+        key_bytes = key.encode() if isinstance(key, str) else key
+        count = max(1, min(count, self.MAX_DETAIL_ELEMENTS))
+        try:
+            position = int(cursor or 0)
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        if position < 0:
+            raise ValueError(f"Invalid cursor: {cursor}")
+
+        key_type = self._safe_decode(await self.client.type(key_bytes))
+        if key_type == 'none':
+            raise ValueError(f"Key '{key}' does not exist")
+        if key_type not in self.MEMBER_LENGTH_COMMANDS:
+            raise ValueError(f"Unsupported type for paging: {key_type}")
+        if match and key_type == 'list':
+            raise ValueError("List type does not support match")
+
+        length = await getattr(self.client, self.MEMBER_LENGTH_COMMANDS[key_type])(key_bytes)
+        match_bytes = match.encode() if match else None
+
+        if key_type == 'list':
+            values = await self.client.lrange(key_bytes, position, position + count - 1)
+            items = [{'index': position + i, 'value': self._safe_decode(v)} for i, v in enumerate(values)]
+            next_position = position + len(values)
+            next_cursor = str(next_position) if values and next_position < length else None
+        elif key_type == 'hash':
+            next_position, data = await self.client.hscan(key_bytes, position, match=match_bytes, count=count)
+            items = [{'field': self._safe_decode(k), 'value': self._safe_decode(v)} for k, v in data.items()]
+            next_cursor = str(next_position) if next_position else None
+        elif key_type == 'set':
+            next_position, data = await self.client.sscan(key_bytes, position, match=match_bytes, count=count)
+            items = [self._safe_decode(m) for m in data]
+            next_cursor = str(next_position) if next_position else None
+        else:
+            next_position, data = await self.client.zscan(key_bytes, position, match=match_bytes, count=count)
+            items = [{'member': self._safe_decode(m), 'score': s} for m, s in data]
+            next_cursor = str(next_position) if next_position else None
+
+        return {
+            'key': key,
+            'type': key_type,
+            'length': length,
+            'items': items,
+            'next_cursor': next_cursor
+        }
+
+    async def iter_key_export(self, key: str) -> AsyncIterator[str]:
+        """
+        以NDJSON格式流式导出单个键
+
+        第一行为键的元信息，之后每行一个元素（字符串按块输出），
+        逐批读取，不会一次性加载整个值
+
+        Args:
+            key: 键名
+
+        Yields:
+            NDJSON行
+        """
+        key_bytes = key.encode() if isinstance(key, str) else key
+        key_type = self._safe_decode(await self.client.type(key_bytes))
+        if key_type == 'none':
+            raise ValueError(f"Key '{key}' does not exist")
+        if key_type != 'string' and key_type not in self.MEMBER_LENGTH_COMMANDS:
+            raise ValueError(f"Unsupported type for export: {key_type}")
+
+        ttl = await self.client.ttl(key_bytes)
+        yield json.dumps({'key': key, 'type': key_type, 'ttl': ttl}, ensure_ascii=False) + '\n'
+
+        batch = self.MAX_DETAIL_ELEMENTS
+        if key_type == 'string':
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            read = 0
+            while True:
+                chunk = await self.client.getrange(key_bytes, read, read + self.MAX_STRING_BYTES - 1)
+                final = len(chunk) < self.MAX_STRING_BYTES
+                # offset 为本行内容的起始字节（包含上一段保留的不完整字符）
+                offset = read - len(decoder.getstate()[0])
+                value = self._decode_chunk(decoder, chunk, final)
+                read += len(chunk)
+                if value:
+                    yield json.dumps({'offset': offset, 'value': value}, ensure_ascii=False) + '\n'
+                if final:
+                    break
+        elif key_type == 'list':
+            index = 0
+            while True:
+                values = await self.client.lrange(key_bytes, index, index + batch - 1)
+                if not values:
+                    break
+                lines = [
+                    json.dumps({'index': index + i, 'value': self._safe_decode(v)}, ensure_ascii=False)
+                    for i, v in enumerate(values)
+                ]
+                yield '\n'.join(lines) + '\n'
+                index += len(values)
+        else:
+            scan = {'hash': self.client.hscan, 'set': self.client.sscan, 'zset': self.client.zscan}[key_type]
+            cursor = 0
+            while True:
+                cursor, data = await scan(key_bytes, cursor, count=batch)
+                if key_type == 'hash':
+                    rows = ({'field': self._safe_decode(k), 'value': self._safe_decode(v)} for k, v in data.items())
+                elif key_type == 'set':
+                    rows = ({'member': self._safe_decode(m)} for m in data)
+                else:
+                    rows = ({'member': self._safe_decode(m), 'score': s} for m, s in data)
+                lines = [json.dumps(row, ensure_ascii=False) for row in rows]
+                if lines:
+                    yield '\n'.join(lines) + '\n'
+                if cursor == 0:
+                    break
+
     async def create_key(self, key: str, key_type: str, value: Any, ttl: Optional[int] = None) -> bool:
         """
         创建Redis键
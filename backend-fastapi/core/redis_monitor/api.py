@@ -10,8 +10,12 @@
 """
 Redis监控API
 """
-from fastapi import APIRouter
+import time
+from typing import Optional
 
+from fastapi import APIRouter, HTTPException, Query
+
+from app.base_schema import MetricsHistorySchema
 from app.config import settings
 from core.redis_monitor.redis_collector import AsyncRedisInfoCollector
 from core.redis_monitor.schema import (
@@ -20,9 +24,17 @@ from core.redis_monitor.schema import (
     RedisConnectionTestSchema,
     RedisConfigSchema,
 )
+from utils.collector_registry import collector_registry
+from utils.metrics_history import metrics_history
 
 router = APIRouter(prefix="/redis_monitor", tags=["Redis监控"])
 
+# 项目Redis的连接标识
+PROJECT_REDIS_ID = 'project_redis'
+
+# 记录历史的指标
+HISTORY_METRICS = ['used_memory', 'memory_usage_percent', 'connected_clients', 'ops_per_sec', 'hit_rate']
+
 
 def get_redis_config():
     """获取项目Redis配置"""
@@ -38,35 +50,34 @@ def get_redis_config():
     return redis_host, redis_port, redis_password, redis_db
 
 
-@router.get("/overview", response_model=RedisMonitorOverviewSchema, summary="获取Redis监控概览")
-async def get_redis_monitor_overview():
-    """获取Redis监控概览信息"""
+async def get_project_collector() -> AsyncRedisInfoCollector:
+    """获取项目Redis的常驻采集器（由采集器注册表复用连接）"""
     redis_host, redis_port, redis_password, redis_db = get_redis_config()
-
-    collector = AsyncRedisInfoCollector(
-        host=redis_host,
-        port=redis_port,
-        password=redis_password,
-        db=redis_db
+    return await collector_registry.get(
+        f"redis:{PROJECT_REDIS_ID}:{redis_host}:{redis_port}/{redis_db}",
+        lambda: AsyncRedisInfoCollector(
+            host=redis_host,
+            port=redis_port,
+            password=redis_password,
+            db=redis_db,
+            persistent=True
+        )
     )
 
-    data = await collector.get_all_info('project_redis', '项目Redis')
+
+@router.get("/overview", response_model=RedisMonitorOverviewSchema, summary="获取Redis监控概览")
+async def get_redis_monitor_overview():
+    """获取Redis监控概览信息"""
+    collector = await get_project_collector()
+    data = await collector.get_all_info(PROJECT_REDIS_ID, '项目Redis')
     return RedisMonitorOverviewSchema(**data)
 
 
 @router.get("/realtime", response_model=RedisRealtimeStatsSchema, summary="获取Redis实时统计")
 async def get_redis_realtime_stats():
     """获取Redis实时统计信息"""
-    redis_host, redis_port, redis_password, redis_db = get_redis_config()
-
-    collector = AsyncRedisInfoCollector(
-        host=redis_host,
-        port=redis_port,
-        password=redis_password,
-        db=redis_db
-    )
-
-    data = await collector.get_realtime_stats('project_redis')
+    collector = await get_project_collector()
+    data = await collector.get_realtime_stats(PROJECT_REDIS_ID)
     return RedisRealtimeStatsSchema(**data)
 
 
@@ -98,3 +109,34 @@ def get_redis_config_info():
         has_password=bool(redis_password),
         redis_url=settings.REDIS_URL or ''
     )
+
+
+def get_history_store():
+    """获取项目Redis的指标历史存储"""
+    return metrics_history.get_store(
+        f"redis:{PROJECT_REDIS_ID}", HISTORY_METRICS, settings.MONITOR_HISTORY_INTERVAL
+    )
+
+
+async def record_redis_history():
+    """采集项目Redis实时统计并写入指标历史（采集失败时不写入，避免记录为0）"""
+    collector = await get_project_collector()
+    stats = await collector.get_realtime_stats(PROJECT_REDIS_ID)
+    if stats.get('error'):
+        raise RuntimeError(stats['error'])
+    get_history_store().record(stats)
+
+
+@router.get("/history", response_model=MetricsHistorySchema, summary="获取Redis监控历史")
+async def get_redis_history(
+        minutes: int = Query(60, ge=1, le=7 * 24 * 60, description="查询最近多少分钟"),
+        start: Optional[float] = Query(None, description="开始时间戳，优先于minutes"),
+        end: Optional[float] = Query(None, description="结束时间戳"),
+        metrics: Optional[str] = Query(None, description="指标名称，多个用逗号分隔")
+):
+    """获取Redis监控历史，1小时内为原始采样，24小时内为1分钟均值，更长为5分钟均值"""
+    store = metrics_history.get(f"redis:{PROJECT_REDIS_ID}")
+    if store is None:
+        raise HTTPException(status_code=404, detail="Redis监控历史未启用")
+    start = start or time.time() - minutes * 60
+    return store.query(start, end, metrics.split(',') if metrics else None)
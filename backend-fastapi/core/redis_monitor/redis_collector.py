@@ -13,7 +13,7 @@ Redis信息收集器（异步版本）
 import logging
 import time
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 
 import redis.asyncio as aioredis
 
@@ -40,16 +40,33 @@ def serialize_redis_data(data: Any) -> Any:
 class AsyncRedisInfoCollector:
     """异步Redis信息收集器"""
 
+    # CONFIG GET databases 不可用时（如云Redis禁用CONFIG）的默认数据库数量
+    DEFAULT_DATABASES = 16
+
+    # 常驻模式下连接池空闲连接的健康检查间隔（秒）
+    HEALTH_CHECK_INTERVAL = 30
+
     def __init__(self, host: str = 'localhost', port: int = 6379,
-                 password: Optional[str] = None, db: int = 0):
+                 password: Optional[str] = None, db: int = 0,
+                 client: Optional[aioredis.Redis] = None,
+                 persistent: bool = False):
+        """
+        Args:
+            client: 共享的Redis客户端（需 decode_responses=True），传入时复用其连接池，不会被disconnect关闭
+            persistent: 常驻模式，客户端在多次采集间复用，disconnect不关闭连接，需调用close释放
+        """
         self.host = host
         self.port = port
         self.password = password
         self.db = db
-        self.client = None
+        self.client = client
+        self.persistent = persistent
+        self._shared = client is not None
 
     async def connect(self) -> bool:
         """连接Redis"""
+        if self._shared or (self.persistent and self.client):
+            return True
         try:
             self.client = aioredis.Redis(
                 host=self.host,
@@ -58,16 +75,38 @@ class AsyncRedisInfoCollector:
                 db=self.db,
                 decode_responses=True,
                 socket_timeout=5,
-                socket_connect_timeout=5
+                socket_connect_timeout=5,
+                health_check_interval=self.HEALTH_CHECK_INTERVAL if self.persistent else 0
             )
             await self.client.ping()
             return True
         except Exception as e:
             logger.error(f"Failed to connect to Redis {self.host}:{self.port}: {e}")
+            await self.close()
+            return False
+
+    async def health_check(self) -> bool:
+        """检查连接是否可用，不可用时关闭客户端，下次采集时重连"""
+        try:
+            if not await self.connect():
+                return False
+            await self.client.ping()
+            return True
+        except Exception as e:
+            logger.warning(f"Redis health check failed {self.host}:{self.port}: {e}")
+            await self.close()
             return False
 
     async def disconnect(self):
-        """断开连接"""
+        """断开连接（常驻模式下保留连接）"""
+        if self.persistent:
+            return
+        await self.close()
+
+    async def close(self):
+        """关闭客户端（共享客户端不关闭）"""
+        if self._shared:
+            return
         if self.client:
             try:
                 await self.client.aclose()
@@ -114,23 +153,27 @@ class AsyncRedisInfoCollector:
 
         try:
             info = await self.client.info('server')
-            clients_info = await self.client.info('clients')
-            return {
-                'redis_version': info.get('redis_version', ''),
-                'redis_mode': info.get('redis_mode', 'standalone'),
-                'role': info.get('role', 'master'),
-                'os': info.get('os', ''),
-                'arch_bits': info.get('arch_bits', 64),
-                'uptime_in_seconds': info.get('uptime_in_seconds', 0),
-                'uptime_in_days': info.get('uptime_in_days', 0),
-                'tcp_port': info.get('tcp_port', self.port),
-                'connected_clients': clients_info.get('connected_clients', 0),
-                'blocked_clients': clients_info.get('blocked_clients', 0)
-            }
+            info.update(await self.client.info('clients'))
+            return self._parse_server_info(info)
         except Exception as e:
             logger.error(f"Error getting Redis server info: {e}")
             return {}
 
+    def _parse_server_info(self, info: Dict[str, Any]) -> Dict[str, Any]:
+        """从INFO结果中提取服务器信息（server、clients段）"""
+        return {
+            'redis_version': info.get('redis_version', ''),
+            'redis_mode': info.get('redis_mode', 'standalone'),
+            'role': info.get('role', 'master'),
+            'os': info.get('os', ''),
+            'arch_bits': info.get('arch_bits', 64),
+            'uptime_in_seconds': info.get('uptime_in_seconds', 0),
+            'uptime_in_days': info.get('uptime_in_days', 0),
+            'tcp_port': info.get('tcp_port', self.port),
+            'connected_clients': info.get('connected_clients', 0),
+            'blocked_clients': info.get('blocked_clients', 0)
+        }
+
     async def get_memory_info(self) -> Dict[str, Any]:
         """获取Redis内存信息"""
         if not self.client:
@@ -138,28 +181,32 @@ class AsyncRedisInfoCollector:
                 return {}
 
         try:
-            info = await self.client.info('memory')
-            return {
-                'used_memory': info.get('used_memory', 0),
-                'used_memory_human': info.get('used_memory_human', '0B'),
-                'used_memory_rss': info.get('used_memory_rss', 0),
-                'used_memory_peak': info.get('used_memory_peak', 0),
-                'used_memory_peak_human': info.get('used_memory_peak_human', '0B'),
-                'total_system_memory': info.get('total_system_memory', 0),
-                'total_system_memory_human': info.get('total_system_memory_human', '0B'),
-                'used_memory_dataset': info.get('used_memory_dataset', 0),
-                'used_memory_dataset_perc': info.get('used_memory_dataset_perc', '0%'),
-                'allocator_allocated': info.get('allocator_allocated', 0),
-                'allocator_active': info.get('allocator_active', 0),
-                'maxmemory': info.get('maxmemory', 0),
-                'maxmemory_human': info.get('maxmemory_human', '0B'),
-                'maxmemory_policy': info.get('maxmemory_policy', 'noeviction'),
-                'mem_fragmentation_ratio': info.get('mem_fragmentation_ratio', 1.0)
-            }
+            return self._parse_memory_info(await self.client.info('memory'))
         except Exception as e:
             logger.error(f"Error getting Redis memory info: {e}")
             return {}
 
+    @staticmethod
+    def _parse_memory_info(info: Dict[str, Any]) -> Dict[str, Any]:
+        """从INFO结果中提取内存信息（memory段）"""
+        return {
+            'used_memory': info.get('used_memory', 0),
+            'used_memory_human': info.get('used_memory_human', '0B'),
+            'used_memory_rss': info.get('used_memory_rss', 0),
+            'used_memory_peak': info.get('used_memory_peak', 0),
+            'used_memory_peak_human': info.get('used_memory_peak_human', '0B'),
+            'total_system_memory': info.get('total_system_memory', 0),
+            'total_system_memory_human': info.get('total_system_memory_human', '0B'),
+            'used_memory_dataset': info.get('used_memory_dataset', 0),
+            'used_memory_dataset_perc': info.get('used_memory_dataset_perc', '0%'),
+            'allocator_allocated': info.get('allocator_allocated', 0),
+            'allocator_active': info.get('allocator_active', 0),
+            'maxmemory': info.get('maxmemory', 0),
+            'maxmemory_human': info.get('maxmemory_human', '0B'),
+            'maxmemory_policy': info.get('maxmemory_policy', 'noeviction'),
+            'mem_fragmentation_ratio': info.get('mem_fragmentation_ratio', 1.0)
+        }
+
     async def get_stats_info(self) -> Dict[str, Any]:
         """获取Redis统计信息"""
         if not self.client:
@@ -167,32 +214,36 @@ class AsyncRedisInfoCollector:
                 return {}
 
         try:
-            info = await self.client.info('stats')
-            return {
-                'total_connections_received': info.get('total_connections_received', 0),
-                'total_commands_processed': info.get('total_commands_processed', 0),
-                'instantaneous_ops_per_sec': info.get('instantaneous_ops_per_sec', 0),
-                'total_net_input_bytes': info.get('total_net_input_bytes', 0),
-                'total_net_output_bytes': info.get('total_net_output_bytes', 0),
-                'instantaneous_input_kbps': info.get('instantaneous_input_kbps', 0.0),
-                'instantaneous_output_kbps': info.get('instantaneous_output_kbps', 0.0),
-                'rejected_connections': info.get('rejected_connections', 0),
-                'sync_full': info.get('sync_full', 0),
-                'sync_partial_ok': info.get('sync_partial_ok', 0),
-                'sync_partial_err': info.get('sync_partial_err', 0),
-                'expired_keys': info.get('expired_keys', 0),
-                'evicted_keys': info.get('evicted_keys', 0),
-                'keyspace_hits': info.get('keyspace_hits', 0),
-                'keyspace_misses': info.get('keyspace_misses', 0),
-                'pubsub_channels': info.get('pubsub_channels', 0),
-                'pubsub_patterns': info.get('pubsub_patterns', 0),
-                'latest_fork_usec': info.get('latest_fork_usec', 0),
-                'migrate_cached_sockets': info.get('migrate_cached_sockets', 0)
-            }
+            return self._parse_stats_info(await self.client.info('stats'))
         except Exception as e:
             logger.error(f"Error getting Redis stats info: {e}")
             return {}
 
+    @staticmethod
+    def _parse_stats_info(info: Dict[str, Any]) -> Dict[str, Any]:
+        """从INFO结果中提取统计信息（stats段）"""
+        return {
+            'total_connections_received': info.get('total_connections_received', 0),
+            'total_commands_processed': info.get('total_commands_processed', 0),
+            'instantaneous_ops_per_sec': info.get('instantaneous_ops_per_sec', 0),
+            'total_net_input_bytes': info.get('total_net_input_bytes', 0),
+            'total_net_output_bytes': info.get('total_net_output_bytes', 0),
+            'instantaneous_input_kbps': info.get('instantaneous_input_kbps', 0.0),
+            'instantaneous_output_kbps': info.get('instantaneous_output_kbps', 0.0),
+            'rejected_connections': info.get('rejected_connections', 0),
+            'sync_full': info.get('sync_full', 0),
+            'sync_partial_ok': info.get('sync_partial_ok', 0),
+            'sync_partial_err': info.get('sync_partial_err', 0),
+            'expired_keys': info.get('expired_keys', 0),
+            'evicted_keys': info.get('evicted_keys', 0),
+            'keyspace_hits': info.get('keyspace_hits', 0),
+            'keyspace_misses': info.get('keyspace_misses', 0),
+            'pubsub_channels': info.get('pubsub_channels', 0),
+            'pubsub_patterns': info.get('pubsub_patterns', 0),
+            'latest_fork_usec': info.get('latest_fork_usec', 0),
+            'migrate_cached_sockets': info.get('migrate_cached_sockets', 0)
+        }
+
     async def get_keyspace_info(self) -> List[Dict[str, Any]]:
         """获取Redis键空间信息"""
         if not self.client:
@@ -200,38 +251,81 @@ class AsyncRedisInfoCollector:
                 return []
 
         try:
-            info = await self.client.info('keyspace')
-            keyspaces = []
-
-            for key, value in info.items():
-                if key.startswith('db'):
-                    db_id = int(key[2:])
-                    if isinstance(value, dict):
-                        stats = value
-                    elif isinstance(value, str):
-                        stats = {}
-                        for stat in value.split(','):
-                            if '=' in stat:
-                                stat_key, stat_value = stat.split('=', 1)
-                                try:
-                                    stats[stat_key] = int(stat_value)
-                                except ValueError:
-                                    stats[stat_key] = stat_value
-                    else:
-                        continue
-
-                    keyspaces.append({
-                        'db_id': db_id,
-                        'keys': stats.get('keys', 0),
-                        'expires': stats.get('expires', 0),
-                        'avg_ttl': stats.get('avg_ttl', 0)
-                    })
-
-            return keyspaces
+            return self._parse_keyspace_info(await self.client.info('keyspace'))
         except Exception as e:
             logger.error(f"Error getting Redis keyspace info: {e}")
             return []
 
+    @staticmethod
+    def _parse_keyspace_info(info: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """从INFO结果中提取键空间信息（keyspace段）"""
+        keyspaces = []
+
+        for key, value in info.items():
+            if key.startswith('db') and key[2:].isdigit():
+                db_id = int(key[2:])
+                if isinstance(value, dict):
+                    stats = value
+                elif isinstance(value, str):
+                    stats = {}
+                    for stat in value.split(','):
+                        if '=' in stat:
+                            stat_key, stat_value = stat.split('=', 1)
+                            try:
+                                stats[stat_key] = int(stat_value)
+                            except ValueError:
+                                stats[stat_key] = stat_value
+                else:
+                    continue
+
+                keyspaces.append({
+                    'db_id': db_id,
+                    'keys': stats.get('keys', 0),
+                    'expires': stats.get('expires', 0),
+                    'avg_ttl': stats.get('avg_ttl', 0)
+                })
+
+        return keyspaces
+
+    async def get_database_count(self) -> int:
+        """获取数据库数量（CONFIG GET databases）"""
+        if not self.client:
+            if not await self.connect():
+                return self.DEFAULT_DATABASES
+
+        try:
+            config = await self.client.config_get('databases')
+            return int(config.get('databases', self.DEFAULT_DATABASES))
+        except Exception as e:
+            logger.warning(f"CONFIG GET databases unavailable, using default {self.DEFAULT_DATABASES}: {e}")
+            return self.DEFAULT_DATABASES
+
+    async def get_keyspace_overview(self) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        获取所有数据库的键空间概览
+
+        一次 INFO keyspace 即包含所有数据库，数据库范围取自 CONFIG GET databases
+
+        Returns:
+            (数据库列表, 总键数)
+        """
+        keyspace = {item['db_id']: item for item in await self.get_keyspace_info()}
+        database_count = max(await self.get_database_count(), max(keyspace, default=-1) + 1)
+
+        databases = []
+        total_keys = 0
+        for db_idx in range(database_count):
+            stats = keyspace.get(db_idx, {})
+            databases.append({
+                'db_index': db_idx,
+                'keys_count': stats.get('keys', 0),
+                'expires_count': stats.get('expires', 0),
+                'avg_ttl': stats.get('avg_ttl', 0)
+            })
+            total_keys += stats.get('keys', 0)
+
+        return databases, total_keys
+
     async def get_clients_info(self, limit: int = 100) -> List[Dict[str, Any]]:
         """获取Redis客户端信息"""
         if not self.client:
@@ -372,14 +466,16 @@ class AsyncRedisInfoCollector:
                     'timestamp': timestamp
                 }
 
+            # INFO 只执行一次，各段均从同一结果中解析
+            info = await self.client.info()
             data = {
                 'connection_id': connection_id,
                 'connection_name': connection_name,
                 'status': 'connected',
-                'info': await self.get_server_info(),
-                'memory': await self.get_memory_info(),
-                'stats': await self.get_stats_info(),
-                'keyspace': await self.get_keyspace_info(),
+                'info': self._parse_server_info(info),
+                'memory': self._parse_memory_info(info),
+                'stats': self._parse_stats_info(info),
+                'keyspace': self._parse_keyspace_info(info),
                 'clients': await self.get_clients_info(),
                 'slow_log': await self.get_slowlog(),
                 'timestamp': timestamp
@@ -403,7 +499,7 @@ class AsyncRedisInfoCollector:
             await self.disconnect()
 
     async def get_realtime_stats(self, connection_id: str) -> Dict[str, Any]:
-        """获取实时统计信息"""
+        """获取实时统计信息，每次采集只执行一次INFO"""
         timestamp = datetime.now().isoformat()
 
         try:
@@ -417,27 +513,27 @@ class AsyncRedisInfoCollector:
                     'hit_rate': 0.0,
                     'keyspace_hits': 0,
                     'keyspace_misses': 0,
+                    'error': '连接Redis失败',
                     'timestamp': timestamp
                 }
 
-            memory_info = await self.get_memory_info()
-            stats_info = await self.get_stats_info()
-            server_info = await self.get_server_info()
+            # 一次 INFO 同时包含 memory、stats、clients 段
+            info = await self.client.info()
 
-            used_memory = memory_info.get('used_memory', 0)
-            total_memory = memory_info.get('total_system_memory', 0)
+            used_memory = info.get('used_memory', 0)
+            total_memory = info.get('total_system_memory', 0)
             memory_usage_percent = (used_memory / total_memory * 100) if total_memory > 0 else 0.0
 
-            hits = stats_info.get('keyspace_hits', 0)
-            misses = stats_info.get('keyspace_misses', 0)
+            hits = info.get('keyspace_hits', 0)
+            misses = info.get('keyspace_misses', 0)
             hit_rate = (hits / (hits + misses) * 100) if (hits + misses) > 0 else 0.0
 
             data = {
                 'connection_id': connection_id,
                 'used_memory': used_memory,
                 'memory_usage_percent': round(memory_usage_percent, 2),
-                'connected_clients': server_info.get('connected_clients', 0),
-                'ops_per_sec': stats_info.get('instantaneous_ops_per_sec', 0),
+                'connected_clients': info.get('connected_clients', 0),
+                'ops_per_sec': info.get('instantaneous_ops_per_sec', 0),
                 'hit_rate': round(hit_rate, 2),
                 'keyspace_hits': hits,
                 'keyspace_misses': misses,
@@ -455,6 +551,7 @@ class AsyncRedisInfoCollector:
                 'hit_rate': 0.0,
                 'keyspace_hits': 0,
                 'keyspace_misses': 0,
+                'error': str(e),
                 'timestamp': timestamp
             }
         finally:
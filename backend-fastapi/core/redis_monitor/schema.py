@@ -135,6 +135,7 @@ class RedisRealtimeStatsSchema(BaseModel):
     hit_rate: float = Field(..., description="命中率")
     keyspace_hits: int = Field(..., description="键空间命中数")
     keyspace_misses: int = Field(..., description="键空间未命中数")
+    error: Optional[str] = Field(None, description="采集失败原因，失败时各指标为0")
     timestamp: str = Field(..., description="时间戳")
 
 
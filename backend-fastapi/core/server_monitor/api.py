@@ -11,9 +11,12 @@
 服务器监控API（异步版本）
 """
 import asyncio
+import time
 from typing import Dict, Any, List, Optional
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
+
+from app.base_schema import MetricsHistorySchema
 
 from core.server_monitor.server_info import ServerInfoCollector
 from core.server_monitor.schema import (
@@ -30,6 +33,7 @@ from core.server_monitor.schema import (
     BootTimeSchema,
     UserInfoSchema,
 )
+from utils.http_client import http_clients
 
 router = APIRouter(prefix="/server_monitor", tags=["服务器监控"])
 
@@ -270,3 +274,22 @@ async def get_battery_info():
             return None
     except Exception as e:
         return {"error": str(e)}
+
+
+@router.get("/history", response_model=MetricsHistorySchema, summary="获取服务器监控历史")
+async def get_server_history(
+        minutes: int = Query(60, ge=1, le=7 * 24 * 60, description="查询最近多少分钟"),
+        start: Optional[float] = Query(None, description="开始时间戳，优先于minutes"),
+        end: Optional[float] = Query(None, description="结束时间戳"),
+        metrics: Optional[str] = Query(None, description="指标名称，多个用逗号分隔")
+):
+    """获取服务器监控历史，1小时内为原始采样，24小时内为1分钟均值，更长为5分钟均值"""
+    start = start or time.time() - minutes * 60
+    metric_list = metrics.split(',') if metrics else None
+    return await asyncio.to_thread(server_collector.history.query, start, end, metric_list)
+
+
+@router.get("/http_clients", summary="获取外部HTTP请求统计")
+async def get_http_client_stats():
+    """获取共享HTTP客户端的连接池配置和按主机统计的请求数、错误数、重试数与延迟"""
+    return http_clients.get_stats()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author: 臧成龙
+@Contact: 939589097@qq.com
+@Time: 2025-12-31
+@File: process_sampler.py
+@Desc: 增量进程采样器 - 按PID保存CPU时间基线，堆维护CPU/内存Top N
+"""
+"""
+增量进程采样器
+- 每个PID保存上次采样的CPU时间，两次采样的差值除以间隔即为该区间的CPU使用率（100%为一个核）
+- 进程名、启动时间只在PID首次出现时读取，命令行只在进入Top N时读取一次
+- 遍历时用大小为N的小顶堆分别维护CPU、内存Top N，不构建完整进程列表
+- CPU时间比基线小说明PID已被新进程复用，重新读取静态信息
+"""
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+
+class ProcessSampler:
+    """增量进程采样器（线程安全）"""
+
+    # 命令行最大长度
+    MAX_CMDLINE_LENGTH = 256
+
+    def __init__(self, top_n: int = 20):
+        """
+        Args:
+            top_n: CPU、内存各保留的进程数
+        """
+        self.top_n = top_n
+        # pid -> {process, name, create_time, cmdline, cpu_time, sample_time, denied}
+        self._known: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._result: Optional[Dict[str, Any]] = None
+        self._result_time = 0.0
+
+    def get(self, max_age: float) -> Dict[str, Any]:
+        """
+        获取进程统计，结果超过 max_age 秒时重新采样
+
+        Args:
+            max_age: 结果最大有效期（秒）
+        """
+        with self._lock:
+            if self._result is None or time.monotonic() - self._result_time > max_age:
+                self._sample()
+            return self._result
+
+    def sample(self) -> Dict[str, Any]:
+        """立即采样并返回进程统计"""
+        with self._lock:
+            self._sample()
+            return self._result
+
+    def _new_entry(self, pid: int) -> Dict[str, Any]:
+        """PID首次出现（或被复用）时读取静态信息，无权限的进程也缓存，之后不再重复读取"""
+        process = psutil.Process(pid)
+        entry = {
+            'process': process,
+            'name': None,
+            'create_time': None,
+            'cmdline': None,
+            'cpu_time': None,
+            'sample_time': None,
+            'denied': False,
+        }
+        try:
+            with process.oneshot():
+                entry['name'] = process.name()
+                entry['create_time'] = process.create_time()
+        except psutil.AccessDenied:
+            entry['denied'] = True
+        return entry
+
+    def _push(self, heap: List[Tuple], item: Tuple):
+        if len(heap) < self.top_n:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    def _sample(self):
+        now = time.monotonic()
+        total_memory = psutil.virtual_memory().total or 1
+        total_processes = 0
+        running_processes = 0
+        sleeping_processes = 0
+        # 小顶堆：(cpu, pid, memory, status) / (memory, pid, cpu, status)
+        cpu_heap: List[Tuple] = []
+        memory_heap: List[Tuple] = []
+        alive = set()
+
+        for pid in psutil.pids():
+            entry = self._known.get(pid)
+            try:
+                if entry is None or not entry['process'].is_running():
+                    # 首次出现，或PID被复用（is_running 比较进程创建时间）：重新读取静态信息，本次作为新基线
+                    entry = self._new_entry(pid)
+                    self._known[pid] = entry
+                alive.add(pid)
+                total_processes += 1
+                if entry['denied']:
+                    continue
+
+                process = entry['process']
+                with process.oneshot():
+                    cpu_times = process.cpu_times()
+                    status = process.status()
+                    rss = process.memory_info().rss
+            except psutil.NoSuchProcess:
+                self._known.pop(pid, None)
+                if pid in alive:
+                    alive.discard(pid)
+                    total_processes -= 1
+                continue
+            except psutil.AccessDenied:
+                if entry is not None:
+                    entry['denied'] = True
+                continue
+            except Exception as e:
+                logger.debug(f"Error sampling process {pid}: {e}")
+                continue
+
+            if status == psutil.STATUS_RUNNING:
+                running_processes += 1
+            elif status == psutil.STATUS_SLEEPING:
+                sleeping_processes += 1
+
+            cpu_time = cpu_times.user + cpu_times.system
+            cpu_percent = 0.0
+            if entry['cpu_time'] is not None and cpu_time >= entry['cpu_time']:
+                elapsed = now - entry['sample_time']
+                if elapsed > 0:
+                    cpu_percent = (cpu_time - entry['cpu_time']) / elapsed * 100
+            entry['cpu_time'] = cpu_time
+            entry['sample_time'] = now
+
+            memory_percent = rss / total_memory * 100
+            self._push(cpu_heap, (cpu_percent, pid, memory_percent, status))
+            self._push(memory_heap, (memory_percent, pid, cpu_percent, status))
+
+        # 清理已退出的进程
+        for pid in self._known.keys() - alive:
+            del self._known[pid]
+
+        self._result = {
+            'total_processes': total_processes,
+            'top_processes': [
+                self._build_row(pid, cpu, memory, status)
+                for cpu, pid, memory, status in sorted(cpu_heap, reverse=True)
+            ],
+            'top_memory_processes': [
+                self._build_row(pid, cpu, memory, status)
+                for memory, pid, cpu, status in sorted(memory_heap, reverse=True)
+            ],
+            'running_processes': running_processes,
+            'sleeping_processes': sleeping_processes,
+        }
+        self._result_time = now
+
+    def _build_row(self, pid: int, cpu_percent: float, memory_percent: float, status: str) -> Dict[str, Any]:
+        entry = self._known[pid]
+        if entry['cmdline'] is None:
+            try:
+                entry['cmdline'] = ' '.join(entry['process'].cmdline())[:self.MAX_CMDLINE_LENGTH]
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                entry['cmdline'] = ''
+        return {
+            'pid': pid,
+            'name': entry['name'] or 'Unknown',
+            'cpu_percent': round(cpu_percent, 2),
+            'memory_percent': round(memory_percent, 2),
+            'status': status or 'Unknown',
+            'create_time': datetime.fromtimestamp(entry['create_time']).isoformat(),
+            'cmdline': entry['cmdline'],
+        }
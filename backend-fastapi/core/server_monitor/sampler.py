@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author: 臧成龙
+@Contact: 939589097@qq.com
+@Time: 2025-12-31
+@File: sampler.py
+@Desc: 系统指标后台采样线程
+"""
+"""
+系统指标后台采样线程
+按固定间隔在独立线程中采样，结果保存在环形缓冲区中，读取最新样本为O(1)操作
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SystemSampler:
+    """系统指标后台采样线程"""
+
+    def __init__(self, collect: Callable[[], Dict[str, Any]], interval: float = 2.0, history_size: int = 300):
+        """
+        Args:
+            collect: 采样函数，在采样线程中调用
+            interval: 采样间隔（秒）
+            history_size: 环形缓冲区保留的样本数
+        """
+        self.collect = collect
+        self.interval = interval
+        self.samples: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        # 第一个样本产生时置位，避免启动后立即读取到空数据
+        self._ready = threading.Event()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动采样线程（重复调用无副作用）"""
+        with self._lock:
+            if self.is_running:
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='system-sampler', daemon=True)
+            self._thread.start()
+            logger.info(f"系统采样线程已启动，间隔{self.interval}秒")
+
+    def stop(self, timeout: float = 5.0):
+        """停止采样线程"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        next_time = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                self.samples.append(self.collect())
+                self._ready.set()
+            except Exception as e:
+                logger.error(f"系统采样失败: {e}")
+
+            # 按固定节拍采样，不随采样耗时漂移
+            next_time += self.interval
+            delay = next_time - time.monotonic()
+            if delay < 0:
+                next_time = time.monotonic()
+                delay = 0
+            self._stop_event.wait(delay)
+
+    def latest(self, wait: float = 0) -> Optional[Dict[str, Any]]:
+        """
+        获取最新样本
+
+        Args:
+            wait: 尚无样本时最多等待的秒数
+
+        Returns:
+            最新样本，没有样本时返回None
+        """
+        if not self.samples and wait > 0:
+            self._ready.wait(wait)
+        try:
+            return self.samples[-1]
+        except IndexError:
+            return None
+
+    def history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        获取环形缓冲区中的历史样本（按时间升序）
+
+        Args:
+            limit: 最多返回的样本数
+        """
+        samples = list(self.samples)
+        if limit:
+            samples = samples[-limit:]
+        return samples
@@ -164,12 +164,14 @@ class ProcessSchema(BaseModel):
     memory_percent: float
     status: str
     create_time: str
+    cmdline: Optional[str] = None
 
 
 class ProcessInfoSchema(BaseModel):
     """进程统计信息"""
     total_processes: int
-    top_processes: List[ProcessSchema]
+    top_processes: List[ProcessSchema]  # 按CPU使用率排序
+    top_memory_processes: List[ProcessSchema] = []  # 按内存使用率排序
     running_processes: int
     sleeping_processes: int
 
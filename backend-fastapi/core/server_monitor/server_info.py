@@ -18,10 +18,27 @@ from typing import Dict, List, Any, Optional
 
 import psutil
 
+from app.config import settings
+from core.server_monitor.process_sampler import ProcessSampler
+from core.server_monitor.sampler import SystemSampler
+from utils.metrics_history import metrics_history
+
 
 class ServerInfoCollector:
     """服务器信息收集器，支持Linux、Windows、macOS"""
 
+    # 记录历史的指标
+    HISTORY_METRICS = [
+        'cpu_percent', 'memory_percent', 'load_1min',
+        'disk_read_speed', 'disk_write_speed', 'upload_speed', 'download_speed',
+    ]
+
+    # 进程Top N数量
+    TOP_PROCESSES = 20
+
+    # 实时统计中推送的进程数量
+    REALTIME_TOP_PROCESSES = 15
+
     def __init__(self):
         self.system_name = platform.system()
         self.is_windows = self.system_name == 'Windows'
@@ -33,6 +50,9 @@ class ServerInfoCollector:
         self._last_network_time = None
         self._last_disk_io = None
         self._last_disk_time = None
+        # 最近一次采样是否算出了速度（首次采样没有上一次的计数，或计数不可用时为False）
+        self._network_speed_valid = False
+        self._disk_speed_valid = False
 
         # 用于CPU使用率的缓存数据
         self._last_cpu_times = None
@@ -44,6 +64,20 @@ class ServerInfoCollector:
         except:
             pass
 
+        # 增量进程采样器：读取进程信息或实时统计时按需采样，一个采样间隔内复用结果
+        self.process_sampler = ProcessSampler(top_n=self.TOP_PROCESSES)
+
+        # 后台采样线程：CPU/磁盘IO/网络IO等基于差值的指标统一由采样线程计算，
+        # 接口只读取最新样本，不再在请求线程中sleep
+        self.sampler = SystemSampler(
+            self._sample,
+            interval=settings.SERVER_MONITOR_SAMPLE_INTERVAL,
+            history_size=settings.SERVER_MONITOR_HISTORY_SIZE
+        )
+        self.history = metrics_history.get_store(
+            'server', self.HISTORY_METRICS, settings.SERVER_MONITOR_SAMPLE_INTERVAL
+        )
+
     def get_all_info(self) -> Dict[str, Any]:
         """获取所有服务器监控信息"""
         return {
@@ -98,11 +132,24 @@ class ServerInfoCollector:
                 'version': "Unknown",
             }
 
+    def get_latest_sample(self) -> Dict[str, Any]:
+        """获取后台采样线程的最新样本，首次调用时启动采样线程"""
+        self.sampler.start()
+        sample = self.sampler.latest(wait=self.sampler.interval + 1)
+        if sample is None:
+            raise RuntimeError('系统采样数据不可用')
+        return sample
+
+    def close(self):
+        """停止后台采样线程"""
+        self.sampler.stop()
+
     def get_cpu_info(self) -> Dict[str, Any]:
         """获取CPU信息"""
         try:
-            cpu_percent = psutil.cpu_percent(interval=1, percpu=True)
-            overall_cpu_percent = psutil.cpu_percent(interval=1)
+            sample = self.get_latest_sample()
+            cpu_percent = sample['cpu_details']['cpu_percent_per_core']
+            overall_cpu_percent = sample['cpu_percent']
 
             try:
                 cpu_freq = psutil.cpu_freq()
@@ -282,61 +329,18 @@ class ServerInfoCollector:
         }
 
     def get_process_info(self) -> Dict[str, Any]:
-        """获取进程信息"""
-        processes = []
-        total_processes = 0
-        running_processes = 0
-        sleeping_processes = 0
-
+        """获取进程信息（CPU使用率为最近两次采样区间的均值）"""
         try:
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'status', 'create_time']):
-                try:
-                    process_info = proc.info
-                    total_processes += 1
-
-                    status = process_info.get('status', '')
-                    if status == psutil.STATUS_RUNNING:
-                        running_processes += 1
-                    elif status == psutil.STATUS_SLEEPING:
-                        sleeping_processes += 1
-
-                    cpu_percent = process_info.get('cpu_percent', 0.0)
-                    memory_percent = process_info.get('memory_percent', 0.0)
-
-                    if cpu_percent is None:
-                        cpu_percent = 0.0
-                    if memory_percent is None:
-                        memory_percent = 0.0
-
-                    if cpu_percent > 1.0 or memory_percent > 1.0:
-                        create_time = process_info.get('create_time')
-                        if create_time:
-                            create_time_str = datetime.fromtimestamp(create_time).isoformat()
-                        else:
-                            create_time_str = datetime.now().isoformat()
-
-                        processes.append({
-                            'pid': process_info.get('pid', 0),
-                            'name': process_info.get('name', 'Unknown'),
-                            'cpu_percent': round(float(cpu_percent), 2),
-                            'memory_percent': round(float(memory_percent), 2),
-                            'status': status or 'Unknown',
-                            'create_time': create_time_str,
-                        })
-                except (psutil.NoSuchProcess, psutil.AccessDenied, TypeError, ValueError):
-                    continue
-
-            processes.sort(key=lambda x: x['cpu_percent'], reverse=True)
-
+            return self.process_sampler.get(max_age=settings.SERVER_MONITOR_SAMPLE_INTERVAL)
         except Exception as e:
             print(f"Error getting process info: {e}")
-
-        return {
-            'total_processes': total_processes,
-            'top_processes': processes[:20],
-            'running_processes': running_processes,
-            'sleeping_processes': sleeping_processes,
-        }
+            return {
+                'total_processes': 0,
+                'top_processes': [],
+                'top_memory_processes': [],
+                'running_processes': 0,
+                'sleeping_processes': 0,
+            }
 
     def get_system_load(self) -> Dict[str, Any]:
         """获取系统负载信息"""
@@ -353,7 +357,7 @@ class ServerInfoCollector:
                 except:
                     pass
 
-            cpu_percent = psutil.cpu_percent(interval=0.1)
+            cpu_percent = self.get_latest_sample()['cpu_percent']
             cpu_count = psutil.cpu_count() or 1
             return {
                 'load_1min': round(cpu_percent / 100 * cpu_count, 2),
@@ -462,13 +466,34 @@ class ServerInfoCollector:
         return round(bytes_value / (1024 ** 2), 2)
 
     def get_realtime_stats(self) -> Dict[str, Any]:
-        """获取实时统计信息（用于实时更新）"""
+        """获取实时统计信息（用于实时更新）：后台采样线程的最新样本，加上按需采集的进程统计"""
+        return {**self.get_latest_sample(), **self._collect_process_stats()}
+
+    def _sample(self) -> Dict[str, Any]:
+        """采样并写入指标历史"""
+        stats = self._collect_realtime_stats()
+        # 没有算出的速度记为空，而不是0
+        disk_valid, network_valid = self._disk_speed_valid, self._network_speed_valid
+        self.history.record({
+            'cpu_percent': stats['cpu_percent'],
+            'memory_percent': stats['memory_percent'],
+            'load_1min': stats['system_load'].get('load_1min'),
+            'disk_read_speed': stats['disk_io']['read_speed'] if disk_valid else None,
+            'disk_write_speed': stats['disk_io']['write_speed'] if disk_valid else None,
+            'upload_speed': stats['network_io']['upload_speed'] if network_valid else None,
+            'download_speed': stats['network_io']['download_speed'] if network_valid else None,
+        })
+        return stats
+
+    def _collect_realtime_stats(self) -> Dict[str, Any]:
+        """采集实时统计信息，由后台采样线程按固定间隔调用"""
         current_time = time.time()
 
         # 获取当前网络IO统计
         current_network_io = psutil.net_io_counters()
         upload_speed = 0.0
         download_speed = 0.0
+        self._network_speed_valid = False
 
         if (self._last_network_io is not None and
                 self._last_network_time is not None and
@@ -480,6 +505,7 @@ class ServerInfoCollector:
 
                 upload_speed = max(0, bytes_sent_diff / time_diff)
                 download_speed = max(0, bytes_recv_diff / time_diff)
+                self._network_speed_valid = True
 
         if current_network_io:
             self._last_network_io = current_network_io
@@ -489,6 +515,7 @@ class ServerInfoCollector:
         current_disk_io = psutil.disk_io_counters()
         read_speed = 0.0
         write_speed = 0.0
+        self._disk_speed_valid = False
 
         if (self._last_disk_io is not None and
                 self._last_disk_time is not None and
@@ -500,6 +527,7 @@ class ServerInfoCollector:
 
                 read_speed = max(0, read_bytes_diff / time_diff)
                 write_speed = max(0, write_bytes_diff / time_diff)
+                self._disk_speed_valid = True
 
         if current_disk_io:
             self._last_disk_io = current_disk_io
@@ -513,13 +541,6 @@ class ServerInfoCollector:
                 core == 0.0 for core in cpu_percent_per_core):
             overall_cpu_percent = sum(cpu_percent_per_core) / len(cpu_percent_per_core)
 
-        elif overall_cpu_percent == 0.0 and all(core == 0.0 for core in cpu_percent_per_core):
-            try:
-                overall_cpu_percent = psutil.cpu_percent(interval=0.1)
-                cpu_percent_per_core = psutil.cpu_percent(interval=0.1, percpu=True)
-            except:
-                pass
-
         try:
             cpu_freq = psutil.cpu_freq()
         except (FileNotFoundError, OSError):
@@ -543,12 +564,11 @@ class ServerInfoCollector:
                     pass
 
             if not load_info:
-                cpu_percent = psutil.cpu_percent(interval=0.1)
                 cpu_count = psutil.cpu_count() or 1
                 load_info = {
-                    'load_1min': round(cpu_percent / 100 * cpu_count, 2),
-                    'load_5min': round(cpu_percent / 100 * cpu_count, 2),
-                    'load_15min': round(cpu_percent / 100 * cpu_count, 2),
+                    'load_1min': round(overall_cpu_percent / 100 * cpu_count, 2),
+                    'load_5min': round(overall_cpu_percent / 100 * cpu_count, 2),
+                    'load_15min': round(overall_cpu_percent / 100 * cpu_count, 2),
                 }
         except:
             load_info = {
@@ -557,56 +577,6 @@ class ServerInfoCollector:
                 'load_15min': 0.0,
             }
 
-        # 获取进程统计信息
-        total_processes = 0
-        running_processes = 0
-        sleeping_processes = 0
-        top_processes = []
-
-        try:
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'status', 'create_time']):
-                try:
-                    process_info = proc.info
-                    total_processes += 1
-
-                    status = process_info.get('status', '')
-                    if status == psutil.STATUS_RUNNING:
-                        running_processes += 1
-                    elif status == psutil.STATUS_SLEEPING:
-                        sleeping_processes += 1
-
-                    cpu_percent = process_info.get('cpu_percent', 0.0)
-                    memory_percent = process_info.get('memory_percent', 0.0)
-
-                    if cpu_percent is None:
-                        cpu_percent = 0.0
-                    if memory_percent is None:
-                        memory_percent = 0.0
-
-                    if cpu_percent > 0.5 or memory_percent > 0.5:
-                        create_time = process_info.get('create_time')
-                        if create_time:
-                            create_time_str = datetime.fromtimestamp(create_time).isoformat()
-                        else:
-                            create_time_str = datetime.now().isoformat()
-
-                        top_processes.append({
-                            'pid': process_info.get('pid', 0),
-                            'name': process_info.get('name', 'Unknown'),
-                            'cpu_percent': round(float(cpu_percent), 2),
-                            'memory_percent': round(float(memory_percent), 2),
-                            'status': status or 'Unknown',
-                            'create_time': create_time_str,
-                        })
-                except (psutil.NoSuchProcess, psutil.AccessDenied, TypeError, ValueError):
-                    continue
-
-            top_processes.sort(key=lambda x: x['cpu_percent'], reverse=True)
-            top_processes = top_processes[:15]
-
-        except Exception as e:
-            print(f"Error getting process info in realtime: {e}")
-
         # 获取网络接口详细统计
         per_nic = psutil.net_io_counters(pernic=True)
         per_interface_stats = {}
@@ -622,21 +592,6 @@ class ServerInfoCollector:
                 'dropout': stats.dropout,
             }
 
-        # 获取网络连接
-        connections = []
-        try:
-            for conn in psutil.net_connections():
-                if conn.status == 'LISTEN':
-                    connections.append({
-                        'local_address': f"{conn.laddr.ip}:{conn.laddr.port}" if conn.laddr else "",
-                        'status': conn.status,
-                        'pid': conn.pid
-                    })
-                    if len(connections) >= 50:
-                        break
-        except:
-            pass
-
         return {
             'cpu_percent': round(overall_cpu_percent, 2),
             'memory_percent': round(virtual_mem.percent, 2),
@@ -671,6 +626,47 @@ class ServerInfoCollector:
                 'free': self._bytes_to_gb(virtual_mem.free),
             },
             'system_load': load_info,
+            'network_interfaces': per_interface_stats,
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def _collect_process_stats(self) -> Dict[str, Any]:
+        """
+        采集进程统计和监听端口
+
+        需要遍历所有进程，不在后台采样线程中执行，只在读取实时统计时采集；
+        进程统计复用 process_sampler 一个采样间隔内的结果，多个读取方只遍历一次
+        """
+        total_processes = 0
+        running_processes = 0
+        sleeping_processes = 0
+        top_processes = []
+
+        try:
+            process_info = self.process_sampler.get(max_age=settings.SERVER_MONITOR_SAMPLE_INTERVAL)
+            total_processes = process_info['total_processes']
+            running_processes = process_info['running_processes']
+            sleeping_processes = process_info['sleeping_processes']
+            top_processes = process_info['top_processes'][:self.REALTIME_TOP_PROCESSES]
+        except Exception as e:
+            print(f"Error getting process info in realtime: {e}")
+
+        # 获取网络连接
+        connections = []
+        try:
+            for conn in psutil.net_connections():
+                if conn.status == 'LISTEN':
+                    connections.append({
+                        'local_address': f"{conn.laddr.ip}:{conn.laddr.port}" if conn.laddr else "",
+                        'status': conn.status,
+                        'pid': conn.pid
+                    })
+                    if len(connections) >= 50:
+                        break
+        except:
+            pass
+
+        return {
             'process_stats': {
                 'total_processes': total_processes,
                 'running_processes': running_processes,
@@ -682,7 +678,5 @@ class ServerInfoCollector:
                 'running_processes': running_processes,
                 'sleeping_processes': sleeping_processes,
             },
-            'network_interfaces': per_interface_stats,
             'network_connections': connections,
-            'timestamp': datetime.now().isoformat()
         }
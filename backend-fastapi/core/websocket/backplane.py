@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author: 臧成龙
+@Contact: 939589097@qq.com
+@Time: 2025-12-31
+@File: backplane.py
+@Desc: WebSocket跨进程消息通道 - 基于Redis发布订阅，多worker部署时向所有进程的连接投递
+"""
+"""
+WebSocket跨进程消息通道
+- send_to_user / broadcast_to_group 发布一次到Redis频道，每个worker订阅后投递给本进程的连接
+- 短时间窗口内的消息合并为一次PUBLISH，同一用户相同 coalesce_key 的消息只保留最新一条
+- 每个worker在Redis中维护在线用户集合（带TTL心跳），发布前跳过没有任何在线连接的用户
+- Redis不可用时退化为进程内投递
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config import settings
+from core.websocket.consumers.base import manager
+from utils.redis import RedisClient
+
+logger = logging.getLogger(__name__)
+
+
+class RedisBackplane:
+    """基于Redis发布订阅的WebSocket消息通道"""
+
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.channel = f"{settings.CACHE_PREFIX}ws:backplane"
+        self.workers_key = f"{settings.CACHE_PREFIX}ws:workers"
+        self.window = settings.WS_COALESCE_WINDOW
+        self.ttl = settings.WS_PRESENCE_TTL
+        self.running = False
+        self._tasks: List[asyncio.Task] = []
+        # 待发布的消息：{user_id: [(coalesce_key, message_text)]}、[(group_name, message_text)]
+        self._user_buffer: Dict[str, List[Tuple[Optional[str], str]]] = {}
+        self._group_buffer: List[Tuple[str, str]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        # 统计
+        self.published = 0
+        self.coalesced = 0
+        self.skipped_offline = 0
+        self.delivered = 0
+
+    def _presence_key(self, worker_id: str) -> str:
+        return f"{settings.CACHE_PREFIX}ws:presence:{worker_id}"
+
+    async def start(self):
+        """连接Redis并启动订阅、心跳任务，失败时保持进程内投递"""
+        try:
+            client = await RedisClient.get_client()
+            await client.ping()
+        except Exception as e:
+            logger.warning(f"WebSocket跨进程通道未启用，Redis不可用: {e}")
+            return
+
+        self.running = True
+        manager.backplane = self
+        await self._refresh_presence()
+        self._tasks = [
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._heartbeat()),
+        ]
+        logger.info(f"WebSocket跨进程通道已启动: {self.worker_id}")
+
+    async def stop(self):
+        """发送剩余消息，停止后台任务并清理在线状态"""
+        if not self.running:
+            return
+        await self._flush()
+        self.running = False
+        manager.backplane = None
+
+        for task in self._tasks + ([self._flush_task] if self._flush_task else []):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        try:
+            client = await RedisClient.get_client()
+            pipe = client.pipeline(transaction=False)
+            pipe.delete(self._presence_key(self.worker_id))
+            pipe.zrem(self.workers_key, self.worker_id)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"清理WebSocket在线状态失败: {e}")
+
+    # ---------- 发布 ----------
+
+    def publish_user(self, user_id: str, message_text: str, coalesce_key: Optional[str] = None):
+        """
+        发布给指定用户（在合并窗口结束时统一发送）
+
+        Args:
+            user_id: 用户ID
+            message_text: 已序列化的消息
+            coalesce_key: 合并键，窗口内同一用户相同合并键的消息只保留最新一条
+        """
+        items = self._user_buffer.setdefault(user_id, [])
+        if coalesce_key is not None:
+            for i, (key, _) in enumerate(items):
+                if key == coalesce_key:
+                    items[i] = (key, message_text)
+                    self.coalesced += 1
+                    break
+            else:
+                items.append((coalesce_key, message_text))
+        else:
+            items.append((None, message_text))
+        self._schedule_flush()
+
+    def publish_group(self, group_name: str, message_text: str):
+        """发布给组内所有连接（在合并窗口结束时统一发送）"""
+        self._group_buffer.append((group_name, message_text))
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(self.window)
+        await self._flush()
+
+    async def _flush(self):
+        """将窗口内的消息合并为一次PUBLISH"""
+        users, groups = self._user_buffer, self._group_buffer
+        self._user_buffer, self._group_buffer = {}, []
+        if not users and not groups:
+            return
+
+        items: List[Dict[str, Any]] = []
+        if users:
+            online = await self.get_online_users(users.keys())
+            for user_id, messages in users.items():
+                if user_id not in online:
+                    self.skipped_offline += len(messages)
+                    continue
+                items.append({'user': user_id, 'texts': [text for _, text in messages]})
+        for group_name, text in groups:
+            items.append({'group': group_name, 'texts': [text]})
+        if not items:
+            return
+
+        try:
+            client = await RedisClient.get_client()
+            await client.publish(self.channel, json.dumps({'origin': self.worker_id, 'items': items}))
+            self.published += 1
+        except Exception as e:
+            logger.error(f"WebSocket消息发布失败，仅投递本进程连接: {e}")
+            await self._deliver(items)
+
+    # ---------- 在线状态 ----------
+
+    async def get_online_users(self, user_ids: Iterable[str]) -> Set[str]:
+        """
+        查询在任意worker上有连接的用户
+
+        Redis查询失败时视为全部在线，避免丢消息
+        """
+        user_ids = list(user_ids)
+        online = {user_id for user_id in user_ids if user_id in manager.active_connections}
+        remaining = [user_id for user_id in user_ids if user_id not in online]
+        if not remaining:
+            return online
+
+        try:
+            client = await RedisClient.get_client()
+            workers = await client.zrangebyscore(self.workers_key, time.time() - self.ttl, '+inf')
+            workers = [worker for worker in workers if worker != self.worker_id]
+            if workers:
+                pipe = client.pipeline(transaction=False)
+                for worker in workers:
+                    pipe.smismember(self._presence_key(worker), remaining)
+                for flags in await pipe.execute():
+                    online.update(user_id for user_id, flag in zip(remaining, flags) if flag)
+        except Exception as e:
+            logger.warning(f"查询WebSocket在线状态失败: {e}")
+            return set(user_ids)
+        return online
+
+    def mark_online(self, user_id: str):
+        """用户在本进程建立第一个连接"""
+        asyncio.create_task(self._update_presence('sadd', user_id))
+
+    def mark_offline(self, user_id: str):
+        """用户在本进程的最后一个连接断开"""
+        asyncio.create_task(self._update_presence('srem', user_id))
+
+    async def _update_presence(self, command: str, user_id: str):
+        try:
+            client = await RedisClient.get_client()
+            key = self._presence_key(self.worker_id)
+            pipe = client.pipeline(transaction=False)
+            getattr(pipe, command)(key, user_id)
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"更新WebSocket在线状态失败: {e}")
+
+    async def _refresh_presence(self):
+        """重写本进程的在线用户集合并续期"""
+        client = await RedisClient.get_client()
+        key = self._presence_key(self.worker_id)
+        users = list(manager.active_connections.keys())
+        now = time.time()
+
+        pipe = client.pipeline(transaction=True)
+        pipe.delete(key)
+        if users:
+            pipe.sadd(key, *users)
+            pipe.expire(key, self.ttl)
+        pipe.zadd(self.workers_key, {self.worker_id: now})
+        pipe.zremrangebyscore(self.workers_key, '-inf', now - self.ttl)
+        await pipe.execute()
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            try:
+                await self._refresh_presence()
+            except Exception as e:
+                logger.warning(f"WebSocket在线状态心跳失败: {e}")
+
+    # ---------- 订阅 ----------
+
+    async def _listen(self):
+        """订阅频道并投递给本进程的连接，断线后重连"""
+        while True:
+            pubsub = None
+            try:
+                client = await RedisClient.get_client()
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message.get('type') != 'message':
+                        continue
+                    try:
+                        payload = json.loads(message['data'])
+                        await self._deliver(payload.get('items', []))
+                    except Exception as e:
+                        logger.error(f"WebSocket跨进程消息处理失败: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"WebSocket跨进程通道订阅中断，1秒后重连: {e}")
+                await asyncio.sleep(1)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+
+    async def _deliver(self, items: List[Dict[str, Any]]):
+        """投递给本进程的连接"""
+        for item in items:
+            if 'user' in item:
+                sockets = manager.active_connections.get(item['user'])
+            else:
+                sockets = manager.groups.get(item['group'])
+            if not sockets:
+                continue
+            for text in item['texts']:
+                await manager.send_text(sockets, text)
+                self.delivered += len(sockets)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取通道状态"""
+        return {
+            'worker_id': self.worker_id,
+            'running': self.running,
+            'published': self.published,
+            'coalesced': self.coalesced,
+            'skipped_offline': self.skipped_offline,
+            'delivered': self.delivered,
+        }
+
+
+# 全局跨进程消息通道
+backplane = RedisBackplane()
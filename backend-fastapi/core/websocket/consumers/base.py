@@ -27,39 +27,103 @@ logger = logging.getLogger(__name__)
 
 
 class ConnectionManager:
-    """WebSocket 连接管理器"""
+    """
+    WebSocket 连接管理器
+
+    每个连接有一个有界发送队列和一个写任务，广播只是把已序列化的消息放入各连接的队列，
+    慢客户端不会拖慢其他连接。队列满时按 WS_SLOW_CONSUMER_POLICY 处理：
+    - drop_oldest: 丢弃队列中最早的消息
+    - evict: 断开该慢连接
+    
+    设置 backplane 后（多worker部署），send_to_user / broadcast_to_group 经Redis发布到所有进程，
+    由各进程投递给本进程的连接
+    """
     
-    def __init__(self):
+    def __init__(self, queue_size: Optional[int] = None, policy: Optional[str] = None):
         # 活跃连接: {user_id: {websocket1, websocket2, ...}}
         self.active_connections: Dict[str, Set[WebSocket]] = {}
         # 组连接: {group_name: {websocket1, websocket2, ...}}
         self.groups: Dict[str, Set[WebSocket]] = {}
+        # 反向索引: {websocket: {group_name, ...}}，断开时只需遍历已加入的组
+        self.socket_groups: Dict[WebSocket, Set[str]] = {}
+        # 反向索引: {websocket: user_id}，被动移除（驱逐、发送失败）时直接找到所属用户
+        self.socket_users: Dict[WebSocket, str] = {}
+        # 发送队列与写任务
+        self.queues: Dict[WebSocket, asyncio.Queue] = {}
+        self.writers: Dict[WebSocket, asyncio.Task] = {}
+        self.queue_size = queue_size or settings.WS_SEND_QUEUE_SIZE
+        self.policy = policy or settings.WS_SLOW_CONSUMER_POLICY
+        # 统计
+        self.dropped_messages = 0
+        self.evicted_connections = 0
+        # 跨进程消息通道（core.websocket.backplane.RedisBackplane），未启用时为None
+        self.backplane = None
     
     async def connect(self, websocket: WebSocket, user_id: str):
         """添加连接"""
         await websocket.accept()
         if user_id not in self.active_connections:
             self.active_connections[user_id] = set()
+            if self.backplane is not None:
+                self.backplane.mark_online(user_id)
         self.active_connections[user_id].add(websocket)
+        self.socket_users[websocket] = user_id
+        self.start_writer(websocket)
+    
+    def start_writer(self, websocket: WebSocket):
+        """为连接创建发送队列和写任务"""
+        if websocket in self.queues:
+            return
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.queues[websocket] = queue
+        self.writers[websocket] = asyncio.create_task(self._writer(websocket, queue))
+    
+    async def _writer(self, websocket: WebSocket, queue: asyncio.Queue):
+        """按顺序发送队列中的消息，发送失败时停止"""
+        try:
+            while True:
+                message_text = await queue.get()
+                await websocket.send_text(message_text)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.debug(f"WebSocket writer stopped: {str(e)}")
+            # 发送失败的连接已不可用，从用户和组中移除，之后的广播直接跳过
+            self._stop_writer(websocket, cancel=False)
+            self._remove(websocket)
+    
+    def _stop_writer(self, websocket: WebSocket, cancel: bool = True):
+        self.queues.pop(websocket, None)
+        task = self.writers.pop(websocket, None)
+        if cancel and task and not task.done():
+            task.cancel()
     
     def disconnect(self, websocket: WebSocket, user_id: str):
         """移除连接"""
+        self.socket_users.pop(websocket, None)
         if user_id in self.active_connections:
             self.active_connections[user_id].discard(websocket)
             if not self.active_connections[user_id]:
                 del self.active_connections[user_id]
+                if self.backplane is not None:
+                    self.backplane.mark_offline(user_id)
         
-        # 从所有组中移除
-        for group_name in list(self.groups.keys()):
-            self.groups[group_name].discard(websocket)
-            if not self.groups[group_name]:
-                del self.groups[group_name]
+        # 从已加入的组中移除
+        for group_name in self.socket_groups.pop(websocket, set()):
+            members = self.groups.get(group_name)
+            if members is not None:
+                members.discard(websocket)
+                if not members:
+                    del self.groups[group_name]
+        
+        self._stop_writer(websocket)
     
     async def group_add(self, group_name: str, websocket: WebSocket):
         """将连接添加到组"""
         if group_name not in self.groups:
             self.groups[group_name] = set()
         self.groups[group_name].add(websocket)
+        self.socket_groups.setdefault(websocket, set()).add(group_name)
     
     async def group_discard(self, group_name: str, websocket: WebSocket):
         """从组中移除连接"""
@@ -67,26 +131,115 @@ class ConnectionManager:
             self.groups[group_name].discard(websocket)
             if not self.groups[group_name]:
                 del self.groups[group_name]
+        joined = self.socket_groups.get(websocket)
+        if joined is not None:
+            joined.discard(group_name)
+            if not joined:
+                del self.socket_groups[websocket]
     
-    async def broadcast_to_group(self, group_name: str, message: dict):
-        """向组内所有连接广播消息"""
-        if group_name in self.groups:
-            message_text = json.dumps(message)
-            for websocket in list(self.groups[group_name]):
-                try:
-                    await websocket.send_text(message_text)
-                except Exception:
-                    pass
-    
-    async def send_to_user(self, user_id: str, message: dict):
-        """向指定用户的所有连接发送消息"""
-        if user_id in self.active_connections:
-            message_text = json.dumps(message)
-            for websocket in list(self.active_connections[user_id]):
-                try:
-                    await websocket.send_text(message_text)
-                except Exception:
-                    pass
+    def enqueue(self, websocket: WebSocket, message_text: str) -> bool:
+        """
+        将消息放入连接的发送队列（不等待发送完成）
+        
+        Returns:
+            是否已入队，连接没有发送队列或被断开时返回False
+        """
+        queue = self.queues.get(websocket)
+        if queue is None:
+            return False
+        
+        if queue.full():
+            if self.policy == 'evict':
+                self.evict(websocket)
+                return False
+            try:
+                queue.get_nowait()
+                self.dropped_messages += 1
+            except asyncio.QueueEmpty:
+                pass
+        queue.put_nowait(message_text)
+        return True
+    
+    def _remove(self, websocket: WebSocket):
+        """不知道所属用户时移除连接"""
+        self.disconnect(websocket, self.socket_users.get(websocket, ''))
+    
+    def is_connected(self, websocket: WebSocket) -> bool:
+        """连接是否仍有发送队列（被断开或发送失败后返回False）"""
+        return websocket in self.queues
+    
+    def evict(self, websocket: WebSocket):
+        """断开慢连接"""
+        self.evicted_connections += 1
+        self._remove(websocket)
+        asyncio.create_task(self._close(websocket))
+    
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        try:
+            # 1013: Try Again Later
+            await asyncio.wait_for(websocket.close(code=1013), timeout=5)
+        except Exception:
+            pass
+    
+    async def send_text(self, websockets, message_text: str):
+        """
+        向多个连接发送已序列化的消息（消息只序列化一次，放入各连接的发送队列）
+        
+        没有发送队列的连接（已被断开或发送失败）直接跳过，广播不会在任何连接上等待发送
+        """
+        for websocket in list(websockets):
+            self.enqueue(websocket, message_text)
+    
+    async def broadcast_to_group(self, group_name: str, message: dict, local: bool = False):
+        """
+        向组内所有连接广播消息
+        
+        Args:
+            group_name: 组名
+            message: 消息
+            local: 只投递本进程的连接（不经跨进程通道）
+        """
+        if self.backplane is not None and not local:
+            self.backplane.publish_group(group_name, json.dumps(message))
+        elif group_name in self.groups:
+            await self.send_text(self.groups[group_name], json.dumps(message))
+    
+    async def send_to_user(self, user_id: str, message: dict, coalesce_key: Optional[str] = None,
+                           local: bool = False):
+        """
+        向指定用户的所有连接发送消息
+        
+        Args:
+            user_id: 用户ID
+            message: 消息
+            coalesce_key: 合并键，短时间内同一用户相同合并键的消息只发送最新一条（仅跨进程通道生效）
+            local: 只投递本进程的连接（不经跨进程通道）
+        """
+        user_id = str(user_id)
+        if self.backplane is not None and not local:
+            self.backplane.publish_user(user_id, json.dumps(message), coalesce_key)
+        elif user_id in self.active_connections:
+            await self.send_text(self.active_connections[user_id], json.dumps(message))
+    
+    async def get_online_users(self, user_ids) -> Set[str]:
+        """筛选有WebSocket连接的用户（启用跨进程通道时包含其他进程上的连接）"""
+        user_ids = [str(user_id) for user_id in user_ids]
+        if self.backplane is not None:
+            return await self.backplane.get_online_users(user_ids)
+        return {user_id for user_id in user_ids if user_id in self.active_connections}
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取连接管理器状态"""
+        return {
+            'connections': len(self.queues),
+            'users': len(self.active_connections),
+            'groups': len(self.groups),
+            'queued_messages': sum(queue.qsize() for queue in self.queues.values()),
+            'dropped_messages': self.dropped_messages,
+            'evicted_connections': self.evicted_connections,
+            'backplane': self.backplane.get_stats() if self.backplane is not None else None,
+        }
 
 
 # 全局连接管理器实例
@@ -99,6 +252,7 @@ class TokenAuthWebSocketConsumer:
     def __init__(self, websocket: WebSocket):
         self.websocket = websocket
         self.user_id: Optional[str] = None
+        self.token_payload: Dict[str, Any] = {}
         self.is_authenticated = False
     
     async def authenticate(self) -> bool:
@@ -141,6 +295,7 @@ class TokenAuthWebSocketConsumer:
                 return False
             
             self.user_id = user_id
+            self.token_payload = payload
             self.is_authenticated = True
             logger.info(f"WebSocket connection accepted for user {user_id}")
             return True
@@ -194,7 +349,12 @@ class TokenAuthWebSocketConsumer:
         if data:
             response['data'] = data
         
-        await self.websocket.send_text(json.dumps(response))
+        message_text = json.dumps(response)
+        # 已建立连接的消息与广播共用发送队列，保证顺序
+        if self.websocket in manager.queues:
+            manager.enqueue(self.websocket, message_text)
+        else:
+            await self.websocket.send_text(message_text)
     
     async def send_error(self, error_message: str):
         """发送错误消息"""
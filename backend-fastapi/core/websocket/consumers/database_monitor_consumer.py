@@ -16,7 +16,10 @@ from typing import Dict, Any, Optional
 
 from fastapi import WebSocket
 
+from core.database_monitor.api import get_database_configs, get_pooled_collector
+from core.database_monitor.database_collector import AsyncDatabaseCollector
 from core.websocket.consumers.base import TokenAuthWebSocketConsumer, manager
+from core.websocket.monitor_hub import monitor_hub
 
 logger = logging.getLogger(__name__)
 
@@ -26,9 +29,9 @@ class DatabaseMonitorConsumer(TokenAuthWebSocketConsumer):
     
     def __init__(self, websocket: WebSocket):
         super().__init__(websocket)
-        self.monitor_task: Optional[asyncio.Task] = None
         self.is_monitoring = False
-        self.monitor_interval = 2  # 固定2秒更新一次
+        self.monitor_interval = 2  # 默认2秒更新一次
+        self.monitor_delta = False  # 增量推送模式
         self.current_db_name: Optional[str] = None
     
     async def connect(self):
@@ -43,13 +46,9 @@ class DatabaseMonitorConsumer(TokenAuthWebSocketConsumer):
     
     async def disconnect(self, close_code: int = 1000):
         """断开连接并停止监控"""
-        self.is_monitoring = False
-        if self.monitor_task:
-            self.monitor_task.cancel()
-            try:
-                await self.monitor_task
-            except asyncio.CancelledError:
-                pass
+        if self.is_monitoring:
+            self.is_monitoring = False
+            await monitor_hub.unsubscribe(self._get_monitor_target(self.current_db_name), self.websocket)
         
         if self.user_id:
             await manager.group_discard(
@@ -67,9 +66,11 @@ class DatabaseMonitorConsumer(TokenAuthWebSocketConsumer):
             if not db_name:
                 await self.send_error('缺少数据库名称参数')
                 return
-            await self.start_monitoring(db_name)
+            await self.start_monitoring(db_name, data.get('interval'), data.get('delta', False))
         elif message_type == 'stop_monitor':
             await self.stop_monitoring()
+        elif message_type == 'resync':
+            await self.resync_monitoring()
         elif message_type == 'get_overview':
             db_name = data.get('db_name')
             if not db_name:
@@ -93,91 +94,106 @@ class DatabaseMonitorConsumer(TokenAuthWebSocketConsumer):
         else:
             await self.send_error(f'未知的数据库监控命令: {message_type}')
     
-    async def start_monitoring(self, db_name: str):
-        """开始监控"""
+    @staticmethod
+    def _get_monitor_target(db_name: str) -> str:
+        """监控采集中心中的目标标识"""
+        return f"db:{db_name}"
+    
+    async def start_monitoring(self, db_name: str, interval: Optional[float] = None, delta: bool = False):
+        """开始监控，订阅共享的数据库采样任务"""
         if self.is_monitoring:
             await self.send_message('monitor_status', '数据库监控已在运行')
             return
         
+        db_config = await self._get_config_by_name(db_name)
+        if db_config is None:
+            return
+        
+        async def collect() -> Dict[str, Any]:
+            # 每次采样从注册表取常驻采集器，空闲回收后自动重建
+            collector = await get_pooled_collector(db_config)
+            return await collector.get_realtime_stats(db_name)
+        
+        if interval:
+            try:
+                self.monitor_interval = monitor_hub.normalize_interval(interval)
+            except ValueError as e:
+                await self.send_error(str(e))
+                return
         self.current_db_name = db_name
+        self.monitor_delta = bool(delta)
+        await monitor_hub.subscribe(
+            self._get_monitor_target(db_name),
+            self.websocket,
+            collect,
+            'database_realtime',
+            '数据库实时统计',
+            self.monitor_interval,
+            delta=self.monitor_delta
+        )
         self.is_monitoring = True
-        self.monitor_task = asyncio.create_task(self.monitor_loop())
         await self.send_message('monitor_started', f'开始数据库监控({db_name})，间隔{self.monitor_interval}秒')
     
     async def stop_monitoring(self):
         """停止监控"""
-        self.is_monitoring = False
-        if self.monitor_task:
-            self.monitor_task.cancel()
-            try:
-                await self.monitor_task
-            except asyncio.CancelledError:
-                pass
-            self.monitor_task = None
+        if self.is_monitoring:
+            self.is_monitoring = False
+            await monitor_hub.unsubscribe(self._get_monitor_target(self.current_db_name), self.websocket)
         self.current_db_name = None
         await self.send_message('monitor_stopped', '数据库监控已停止')
     
+    async def resync_monitoring(self):
+        """增量模式下请求重新同步，下次推送完整快照"""
+        target = self._get_monitor_target(self.current_db_name)
+        if not self.is_monitoring or not monitor_hub.resync(target, self.websocket):
+            await self.send_error('未开始监控')
+    
     async def restart_monitoring(self):
         """重启监控"""
         if self.current_db_name:
             db_name = self.current_db_name
             await self.stop_monitoring()
             await asyncio.sleep(0.1)  # 短暂延迟
-            await self.start_monitoring(db_name)
-    
-    async def monitor_loop(self):
-        """监控循环"""
-        try:
-            while self.is_monitoring and self.current_db_name:
-                try:
-                    await self.send_realtime_stats(self.current_db_name)
-                except Exception as e:
-                    logger.error(f"发送数据库实时数据失败: {str(e)}")
-                    # 发送错误消息但不停止监控循环
-                    try:
-                        await self.send_error(f'获取数据库监控数据失败: {str(e)}')
-                    except:
-                        pass
-                
-                # 等待下一次监控间隔
-                await asyncio.sleep(self.monitor_interval)
-        except asyncio.CancelledError:
-            logger.info("数据库监控循环被取消")
-        except Exception as e:
-            logger.error(f"数据库监控循环严重错误: {str(e)}")
-            self.is_monitoring = False
+            await self.start_monitoring(db_name, delta=self.monitor_delta)
     
-    def _get_database_configs(self):
-        """获取数据库配置列表"""
-        try:
-            from core.database_monitor import get_database_configs
-            return get_database_configs()
-        except ImportError:
-            logger.warning("database_monitor module not available")
-            return []
+    async def _get_config_by_name(self, db_name: str) -> Optional[dict]:
+        """根据数据库名称获取配置，未找到时发送错误消息"""
+        configs = await get_database_configs()
+        db_config = next((config for config in configs if config['db_name'] == db_name), None)
+        
+        if not db_config:
+            await self.send_error(f'数据库 {db_name} 未找到')
+            return None
+        return db_config
     
-    def _get_database_collector(self, db_config: Dict[str, Any]):
-        """获取数据库收集器"""
-        try:
-            from core.database_monitor import DatabaseCollector
-            return DatabaseCollector(
-                db_type=db_config['db_type'],
-                host=db_config['host'],
-                port=db_config['port'],
-                user=db_config['user'],
-                password=db_config['password'],
-                database=db_config['database']
-            )
-        except ImportError:
-            logger.warning("DatabaseCollector not available")
+    async def _get_collector_by_name(self, db_name: str, pooled: bool = True) -> Optional[AsyncDatabaseCollector]:
+        """
+        根据数据库名称获取收集器，未找到时发送错误消息
+        
+        Args:
+            pooled: 使用注册表中的常驻采集器，False时创建一次性采集器（用于连接测试）
+        """
+        db_config = await self._get_config_by_name(db_name)
+        if db_config is None:
             return None
+        
+        if pooled:
+            return await get_pooled_collector(db_config)
+        return AsyncDatabaseCollector(
+            db_type=db_config['db_type'],
+            host=db_config['host'],
+            port=db_config['port'],
+            user=db_config['user'],
+            password=db_config['password'],
+            database=db_config['database']
+        )
     
     async def send_database_configs(self):
         """发送数据库配置列表"""
         try:
-            # 在线程池中执行同步方法
-            loop = asyncio.get_event_loop()
-            configs = await loop.run_in_executor(None, self._get_database_configs)
+            configs = await get_database_configs()
+            # 不向前端发送密码
+            configs = [{k: v for k, v in config.items() if k != 'password'} for config in configs]
             
             await self.send_message('database_configs', '数据库配置列表', configs)
         except Exception as e:
@@ -187,26 +203,11 @@ class DatabaseMonitorConsumer(TokenAuthWebSocketConsumer):
     async def send_database_overview(self, db_name: str):
         """发送数据库概览信息"""
         try:
-            # 在线程池中执行同步方法
-            loop = asyncio.get_event_loop()
-            configs = await loop.run_in_executor(None, self._get_database_configs)
-            db_config = next((config for config in configs if config['db_name'] == db_name), None)
-            
-            if not db_config:
-                await self.send_error(f'数据库 {db_name} 未找到')
-                return
-            
-            collector = self._get_database_collector(db_config)
+            collector = await self._get_collector_by_name(db_name)
             if collector is None:
-                await self.send_error('数据库监控模块未安装')
                 return
             
-            overview_data = await loop.run_in_executor(
-                None,
-                collector.get_all_info,
-                db_name,
-                db_config['name']
-            )
+            overview_data = await collector.get_all_info(db_name, db_name)
             
             await self.send_message('database_overview', '数据库概览信息', overview_data)
         except Exception as e:
@@ -216,25 +217,11 @@ class DatabaseMonitorConsumer(TokenAuthWebSocketConsumer):
     async def send_realtime_stats(self, db_name: str):
         """发送数据库实时统计信息"""
         try:
-            # 在线程池中执行同步方法
-            loop = asyncio.get_event_loop()
-            configs = await loop.run_in_executor(None, self._get_database_configs)
-            db_config = next((config for config in configs if config['db_name'] == db_name), None)
-            
-            if not db_config:
-                await self.send_error(f'数据库 {db_name} 未找到')
-                return
-            
-            collector = self._get_database_collector(db_config)
+            collector = await self._get_collector_by_name(db_name)
             if collector is None:
-                await self.send_error('数据库监控模块未安装')
                 return
             
-            realtime_data = await loop.run_in_executor(
-                None,
-                collector.get_realtime_stats,
-                db_name
-            )
+            realtime_data = await collector.get_realtime_stats(db_name)
             
             await self.send_message('database_realtime', '数据库实时统计', realtime_data)
         except Exception as e:
@@ -244,21 +231,11 @@ class DatabaseMonitorConsumer(TokenAuthWebSocketConsumer):
     async def test_database_connection(self, db_name: str):
         """测试数据库连接"""
         try:
-            # 在线程池中执行同步方法
-            loop = asyncio.get_event_loop()
-            configs = await loop.run_in_executor(None, self._get_database_configs)
-            db_config = next((config for config in configs if config['db_name'] == db_name), None)
-            
-            if not db_config:
-                await self.send_error(f'数据库 {db_name} 未找到')
-                return
-            
-            collector = self._get_database_collector(db_config)
+            collector = await self._get_collector_by_name(db_name, pooled=False)
             if collector is None:
-                await self.send_error('数据库监控模块未安装')
                 return
             
-            test_result = await loop.run_in_executor(None, collector.test_connection)
+            test_result = await collector.test_connection()
             
             await self.send_message('connection_test', '数据库连接测试结果', test_result)
         except Exception as e:
@@ -10,36 +10,60 @@
 """
 通知 WebSocket 消费者
 """
-from typing import Dict, Any
+import logging
+from typing import Dict, Any, List
 
 from fastapi import WebSocket
 
 from core.websocket.consumers.base import TokenAuthWebSocketConsumer, manager
 
+logger = logging.getLogger(__name__)
+
 
 class NotificationConsumer(TokenAuthWebSocketConsumer):
     """通知WebSocket消费者"""
     
     def __init__(self, websocket: WebSocket):
         super().__init__(websocket)
+        self.groups: List[str] = []
+    
+    async def load_groups(self) -> List[str]:
+        """通知组：用户组、全员组，以及用户当前所属的部门、角色组（token中没有部门，按用户查询）"""
+        groups = [f"notifications_user_{self.user_id}", "notifications_all"]
+        dept_id = self.token_payload.get('dept_id')
+        role_id = self.token_payload.get('role_id')
+        try:
+            from sqlalchemy import select
+            from app.database import AsyncSessionLocal
+            from core.user.model import User
+
+            async with AsyncSessionLocal() as db:
+                row = (await db.execute(
+                    select(User.dept_id, User.role_id).where(User.id == self.user_id)
+                )).first()
+            if row:
+                dept_id, role_id = row.dept_id, row.role_id
+        except Exception as e:
+            logger.warning(f"查询用户 {self.user_id} 的部门失败，只加入token中的分组: {e}")
+        if dept_id:
+            groups.append(f"notifications_dept_{dept_id}")
+        if role_id:
+            groups.append(f"notifications_role_{role_id}")
+        return groups
     
     async def connect(self):
         """连接并加入通知组"""
         await super().connect()
         if self.is_authenticated and self.user_id:
-            # 加入用户通知组
-            await manager.group_add(
-                f"notifications_user_{self.user_id}",
-                self.websocket
-            )
+            self.groups = await self.load_groups()
+            for group_name in self.groups:
+                await manager.group_add(group_name, self.websocket)
     
     async def disconnect(self, close_code: int = 1000):
         """断开连接并离开通知组"""
-        if self.user_id:
-            await manager.group_discard(
-                f"notifications_user_{self.user_id}",
-                self.websocket
-            )
+        for group_name in self.groups:
+            await manager.group_discard(group_name, self.websocket)
+        self.groups = []
         await super().disconnect(close_code)
     
     async def handle_message(self, data: Dict[str, Any]):
@@ -16,20 +16,26 @@ from typing import Dict, Any, Optional
 
 from fastapi import WebSocket
 
-from app.config import settings
+from core.redis_monitor.api import get_project_collector, get_redis_config
+from core.redis_monitor.redis_collector import AsyncRedisInfoCollector
 from core.websocket.consumers.base import TokenAuthWebSocketConsumer, manager
+from core.websocket.monitor_hub import monitor_hub
 
 logger = logging.getLogger(__name__)
 
 
 class RedisMonitorConsumer(TokenAuthWebSocketConsumer):
     """Redis监控WebSocket消费者"""
-    
+
+    # 项目Redis的连接标识
+    CONNECTION_ID = 'project_redis'
+
     def __init__(self, websocket: WebSocket):
         super().__init__(websocket)
-        self.monitor_task: Optional[asyncio.Task] = None
         self.is_monitoring = False
-        self.monitor_interval = 2  # 固定2秒更新一次
+        self.monitor_interval = 2  # 默认2秒更新一次
+        self.monitor_delta = False  # 增量推送模式
+        self.monitor_target = f"redis:{self.CONNECTION_ID}"
     
     async def connect(self):
         """连接并开始监控"""
@@ -43,13 +49,9 @@ class RedisMonitorConsumer(TokenAuthWebSocketConsumer):
     
     async def disconnect(self, close_code: int = 1000):
         """断开连接并停止监控"""
-        self.is_monitoring = False
-        if self.monitor_task:
-            self.monitor_task.cancel()
-            try:
-                await self.monitor_task
-            except asyncio.CancelledError:
-                pass
+        if self.is_monitoring:
+            self.is_monitoring = False
+            await monitor_hub.unsubscribe(self.monitor_target, self.websocket)
         
         if self.user_id:
             await manager.group_discard(
@@ -63,9 +65,11 @@ class RedisMonitorConsumer(TokenAuthWebSocketConsumer):
         message_type = data.get('type', 'unknown')
         
         if message_type == 'start_monitor':
-            await self.start_monitoring()
+            await self.start_monitoring(data.get('interval'), data.get('delta', False))
         elif message_type == 'stop_monitor':
             await self.stop_monitoring()
+        elif message_type == 'resync':
+            await self.resync_monitoring()
         elif message_type == 'get_overview':
             await self.send_redis_overview()
         elif message_type == 'get_realtime':
@@ -75,96 +79,69 @@ class RedisMonitorConsumer(TokenAuthWebSocketConsumer):
         else:
             await self.send_error(f'未知的Redis监控命令: {message_type}')
     
-    async def start_monitoring(self):
-        """开始监控"""
+    async def start_monitoring(self, interval: Optional[float] = None, delta: bool = False):
+        """开始监控，订阅共享的Redis采样任务"""
         if self.is_monitoring:
             await self.send_message('monitor_status', 'Redis监控已在运行')
             return
         
+        if interval:
+            try:
+                self.monitor_interval = monitor_hub.normalize_interval(interval)
+            except ValueError as e:
+                await self.send_error(str(e))
+                return
+        self.monitor_delta = bool(delta)
+        await monitor_hub.subscribe(
+            self.monitor_target,
+            self.websocket,
+            self.collect_realtime_stats,
+            'redis_realtime',
+            'Redis实时统计',
+            self.monitor_interval,
+            delta=self.monitor_delta
+        )
         self.is_monitoring = True
-        self.monitor_task = asyncio.create_task(self.monitor_loop())
         await self.send_message('monitor_started', f'开始Redis监控，间隔{self.monitor_interval}秒')
     
     async def stop_monitoring(self):
         """停止监控"""
-        self.is_monitoring = False
-        if self.monitor_task:
-            self.monitor_task.cancel()
-            try:
-                await self.monitor_task
-            except asyncio.CancelledError:
-                pass
-            self.monitor_task = None
+        if self.is_monitoring:
+            self.is_monitoring = False
+            await monitor_hub.unsubscribe(self.monitor_target, self.websocket)
         await self.send_message('monitor_stopped', 'Redis监控已停止')
     
+    async def resync_monitoring(self):
+        """增量模式下请求重新同步，下次推送完整快照"""
+        if not self.is_monitoring or not monitor_hub.resync(self.monitor_target, self.websocket):
+            await self.send_error('未开始监控')
+    
     async def restart_monitoring(self):
         """重启监控"""
         await self.stop_monitoring()
         await asyncio.sleep(0.1)  # 短暂延迟
-        await self.start_monitoring()
-    
-    async def monitor_loop(self):
-        """监控循环"""
-        try:
-            while self.is_monitoring:
-                try:
-                    await self.send_realtime_stats()
-                except Exception as e:
-                    logger.error(f"发送Redis实时数据失败: {str(e)}")
-                    # 发送错误消息但不停止监控循环
-                    try:
-                        await self.send_error(f'获取Redis监控数据失败: {str(e)}')
-                    except:
-                        pass
-                
-                # 等待下一次监控间隔
-                await asyncio.sleep(self.monitor_interval)
-        except asyncio.CancelledError:
-            logger.info("Redis监控循环被取消")
-        except Exception as e:
-            logger.error(f"Redis监控循环严重错误: {str(e)}")
-            self.is_monitoring = False
+        await self.start_monitoring(delta=self.monitor_delta)
     
-    def _get_redis_collector(self):
-        """获取Redis信息收集器"""
-        try:
-            from core.redis_monitor import RedisInfoCollector
-            
-            # 从配置中获取Redis配置
-            redis_host = settings.REDIS_HOST
-            redis_port = settings.REDIS_PORT
-            redis_password = settings.REDIS_PASSWORD or None
-            redis_db = settings.REDIS_DB
-            
-            if redis_password == '':
-                redis_password = None
-            
-            return RedisInfoCollector(
-                host=redis_host,
-                port=redis_port,
-                password=redis_password,
-                db=redis_db
-            )
-        except ImportError:
-            logger.warning("RedisInfoCollector not available")
-            return None
+    async def collect_realtime_stats(self) -> Dict[str, Any]:
+        """采集Redis实时统计（使用常驻采集器）"""
+        collector = await get_project_collector()
+        return await collector.get_realtime_stats(self.CONNECTION_ID)
+
+    def _get_redis_collector(self) -> AsyncRedisInfoCollector:
+        """获取一次性Redis信息收集器（用于连接测试）"""
+        redis_host, redis_port, redis_password, redis_db = get_redis_config()
+        return AsyncRedisInfoCollector(
+            host=redis_host,
+            port=redis_port,
+            password=redis_password,
+            db=redis_db
+        )
     
     async def send_redis_overview(self):
         """发送Redis概览信息"""
         try:
-            collector = self._get_redis_collector()
-            if collector is None:
-                await self.send_error('Redis监控模块未安装')
-                return
-            
-            # 在线程池中执行同步方法
-            loop = asyncio.get_event_loop()
-            overview_data = await loop.run_in_executor(
-                None, 
-                collector.get_all_info, 
-                'project_redis', 
-                '项目Redis'
-            )
+            collector = await get_project_collector()
+            overview_data = await collector.get_all_info(self.CONNECTION_ID, '项目Redis')
             
             await self.send_message('redis_overview', 'Redis概览信息', overview_data)
         except Exception as e:
@@ -174,18 +151,7 @@ class RedisMonitorConsumer(TokenAuthWebSocketConsumer):
     async def send_realtime_stats(self):
         """发送Redis实时统计信息"""
         try:
-            collector = self._get_redis_collector()
-            if collector is None:
-                await self.send_error('Redis监控模块未安装')
-                return
-            
-            # 在线程池中执行同步方法
-            loop = asyncio.get_event_loop()
-            realtime_data = await loop.run_in_executor(
-                None,
-                collector.get_realtime_stats,
-                'project_redis'
-            )
+            realtime_data = await self.collect_realtime_stats()
             
             await self.send_message('redis_realtime', 'Redis实时统计', realtime_data)
         except Exception as e:
@@ -196,13 +162,7 @@ class RedisMonitorConsumer(TokenAuthWebSocketConsumer):
         """测试Redis连接"""
         try:
             collector = self._get_redis_collector()
-            if collector is None:
-                await self.send_error('Redis监控模块未安装')
-                return
-            
-            # 在线程池中执行同步方法
-            loop = asyncio.get_event_loop()
-            test_result = await loop.run_in_executor(None, collector.test_connection)
+            test_result = await collector.test_connection()
             
             await self.send_message('connection_test', 'Redis连接测试结果', test_result)
         except Exception as e:
@@ -17,30 +17,31 @@ from typing import Dict, Any, Optional
 from fastapi import WebSocket
 
 from core.websocket.consumers.base import TokenAuthWebSocketConsumer, manager
+from core.websocket.monitor_hub import monitor_hub
 
 logger = logging.getLogger(__name__)
 
 
 class ServerMonitorConsumer(TokenAuthWebSocketConsumer):
     """服务器监控WebSocket消费者"""
-    
+
+    # 监控采集中心中的目标标识
+    MONITOR_TARGET = 'server'
+
     def __init__(self, websocket: WebSocket):
         super().__init__(websocket)
-        self.monitor_task: Optional[asyncio.Task] = None
         self.is_monitoring = False
-        self.monitor_interval = 2  # 固定2秒更新一次
-        # 创建持久的收集器实例以保持缓存数据
-        self.server_collector = None
+        self.monitor_interval = 2  # 默认2秒更新一次
+        self.monitor_delta = False  # 增量推送模式
     
     def _get_server_collector(self):
-        """懒加载服务器信息收集器"""
-        if self.server_collector is None:
-            try:
-                from core.server_monitor.server_info import ServerInfoCollector
-                self.server_collector = ServerInfoCollector()
-            except ImportError:
-                logger.warning("ServerInfoCollector not available")
-        return self.server_collector
+        """获取服务器信息收集器（与HTTP接口共用同一实例以保持缓存数据）"""
+        try:
+            from core.server_monitor.api import server_collector
+            return server_collector
+        except ImportError:
+            logger.warning("ServerInfoCollector not available")
+            return None
     
     async def connect(self):
         """连接并开始监控"""
@@ -54,13 +55,9 @@ class ServerMonitorConsumer(TokenAuthWebSocketConsumer):
     
     async def disconnect(self, close_code: int = 1000):
         """断开连接并停止监控"""
-        self.is_monitoring = False
-        if self.monitor_task:
-            self.monitor_task.cancel()
-            try:
-                await self.monitor_task
-            except asyncio.CancelledError:
-                pass
+        if self.is_monitoring:
+            self.is_monitoring = False
+            await monitor_hub.unsubscribe(self.MONITOR_TARGET, self.websocket)
         
         if self.user_id:
             await manager.group_discard(
@@ -74,9 +71,11 @@ class ServerMonitorConsumer(TokenAuthWebSocketConsumer):
         message_type = data.get('type', 'unknown')
         
         if message_type == 'start_monitor':
-            await self.start_monitoring()
+            await self.start_monitoring(data.get('interval'), data.get('delta', False))
         elif message_type == 'stop_monitor':
             await self.stop_monitoring()
+        elif message_type == 'resync':
+            await self.resync_monitoring()
         elif message_type == 'get_overview':
             await self.send_server_overview()
         elif message_type == 'get_realtime':
@@ -84,55 +83,56 @@ class ServerMonitorConsumer(TokenAuthWebSocketConsumer):
         else:
             await self.send_error(f'未知的监控命令: {message_type}')
     
-    async def start_monitoring(self):
-        """开始监控"""
+    async def collect_realtime_stats(self) -> Dict[str, Any]:
+        """采集实时统计信息（由监控采集中心调用）"""
+        collector = self._get_server_collector()
+        if collector is None:
+            raise RuntimeError('服务器监控模块未安装')
+        # 在线程池中执行同步方法
+        return await asyncio.to_thread(collector.get_realtime_stats)
+    
+    async def start_monitoring(self, interval: Optional[float] = None, delta: bool = False):
+        """开始监控，订阅共享的服务器采样任务"""
         if self.is_monitoring:
             await self.send_message('monitor_status', '监控已在运行')
             return
         
+        if interval:
+            try:
+                self.monitor_interval = monitor_hub.normalize_interval(interval)
+            except ValueError as e:
+                await self.send_error(str(e))
+                return
+        self.monitor_delta = bool(delta)
+        await monitor_hub.subscribe(
+            self.MONITOR_TARGET,
+            self.websocket,
+            self.collect_realtime_stats,
+            'realtime_stats',
+            '实时统计信息',
+            self.monitor_interval,
+            delta=self.monitor_delta
+        )
         self.is_monitoring = True
-        self.monitor_task = asyncio.create_task(self.monitor_loop())
         await self.send_message('monitor_started', f'开始监控，间隔{self.monitor_interval}秒')
     
     async def stop_monitoring(self):
         """停止监控"""
-        self.is_monitoring = False
-        if self.monitor_task:
-            self.monitor_task.cancel()
-            try:
-                await self.monitor_task
-            except asyncio.CancelledError:
-                pass
-            self.monitor_task = None
+        if self.is_monitoring:
+            self.is_monitoring = False
+            await monitor_hub.unsubscribe(self.MONITOR_TARGET, self.websocket)
         await self.send_message('monitor_stopped', '监控已停止')
     
+    async def resync_monitoring(self):
+        """增量模式下请求重新同步，下次推送完整快照"""
+        if not self.is_monitoring or not monitor_hub.resync(self.MONITOR_TARGET, self.websocket):
+            await self.send_error('未开始监控')
+    
     async def restart_monitoring(self):
         """重启监控"""
         await self.stop_monitoring()
         await asyncio.sleep(0.1)  # 短暂延迟
-        await self.start_monitoring()
-    
-    async def monitor_loop(self):
-        """监控循环"""
-        try:
-            while self.is_monitoring:
-                try:
-                    await self.send_realtime_stats()
-                except Exception as e:
-                    logger.error(f"发送实时数据失败: {str(e)}")
-                    # 发送错误消息但不停止监控循环
-                    try:
-                        await self.send_error(f'获取监控数据失败: {str(e)}')
-                    except:
-                        pass
-                
-                # 等待下一次监控间隔
-                await asyncio.sleep(self.monitor_interval)
-        except asyncio.CancelledError:
-            logger.info("监控循环被取消")
-        except Exception as e:
-            logger.error(f"监控循环严重错误: {str(e)}")
-            self.is_monitoring = False
+        await self.start_monitoring(delta=self.monitor_delta)
     
     async def send_server_overview(self):
         """发送服务器概览信息"""
@@ -143,8 +143,7 @@ class ServerMonitorConsumer(TokenAuthWebSocketConsumer):
                 return
             
             # 在线程池中执行同步方法
-            loop = asyncio.get_event_loop()
-            overview_data = await loop.run_in_executor(None, collector.get_all_info)
+            overview_data = await asyncio.to_thread(collector.get_all_info)
             
             await self.send_message('server_overview', '服务器概览信息', overview_data)
         except Exception as e:
@@ -154,15 +153,7 @@ class ServerMonitorConsumer(TokenAuthWebSocketConsumer):
     async def send_realtime_stats(self):
         """发送实时统计信息"""
         try:
-            collector = self._get_server_collector()
-            if collector is None:
-                await self.send_error('服务器监控模块未安装')
-                return
-            
-            # 在线程池中执行同步方法
-            loop = asyncio.get_event_loop()
-            realtime_data = await loop.run_in_executor(None, collector.get_realtime_stats)
-            
+            realtime_data = await self.collect_realtime_stats()
             await self.send_message('realtime_stats', '实时统计信息', realtime_data)
         except Exception as e:
             logger.error(f"获取实时统计失败: {str(e)}")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author: 臧成龙
+@Contact: 939589097@qq.com
+@Time: 2025-12-31
+@File: delta.py
+@Desc: 监控数据增量编码 - 生成/应用JSON Patch风格的差异
+"""
+"""
+监控数据增量编码
+diff 比较两次采样结果，只输出变化的字段，格式参照 JSON Patch (RFC 6902)：
+    {"op": "replace", "path": "/cpu_percent", "value": 12.5}
+    {"op": "add", "path": "/disk_partitions/3", "value": {...}}
+    {"op": "remove", "path": "/network_interfaces/eth1"}
+路径按 JSON Pointer (RFC 6901) 转义。长度变化的数组整体替换，避免逐项移位。
+"""
+from typing import Any, Dict, List
+
+Patch = List[Dict[str, Any]]
+
+
+def escape_pointer(token: Any) -> str:
+    """JSON Pointer 路径片段转义"""
+    return str(token).replace('~', '~0').replace('/', '~1')
+
+
+def unescape_pointer(token: str) -> str:
+    """JSON Pointer 路径片段反转义"""
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def diff(old: Any, new: Any) -> Patch:
+    """
+    生成从 old 到 new 的差异
+
+    Args:
+        old: 上一次的数据
+        new: 本次的数据
+
+    Returns:
+        操作列表，数据未变化时为空列表
+    """
+    patch: Patch = []
+    _diff(old, new, '', patch)
+    return patch
+
+
+def _diff(old: Any, new: Any, path: str, patch: Patch):
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, value in new.items():
+            child = f"{path}/{escape_pointer(key)}"
+            if key in old:
+                _diff(old[key], value, child, patch)
+            else:
+                patch.append({'op': 'add', 'path': child, 'value': value})
+        for key in old:
+            if key not in new:
+                patch.append({'op': 'remove', 'path': f"{path}/{escape_pointer(key)}"})
+    elif isinstance(old, (list, tuple)) and isinstance(new, (list, tuple)) and len(old) == len(new):
+        for index, (old_item, new_item) in enumerate(zip(old, new)):
+            _diff(old_item, new_item, f"{path}/{index}", patch)
+    # 类型不同时（如 1 与 True、1 与 1.0）也视为变化，保证客户端还原后类型一致
+    elif type(old) is not type(new) or old != new:
+        patch.append({'op': 'replace', 'path': path, 'value': new})
+
+
+def apply_patch(document: Any, patch: Patch) -> Any:
+    """
+    将差异应用到数据上（原地修改，根路径替换时返回新值）
+
+    Args:
+        document: 上一次的数据
+        patch: diff 生成的操作列表
+
+    Returns:
+        应用后的数据
+    """
+    for operation in patch:
+        path = operation['path']
+        if path == '':
+            document = operation['value']
+            continue
+
+        tokens = [unescape_pointer(token) for token in path.split('/')[1:]]
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+
+        last = tokens[-1]
+        if isinstance(parent, list):
+            last = int(last)
+        if operation['op'] == 'remove':
+            del parent[last]
+        elif isinstance(parent, list) and operation['op'] == 'add':
+            parent.insert(last, operation['value'])
+        else:
+            parent[last] = operation['value']
+    return document
@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author: 臧成龙
+@Contact: 939589097@qq.com
+@Time: 2025-12-31
+@File: monitor_hub.py
+@Desc: 监控采集中心 - 每个监控目标只运行一个采样任务，结果广播给所有订阅者
+"""
+"""
+监控采集中心
+每个监控目标（如 server、redis:project_redis、db:zq_platform）只运行一个采样任务，
+采样间隔取所有订阅者请求的最小值，最后一个订阅者离开后自动停止。采集开销与目标数量相关，与查看人数无关。
+
+订阅者可选择增量模式（delta=True）：首次收到完整快照，之后只收到变化字段，
+    快照: {type, message, mode: 'snapshot', seq, data, timestamp}
+    增量: {type, message, mode: 'delta', seq, base_seq, patch, timestamp}
+客户端发现 base_seq 与本地 seq 不一致时发送 resync 重新获取快照。
+每次采样的快照、增量消息各只序列化一次，再发送给对应的订阅者。
+"""
+import asyncio
+import json
+import logging
+import math
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import WebSocket
+
+from core.websocket.consumers.base import manager
+from core.websocket.delta import diff
+
+logger = logging.getLogger(__name__)
+
+CollectFunc = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+class MonitorTarget:
+    """监控目标"""
+
+    def __init__(self, key: str, collect: CollectFunc, message_type: str, message: str):
+        self.key = key
+        self.collect = collect
+        self.message_type = message_type
+        self.message = message
+        self.group_name = f"monitor:{key}"
+        # 订阅者选项：{websocket: {interval, delta, synced}}
+        self.subscribers: Dict[WebSocket, Dict[str, Any]] = {}
+        self.task: Optional[asyncio.Task] = None
+        # 上一次采样结果及序号，用于生成增量
+        self.last_data: Optional[Dict[str, Any]] = None
+        self.seq = 0
+
+    @property
+    def interval(self) -> Optional[float]:
+        """各订阅者请求的最小采样间隔，没有订阅者时为 None"""
+        return min((options['interval'] for options in self.subscribers.values()), default=None)
+
+    async def publish(self, data: Dict[str, Any]):
+        """将一次采样结果发送给所有订阅者"""
+        self.seq += 1
+        timestamp = datetime.now().isoformat()
+
+        full, patched = [], []
+        for websocket, options in list(self.subscribers.items()):
+            if not manager.is_connected(websocket):
+                # 慢连接被断开或发送失败，不再向其推送
+                self.subscribers.pop(websocket, None)
+                continue
+            if options['delta'] and options['synced'] and self.last_data is not None:
+                patched.append(websocket)
+            else:
+                full.append(websocket)
+                options['synced'] = True
+
+        if full:
+            # 普通订阅者与需要快照的增量订阅者共用同一条完整消息
+            await manager.send_text(full, json.dumps({
+                'type': self.message_type,
+                'message': self.message,
+                'mode': 'snapshot',
+                'seq': self.seq,
+                'data': data,
+                'timestamp': timestamp
+            }))
+        if patched:
+            await manager.send_text(patched, json.dumps({
+                'type': self.message_type,
+                'message': self.message,
+                'mode': 'delta',
+                'seq': self.seq,
+                'base_seq': self.seq - 1,
+                'patch': diff(self.last_data, data),
+                'timestamp': timestamp
+            }))
+        self.last_data = data
+
+    async def run(self):
+        """采样循环"""
+        try:
+            while self.subscribers:
+                try:
+                    await self.publish(await self.collect())
+                except Exception as e:
+                    logger.error(f"监控目标 {self.key} 采集失败: {str(e)}")
+                    await manager.broadcast_to_group(self.group_name, {
+                        'type': 'error',
+                        'message': f'获取监控数据失败: {str(e)}',
+                        'timestamp': datetime.now().isoformat()
+                    }, local=True)
+
+                if not self.subscribers:
+                    break
+                # 等待下一次采样间隔
+                await asyncio.sleep(self.interval)
+        except asyncio.CancelledError:
+            logger.info(f"监控目标 {self.key} 采样任务已停止")
+        except Exception as e:
+            logger.error(f"监控目标 {self.key} 采样任务严重错误: {str(e)}")
+
+
+class MonitorHub:
+    """监控采集中心"""
+
+    # 最小采样间隔（秒）
+    MIN_INTERVAL = 1.0
+
+    def __init__(self):
+        self.targets: Dict[str, MonitorTarget] = {}
+
+    @classmethod
+    def normalize_interval(cls, interval: Any) -> float:
+        """
+        校验订阅者请求的采样间隔，不小于 MIN_INTERVAL
+
+        Raises:
+            ValueError: 不是有效的数字
+        """
+        try:
+            value = float(interval)
+        except (TypeError, ValueError):
+            raise ValueError(f"无效的监控间隔: {interval}")
+        if not math.isfinite(value):
+            raise ValueError(f"无效的监控间隔: {interval}")
+        return max(value, cls.MIN_INTERVAL)
+
+    async def subscribe(
+            self,
+            key: str,
+            websocket: WebSocket,
+            collect: CollectFunc,
+            message_type: str,
+            message: str,
+            interval: float = 2,
+            delta: bool = False
+    ):
+        """
+        订阅监控目标
+
+        Args:
+            key: 目标标识，如 server、redis:project_redis、db:zq_platform
+            websocket: 订阅者连接
+            collect: 采集函数，仅在目标首次创建时使用
+            message_type: 广播消息类型
+            message: 广播消息说明
+            interval: 订阅者请求的采样间隔（秒）
+            delta: 增量模式，首次发送快照，之后只发送变化字段
+
+        Raises:
+            ValueError: 采样间隔无效（此时不会订阅）
+        """
+        interval = self.normalize_interval(interval)
+        target = self.targets.get(key)
+        if target is None:
+            target = MonitorTarget(key, collect, message_type, message)
+            self.targets[key] = target
+
+        target.subscribers[websocket] = {
+            'interval': interval,
+            'delta': bool(delta),
+            'synced': False,
+        }
+        await manager.group_add(target.group_name, websocket)
+
+        if target.task is None or target.task.done():
+            target.task = asyncio.create_task(target.run())
+            logger.info(f"监控目标 {key} 采样任务已启动")
+
+    async def unsubscribe(self, key: str, websocket: WebSocket):
+        """
+        取消订阅，最后一个订阅者离开时停止采样任务
+
+        Args:
+            key: 目标标识
+            websocket: 订阅者连接
+        """
+        target = self.targets.get(key)
+        if target is None:
+            return
+
+        target.subscribers.pop(websocket, None)
+        task = None
+        if not target.subscribers:
+            # 先取消采样任务再等待，避免任务在订阅者为空时继续执行
+            del self.targets[key]
+            if target.task and not target.task.done():
+                task = target.task
+                task.cancel()
+
+        await manager.group_discard(target.group_name, websocket)
+        if task is not None:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def resync(self, key: str, websocket: WebSocket) -> bool:
+        """
+        增量订阅者请求重新同步，下次采样时发送完整快照
+
+        Returns:
+            是否已订阅该目标
+        """
+        target = self.targets.get(key)
+        if target is None or websocket not in target.subscribers:
+            return False
+        target.subscribers[websocket]['synced'] = False
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取采集中心状态"""
+        return {
+            key: {
+                'subscribers': len(target.subscribers),
+                'delta_subscribers': sum(1 for options in target.subscribers.values() if options['delta']),
+                'interval': target.interval,
+                'running': bool(target.task and not target.task.done()),
+            }
+            for key, target in self.targets.items()
+        }
+
+
+# 全局监控采集中心实例
+monitor_hub = MonitorHub()
@@ -18,6 +18,15 @@ from zq_demo.router import router as zq_demo_router
 from core.router import router as core_router
 from scheduler.router import router as scheduler_router
 from core.websocket.router import router as websocket_router
+from core.server_monitor.api import server_collector
+from core.redis_monitor.api import record_redis_history
+from core.database_monitor.api import record_database_history
+from core.redis_manager.jobs import job_manager
+from core.message.delivery import delivery_manager
+from utils.collector_registry import collector_registry
+from core.websocket.backplane import backplane
+from utils.http_client import http_clients
+from utils.metrics_history import history_recorder, metrics_history
 from utils.auth_middleware import AuthMiddleware
 
 # 全局OAuth2方案，用于Swagger显示小锁图标
@@ -28,9 +37,26 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/core/auth/login/oauth2",
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     # 启动时
+    # 创建共享HTTP客户端（API数据源、OAuth等外部请求复用连接池）
+    await http_clients.start()
+
+    # 启动WebSocket跨进程消息通道（多worker部署时通知可以送达其他进程上的连接）
+    if settings.WS_BACKPLANE_ENABLED:
+        await backplane.start()
+    
+    # 启动监控历史采集（服务器指标由后台采样线程写入）
+    if settings.MONITOR_HISTORY_ENABLED:
+        server_collector.sampler.start()
+        history_recorder.register(record_redis_history)
+        history_recorder.register(record_database_history)
+        history_recorder.start(settings.MONITOR_HISTORY_INTERVAL)
+    
     # 启动定时任务调度器 (APScheduler 4.x)
-    if getattr(settings, 'ENABLE_SCHEDULER', True):
+    if settings.ENABLE_SCHEDULER:
         from apscheduler import AsyncScheduler
+        from scheduler.accounting import run_accounting
+        from scheduler.coordinator import coordinator
+        from scheduler.executors import job_runner
         from scheduler.service import scheduler_service
         
         scheduler = AsyncScheduler()
@@ -39,6 +65,9 @@ async def lifespan(app: FastAPI):
             scheduler_service.set_scheduler(scheduler)
             app.state.scheduler = scheduler
             
+            # 多worker协调：每个触发时间只执行一次，同步其他worker的任务变更
+            await coordinator.start(scheduler_service.handle_sync_message)
+            
             # 加载数据库中的任务
             await scheduler_service.load_jobs_from_db()
             
@@ -46,9 +75,23 @@ async def lifespan(app: FastAPI):
             
             # 关闭时
             scheduler_service.set_running(False)
+            await coordinator.stop()
+        # 调度器停止后写入缓冲中的执行日志和执行计数
+        await run_accounting.stop()
+        # 关闭任务执行线程池
+        job_runner.shutdown()
     else:
         yield
     
+    # 取消本进程内运行中的后台任务，保存最终状态并释放运行锁
+    await job_manager.shutdown()
+    await delivery_manager.shutdown()
+    await history_recorder.stop()
+    await collector_registry.close()
+    server_collector.close()
+    metrics_history.close()
+    await backplane.stop()
+    await http_clients.close()
     await RedisClient.close()
 
 app = FastAPI(
@@ -89,5 +132,7 @@ if __name__ == "__main__":
         "main:app",
         host=settings.APP_HOST,
         port=settings.APP_PORT,
-        reload=settings.DEBUG
+        reload=settings.DEBUG,
+        ws="websockets",
+        ws_per_message_deflate=settings.WS_PER_MESSAGE_DEFLATE
     )
@@ -0,0 +1,402 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author: 臧成龙
+@Contact: 939589097@qq.com
+@Time: 2025-12-31
+@File: accounting.py
+@Desc: Scheduler Accounting - 任务执行记录 - 批量写入执行日志、原子更新执行计数、滚动统计执行耗时分位数
+"""
+"""
+Scheduler Accounting - 任务执行记录
+- 执行结果先放入内存缓冲，每隔 SCHEDULER_LOG_FLUSH_INTERVAL 秒（或缓冲达到 SCHEDULER_LOG_BATCH_SIZE 条）
+  在一个事务中写入：执行日志为多行INSERT，执行计数按任务合并为 UPDATE ... SET x = x + n，不再逐次查询任务再保存
+- 写入失败时缓冲保留到下次重试，超过上限的部分丢弃并记录错误
+- 执行耗时按任务记入对数分桶直方图，窗口 SCHEDULER_DURATION_WINDOW 秒分为 12 段滚动；
+  启用调度协调时各worker在写入时把增量合并到Redis，查询时汇总所有worker，否则只统计本进程
+"""
+import asyncio
+import logging
+import math
+import os
+import socket
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, select, update
+
+from app.base_model import generate_nanoid
+from app.config import settings
+from scheduler.coordinator import coordinator
+from utils.redis import RedisClient
+
+logger = logging.getLogger(__name__)
+
+# 直方图分桶：第 i 个桶的上界为 DURATION_MIN * DURATION_GROWTH^i（相邻桶相差约 19%）
+DURATION_MIN = 0.001
+DURATION_GROWTH = 2 ** 0.25
+DURATION_BUCKETS = 100
+WINDOW_SLOTS = 12
+
+# 写入失败时最多保留的缓冲条数（批大小的倍数）
+MAX_PENDING_BATCHES = 10
+
+
+def bucket_of(duration: float) -> int:
+    """耗时所在的桶"""
+    if duration <= DURATION_MIN:
+        return 0
+    index = math.ceil(math.log(duration / DURATION_MIN, DURATION_GROWTH))
+    return min(index, DURATION_BUCKETS - 1)
+
+
+def bucket_bounds(index: int) -> Tuple[float, float]:
+    """桶的下界、上界（秒）"""
+    upper = DURATION_MIN * DURATION_GROWTH ** index
+    return (0.0 if index == 0 else upper / DURATION_GROWTH), upper
+
+
+def percentile(buckets: Dict[int, int], q: float) -> Optional[float]:
+    """按分桶计数估算分位数，在桶内线性插值"""
+    total = sum(buckets.values())
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for index in sorted(buckets):
+        count = buckets[index]
+        if seen + count >= rank:
+            lower, upper = bucket_bounds(index)
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+    return bucket_bounds(max(buckets))[1]
+
+
+def _merge_into(
+        merged: Dict[str, Dict[str, Any]],
+        counts: Dict[int, Dict[str, Dict[int, int]]],
+        sums: Dict[int, Dict[str, float]],
+        slots: Optional[range] = None,
+):
+    """把按时间段存放的分桶计数、耗时合计汇总到 {任务编码: {'buckets', 'sum'}}"""
+    for slot, jobs in counts.items():
+        if slots is not None and slot not in slots:
+            continue
+        for job_code, buckets in jobs.items():
+            item = merged.setdefault(job_code, {'buckets': {}, 'sum': 0.0})
+            for bucket, count in buckets.items():
+                item['buckets'][bucket] = item['buckets'].get(bucket, 0) + count
+            item['sum'] += sums.get(slot, {}).get(job_code, 0.0)
+
+
+class DurationHistogram:
+    """按任务分桶的滚动耗时直方图"""
+
+    def __init__(self, window: int, slots: int = WINDOW_SLOTS):
+        self.slot_seconds = window / slots
+        self.slots = slots
+        # {时间段: {任务编码: {桶: 次数}}}、{时间段: {任务编码: 耗时合计}}
+        self._counts: Dict[int, Dict[str, Dict[int, int]]] = {}
+        self._sums: Dict[int, Dict[str, float]] = {}
+        # 尚未合并到Redis的增量，结构相同
+        self._pending_counts: Dict[int, Dict[str, Dict[int, int]]] = {}
+        self._pending_sums: Dict[int, Dict[str, float]] = {}
+
+    def current_slot(self, now: Optional[float] = None) -> int:
+        return int((now or time.time()) // self.slot_seconds)
+
+    def observe(self, job_code: str, duration: float):
+        slot = self.current_slot()
+        bucket = bucket_of(duration)
+        for counts, sums in ((self._counts, self._sums), (self._pending_counts, self._pending_sums)):
+            job_counts = counts.setdefault(slot, {}).setdefault(job_code, {})
+            job_counts[bucket] = job_counts.get(bucket, 0) + 1
+            job_sums = sums.setdefault(slot, {})
+            job_sums[job_code] = job_sums.get(job_code, 0.0) + duration
+        self._prune(slot)
+
+    def _prune(self, slot: int):
+        for expired in [s for s in self._counts if s <= slot - self.slots]:
+            del self._counts[expired]
+            self._sums.pop(expired, None)
+
+    def take_pending(self) -> Tuple[Dict[int, Dict[str, Dict[int, int]]], Dict[int, Dict[str, float]]]:
+        """取出尚未合并到Redis的增量"""
+        pending = self._pending_counts, self._pending_sums
+        self._pending_counts, self._pending_sums = {}, {}
+        return pending
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """汇总窗口内本进程的数据：{任务编码: {'buckets': {桶: 次数}, 'sum': 耗时合计}}"""
+        self._prune(self.current_slot())
+        merged: Dict[str, Dict[str, Any]] = {}
+        _merge_into(merged, self._counts, self._sums)
+        return merged
+
+    def merge_pending(self, merged: Dict[str, Dict[str, Any]], slots: range):
+        """把尚未合并到Redis的增量加到 merged"""
+        _merge_into(merged, self._pending_counts, self._pending_sums, slots)
+
+
+class RunAccounting:
+    """任务执行记录：批量写入执行日志和执行计数，统计执行耗时"""
+
+    def __init__(self):
+        self.flush_interval = settings.SCHEDULER_LOG_FLUSH_INTERVAL
+        self.batch_size = settings.SCHEDULER_LOG_BATCH_SIZE
+        self.histogram = DurationHistogram(settings.SCHEDULER_DURATION_WINDOW)
+        self.duration_prefix = f"{settings.CACHE_PREFIX}scheduler:durations:"
+        self.hostname = socket.gethostname()
+        self._rows: List[Dict[str, Any]] = []
+        # {任务编码: {'total', 'success', 'failure', 'last_run_time', 'last_run_status', 'last_run_result'}}
+        self._counters: Dict[str, Dict[str, Any]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        # 统计
+        self.recorded = 0
+        self.written = 0
+        self.flushes = 0
+        self.errors = 0
+        self.dropped = 0
+
+    def record(
+            self,
+            job_code: str,
+            status: str,
+            start_time: datetime,
+            end_time: Optional[datetime] = None,
+            result: Any = None,
+            exception_info: Optional[BaseException] = None,
+            exception_traceback: Optional[str] = None,
+            retry_count: int = 0,
+    ):
+        """
+        记录一次执行（不等待写入数据库）
+
+        跳过的执行只写日志，不计入执行次数和耗时
+        """
+        end_time = end_time or datetime.now()
+        duration = (end_time - start_time).total_seconds()
+        result_text = str(result) if result else None
+        exception_text = str(exception_info) if exception_info else None
+
+        self._rows.append({
+            'job_code': job_code,
+            'status': status,
+            'start_time': start_time,
+            'end_time': end_time,
+            'duration': duration,
+            'result': result_text,
+            'exception': exception_text,
+            'traceback': exception_traceback,
+            'hostname': self.hostname,
+            'process_id': os.getpid(),
+            'retry_count': retry_count,
+        })
+        self.recorded += 1
+
+        if status != 'skipped':
+            counter = self._counters.setdefault(job_code, {'total': 0, 'success': 0, 'failure': 0})
+            counter['total'] += 1
+            counter['success' if status == 'success' else 'failure'] += 1
+            counter['last_run_time'] = end_time
+            counter['last_run_status'] = status
+            counter['last_run_result'] = result_text if status == 'success' else exception_text
+            self.histogram.observe(job_code, duration)
+
+        if len(self._rows) >= self.batch_size:
+            self._start_flush(0)
+        else:
+            self._start_flush(self.flush_interval)
+
+    def _start_flush(self, delay: float):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush(delay))
+        elif delay == 0:
+            # 缓冲已满：已安排的刷新可能还在等待，另起一次立即刷新
+            asyncio.create_task(self.flush())
+
+    async def _delayed_flush(self, delay: float):
+        if delay:
+            await asyncio.sleep(delay)
+        await self.flush()
+
+    async def flush(self):
+        """写入缓冲中的执行日志和执行计数，并把耗时增量合并到Redis"""
+        async with self._flush_lock:
+            rows, counters = self._rows, self._counters
+            self._rows, self._counters = [], {}
+            if rows:
+                try:
+                    await self._write(rows, counters)
+                    self.written += len(rows)
+                    self.flushes += 1
+                except Exception as e:
+                    self.errors += 1
+                    self._requeue(rows, counters)
+                    logger.error(f"写入任务执行日志失败，{len(rows)} 条保留到下次写入: {str(e)}")
+            await self._merge_durations()
+
+    async def _write(self, rows: List[Dict[str, Any]], counters: Dict[str, Dict[str, Any]]):
+        from app.database import AsyncSessionLocal
+        from scheduler.model import SchedulerJob, SchedulerLog
+
+        async with AsyncSessionLocal() as db:
+            # 每批只查询一次任务ID和名称（同一编码有已删除的旧任务时以未删除的为准）
+            result = await db.execute(
+                select(SchedulerJob.code, SchedulerJob.id, SchedulerJob.name).where(
+                    SchedulerJob.code.in_({row['job_code'] for row in rows})
+                ).order_by(SchedulerJob.is_deleted.desc())
+            )
+            jobs = {code: (job_id, name) for code, job_id, name in result.all()}
+
+            now = datetime.now()
+            log_rows = [
+                {
+                    **row,
+                    'id': generate_nanoid(),
+                    'job_id': jobs[row['job_code']][0],
+                    'job_name': jobs[row['job_code']][1],
+                    'sort': 0,
+                    'is_deleted': False,
+                    'sys_create_datetime': now,
+                    'sys_update_datetime': now,
+                }
+                for row in rows if row['job_code'] in jobs
+            ]
+            for i in range(0, len(log_rows), self.batch_size):
+                await db.execute(insert(SchedulerLog.__table__).values(log_rows[i:i + self.batch_size]))
+
+            # 计数在数据库中原子累加，多worker同时写入不会丢失
+            for job_code, counter in counters.items():
+                if job_code not in jobs:
+                    continue
+                await db.execute(
+                    update(SchedulerJob).where(SchedulerJob.id == jobs[job_code][0]).values(
+                        total_run_count=SchedulerJob.total_run_count + counter['total'],
+                        success_count=SchedulerJob.success_count + counter['success'],
+                        failure_count=SchedulerJob.failure_count + counter['failure'],
+                        last_run_time=counter['last_run_time'],
+                        last_run_status=counter['last_run_status'],
+                        last_run_result=counter['last_run_result'],
+                    )
+                )
+            await db.commit()
+
+    def _requeue(self, rows: List[Dict[str, Any]], counters: Dict[str, Dict[str, Any]]):
+        """写入失败的数据放回缓冲（在新记录之前），超过上限时丢弃最早的日志"""
+        self._rows = rows + self._rows
+        limit = self.batch_size * MAX_PENDING_BATCHES
+        if len(self._rows) > limit:
+            self.dropped += len(self._rows) - limit
+            logger.error(f"任务执行日志缓冲超过 {limit} 条，丢弃最早的 {len(self._rows) - limit} 条")
+            self._rows = self._rows[-limit:]
+
+        for job_code, counter in counters.items():
+            current = self._counters.get(job_code)
+            if current is None:
+                self._counters[job_code] = counter
+                continue
+            for key in ('total', 'success', 'failure'):
+                current[key] += counter[key]
+        self._start_flush(self.flush_interval)
+
+    async def _merge_durations(self):
+        """把本进程的耗时增量合并到Redis（未启用调度协调时只保留在本进程）"""
+        counts, sums = self.histogram.take_pending()
+        if not counts or not coordinator.running:
+            return
+        ttl = int(self.histogram.slot_seconds * (self.histogram.slots + 1))
+        try:
+            client = await RedisClient.get_client()
+            pipe = client.pipeline(transaction=False)
+            for slot, jobs in counts.items():
+                key = f"{self.duration_prefix}{slot}"
+                for job_code, buckets in jobs.items():
+                    for bucket, count in buckets.items():
+                        pipe.hincrby(key, f"{job_code}|{bucket}", count)
+                    pipe.hincrbyfloat(key, f"{job_code}|sum", sums[slot][job_code])
+                pipe.expire(key, ttl)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"合并任务执行耗时到Redis失败: {str(e)}")
+
+    async def stop(self):
+        """写入剩余的缓冲"""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        await self.flush()
+
+    async def get_durations(self, job_code: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        统计窗口内各任务的执行耗时
+
+        Returns:
+            [{job_code, count, avg, p50, p95, p99}]，耗时单位为秒
+        """
+        merged = None
+        if coordinator.running:
+            merged = await self._load_durations()
+        if merged is None:
+            merged = self.histogram.snapshot()
+
+        items = []
+        for code, data in sorted(merged.items()):
+            if job_code and code != job_code:
+                continue
+            count = sum(data['buckets'].values())
+            if not count:
+                continue
+            items.append({
+                'job_code': code,
+                'count': count,
+                'avg': data['sum'] / count,
+                'p50': percentile(data['buckets'], 0.5),
+                'p95': percentile(data['buckets'], 0.95),
+                'p99': percentile(data['buckets'], 0.99),
+            })
+        return items
+
+    async def _load_durations(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """从Redis汇总所有worker窗口内的数据（包含本进程尚未合并的增量），失败时返回 None"""
+        current = self.histogram.current_slot()
+        slots = range(current - self.histogram.slots + 1, current + 1)
+        try:
+            client = await RedisClient.get_client()
+            pipe = client.pipeline(transaction=False)
+            for slot in slots:
+                pipe.hgetall(f"{self.duration_prefix}{slot}")
+            results = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"读取任务执行耗时失败，只统计本进程: {str(e)}")
+            return None
+
+        merged: Dict[str, Dict[str, Any]] = {}
+        for fields in results:
+            for field, value in fields.items():
+                code, _, name = field.rpartition('|')
+                item = merged.setdefault(code, {'buckets': {}, 'sum': 0.0})
+                if name == 'sum':
+                    item['sum'] += float(value)
+                else:
+                    item['buckets'][int(name)] = item['buckets'].get(int(name), 0) + int(value)
+
+        self.histogram.merge_pending(merged, slots)
+        return merged
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取写入状态"""
+        return {
+            'pending': len(self._rows),
+            'recorded': self.recorded,
+            'written': self.written,
+            'flushes': self.flushes,
+            'errors': self.errors,
+            'dropped': self.dropped,
+        }
+
+
+# 全局任务执行记录
+run_accounting = RunAccounting()
@@ -15,7 +15,7 @@ from datetime import datetime, timedelta
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select, func, or_
+from sqlalchemy import and_, case, select, func, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
@@ -34,6 +34,7 @@ from scheduler.schema import (
     SchedulerJobExecuteIn,
     SchedulerJobExecuteOut,
     SchedulerJobStatisticsOut,
+    SchedulerJobDurationOut,
     SchedulerJobSearchRequest,
     SchedulerLogResponse,
     SchedulerLogBatchDeleteIn,
@@ -42,6 +43,9 @@ from scheduler.schema import (
     SchedulerLogCleanOut,
     SchedulerStatusOut,
 )
+from scheduler.accounting import run_accounting
+from scheduler.coordinator import coordinator
+from scheduler.executors import check_executor, job_runner
 from scheduler.service import scheduler_service
 
 router = APIRouter(prefix="/scheduler", tags=["定时任务管理"])
@@ -63,6 +67,7 @@ def _build_job_response(job: SchedulerJob) -> SchedulerJobResponse:
         task_func=job.task_func,
         task_args=job.task_args,
         task_kwargs=job.task_kwargs,
+        executor=job.executor or 'async',
         status=job.status,
         status_display=job.get_status_display(),
         priority=job.priority,
@@ -269,10 +274,10 @@ async def execute_scheduler_job(
     if not job:
         raise HTTPException(status_code=404, detail="任务不存在")
 
-    if not scheduler_service.is_running():
+    if not scheduler_service.is_running() and not settings.SCHEDULER_DISTRIBUTED:
         raise HTTPException(status_code=400, detail="调度器未运行")
 
-    # 立即执行任务
+    # 立即执行任务（本进程未运行调度器时发给其他worker执行）
     success = await scheduler_service.run_job_now(job.code)
 
     if success:
@@ -328,52 +333,28 @@ async def search_scheduler_jobs(
 
 @router.get("/job/statistics/data", response_model=SchedulerJobStatisticsOut, summary="获取任务统计信息")
 async def get_scheduler_job_statistics(db: AsyncSession = Depends(get_db)):
-    """获取任务统计信息"""
-    # 任务统计
-    total_result = await db.execute(
-        select(func.count(SchedulerJob.id)).where(SchedulerJob.is_deleted == False)  # noqa: E712
-    )
-    total_jobs = total_result.scalar() or 0
+    """获取任务统计信息（执行次数取自任务的执行计数，不扫描执行日志）"""
+    active = SchedulerJob.is_deleted == False  # noqa: E712
 
-    enabled_result = await db.execute(
-        select(func.count(SchedulerJob.id)).where(
-            SchedulerJob.is_deleted == False,  # noqa: E712
-            SchedulerJob.status == 1
-        )
-    )
-    enabled_jobs = enabled_result.scalar() or 0
+    def count_where(*conditions):
+        return func.coalesce(func.sum(case((and_(*conditions), 1), else_=0)), 0)
 
-    disabled_result = await db.execute(
-        select(func.count(SchedulerJob.id)).where(
-            SchedulerJob.is_deleted == False,  # noqa: E712
-            SchedulerJob.status == 0
-        )
-    )
-    disabled_jobs = disabled_result.scalar() or 0
-
-    paused_result = await db.execute(
-        select(func.count(SchedulerJob.id)).where(
-            SchedulerJob.is_deleted == False,  # noqa: E712
-            SchedulerJob.status == 2
+    result = await db.execute(
+        select(
+            count_where(active),
+            count_where(active, SchedulerJob.status == 1),
+            count_where(active, SchedulerJob.status == 0),
+            count_where(active, SchedulerJob.status == 2),
+            # 已删除任务的执行次数也计入
+            func.coalesce(func.sum(SchedulerJob.total_run_count), 0),
+            func.coalesce(func.sum(SchedulerJob.success_count), 0),
+            func.coalesce(func.sum(SchedulerJob.failure_count), 0),
         )
     )
-    paused_jobs = paused_result.scalar() or 0
-
-    # 执行统计
-    total_exec_result = await db.execute(
-        select(func.count(SchedulerLog.id))
-    )
-    total_executions = total_exec_result.scalar() or 0
-
-    success_exec_result = await db.execute(
-        select(func.count(SchedulerLog.id)).where(SchedulerLog.status == 'success')
-    )
-    success_executions = success_exec_result.scalar() or 0
-
-    failed_exec_result = await db.execute(
-        select(func.count(SchedulerLog.id)).where(SchedulerLog.status == 'failed')
-    )
-    failed_executions = failed_exec_result.scalar() or 0
+    (
+        total_jobs, enabled_jobs, disabled_jobs, paused_jobs,
+        total_executions, success_executions, failed_executions,
+    ) = (int(value) for value in result.one())
 
     # 计算成功率
     success_rate = round(success_executions / total_executions * 100, 2) if total_executions > 0 else 0
@@ -390,6 +371,14 @@ async def get_scheduler_job_statistics(db: AsyncSession = Depends(get_db)):
     )
 
 
+@router.get("/job/statistics/duration", response_model=List[SchedulerJobDurationOut], summary="获取任务执行耗时分位数")
+async def get_scheduler_job_duration(
+        job_code: Optional[str] = Query(None, description="任务编码，为空时返回所有任务"),
+):
+    """获取最近统计窗口内各任务的执行耗时分位数（跳过的执行不计入）"""
+    return await run_accounting.get_durations(job_code)
+
+
 @router.get("/job/{job_id}", response_model=SchedulerJobResponse, summary="获取定时任务详情")
 async def get_scheduler_job(job_id: str, db: AsyncSession = Depends(get_db)):
     """获取单个定时任务的详细信息"""
@@ -433,6 +422,13 @@ async def update_scheduler_job(
 
     # 更新字段
     update_data = data.model_dump(exclude_unset=True)
+    try:
+        check_executor(
+            update_data.get('executor', job.executor),
+            update_data.get('task_func', job.task_func),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     for key, value in update_data.items():
         setattr(job, key, value)
 
@@ -671,4 +667,7 @@ async def get_scheduler_status():
         is_running=is_running,
         job_count=len(jobs),
         jobs=jobs,
+        coordinator=coordinator.get_stats(),
+        executors=job_runner.get_stats(),
+        accounting=run_accounting.get_stats(),
     )
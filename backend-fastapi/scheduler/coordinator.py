@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author: 臧成龙
+@Contact: 939589097@qq.com
+@Time: 2025-12-31
+@File: coordinator.py
+@Desc: Scheduler Coordinator - 多worker调度协调 - 基于Redis执行锁保证每个触发时间只执行一次，通过发布订阅同步任务变更
+"""
+"""
+Scheduler Coordinator - 多worker调度协调
+每个worker都运行自己的调度器并在相同的触发时间触发，执行前按 (任务编码, 触发时间) 抢占Redis执行锁：
+- SET NX 成功的worker执行，其他worker跳过，因此每个触发时间只执行一次
+- 触发时间由触发器计算，各worker一致（间隔任务的起点按间隔对齐，不取各自的启动时间）
+- 新增、修改、删除、暂停、恢复任务后发布到Redis频道，其他worker同步本地调度
+- 立即执行的请求也通过频道发给调度worker，由抢到锁的一个worker执行
+- 不允许并发的任务按Redis中的名额集合限制同时执行的实例数，跨worker生效
+- Redis不可用时（包括启动时）跳过执行，不重复执行，订阅在后台持续重连；
+  SCHEDULER_LOCAL_FALLBACK 开启时改为在本worker执行
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.config import settings
+from utils.redis import RedisClient
+
+logger = logging.getLogger(__name__)
+
+# 清除过期名额后，未满时占用一个名额：KEYS[1]=名额集合，ARGV=当前时间、过期时间、上限、令牌、键过期秒数
+_ACQUIRE_SLOT_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[3]) then
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[4])
+    redis.call('EXPIRE', KEYS[1], ARGV[5])
+    return 1
+end
+return 0
+"""
+
+
+class SchedulerCoordinator:
+    """基于Redis的调度协调器"""
+
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.channel = f"{settings.CACHE_PREFIX}scheduler:sync"
+        self.lock_prefix = f"{settings.CACHE_PREFIX}scheduler:run:"
+        self.slot_prefix = f"{settings.CACHE_PREFIX}scheduler:slots:"
+        self.lock_ttl = settings.SCHEDULER_RUN_LOCK_TTL
+        self.running = False
+        self._handler: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+        self._task: Optional[asyncio.Task] = None
+        # 统计
+        self.acquired = 0
+        self.skipped = 0
+        self.lock_errors = 0
+        self.published = 0
+        self.received = 0
+
+    @staticmethod
+    def fire_time_key(fire_time: datetime) -> str:
+        """触发时间转为执行锁的键（UTC秒级时间戳，与时区无关）"""
+        return str(int(fire_time.timestamp()))
+
+    async def start(self, handler: Callable[[Dict[str, Any]], Awaitable[None]]):
+        """
+        启用调度协调并订阅任务变更频道
+
+        Redis暂不可用时同样启用：订阅在后台重连，恢复前按 acquire_run 的规则跳过执行
+
+        Args:
+            handler: 收到其他worker发布的消息时调用
+        """
+        if not settings.SCHEDULER_DISTRIBUTED:
+            return
+        try:
+            client = await RedisClient.get_client()
+            await client.ping()
+        except Exception as e:
+            if settings.SCHEDULER_LOCAL_FALLBACK:
+                logger.warning(f"调度协调的Redis不可用，恢复前任务在本worker执行，多worker部署时会重复执行: {e}")
+            else:
+                logger.error(f"调度协调的Redis不可用，恢复前跳过所有定时执行: {e}")
+
+        self._handler = handler
+        self.running = True
+        self._task = asyncio.create_task(self._listen())
+        logger.info(f"调度协调已启动: {self.worker_id}")
+
+    async def stop(self):
+        """停止订阅"""
+        if not self.running:
+            return
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def acquire_run(self, job_code: str, run_key: str) -> bool:
+        """
+        抢占一次执行
+
+        Args:
+            job_code: 任务编码
+            run_key: 执行标识，定时触发为 fire_time_key(触发时间)，立即执行为请求ID
+
+        Returns:
+            本worker是否应执行；未启用协调时总是返回 True，
+            Redis出错时返回 False（开启 SCHEDULER_LOCAL_FALLBACK 时返回 True）
+        """
+        if not self.running:
+            return True
+        try:
+            client = await RedisClient.get_client()
+            acquired = await client.set(
+                f"{self.lock_prefix}{job_code}:{run_key}", self.worker_id, nx=True, ex=self.lock_ttl
+            )
+        except Exception as e:
+            self.lock_errors += 1
+            if settings.SCHEDULER_LOCAL_FALLBACK:
+                logger.warning(f"任务 {job_code} 抢占执行锁失败，在本worker执行: {e}")
+                return True
+            logger.error(f"任务 {job_code} 抢占执行锁失败，跳过本次执行: {e}")
+            return False
+
+        if acquired:
+            self.acquired += 1
+            return True
+        self.skipped += 1
+        return False
+
+    async def acquire_slot(self, job_code: str, token: str, limit: int, ttl: float) -> Optional[bool]:
+        """
+        跨worker占用任务的一个执行实例名额
+
+        Args:
+            token: 本次执行的唯一标识，释放时使用
+            limit: 同时执行的实例数上限
+            ttl: 名额最长占用时间（秒），worker异常退出时过期释放
+
+        Returns:
+            是否占用成功；未启用协调或Redis出错时返回 None，由调用方在本进程内计数
+        """
+        if not self.running:
+            return None
+        now = time.time()
+        try:
+            client = await RedisClient.get_client()
+            acquired = await client.eval(
+                _ACQUIRE_SLOT_SCRIPT, 1, f"{self.slot_prefix}{job_code}",
+                now, now + ttl, limit, token, int(ttl) + 1,
+            )
+            return bool(acquired)
+        except Exception as e:
+            logger.warning(f"任务 {job_code} 占用执行名额失败，改为本进程计数: {e}")
+            return None
+
+    async def release_slot(self, job_code: str, token: str):
+        """释放执行实例名额"""
+        try:
+            client = await RedisClient.get_client()
+            await client.zrem(f"{self.slot_prefix}{job_code}", token)
+        except Exception as e:
+            logger.warning(f"任务 {job_code} 释放执行名额失败，将在过期后释放: {e}")
+
+    async def publish(self, action: str, job_code: str, **extra) -> int:
+        """
+        发布任务变更或立即执行请求
+
+        Returns:
+            收到消息的worker数量（包括本进程），未启用或发布失败时返回 0
+        """
+        if not settings.SCHEDULER_DISTRIBUTED:
+            return 0
+        try:
+            client = await RedisClient.get_client()
+            receivers = await client.publish(self.channel, json.dumps({
+                'origin': self.worker_id,
+                'action': action,
+                'job_code': job_code,
+                **extra,
+            }))
+            self.published += 1
+            return receivers
+        except Exception as e:
+            logger.error(f"发布任务变更失败 {action} {job_code}: {e}")
+            return 0
+
+    async def _listen(self):
+        """订阅频道并处理其他worker发布的消息，断线后重连"""
+        while True:
+            pubsub = None
+            try:
+                client = await RedisClient.get_client()
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message.get('type') != 'message':
+                        continue
+                    try:
+                        payload = json.loads(message['data'])
+                        if payload.get('origin') == self.worker_id:
+                            continue
+                        self.received += 1
+                        await self._handler(payload)
+                    except Exception as e:
+                        logger.error(f"处理任务变更消息失败: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"调度协调订阅中断，1秒后重连: {e}")
+                await asyncio.sleep(1)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取协调状态"""
+        return {
+            'worker_id': self.worker_id,
+            'running': self.running,
+            'acquired': self.acquired,
+            'skipped': self.skipped,
+            'lock_errors': self.lock_errors,
+            'published': self.published,
+            'received': self.received,
+        }
+
+
+# 全局调度协调器
+coordinator = SchedulerCoordinator()
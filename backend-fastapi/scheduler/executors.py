@@ -0,0 +1,343 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author: 臧成龙
+@Contact: 939589097@qq.com
+@Time: 2025-12-31
+@File: executors.py
+@Desc: Scheduler Executors - 任务执行器 - 按任务配置在事件循环、线程池或独立进程中执行，支持超时、重试退避和并发限制
+"""
+"""
+Scheduler Executors - 任务执行器
+- async：在事件循环中执行协程任务；同步函数自动改用线程池，避免阻塞事件循环
+- thread：在线程池中执行同步函数；协程任务不能使用（线程内的新事件循环无法复用应用的数据库和Redis连接），
+  创建和修改任务时拒绝，已有配置改在事件循环中执行
+- process：每次执行启动独立进程（spawn），超时时终止进程；同时运行的进程数受限
+- 超时后取消执行（线程无法强制终止，只停止等待；线程在任务结束后才归还，
+  期间仍计入运行中的线程数，并继续占用任务的执行实例名额，超时后也不再重试）
+- 失败或超时后按指数退避（full jitter）重试
+- 同一任务同时执行的实例数受限（allow_concurrent 为否时为 1，否则为 max_instances），已满时跳过本次；
+  启用调度协调时通过Redis跨worker计数，否则在本进程内计数
+- 每个分组在本进程内同时执行的任务数受限，超过时排队等待
+"""
+import asyncio
+import inspect
+import logging
+import multiprocessing
+import random
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from app.config import settings
+from scheduler.coordinator import coordinator
+
+logger = logging.getLogger(__name__)
+
+EXECUTORS = ('async', 'thread', 'process')
+
+
+@dataclass
+class JobOptions:
+    """任务执行选项（取自 SchedulerJob）"""
+    executor: str = 'async'
+    group: str = 'default'
+    timeout: Optional[int] = None
+    max_retries: int = 0
+    max_instances: int = 1
+    allow_concurrent: bool = False
+
+    @classmethod
+    def from_job(cls, job_obj) -> 'JobOptions':
+        return cls(
+            executor=getattr(job_obj, 'executor', None) or 'async',
+            group=getattr(job_obj, 'group', None) or 'default',
+            timeout=getattr(job_obj, 'timeout', None),
+            max_retries=getattr(job_obj, 'max_retries', None) or 0,
+            max_instances=getattr(job_obj, 'max_instances', None) or 1,
+            allow_concurrent=bool(getattr(job_obj, 'allow_concurrent', False)),
+        )
+
+    @property
+    def concurrency(self) -> int:
+        """同一任务同时执行的实例数上限"""
+        return max(1, self.max_instances) if self.allow_concurrent else 1
+
+
+@dataclass
+class InstanceSlot:
+    """任务的一个执行实例名额，布尔值为是否占用成功"""
+    acquired: bool
+    # 超时后仍在线程池中执行的调用，名额在其结束后才释放
+    lingering: List[asyncio.Future] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return self.acquired
+
+
+def is_coroutine_task(task_path: str) -> bool:
+    """任务函数是否为协程函数，无法导入时返回 False（由执行时报错）"""
+    try:
+        module_path, func_name = task_path.rsplit('.', 1)
+        module = __import__(module_path, fromlist=[func_name])
+        return inspect.iscoroutinefunction(getattr(module, func_name))
+    except Exception:
+        return False
+
+
+def check_executor(executor: Optional[str], task_path: Optional[str]):
+    """
+    检查执行器与任务函数是否匹配
+
+    Raises:
+        ValueError: 协程任务配置了 thread 执行器
+    """
+    if executor == 'thread' and task_path and is_coroutine_task(task_path):
+        raise ValueError('协程任务函数不能使用 thread 执行器，请使用 async 或 process')
+
+
+def _call(func: Callable, args: List[Any], kwargs: Dict[str, Any]) -> Any:
+    """在线程或子进程中调用任务函数，子进程中的协程函数使用独立的事件循环"""
+    if inspect.iscoroutinefunction(func):
+        return asyncio.run(func(*args, **kwargs))
+    return func(*args, **kwargs)
+
+
+def run_in_process(task_path: str, args: List[Any], kwargs: Dict[str, Any]) -> Any:
+    """子进程入口：按路径导入任务函数并执行（只传路径，避免序列化函数对象）"""
+    module_path, func_name = task_path.rsplit('.', 1)
+    module = __import__(module_path, fromlist=[func_name])
+    return _call(getattr(module, func_name), args, kwargs)
+
+
+class JobRunner:
+    """任务执行器"""
+
+    def __init__(self):
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_slots: Optional[asyncio.Semaphore] = None
+        self._group_slots: Dict[str, asyncio.Semaphore] = {}
+        self._group_running: Dict[str, int] = {}
+        # 本进程内各任务正在执行的实例数（未启用调度协调时使用）
+        self._instances: Dict[str, int] = {}
+        # 超时后仍在执行的线程调用，以及等待其结束后释放名额的任务
+        self._lingering: Set[asyncio.Future] = set()
+        self._pending_releases: Set[asyncio.Task] = set()
+        # 统计
+        self.running: Dict[str, int] = {'async': 0, 'thread': 0, 'process': 0}
+        self.timeouts = 0
+        self.retries = 0
+        self.terminated = 0
+
+    @property
+    def thread_pool(self) -> ThreadPoolExecutor:
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=settings.SCHEDULER_THREAD_POOL_SIZE, thread_name_prefix='scheduler'
+            )
+        return self._thread_pool
+
+    @staticmethod
+    def group_limit(group: str) -> int:
+        """分组在本进程内同时执行的任务数上限"""
+        return settings.SCHEDULER_GROUP_CONCURRENCY.get(group, settings.SCHEDULER_GROUP_MAX_CONCURRENCY)
+
+    @asynccontextmanager
+    async def group_slot(self, group: str):
+        """占用分组的一个执行名额，已满时等待"""
+        slots = self._group_slots.get(group)
+        if slots is None:
+            slots = self._group_slots[group] = asyncio.Semaphore(max(1, self.group_limit(group)))
+        async with slots:
+            self._group_running[group] = self._group_running.get(group, 0) + 1
+            try:
+                yield
+            finally:
+                self._group_running[group] -= 1
+
+    @asynccontextmanager
+    async def instance_slot(self, job_code: str, options: JobOptions):
+        """
+        占用任务的一个执行实例
+
+        Yields:
+            InstanceSlot，已达到实例数上限时为假；执行时传给 run，
+            线程超时后名额在线程结束时才释放
+        """
+        token = uuid.uuid4().hex
+        # 执行可能持续的最长时间，worker异常退出时名额在此之后释放
+        ttl = (options.timeout or settings.SCHEDULER_RUN_LOCK_TTL) * (options.max_retries + 1) \
+            + settings.SCHEDULER_RETRY_MAX_BACKOFF * options.max_retries
+        acquired = await coordinator.acquire_slot(job_code, token, options.concurrency, ttl)
+        local = acquired is None
+        if local:
+            acquired = self._instances.get(job_code, 0) < options.concurrency
+            if acquired:
+                self._instances[job_code] = self._instances.get(job_code, 0) + 1
+        slot = InstanceSlot(acquired)
+        try:
+            yield slot
+        finally:
+            if acquired and slot.lingering:
+                task = asyncio.create_task(self._release_after(slot.lingering, job_code, token, local))
+                self._pending_releases.add(task)
+                task.add_done_callback(self._pending_releases.discard)
+            elif acquired:
+                await self._release_instance(job_code, token, local)
+
+    async def _release_instance(self, job_code: str, token: str, local: bool):
+        if local:
+            self._instances[job_code] -= 1
+            if not self._instances[job_code]:
+                del self._instances[job_code]
+        else:
+            await coordinator.release_slot(job_code, token)
+
+    async def _release_after(self, futures: List[asyncio.Future], job_code: str, token: str, local: bool):
+        """超时的线程结束后释放执行实例名额"""
+        await asyncio.wait(futures)
+        await self._release_instance(job_code, token, local)
+
+    @staticmethod
+    def backoff(attempt: int) -> float:
+        """full jitter：在 [0, min(上限, 基数*2^attempt)] 内随机"""
+        return random.uniform(
+            0, min(settings.SCHEDULER_RETRY_MAX_BACKOFF, settings.SCHEDULER_RETRY_BACKOFF * (2 ** attempt))
+        )
+
+    async def run(
+            self,
+            task_func: Callable,
+            task_path: str,
+            args: List[Any],
+            kwargs: Dict[str, Any],
+            options: JobOptions,
+            slot: Optional[InstanceSlot] = None,
+    ) -> Any:
+        """
+        执行一次任务
+
+        Args:
+            slot: instance_slot 占用的名额，线程超时后由其保持到线程结束
+
+        Raises:
+            TimeoutError: 超过 options.timeout 秒未完成
+        """
+        executor = options.executor
+        if executor == 'async' and not inspect.iscoroutinefunction(task_func):
+            executor = 'thread'
+        elif executor == 'thread' and inspect.iscoroutinefunction(task_func):
+            logger.warning(f"协程任务 {task_path} 不能在线程池中执行，改在事件循环中执行")
+            executor = 'async'
+
+        if executor == 'thread':
+            return await self._run_thread(task_func, args, kwargs, options.timeout, slot)
+
+        self.running[executor] += 1
+        try:
+            if executor == 'process':
+                return await self._run_process(task_path, args, kwargs, options.timeout)
+            try:
+                return await asyncio.wait_for(task_func(*args, **kwargs), options.timeout)
+            except TimeoutError:
+                self.timeouts += 1
+                raise
+        finally:
+            self.running[executor] -= 1
+
+    async def _run_thread(
+            self,
+            task_func: Callable,
+            args: List[Any],
+            kwargs: Dict[str, Any],
+            timeout: Optional[int],
+            slot: Optional[InstanceSlot],
+    ) -> Any:
+        """在线程池中执行，超时或取消时未开始的调用直接取消，已开始的在结束前一直计入运行中"""
+        concurrent_future = self.thread_pool.submit(_call, task_func, args, kwargs)
+        future = asyncio.wrap_future(concurrent_future)
+        self.running['thread'] += 1
+        future.add_done_callback(self._thread_done)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            if not future.done() and not concurrent_future.cancel():
+                self._lingering.add(future)
+                if slot is not None:
+                    slot.lingering.append(future)
+
+    def _thread_done(self, future: asyncio.Future):
+        self.running['thread'] -= 1
+        self._lingering.discard(future)
+        if not future.cancelled():
+            # 超时后不再等待的调用，取出异常避免未获取的异常告警
+            future.exception()
+
+    async def _run_process(
+            self,
+            task_path: str,
+            args: List[Any],
+            kwargs: Dict[str, Any],
+            timeout: Optional[int],
+    ) -> Any:
+        """在独立进程中执行，超时时终止进程"""
+        if self._process_slots is None:
+            self._process_slots = asyncio.Semaphore(settings.SCHEDULER_PROCESS_POOL_SIZE)
+
+        async with self._process_slots:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+
+            def resolve(value):
+                if not future.done():
+                    future.set_result(value)
+
+            def reject(error):
+                if not future.done():
+                    future.set_exception(error)
+
+            pool = multiprocessing.get_context('spawn').Pool(processes=1)
+            try:
+                pool.apply_async(
+                    run_in_process, (task_path, args, kwargs),
+                    callback=lambda value: loop.call_soon_threadsafe(resolve, value),
+                    error_callback=lambda error: loop.call_soon_threadsafe(reject, error),
+                )
+                try:
+                    return await asyncio.wait_for(future, timeout)
+                except TimeoutError:
+                    self.timeouts += 1
+                    self.terminated += 1
+                    raise
+            finally:
+                # 正常结束时进程已空闲，超时时进程仍在执行，两种情况都直接终止
+                await asyncio.to_thread(pool.terminate)
+
+    def shutdown(self):
+        """关闭线程池（不等待正在执行的任务）"""
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取执行器状态"""
+        return {
+            'running': dict(self.running),
+            'lingering_threads': len(self._lingering),
+            'timeouts': self.timeouts,
+            'retries': self.retries,
+            'terminated': self.terminated,
+            'groups': {
+                group: {'limit': self.group_limit(group), 'running': self._group_running.get(group, 0)}
+                for group in self._group_slots
+            },
+        }
+
+
+# 全局任务执行器
+job_runner = JobRunner()
@@ -37,6 +37,13 @@ class SchedulerJob(BaseModel):
         'date': '指定时间',
     }
     
+    # 执行器选择
+    EXECUTOR_CHOICES = {
+        'async': '事件循环',
+        'thread': '线程池',
+        'process': '独立进程',
+    }
+    
     # 任务状态选择
     STATUS_CHOICES = {
         0: '禁用',
@@ -77,6 +84,9 @@ class SchedulerJob(BaseModel):
     # 任务关键字参数（JSON格式）
     task_kwargs = Column(Text, nullable=True, comment="任务关键字参数（JSON对象格式）")
     
+    # 执行器（async-事件循环，thread-线程池，process-独立进程）
+    executor = Column(String(20), default='async', comment="执行器（async-事件循环，thread-线程池，process-独立进程）")
+    
     # 任务状态
     status = Column(Integer, default=0, index=True, comment="任务状态（0-禁用，1-启用，2-暂停）")
     
@@ -13,7 +13,9 @@ Scheduler Schema - 定时任务数据验证和序列化
 from datetime import datetime
 from typing import Optional, List
 
-from pydantic import BaseModel, ConfigDict, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+
+from scheduler.executors import check_executor
 
 
 # ==================== SchedulerJob Schemas ====================
@@ -31,6 +33,7 @@ class SchedulerJobBase(BaseModel):
     task_func: str = Field(..., max_length=256, description="任务函数路径")
     task_args: Optional[str] = Field(None, description="任务位置参数（JSON）")
     task_kwargs: Optional[str] = Field(None, description="任务关键字参数（JSON）")
+    executor: str = Field(default="async", description="执行器：async-事件循环，thread-线程池，process-独立进程")
     status: int = Field(default=0, description="任务状态：0-禁用，1-启用，2-暂停")
     priority: int = Field(default=0, description="任务优先级")
     max_instances: int = Field(default=1, ge=1, description="最大实例数")
@@ -57,6 +60,14 @@ class SchedulerJobBase(BaseModel):
             raise ValueError('状态必须是 0（禁用）、1（启用）或 2（暂停）')
         return v
     
+    @field_validator('executor')
+    @classmethod
+    def validate_executor(cls, v):
+        """验证执行器"""
+        if v not in ['async', 'thread', 'process']:
+            raise ValueError('执行器必须是 async、thread 或 process')
+        return v
+    
     @field_validator('code')
     @classmethod
     def validate_code(cls, v):
@@ -67,6 +78,12 @@ class SchedulerJobBase(BaseModel):
             raise ValueError('任务编码只能包含字母、数字和下划线')
         return v
 
+    @model_validator(mode='after')
+    def validate_task_executor(self):
+        """协程任务不能使用 thread 执行器"""
+        check_executor(self.executor, self.task_func)
+        return self
+
 
 class SchedulerJobCreate(SchedulerJobBase):
     """定时任务创建Schema"""
@@ -109,6 +126,7 @@ class SchedulerJobUpdate(BaseModel):
     task_func: Optional[str] = Field(None, max_length=256, description="任务函数路径")
     task_args: Optional[str] = Field(None, description="任务位置参数（JSON）")
     task_kwargs: Optional[str] = Field(None, description="任务关键字参数（JSON）")
+    executor: Optional[str] = Field(None, description="执行器：async-事件循环，thread-线程池，process-独立进程")
     status: Optional[int] = Field(None, description="任务状态")
     priority: Optional[int] = Field(None, description="任务优先级")
     max_instances: Optional[int] = Field(None, ge=1, description="最大实例数")
@@ -118,6 +136,14 @@ class SchedulerJobUpdate(BaseModel):
     allow_concurrent: Optional[bool] = Field(None, description="是否允许并发执行")
     remark: Optional[str] = Field(None, description="备注信息")
     sort: Optional[int] = Field(None, description="排序")
+    
+    @field_validator('executor')
+    @classmethod
+    def validate_executor(cls, v):
+        """验证执行器"""
+        if v is not None and v not in ['async', 'thread', 'process']:
+            raise ValueError('执行器必须是 async、thread 或 process')
+        return v
 
 
 class SchedulerJobResponse(BaseModel):
@@ -135,6 +161,7 @@ class SchedulerJobResponse(BaseModel):
     task_func: str
     task_args: Optional[str] = None
     task_kwargs: Optional[str] = None
+    executor: str = 'async'
     status: int
     status_display: Optional[str] = None
     priority: int
@@ -216,6 +243,16 @@ class SchedulerJobStatisticsOut(BaseModel):
     success_rate: float = Field(..., description="成功率")
 
 
+class SchedulerJobDurationOut(BaseModel):
+    """任务执行耗时分位数输出"""
+    job_code: str = Field(..., description="任务编码")
+    count: int = Field(..., description="统计窗口内的执行次数")
+    avg: Optional[float] = Field(None, description="平均耗时（秒）")
+    p50: Optional[float] = Field(None, description="耗时中位数（秒）")
+    p95: Optional[float] = Field(None, description="95分位耗时（秒）")
+    p99: Optional[float] = Field(None, description="99分位耗时（秒）")
+
+
 class SchedulerJobSearchRequest(BaseModel):
     """搜索任务请求"""
     keyword: str = Field(..., description="搜索关键词")
@@ -273,3 +310,6 @@ class SchedulerStatusOut(BaseModel):
     is_running: bool = Field(..., description="是否运行中")
     job_count: int = Field(..., description="任务数量")
     jobs: List[dict] = Field(default=[], description="任务列表")
+    coordinator: Optional[dict] = Field(default=None, description="多worker协调状态")
+    executors: Optional[dict] = Field(default=None, description="执行器状态")
+    accounting: Optional[dict] = Field(default=None, description="执行记录写入状态")
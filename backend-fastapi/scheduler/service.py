@@ -11,19 +11,23 @@
 Scheduler Service - APScheduler 4.x 调度服务
 基于 APScheduler 4.x 实现的定时任务调度核心服务
 """
+import asyncio
 import json
 import logging
-import os
-import socket
-from datetime import datetime
+import traceback
+import uuid
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any, List
 
-from apscheduler import AsyncScheduler
+from apscheduler import AsyncScheduler, current_job
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.date import DateTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 
 from app.config import settings
+from scheduler.coordinator import coordinator
+from scheduler.accounting import run_accounting
+from scheduler.executors import JobOptions, job_runner
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -41,11 +45,14 @@ class SchedulerService:
     3. 自动从数据库加载任务
     4. 通过事件订阅监听任务执行
     5. 自动更新任务状态和记录日志
+    6. 多worker部署时通过 coordinator 保证每个触发时间只执行一次，并同步任务变更
     """
 
     _instance = None
     _scheduler: Optional[AsyncScheduler] = None
     _running: bool = False
+    # 其他worker请求的立即执行任务
+    _run_tasks: set = set()
 
     def __new__(cls):
         """单例模式"""
@@ -97,7 +104,7 @@ class SchedulerService:
 
                 for job in jobs:
                     try:
-                        success = await self.add_job(job)
+                        success = await self._add_schedule(job)
                         if success:
                             logger.info(f"加载任务成功: {job.code}")
                         else:
@@ -132,10 +139,32 @@ class SchedulerService:
 
     async def _cleanup_expired_jobs_wrapper(self):
         """清理过期任务的包装函数"""
+        if not await self._acquire_scheduled_run('_scheduler_cleanup'):
+            return
         await self.cleanup_expired_jobs(days=7)
 
+    async def _acquire_scheduled_run(self, job_code: str) -> bool:
+        """按 (任务编码, 触发时间) 抢占本次执行，其他worker已执行时返回 False"""
+        try:
+            job = current_job.get()
+        except LookupError:
+            return True
+        if job.scheduled_fire_time is None:
+            return True
+        if await coordinator.acquire_run(job_code, coordinator.fire_time_key(job.scheduled_fire_time)):
+            return True
+        logger.debug(f"任务 {job_code} 触发时间 {job.scheduled_fire_time} 已由其他worker执行，跳过")
+        return False
+
     async def add_job(self, job_obj) -> bool:
-        """添加任务到调度器"""
+        """添加任务到调度器，并通知其他worker"""
+        success = await self._add_schedule(job_obj)
+        if success:
+            await coordinator.publish('add', job_obj.code)
+        return success
+
+    async def _add_schedule(self, job_obj) -> bool:
+        """添加任务到本进程的调度器"""
         if not self._scheduler:
             logger.error("调度器未初始化")
             return False
@@ -159,7 +188,7 @@ class SchedulerService:
             kwargs['job_code'] = job_obj.code
 
             # 创建带日志记录的包装函数
-            wrapper_func = self._create_job_wrapper(task_func, job_obj.code, args, kwargs)
+            wrapper_func = self._create_job_wrapper(task_func, job_obj, args, kwargs)
 
             # APScheduler 4.x: 需要先使用 configure_task 注册任务
             task_id = job_obj.code
@@ -178,93 +207,102 @@ class SchedulerService:
             logger.error(f"添加任务失败 {job_obj.code}: {str(e)}")
             return False
     
-    def _create_job_wrapper(self, task_func, job_code: str, args: list, kwargs: dict):
+    def _create_job_wrapper(self, task_func, job_obj, args: list, kwargs: dict):
         """创建带日志记录的任务包装函数"""
+        job_code = job_obj.code
+        task_path = job_obj.task_func
+        options = JobOptions.from_job(job_obj)
+        one_time = job_obj.trigger_type == 'date'
+
         async def wrapper():
-            return await self._execute_job(task_func, job_code, args, kwargs)
+            if not await self._acquire_scheduled_run(job_code):
+                return None
+            try:
+                return await self._execute_job(task_func, job_code, args, kwargs, task_path, options)
+            finally:
+                # 一次性任务（date 类型）执行后自动清理
+                if one_time:
+                    await self._cleanup_one_time_job(job_code)
         return wrapper
 
-    async def _execute_job(self, task_func, job_code: str, args: list, kwargs: dict):
-        """执行任务并记录日志"""
-        from app.database import AsyncSessionLocal
-        from scheduler.model import SchedulerJob, SchedulerLog
-        from sqlalchemy import select
-        
+    async def _execute_job(
+            self,
+            task_func,
+            job_code: str,
+            args: list,
+            kwargs: dict,
+            task_path: str,
+            options: JobOptions,
+    ):
+        """按任务配置的执行器执行任务（超时、重试、并发限制）并记录日志"""
         start_time = datetime.now()
         exception_info = None
+        exception_traceback = None
         result = None
-        
-        try:
-            # 执行任务
-            if args:
-                result = await task_func(*args, **kwargs)
-            else:
-                result = await task_func(**kwargs)
-        except Exception as e:
-            exception_info = e
-            logger.error(f"任务 {job_code} 执行失败: {str(e)}")
-        
-        end_time = datetime.now()
-        
-        # 记录日志和更新任务状态
-        try:
-            async with AsyncSessionLocal() as db:
-                # 获取任务
-                query_result = await db.execute(
-                    select(SchedulerJob).where(SchedulerJob.code == job_code)
-                )
-                job_obj = query_result.scalar_one_or_none()
+        retry_count = 0
 
-                if job_obj:
-                    # 创建执行日志
-                    log = SchedulerLog(
-                        job_id=job_obj.id,
-                        job_name=job_obj.name,
-                        job_code=job_obj.code,
-                        start_time=start_time,
-                        end_time=end_time,
-                        duration=(end_time - start_time).total_seconds(),
-                        hostname=socket.gethostname(),
-                        process_id=os.getpid(),
-                    )
-
-                    if exception_info:
-                        # 执行失败
-                        job_obj.last_run_status = 'failed'
-                        job_obj.last_run_result = str(exception_info)
-                        job_obj.failure_count += 1
-                        log.status = 'failed'
-                        log.exception = str(exception_info)
-                        import traceback
-                        log.traceback = traceback.format_exc()
-                    else:
-                        # 执行成功
-                        job_obj.last_run_status = 'success'
-                        job_obj.last_run_result = str(result) if result else None
-                        job_obj.success_count += 1
-                        log.status = 'success'
-                        log.result = str(result) if result else None
-
-                    job_obj.total_run_count += 1
-                    job_obj.last_run_time = end_time
-
-                    db.add(log)
-                    await db.commit()
+        async with job_runner.instance_slot(job_code, options) as slot:
+            if not slot:
+                logger.info(f"任务 {job_code} 已有 {options.concurrency} 个实例在执行，跳过本次")
+                run_accounting.record(job_code, 'skipped', start_time)
+                return None
 
-                    # 一次性任务（date 类型）执行后自动清理
-                    if job_obj.trigger_type == 'date':
-                        await self._cleanup_one_time_job(db, job_obj)
+            while True:
+                # 每次尝试占用分组名额，重试等待期间不占用
+                async with job_runner.group_slot(options.group):
+                    if retry_count == 0:
+                        start_time = datetime.now()
+                    try:
+                        result = await job_runner.run(task_func, task_path, args, kwargs, options, slot)
+                        exception_info = None
+                        break
+                    except Exception as e:
+                        if isinstance(e, TimeoutError):
+                            e = TimeoutError(f"执行超时（{options.timeout} 秒）")
+                        exception_info = e
+                        exception_traceback = traceback.format_exc()
+
+                if retry_count >= options.max_retries:
+                    logger.error(f"任务 {job_code} 执行失败: {str(exception_info)}")
+                    break
+                if slot.lingering:
+                    # 超时的线程仍在执行，重试会同时运行两份
+                    logger.error(f"任务 {job_code} 执行超时且线程仍在执行，不再重试: {str(exception_info)}")
+                    break
+                delay = job_runner.backoff(retry_count)
+                retry_count += 1
+                job_runner.retries += 1
+                logger.warning(f"任务 {job_code} 执行失败，{delay:.1f} 秒后第 {retry_count} 次重试: {str(exception_info)}")
+                await asyncio.sleep(delay)
+
+        if exception_info is None:
+            status = 'success'
+        elif isinstance(exception_info, TimeoutError):
+            status = 'timeout'
+        else:
+            status = 'failed'
+        # 执行日志和执行计数由 run_accounting 批量写入
+        run_accounting.record(
+            job_code, status, start_time,
+            result=result,
+            exception_info=exception_info,
+            exception_traceback=exception_traceback,
+            retry_count=retry_count,
+        )
 
-        except Exception as e:
-            logger.error(f"记录任务执行日志失败: {str(e)}")
-        
         if exception_info:
             raise exception_info
-        
+
         return result
 
     async def remove_job(self, job_code: str) -> bool:
-        """从调度器移除任务"""
+        """从调度器移除任务，并通知其他worker"""
+        success = await self._remove_schedule(job_code)
+        await coordinator.publish('remove', job_code)
+        return success
+
+    async def _remove_schedule(self, job_code: str) -> bool:
+        """从本进程的调度器移除任务"""
         if not self._scheduler:
             return False
             
@@ -277,7 +315,13 @@ class SchedulerService:
             return False
 
     async def pause_job(self, job_code: str) -> bool:
-        """暂停任务"""
+        """暂停任务，并通知其他worker"""
+        success = await self._pause_schedule(job_code)
+        await coordinator.publish('pause', job_code)
+        return success
+
+    async def _pause_schedule(self, job_code: str) -> bool:
+        """暂停本进程调度器中的任务"""
         if not self._scheduler:
             return False
             
@@ -290,7 +334,13 @@ class SchedulerService:
             return False
 
     async def resume_job(self, job_code: str) -> bool:
-        """恢复任务"""
+        """恢复任务，并通知其他worker"""
+        success = await self._resume_schedule(job_code)
+        await coordinator.publish('resume', job_code)
+        return success
+
+    async def _resume_schedule(self, job_code: str) -> bool:
+        """恢复本进程调度器中的任务"""
         if not self._scheduler:
             return False
             
@@ -303,25 +353,85 @@ class SchedulerService:
             return False
 
     async def modify_job(self, job_obj) -> bool:
-        """修改任务"""
+        """修改任务，并通知其他worker"""
         try:
-            # 先移除旧任务
-            await self.remove_job(job_obj.code)
-
-            # 如果任务是启用状态，重新添加
-            if job_obj.is_enabled():
-                return await self.add_job(job_obj)
-
-            return True
+            success = await self._modify_schedule(job_obj)
+            await coordinator.publish('modify', job_obj.code)
+            return success
         except Exception as e:
             logger.error(f"修改任务失败 {job_obj.code}: {str(e)}")
             return False
 
-    async def run_job_now(self, job_code: str) -> bool:
-        """立即执行任务"""
+    async def _modify_schedule(self, job_obj) -> bool:
+        """修改本进程调度器中的任务"""
+        # 先移除旧任务
+        await self._remove_schedule(job_obj.code)
+
+        # 如果任务是启用状态，重新添加
+        if job_obj.is_enabled():
+            return await self._add_schedule(job_obj)
+
+        return True
+
+    async def handle_sync_message(self, message: Dict[str, Any]):
+        """处理其他worker发布的任务变更或立即执行请求"""
         if not self._scheduler:
-            return False
-            
+            return
+        action = message.get('action')
+        job_code = message.get('job_code')
+
+        if action == 'run':
+            # 由抢到锁的一个worker执行，不阻塞订阅
+            if await coordinator.acquire_run(job_code, f"manual:{message.get('run_id')}"):
+                task = asyncio.create_task(self._run_job_local(job_code))
+                self._run_tasks.add(task)
+                task.add_done_callback(self._run_tasks.discard)
+        elif action == 'remove':
+            await self._remove_schedule(job_code)
+        elif action == 'pause':
+            await self._pause_schedule(job_code)
+        elif action == 'resume':
+            await self._resume_schedule(job_code)
+        elif action in ('add', 'modify'):
+            from sqlalchemy import select
+            from app.database import AsyncSessionLocal
+            from scheduler.model import SchedulerJob
+
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(SchedulerJob).where(
+                        SchedulerJob.code == job_code,
+                        SchedulerJob.is_deleted == False  # noqa: E712
+                    )
+                )
+                job_obj = result.scalar_one_or_none()
+
+            if action == 'add':
+                # 批量启用时发布方在提交前添加，这里不按状态判断
+                if job_obj:
+                    await self._add_schedule(job_obj)
+            elif job_obj:
+                await self._modify_schedule(job_obj)
+            else:
+                await self._remove_schedule(job_code)
+        logger.debug(f"已同步其他worker的任务变更: {action} {job_code}")
+
+    async def run_job_now(self, job_code: str) -> bool:
+        """
+        立即执行任务
+
+        本进程运行调度器时直接执行；否则发布给调度worker，由其中一个执行
+        """
+        if self.is_running():
+            return await self._run_job_local(job_code)
+
+        receivers = await coordinator.publish('run', job_code, run_id=uuid.uuid4().hex)
+        if receivers:
+            logger.info(f"任务 {job_code} 已发送给调度worker执行")
+        return receivers > 0
+
+    async def _run_job_local(self, job_code: str) -> bool:
+        """在本进程立即执行任务"""
         try:
             # 在 APScheduler 4.x 中，使用 run_job 立即执行
             from sqlalchemy import select
@@ -343,7 +453,9 @@ class SchedulerService:
                     # 导入并执行任务函数
                     task_func = self._import_task_func(job_obj.task_func)
                     if task_func:
-                        await self._execute_job(task_func, job_code, args, kwargs)
+                        await self._execute_job(
+                            task_func, job_code, args, kwargs, job_obj.task_func, JobOptions.from_job(job_obj)
+                        )
                         logger.info(f"任务 {job_code} 已立即执行")
                         return True
             
@@ -409,8 +521,11 @@ class SchedulerService:
                 )
 
             elif job_obj.trigger_type == 'interval':
-                # 间隔触发器
-                return IntervalTrigger(seconds=job_obj.interval_seconds)
+                # 间隔触发器，起点按间隔对齐，各worker计算出的触发时间一致
+                return IntervalTrigger(
+                    seconds=job_obj.interval_seconds,
+                    start_time=self._align_interval_start(job_obj.interval_seconds),
+                )
 
             elif job_obj.trigger_type == 'date':
                 # 指定时间触发器
@@ -424,6 +539,13 @@ class SchedulerService:
             logger.error(f"构建触发器失败: {str(e)}")
             return None
 
+    @staticmethod
+    def _align_interval_start(seconds: int) -> datetime:
+        """从 UTC 纪元起按间隔对齐，取当前时间之后的第一个对齐点"""
+        epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+        elapsed = (datetime.now(timezone.utc) - epoch).total_seconds()
+        return epoch + timedelta(seconds=(int(elapsed // seconds) + 1) * seconds)
+
     def _import_task_func(self, task_path: str):
         """动态导入任务函数"""
         try:
@@ -434,10 +556,12 @@ class SchedulerService:
             logger.error(f"导入任务函数失败 {task_path}: {str(e)}")
             return None
 
-    async def _cleanup_one_time_job(self, db, job_obj):
+    async def _cleanup_one_time_job(self, job_code: str):
         """清理一次性任务"""
         try:
-            job_code = job_obj.code
+            from sqlalchemy import update
+            from app.database import AsyncSessionLocal
+            from scheduler.model import SchedulerJob
 
             # 从调度器移除
             try:
@@ -446,12 +570,18 @@ class SchedulerService:
                 pass
 
             # 软删除数据库记录
-            job_obj.is_deleted = True
-            await db.commit()
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(SchedulerJob).where(
+                        SchedulerJob.code == job_code,
+                        SchedulerJob.is_deleted == False  # noqa: E712
+                    ).values(is_deleted=True)
+                )
+                await db.commit()
 
             logger.debug(f"一次性任务已清理: {job_code}")
         except Exception as e:
-            logger.error(f"清理一次性任务失败 {job_obj.code}: {str(e)}")
+            logger.error(f"清理一次性任务失败 {job_code}: {str(e)}")
 
     async def cleanup_expired_jobs(self, days: int = 7) -> int:
         """
@@ -97,3 +97,57 @@ def sync_test_task(job_code: str = None, **kwargs):
     
     logger.info(f"[{job_code}] 同步测试任务执行完成: {datetime.now()}")
     return f"同步测试任务执行成功: {datetime.now()}"
+
+
+async def unread_counter_reconcile_task(job_code: str = None, **kwargs):
+    """
+    未读数量校准任务
+    
+    按数据库重建Redis中的未读消息计数，并使未读公告计数失效（下次读取时重新计算，
+    同时修正公告过期带来的偏差）。建议每小时执行一次。
+    
+    Args:
+        job_code: 任务编码（由调度器自动传入）
+        **kwargs: 其他参数
+    """
+    logger.info(f"[{job_code}] 未读数量校准开始")
+    
+    try:
+        from app.database import AsyncSessionLocal
+        from core.message.counter import UnreadCounter
+        
+        async with AsyncSessionLocal() as db:
+            count = await UnreadCounter.reconcile(db)
+        
+        logger.info(f"[{job_code}] 未读数量校准完成，重建了 {count} 个用户的计数")
+        return f"重建了 {count} 个用户的未读计数"
+    except Exception as e:
+        logger.error(f"[{job_code}] 未读数量校准失败: {str(e)}")
+        raise
+
+
+async def data_source_cache_warmup_task(job_code: str = None, **kwargs):
+    """
+    数据源缓存预热任务
+    
+    对启用缓存的数据源按默认参数执行，缓存不存在或即将过期时重新加载，
+    避免缓存过期后第一批访问者等待查询。执行间隔建议小于数据源的缓存时间。
+    
+    Args:
+        job_code: 任务编码（由调度器自动传入）
+        **kwargs: 其他参数
+    """
+    logger.info(f"[{job_code}] 数据源缓存预热开始")
+    
+    try:
+        from app.database import AsyncSessionLocal
+        from core.data_source.service import DataSourceService
+        
+        async with AsyncSessionLocal() as db:
+            count = await DataSourceService.warm_up_cache(db)
+        
+        logger.info(f"[{job_code}] 数据源缓存预热完成，刷新了 {count} 个数据源")
+        return f"刷新了 {count} 个数据源的缓存"
+    except Exception as e:
+        logger.error(f"[{job_code}] 数据源缓存预热失败: {str(e)}")
+        raise
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author: 臧成龙
+@Contact: 939589097@qq.com
+@Time: 2025-12-31
+@File: bench_chart_transform.py
+@Desc: 数据源图表转换基准测试 - 对比逐行转换与按列转换的轴向图、热力图耗时 - 使用方法: python scripts/bench_chart_transform.py [行数]
+"""
+"""
+数据源图表转换基准测试
+生成指定行数的模拟数据（默认100万行），对比：
+- 逐行：原先逐行 item.get 的实现（保留在本脚本中作为对照）
+- 按列：core.data_source.transform 的实现（安装了 NumPy 时降采样、Top N 使用 NumPy）
+另外测试轴向图降采样到 1000 点、热力图按坐标聚合、饼图 Top 10 的耗时
+使用方法: python scripts/bench_chart_transform.py [行数]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.data_source import transform
+
+REPEAT = 3
+
+
+def row_axis(data, config):
+    """逐行实现：轴向图"""
+    x_field = config['x_field']
+    series_fields = config['series_fields']
+    x_axis_data = [item.get(x_field, '') for item in data]
+    series_data = []
+    for field in series_fields:
+        series_data.append({"name": field, "data": [item.get(field, 0) for item in data]})
+    return {"xAxisData": x_axis_data, "seriesData": series_data}
+
+
+def row_heatmap(data, config):
+    """逐行实现：热力图"""
+    x_field, y_field, value_field = config['x_field'], config['y_field'], config['value_field']
+    x_values = list(dict.fromkeys(item.get(x_field, '') for item in data))
+    y_values = list(dict.fromkeys(item.get(y_field, '') for item in data))
+    x_index = {v: i for i, v in enumerate(x_values)}
+    y_index = {v: i for i, v in enumerate(y_values)}
+    series_data = []
+    for item in data:
+        series_data.append([
+            x_index.get(item.get(x_field, ''), 0),
+            y_index.get(item.get(y_field, ''), 0),
+            item.get(value_field, 0),
+        ])
+    return {"xAxisData": x_values, "yAxisData": y_values, "seriesData": series_data}
+
+
+def generate(rows: int):
+    random.seed(0)
+    hours = [f"{h:02d}:00" for h in range(24)]
+    days = [f"day{d}" for d in range(7)]
+    return [
+        {
+            'ts': i,
+            'hour': hours[i % 24],
+            'day': days[(i // 24) % 7],
+            'cpu': random.random() * 100,
+            'mem': random.random() * 100,
+            'category': f"c{random.randint(0, 999)}",
+        }
+        for i in range(rows)
+    ]
+
+
+def bench(name: str, func, *args):
+    best = float('inf')
+    result = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    print(f"  {name:<36} {best * 1000:>10.1f} ms")
+    return result
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"生成 {rows} 行数据...")
+    data = generate(rows)
+    print(f"NumPy: {'已安装 ' + transform.np.__version__ if transform.np is not None else '未安装'}（取 {REPEAT} 次最快）")
+
+    axis_config = {'x_field': 'ts', 'series_fields': ['cpu', 'mem']}
+    heatmap_config = {'x_field': 'hour', 'y_field': 'day', 'value_field': 'cpu'}
+
+    print("轴向图:")
+    expected = bench("逐行", row_axis, data, axis_config)
+    actual = bench("按列", transform.to_chart_axis, data, axis_config)
+    assert expected == actual, "轴向图结果不一致"
+    bench("按列 + LTTB 降采样到 1000 点", transform.to_chart_axis, data, {**axis_config, 'max_points': 1000})
+    bench("按列 + 分桶平均到 1000 点", transform.to_chart_axis, data,
+          {**axis_config, 'max_points': 1000, 'downsample': 'avg'})
+
+    print("热力图:")
+    expected = bench("逐行", row_heatmap, data, heatmap_config)
+    actual = bench("按列", transform.to_chart_heatmap, data, heatmap_config)
+    assert expected == actual, "热力图结果不一致"
+    bench("按列 + 按坐标求平均", transform.to_chart_heatmap, data, {**heatmap_config, 'aggregate': 'avg'})
+
+    print("饼图:")
+    bench("按列 + Top 10", transform.to_chart_pie, data, {'name_field': 'category', 'value_field': 'cpu', 'top_n': 10})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author: 臧成龙
+@Contact: 939589097@qq.com
+@Time: 2025-12-31
+@File: bench_ws_delta.py
+@Desc: 监控WebSocket推送格式基准测试 - 对比完整推送与增量推送的字节数和CPU耗时 - 使用方法: python scripts/bench_ws_delta.py [采样次数] [连接数]
+"""
+"""
+监控WebSocket推送格式基准测试
+使用本机真实的服务器实时统计数据，对比：
+- 字节数：完整JSON / 增量JSON，以及经过 permessage-deflate（保留上下文）压缩后的大小
+- CPU耗时：旧方式每个连接各序列化一次 / 新方式每次广播只序列化一次（含diff）
+使用方法: python scripts/bench_ws_delta.py [采样次数] [连接数]
+"""
+import json
+import sys
+import time
+import zlib
+from copy import deepcopy
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.server_monitor.server_info import ServerInfoCollector
+from core.websocket.delta import apply_patch, diff
+
+
+class DeflateStream:
+    """模拟 permessage-deflate（保留压缩上下文），返回每条消息压缩后的字节数"""
+
+    def __init__(self):
+        self.compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+
+    def size(self, text: str) -> int:
+        data = self.compressor.compress(text.encode()) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        # 协议规定去掉末尾的 00 00 ff ff
+        return len(data) - 4
+
+
+def collect_samples(count: int, interval: float):
+    collector = ServerInfoCollector()
+    collector._collect_realtime_stats()
+    samples = []
+    for _ in range(count):
+        time.sleep(interval)
+        samples.append(collector._collect_realtime_stats())
+    return samples
+
+
+def full_message(data, seq):
+    return {'type': 'realtime_stats', 'message': '实时统计信息', 'mode': 'snapshot',
+            'seq': seq, 'data': data, 'timestamp': data.get('timestamp')}
+
+
+def delta_message(patch, seq):
+    return {'type': 'realtime_stats', 'message': '实时统计信息', 'mode': 'delta',
+            'seq': seq, 'base_seq': seq - 1, 'patch': patch, 'timestamp': None}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    connections = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    print(f"采集 {count} 个样本...")
+    samples = collect_samples(count, 0.2)
+
+    # 字节数
+    full_bytes = delta_bytes = full_deflate = delta_deflate = 0
+    full_stream, delta_stream = DeflateStream(), DeflateStream()
+    client_state = None
+    for seq, data in enumerate(samples, start=1):
+        full_text = json.dumps(full_message(data, seq))
+        full_bytes += len(full_text.encode())
+        full_deflate += full_stream.size(full_text)
+
+        if seq == 1:
+            text = full_text
+            client_state = deepcopy(data)
+        else:
+            patch = diff(samples[seq - 2], data)
+            text = json.dumps(delta_message(patch, seq))
+            client_state = apply_patch(client_state, json.loads(json.dumps(patch)))
+        delta_bytes += len(text.encode())
+        delta_deflate += delta_stream.size(text)
+
+    # 还原正确性校验
+    assert json.dumps(client_state, sort_keys=True) == json.dumps(samples[-1], sort_keys=True)
+
+    # CPU耗时：每次广播
+    start = time.perf_counter()
+    for seq, data in enumerate(samples, start=1):
+        for _ in range(connections):
+            json.dumps(full_message(data, seq))
+    per_socket = (time.perf_counter() - start) / count
+
+    start = time.perf_counter()
+    for seq, data in enumerate(samples, start=1):
+        json.dumps(full_message(data, seq))
+        if seq > 1:
+            json.dumps(delta_message(diff(samples[seq - 2], data), seq))
+    once = (time.perf_counter() - start) / count
+
+    print(f"\n样本数: {count}  模拟连接数: {connections}")
+    print(f"{'格式':<24}{'平均字节/条':>14}{'deflate后':>14}")
+    print(f"{'完整推送':<24}{full_bytes / count:>14.0f}{full_deflate / count:>14.0f}")
+    print(f"{'增量推送(首条为快照)':<24}{delta_bytes / count:>14.0f}{delta_deflate / count:>14.0f}")
+    print("\n每次广播序列化耗时:")
+    print(f"  旧方式（每连接json.dumps）: {per_socket * 1000:.3f} ms")
+    print(f"  新方式（序列化一次+diff）: {once * 1000:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author: 臧成龙
+@Contact: 939589097@qq.com
+@Time: 2025-12-31
+@File: bench_ws_fanout.py
+@Desc: WebSocket广播基准测试 - 模拟大量连接（含慢连接），对比逐个await发送与发送队列 - 使用方法: python scripts/bench_ws_fanout.py [连接数] [慢连接数] [消息数]
+"""
+"""
+WebSocket广播基准测试
+模拟连接的 send_text 通过 sleep 模拟网络耗时，慢连接每条消息耗时更长。对比：
+- 旧方式：广播时逐个 await send_text
+- 新方式：ConnectionManager 发送队列 + 每连接写任务
+指标：广播调用本身的耗时、正常连接收到全部消息的耗时、断开连接耗时
+使用方法: python scripts/bench_ws_fanout.py [连接数] [慢连接数] [消息数]
+"""
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.websocket.consumers.base import ConnectionManager
+
+# 正常连接、慢连接每条消息的发送耗时（秒）
+FAST_DELAY = 0.0
+SLOW_DELAY = 0.2
+
+# 每个连接的发送队列长度
+QUEUE_SIZE = 2
+
+# 两次广播之间的间隔（秒），模拟采样间隔
+BROADCAST_INTERVAL = 0.01
+
+# 每个连接加入的组数量
+GROUPS_PER_SOCKET = 3
+TOTAL_GROUPS = 50
+
+
+class FakeWebSocket:
+    """模拟的WebSocket连接"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.received = 0
+        self.done = asyncio.Event()
+        self.expected = 0
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, text: str):
+        await asyncio.sleep(self.delay)
+        self.received += 1
+        if self.received >= self.expected:
+            self.done.set()
+
+
+async def sequential_broadcast(sockets, message_text: str):
+    """旧方式：逐个await发送"""
+    for websocket in sockets:
+        try:
+            await websocket.send_text(message_text)
+        except Exception:
+            pass
+
+
+async def build(count: int, slow: int, messages: int, policy: str):
+    manager = ConnectionManager(queue_size=QUEUE_SIZE, policy=policy)
+    sockets = []
+    for i in range(count):
+        websocket = FakeWebSocket(SLOW_DELAY if i < slow else FAST_DELAY)
+        websocket.expected = messages
+        await manager.connect(websocket, str(i % 500))
+        await manager.group_add('broadcast', websocket)
+        for g in range(GROUPS_PER_SOCKET):
+            await manager.group_add(f"group:{(i + g) % TOTAL_GROUPS}", websocket)
+        sockets.append(websocket)
+    return manager, sockets
+
+
+async def run_sequential(count: int, slow: int, messages: int):
+    sockets = [FakeWebSocket(SLOW_DELAY if i < slow else FAST_DELAY) for i in range(count)]
+    message_text = json.dumps({'type': 'realtime_stats', 'data': {'cpu_percent': 1.0}})
+    start = time.perf_counter()
+    for _ in range(messages):
+        await sequential_broadcast(sockets, message_text)
+        await asyncio.sleep(BROADCAST_INTERVAL)
+    return time.perf_counter() - start
+
+
+async def run_queued(count: int, slow: int, messages: int, policy: str):
+    manager, sockets = await build(count, slow, messages, policy)
+
+    enqueue_time = 0.0
+    start = time.perf_counter()
+    for _ in range(messages):
+        begin = time.perf_counter()
+        await manager.broadcast_to_group('broadcast', {'type': 'realtime_stats', 'data': {'cpu_percent': 1.0}})
+        enqueue_time += time.perf_counter() - begin
+        await asyncio.sleep(BROADCAST_INTERVAL)
+
+    fast = [ws for ws in sockets if ws.delay == FAST_DELAY]
+    await asyncio.gather(*(ws.done.wait() for ws in fast))
+    fast_time = time.perf_counter() - start
+    stats = manager.get_stats()
+
+    start = time.perf_counter()
+    for i, websocket in enumerate(sockets):
+        manager.disconnect(websocket, str(i % 500))
+    disconnect_time = time.perf_counter() - start
+
+    return enqueue_time / messages, fast_time, disconnect_time, stats
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    slow = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    messages = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    print(f"连接数: {count}  慢连接数: {slow}（每条{SLOW_DELAY * 1000:.0f}ms）  消息数: {messages}\n")
+
+    sequential = await run_sequential(count, slow, messages)
+    print(f"旧方式（逐个await）: 所有连接收到全部消息耗时 {sequential:.3f}s（正常连接同样需要等待慢连接）")
+
+    for policy in ('drop_oldest', 'evict'):
+        enqueue_time, fast_time, disconnect_time, stats = await run_queued(count, slow, messages, policy)
+        print(f"新方式（发送队列，{policy}）:")
+        print(f"  每次广播调用耗时  {enqueue_time * 1000:.1f} ms")
+        print(f"  正常连接全部收到  {fast_time * 1000:.1f} ms")
+        print(f"  断开全部连接      {disconnect_time * 1000:.1f} ms")
+        print(f"  统计（断开前）    {stats}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author: 臧成龙
+@Contact: 939589097@qq.com
+@Time: 2025-12-31
+@File: check_scheduler_single_run.py
+@Desc: 多worker调度验证 - 启动多个进程运行同一个间隔任务，检查每个触发时间只执行一次 - 使用方法: python scripts/check_scheduler_single_run.py [进程数] [运行秒数] [间隔秒数]
+"""
+"""
+多worker调度验证
+模拟多worker部署：每个进程各自运行 AsyncScheduler 和调度协调器，添加同一个间隔任务（错开启动时间），
+任务执行时把触发时间记录到Redis，结束后检查：
+- 每个触发时间恰好执行一次
+- 触发次数与运行时长相符
+- 各进程分别执行了多少次
+需要可用的Redis（settings.REDIS_URL）；任务不写数据库执行日志
+使用方法: python scripts/check_scheduler_single_run.py [进程数] [运行秒数] [间隔秒数]
+"""
+import asyncio
+import multiprocessing
+import random
+import sys
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from utils.redis import RedisClient
+
+# 各进程启动时间的最大错开（秒）
+START_SKEW = 0.5
+
+
+async def run_worker(index: int, duration: float, interval: int, job_code: str, result_key: str):
+    from apscheduler import AsyncScheduler, current_job
+    from scheduler.coordinator import coordinator
+    from scheduler.service import scheduler_service
+
+    async def record(task_func, code, args, kwargs, task_path, options):
+        """替代 _execute_job：只记录触发时间和执行进程"""
+        fire_time = current_job.get().scheduled_fire_time
+        client = await RedisClient.get_client()
+        pipe = client.pipeline(transaction=False)
+        pipe.hincrby(result_key, f"fire:{coordinator.fire_time_key(fire_time)}", 1)
+        pipe.hincrby(result_key, f"worker:{index}", 1)
+        await pipe.execute()
+
+    scheduler_service._execute_job = record
+    await asyncio.sleep(random.random() * START_SKEW)
+
+    async with AsyncScheduler() as scheduler:
+        await scheduler.start_in_background()
+        scheduler_service.set_scheduler(scheduler)
+        await coordinator.start(scheduler_service.handle_sync_message)
+        if not coordinator.running:
+            raise RuntimeError("调度协调未启动，请检查Redis")
+
+        job = SimpleNamespace(
+            code=job_code,
+            trigger_type='interval',
+            interval_seconds=interval,
+            task_func='asyncio.sleep',
+            task_args=None,
+            task_kwargs=None,
+        )
+        await scheduler_service._add_schedule(job)
+        await asyncio.sleep(duration)
+
+        scheduler_service.set_running(False)
+        await coordinator.stop()
+        await scheduler.stop()
+    await RedisClient.close()
+
+
+def worker_main(index: int, duration: float, interval: int, job_code: str, result_key: str):
+    asyncio.run(run_worker(index, duration, interval, job_code, result_key))
+
+
+async def collect(result_key: str):
+    client = await RedisClient.get_client()
+    result = await client.hgetall(result_key)
+    await client.delete(result_key)
+    await RedisClient.close()
+    return result
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    interval = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    run_id = uuid.uuid4().hex[:8]
+    job_code = f"_check_single_run_{run_id}"
+    result_key = f"{settings.CACHE_PREFIX}scheduler:check:{run_id}"
+
+    print(f"{processes} 个进程，运行 {duration} 秒，每 {interval} 秒触发一次（Redis: {settings.REDIS_URL}）")
+    context = multiprocessing.get_context('spawn')
+    workers = [
+        context.Process(target=worker_main, args=(i, duration, interval, job_code, result_key))
+        for i in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    if any(worker.exitcode != 0 for worker in workers):
+        print("存在异常退出的进程")
+        sys.exit(1)
+
+    result = asyncio.run(collect(result_key))
+    fires = {key: int(value) for key, value in result.items() if key.startswith('fire:')}
+    per_worker = {key: int(value) for key, value in result.items() if key.startswith('worker:')}
+    duplicated = {key: count for key, count in fires.items() if count != 1}
+
+    print(f"触发时间数: {len(fires)}（预期约 {int(duration // interval)}）")
+    print(f"总执行次数: {sum(fires.values())}")
+    print(f"各进程执行次数: {dict(sorted(per_worker.items()))}")
+    if duplicated or not fires:
+        print(f"失败：重复执行的触发时间 {duplicated}" if duplicated else "失败：没有执行记录")
+        sys.exit(1)
+    print("通过：每个触发时间只执行了一次")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author: 臧成龙
+@Contact: 939589097@qq.com
+@Time: 2025-12-31
+@File: collector_registry.py
+@Desc: 监控采集器注册表 - 按监控目标复用常驻连接，定期健康检查，空闲自动回收
+"""
+"""
+监控采集器注册表
+每个监控目标（如 redis:project_redis、db:zq_platform）只保留一个常驻采集器，
+采样时不再每次新建、关闭连接。超过健康检查间隔未检查的采集器在取出前先检查连接，
+超过空闲时间未使用的采集器自动关闭。
+采集器需实现 health_check() 和 close() 两个异步方法。
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class CollectorRegistry:
+    """监控采集器注册表（进程内）"""
+
+    # 空闲回收时间（秒）
+    IDLE_TIMEOUT = 300
+
+    # 健康检查间隔（秒）
+    HEALTH_CHECK_INTERVAL = 30
+
+    def __init__(self):
+        # key -> {collector, last_used, last_check}
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+
+    async def get(self, key: str, factory: Callable[[], Any]) -> Any:
+        """
+        获取或创建监控目标的采集器
+
+        Args:
+            key: 目标标识，需包含连接参数以便配置变更后重建
+            factory: 创建采集器的函数，仅在采集器不存在时调用
+
+        Returns:
+            采集器
+        """
+        await self.evict_idle()
+
+        now = time.monotonic()
+        async with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = {'collector': factory(), 'last_used': now, 'last_check': now}
+                self.entries[key] = entry
+                logger.info(f"监控采集器 {key} 已创建")
+
+        if now - entry['last_check'] > self.HEALTH_CHECK_INTERVAL:
+            entry['last_check'] = now
+            if not await entry['collector'].health_check():
+                logger.warning(f"监控采集器 {key} 健康检查失败，下次采集时重新连接")
+
+        entry['last_used'] = now
+        return entry['collector']
+
+    async def evict_idle(self):
+        """关闭超过空闲时间未使用的采集器"""
+        now = time.monotonic()
+        async with self._lock:
+            expired = [key for key, entry in self.entries.items() if now - entry['last_used'] > self.IDLE_TIMEOUT]
+            collectors = [self.entries.pop(key)['collector'] for key in expired]
+
+        for key, collector in zip(expired, collectors):
+            await self._close(key, collector)
+
+    async def close(self):
+        """关闭所有采集器"""
+        async with self._lock:
+            entries = list(self.entries.items())
+            self.entries.clear()
+
+        for key, entry in entries:
+            await self._close(key, entry['collector'])
+
+    @staticmethod
+    async def _close(key: str, collector: Any):
+        try:
+            await collector.close()
+            logger.info(f"监控采集器 {key} 已关闭")
+        except Exception as e:
+            logger.error(f"关闭监控采集器 {key} 失败: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取注册表状态"""
+        now = time.monotonic()
+        return {
+            key: {'idle_seconds': round(now - entry['last_used'], 1)}
+            for key, entry in self.entries.items()
+        }
+
+
+# 全局监控采集器注册表
+collector_registry = CollectorRegistry()
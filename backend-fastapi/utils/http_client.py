@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author: 臧成龙
+@Contact: 939589097@qq.com
+@Time: 2025-12-31
+@File: http_client.py
+@Desc: 应用级共享HTTP客户端 - 连接池复用、按主机限制并发、幂等请求重试、按主机统计延迟
+"""
+"""
+应用级共享HTTP客户端
+- 整个进程共用一个 httpx.AsyncClient（在 main.py 生命周期中创建和关闭），保持长连接，避免每次请求重新握手
+- 按主机限制同时进行的请求数（httpx 只有全局连接数限制）
+- GET/HEAD/OPTIONS 在连接错误、超时和 502/503/504 时按指数退避（full jitter）重试
+- 按主机统计请求数、错误数、重试数和延迟分位数
+- 可选 HTTP/2（需要安装 h2）
+- 不保存响应中的 Cookie：客户端被所有数据源和用户共用，需要 Cookie 时在每次请求中通过 cookies= 传入
+
+使用方式：
+    async with http_clients.session(timeout=10.0) as client:
+        response = await client.get(url, params=params)
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Any, Deque, Dict, Optional
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HostMetrics:
+    """单个主机的请求统计"""
+
+    # 计算分位数保留的最近样本数
+    SAMPLE_SIZE = 500
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.in_flight = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.samples: Deque[float] = deque(maxlen=self.SAMPLE_SIZE)
+        self.status_codes: Dict[int, int] = {}
+
+    def record(self, elapsed_ms: float, status_code: Optional[int]):
+        self.requests += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.samples.append(elapsed_ms)
+        if status_code is None:
+            self.errors += 1
+        else:
+            self.status_codes[status_code] = self.status_codes.get(status_code, 0) + 1
+            if status_code >= 500:
+                self.errors += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        samples = sorted(self.samples)
+
+        def percentile(p: float) -> float:
+            if not samples:
+                return 0.0
+            return round(samples[min(len(samples) - 1, int(len(samples) * p))], 2)
+
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'retries': self.retries,
+            'in_flight': self.in_flight,
+            'avg_ms': round(self.total_ms / self.requests, 2) if self.requests else 0.0,
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+            'max_ms': round(self.max_ms, 2),
+            'status_codes': self.status_codes,
+        }
+
+
+class _NoStoreCookiePolicy(DefaultCookiePolicy):
+    """不接受任何 Set-Cookie，请求中显式传入的 Cookie 照常发送"""
+
+    def set_ok(self, cookie, request):
+        return False
+
+
+class HttpSession:
+    """
+    绑定默认超时时间的共享客户端视图
+
+    可用于 async with（进入、退出时不会关闭共享连接池），便于替换原来每次创建的 httpx.AsyncClient
+    """
+
+    def __init__(self, registry: 'HttpClientRegistry', timeout: Optional[float] = None):
+        self.registry = registry
+        self.timeout = timeout
+
+    async def __aenter__(self) -> 'HttpSession':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        return await self.registry.request(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('POST', url, **kwargs)
+
+
+class HttpClientRegistry:
+    """应用级HTTP客户端"""
+
+    # 可安全重试的方法
+    IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS')
+    # 可重试的响应状态码
+    RETRY_STATUS_CODES = (502, 503, 504)
+    # 退避基数与上限（秒）
+    BACKOFF_BASE = 0.1
+    BACKOFF_MAX = 2.0
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.metrics: Dict[str, HostMetrics] = {}
+        self.http2 = False
+
+    def _create_client(self, transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+        http2 = settings.HTTP_CLIENT_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("未安装 h2，HTTP客户端使用 HTTP/1.1")
+                http2 = False
+        self.http2 = http2
+
+        return httpx.AsyncClient(
+            timeout=settings.HTTP_CLIENT_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE,
+                keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY,
+            ),
+            http2=http2,
+            transport=transport,
+            cookies=CookieJar(policy=_NoStoreCookiePolicy()),
+        )
+
+    async def start(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        创建共享客户端
+
+        Args:
+            transport: 自定义传输层（如 httpx.ASGITransport，用于测试）
+        """
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = self._create_client(transport)
+        logger.info(f"HTTP客户端已创建 (http2={self.http2})")
+
+    async def close(self):
+        """关闭共享客户端及其连接池"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """共享客户端，未在生命周期中创建时（如脚本中使用）按需创建"""
+        if self._client is None:
+            self._client = self._create_client()
+        return self._client
+
+    def session(self, timeout: Optional[float] = None) -> HttpSession:
+        """获取绑定默认超时时间的客户端视图"""
+        return HttpSession(self, timeout)
+
+    def _get_semaphore(self, host: str) -> asyncio.Semaphore:
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(settings.HTTP_CLIENT_MAX_CONNECTIONS_PER_HOST)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    def _backoff(self, attempt: int) -> float:
+        """full jitter：在 [0, min(上限, 基数*2^attempt)] 内随机"""
+        return random.uniform(0, min(self.BACKOFF_MAX, self.BACKOFF_BASE * (2 ** attempt)))
+
+    async def request(self, method: str, url: str, retries: Optional[int] = None, **kwargs) -> httpx.Response:
+        """
+        发送请求
+
+        Args:
+            method: 请求方法
+            url: 请求地址
+            retries: 重试次数，默认幂等方法为 HTTP_CLIENT_RETRIES，其他方法不重试
+            **kwargs: 传给 httpx.AsyncClient.request 的参数（timeout 为 None 时使用客户端默认值）
+        """
+        method = method.upper()
+        if kwargs.get('timeout', ...) is None:
+            kwargs.pop('timeout')
+        if retries is None:
+            retries = settings.HTTP_CLIENT_RETRIES if method in self.IDEMPOTENT_METHODS else 0
+
+        host = httpx.URL(url).netloc.decode('ascii')
+        metrics = self.metrics.setdefault(host, HostMetrics())
+        semaphore = self._get_semaphore(host)
+
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            async with semaphore:
+                metrics.in_flight += 1
+                try:
+                    response = await self.client.request(method, url, **kwargs)
+                except httpx.TransportError:
+                    metrics.record((time.perf_counter() - start) * 1000, None)
+                    if attempt >= retries:
+                        raise
+                    response = None
+                finally:
+                    metrics.in_flight -= 1
+
+            if response is not None:
+                metrics.record((time.perf_counter() - start) * 1000, response.status_code)
+                if response.status_code not in self.RETRY_STATUS_CODES or attempt >= retries:
+                    return response
+                await response.aclose()
+
+            attempt += 1
+            metrics.retries += 1
+            await asyncio.sleep(self._backoff(attempt))
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('POST', url, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取客户端配置和各主机统计"""
+        return {
+            'started': self._client is not None,
+            'http2': self.http2,
+            'max_connections': settings.HTTP_CLIENT_MAX_CONNECTIONS,
+            'max_connections_per_host': settings.HTTP_CLIENT_MAX_CONNECTIONS_PER_HOST,
+            'hosts': {host: metrics.to_dict() for host, metrics in self.metrics.items()},
+        }
+
+
+# 全局HTTP客户端
+http_clients = HttpClientRegistry()
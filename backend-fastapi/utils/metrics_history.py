@@ -0,0 +1,389 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author: 臧成龙
+@Contact: 939589097@qq.com
+@Time: 2025-12-31
+@File: metrics_history.py
+@Desc: 监控指标历史存储 - 进程内时序环形缓冲区，自动降采样，可选mmap持久化
+"""
+"""
+监控指标历史存储
+每个存储包含三个精度层级，每层为按列存放的double环形缓冲区：
+- 原始精度：保留1小时
+- 1分钟均值：保留24小时
+- 5分钟均值：保留7天
+配置 MONITOR_HISTORY_DIR 后每层映射到一个文件（mmap），重启后历史数据不丢失。
+多worker部署时只有获得目录锁的一个进程使用持久化文件，其他进程只保存在内存中，避免多个进程写同一组文件。
+采集失败时不写入样本（不会以0值记录），图表和均值中表现为空缺。
+"""
+import asyncio
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+from app.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+NAN = float('nan')
+
+
+class RingTier:
+    """
+    单个精度层级的环形缓冲区
+
+    数据按列存放：第0列为时间戳，其余为各指标，
+    底层为bytearray或mmap，通过 memoryview.cast('d') 直接读写double
+    """
+
+    MAGIC = b'ZQMETRIC'
+    # 文件头：魔数、列数、容量、写入位置、有效数量
+    HEADER = struct.Struct('<8sIIQQ')
+
+    def __init__(self, resolution: int, retention: int, columns: int, path: Optional[str] = None):
+        """
+        Args:
+            resolution: 精度（秒），0表示原始精度
+            retention: 保留时长（秒）
+            columns: 指标数量
+            path: mmap持久化文件路径
+        """
+        self.resolution = resolution
+        self.retention = retention
+        self.columns = columns + 1
+        self.capacity = 0
+        self.position = 0
+        self.count = 0
+        self._mmap: Optional[mmap.mmap] = None
+        self._file = None
+        self.path = path
+
+    def allocate(self, capacity: int):
+        """分配缓冲区，持久化文件存在且结构一致时加载已有数据"""
+        self.capacity = capacity
+        size = self.HEADER.size + capacity * self.columns * 8
+
+        if self.path:
+            exists = os.path.exists(self.path) and os.path.getsize(self.path) == size
+            self._file = open(self.path, 'r+b' if exists else 'w+b')
+            if not exists:
+                self._file.truncate(size)
+            self._mmap = mmap.mmap(self._file.fileno(), size)
+            buffer = self._mmap
+            if exists:
+                magic, columns, file_capacity, position, count = self.HEADER.unpack_from(buffer, 0)
+                if magic == self.MAGIC and columns == self.columns and file_capacity == capacity:
+                    self.position, self.count = position, count
+                    self.data = memoryview(buffer)[self.HEADER.size:].cast('d')
+                    return
+        else:
+            buffer = bytearray(size)
+
+        self.data = memoryview(buffer)[self.HEADER.size:].cast('d')
+        for i in range(capacity * self.columns):
+            self.data[i] = NAN
+        self._write_header()
+
+    def _write_header(self):
+        if self._mmap is not None:
+            self.HEADER.pack_into(self._mmap, 0, self.MAGIC, self.columns, self.capacity, self.position, self.count)
+
+    def append(self, timestamp: float, values: Sequence[float]):
+        """追加一行数据"""
+        offset = self.position
+        self.data[offset] = timestamp
+        for col, value in enumerate(values, start=1):
+            self.data[col * self.capacity + offset] = value
+        self.position = (self.position + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self._write_header()
+
+    def query(self, start: float, end: float, columns: List[int]) -> Dict[str, list]:
+        """
+        查询时间范围内的数据（按时间升序）
+
+        Args:
+            start: 开始时间戳
+            end: 结束时间戳
+            columns: 指标列下标（从0开始）
+        """
+        timestamps = []
+        series = [[] for _ in columns]
+        first = (self.position - self.count) % self.capacity
+        for i in range(self.count):
+            offset = (first + i) % self.capacity
+            ts = self.data[offset]
+            if math.isnan(ts) or ts < start or ts > end:
+                continue
+            timestamps.append(ts)
+            for values, col in zip(series, columns):
+                value = self.data[(col + 1) * self.capacity + offset]
+                values.append(None if math.isnan(value) else round(value, 4))
+        return {'timestamps': timestamps, 'series': series}
+
+    def flush(self):
+        if self._mmap is not None:
+            self._mmap.flush()
+
+    def close(self):
+        if self._mmap is not None:
+            self.data.release()
+            self._mmap.flush()
+            self._mmap.close()
+            self._mmap = None
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class MetricsHistory:
+    """单个监控目标的指标历史"""
+
+    # 降采样层级：(精度秒数, 保留秒数)
+    TIERS = [
+        (60, 24 * 3600),
+        (300, 7 * 24 * 3600),
+    ]
+
+    # 原始精度保留时长（秒）
+    RAW_RETENTION = 3600
+
+    def __init__(self, name: str, metrics: List[str], interval: float, directory: Optional[str] = None):
+        """
+        Args:
+            name: 存储名称，如 server、redis:project_redis、db:zq_platform
+            metrics: 指标名称列表
+            interval: 数据写入间隔（秒），用于计算原始精度层容量
+            directory: 持久化目录，为空时仅保存在内存中
+        """
+        self.name = name
+        self.metrics = list(metrics)
+        self._index = {metric: i for i, metric in enumerate(self.metrics)}
+        self._lock = threading.Lock()
+
+        def tier_path(suffix: str) -> Optional[str]:
+            if not directory:
+                return None
+            safe_name = re.sub(r'[^\w.-]', '_', name)
+            return os.path.join(directory, f"{safe_name}.{suffix}.bin")
+
+        self.raw = RingTier(0, self.RAW_RETENTION, len(self.metrics), tier_path('raw'))
+        self.raw.allocate(max(1, math.ceil(self.RAW_RETENTION / max(interval, 0.1))))
+
+        self.tiers: List[RingTier] = []
+        for resolution, retention in self.TIERS:
+            tier = RingTier(resolution, retention, len(self.metrics), tier_path(f'{resolution}s'))
+            tier.allocate(retention // resolution)
+            self.tiers.append(tier)
+
+        # 各降采样层当前桶的累加值：[桶开始时间, 各指标和, 各指标计数]
+        self._buckets = [[None, [0.0] * len(self.metrics), [0] * len(self.metrics)] for _ in self.tiers]
+
+    def record(self, values: Dict[str, Optional[float]], timestamp: Optional[float] = None):
+        """
+        写入一组指标
+
+        Args:
+            values: {指标名: 值}，缺失或None的指标记为空
+            timestamp: 时间戳，默认当前时间
+        """
+        timestamp = timestamp or time.time()
+        row = []
+        for metric in self.metrics:
+            value = values.get(metric)
+            row.append(NAN if value is None else float(value))
+
+        with self._lock:
+            self.raw.append(timestamp, row)
+            for tier, bucket in zip(self.tiers, self._buckets):
+                bucket_start = timestamp - timestamp % tier.resolution
+                if bucket[0] is not None and bucket_start != bucket[0]:
+                    self._flush_bucket(tier, bucket)
+                if bucket[0] is None:
+                    bucket[0] = bucket_start
+                for i, value in enumerate(row):
+                    if not math.isnan(value):
+                        bucket[1][i] += value
+                        bucket[2][i] += 1
+
+    @staticmethod
+    def _flush_bucket(tier: RingTier, bucket: list):
+        """将当前桶的均值写入降采样层并重置"""
+        averages = [total / count if count else NAN for total, count in zip(bucket[1], bucket[2])]
+        tier.append(bucket[0], averages)
+        bucket[0] = None
+        bucket[1] = [0.0] * len(bucket[1])
+        bucket[2] = [0] * len(bucket[2])
+
+    def query(self, start: float, end: Optional[float] = None,
+              metrics: Optional[List[str]] = None) -> Dict[str, object]:
+        """
+        查询历史数据，按时间范围自动选择精度
+
+        Args:
+            start: 开始时间戳
+            end: 结束时间戳，默认当前时间
+            metrics: 指标名称列表，默认全部
+
+        Returns:
+            {name, resolution, start, end, timestamps, series}
+        """
+        now = time.time()
+        end = end or now
+        metrics = [m for m in (metrics or self.metrics) if m in self._index]
+        columns = [self._index[m] for m in metrics]
+
+        tier = self.raw
+        if now - start > self.raw.retention:
+            tier = next((t for t in self.tiers if now - start <= t.retention), self.tiers[-1])
+
+        with self._lock:
+            result = tier.query(start, end, columns)
+
+        return {
+            'name': self.name,
+            'resolution': tier.resolution,
+            'start': start,
+            'end': end,
+            'timestamps': result['timestamps'],
+            'series': dict(zip(metrics, result['series'])),
+        }
+
+    def flush(self):
+        with self._lock:
+            for tier in [self.raw] + self.tiers:
+                tier.flush()
+
+    def close(self):
+        with self._lock:
+            for tier in [self.raw] + self.tiers:
+                tier.close()
+
+
+class MetricsHistoryRegistry:
+    """指标历史存储注册表（进程内）"""
+
+    LOCK_FILE = '.lock'
+
+    def __init__(self):
+        self.stores: Dict[str, MetricsHistory] = {}
+        self._lock = threading.Lock()
+        # 持久化目录锁文件，本进程获得锁后一直持有到 close()
+        self._directory_lock = None
+        self._directory_owner: Optional[bool] = None
+
+    def _acquire_directory(self, directory: str) -> bool:
+        """获取持久化目录的独占锁（非阻塞），同一目录只允许一个进程写入"""
+        if self._directory_owner is not None:
+            return self._directory_owner
+        lock_file = None
+        try:
+            os.makedirs(directory, exist_ok=True)
+            lock_file = open(os.path.join(directory, self.LOCK_FILE), 'a+b')
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError as e:
+            if lock_file is not None:
+                lock_file.close()
+            logger.warning(f"指标历史目录 {directory} 已被其他进程使用，本进程的历史数据只保存在内存中: {e}")
+            self._directory_owner = False
+            return False
+        self._directory_lock = lock_file
+        self._directory_owner = True
+        return True
+
+    def get_store(self, name: str, metrics: List[str], interval: float) -> MetricsHistory:
+        """
+        获取或创建指标历史存储
+
+        Args:
+            name: 存储名称
+            metrics: 指标名称列表
+            interval: 数据写入间隔（秒）
+        """
+        with self._lock:
+            store = self.stores.get(name)
+            if store is None:
+                directory = settings.MONITOR_HISTORY_DIR
+                if directory and not self._acquire_directory(directory):
+                    directory = None
+                try:
+                    store = MetricsHistory(name, metrics, interval, directory)
+                except OSError as e:
+                    logger.error(f"指标历史持久化文件打开失败，使用内存存储: {e}")
+                    store = MetricsHistory(name, metrics, interval)
+                self.stores[name] = store
+            return store
+
+    def get(self, name: str) -> Optional[MetricsHistory]:
+        return self.stores.get(name)
+
+    def close(self):
+        """关闭所有存储并刷新持久化文件"""
+        with self._lock:
+            for store in self.stores.values():
+                store.close()
+            self.stores.clear()
+            if self._directory_lock is not None:
+                # 关闭文件即释放锁
+                self._directory_lock.close()
+                self._directory_lock = None
+            self._directory_owner = None
+
+
+class HistoryRecorder:
+    """按固定间隔执行的指标历史采集任务（Redis、数据库等异步采集）"""
+
+    def __init__(self):
+        self.funcs: List[Callable[[], Awaitable[None]]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, func: Callable[[], Awaitable[None]]):
+        """注册采集函数"""
+        self.funcs.append(func)
+
+    def start(self, interval: float):
+        """启动采集任务"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(interval))
+
+    async def stop(self):
+        """停止采集任务"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self, interval: float):
+        while True:
+            results = await asyncio.gather(*(func() for func in self.funcs), return_exceptions=True)
+            for func, result in zip(self.funcs, results):
+                if isinstance(result, Exception):
+                    logger.error(f"指标历史采集失败 {func.__name__}: {result}")
+            await asyncio.sleep(interval)
+
+
+# 全局指标历史注册表
+metrics_history = MetricsHistoryRegistry()
+
+# 全局指标历史采集任务
+history_recorder = HistoryRecorder()
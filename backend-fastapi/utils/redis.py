@@ -25,6 +25,7 @@ class RedisClient:
     """Redis客户端管理器"""
     
     _client: Optional[Redis] = None
+    _binary_client: Optional[Redis] = None
     
     @classmethod
     async def get_client(cls) -> Redis:
@@ -37,12 +38,25 @@ class RedisClient:
             )
         return cls._client
     
+    @classmethod
+    async def get_binary_client(cls) -> Redis:
+        """获取不解码返回值的Redis客户端实例（用于读写压缩等二进制数据）"""
+        if cls._binary_client is None:
+            cls._binary_client = await aioredis.from_url(
+                settings.REDIS_URL,
+                decode_responses=False
+            )
+        return cls._binary_client
+    
     @classmethod
     async def close(cls) -> None:
         """关闭Redis连接"""
         if cls._client:
             await cls._client.close()
             cls._client = None
+        if cls._binary_client:
+            await cls._binary_client.close()
+            cls._binary_client = None
 
 
 class CacheManager: